@@ -0,0 +1,177 @@
+"""
+Recall/latency sweep for the IVF-PQ approximate index.
+
+Builds (or loads) an IVF-PQ index and measures, for every nprobe value,
+recall@k against exact search and the per-query latency, next to the
+exact (flat) baseline. Use it to pick RAG_IVFPQ_NPROBE and
+RAG_IVFPQ_RERANK for a corpus:
+
+    python -m benchmarks.ann_recall --count 200000 --dim 256 --nprobe 1,4,16,64
+    python -m benchmarks.ann_recall --artifact vectorstore/index.rgidx --nprobe 8,16,32
+
+Without --artifact the vectors are synthetic: unit-norm points scattered
+around random cluster centres, which is closer to real embeddings than
+uniform noise. With --artifact the queries are perturbed copies of
+artifact rows, so the exact neighbours are known without an embedding API.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.run import git_revision, parse_int_list, summarize_latencies
+from src.services.rag.index_artifact import IndexArtifact
+from src.services.rag.ivfpq import IVFPQIndex, ivfpq_path_for
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, spread: float, seed: int) -> np.ndarray:
+    """
+    Generate clustered unit-norm vectors.
+
+    Args:
+        count: Number of vectors
+        dim: Dimension
+        clusters: Number of cluster centres
+        spread: Noise scale around each centre
+        seed: Random seed
+
+    Returns:
+        np.ndarray: (count x dim) float32, L2-normalized
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)]
+    vectors += spread * rng.normal(size=(count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    """Perturbed copies of random rows, L2-normalized."""
+    rng = np.random.default_rng(seed + 1)
+    rows = np.asarray(vectors[np.sort(rng.choice(len(vectors), min(count, len(vectors)), replace=False))])
+    queries = rows + noise * rng.normal(size=rows.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """Exact top-k rows by inner product."""
+    scores = np.asarray(vectors @ query)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def sweep(vectors: np.ndarray, index: IVFPQIndex, queries: np.ndarray, k: int,
+          nprobes: List[int], rerank: int) -> Dict[str, Any]:
+    """
+    Measure exact search and IVF-PQ at every nprobe.
+
+    Args:
+        vectors: Exact vectors
+        index: Built IVF-PQ index
+        queries: Query vectors
+        k: Neighbours per query
+        nprobes: nprobe values to test
+        rerank: Candidates re-ranked with exact vectors
+
+    Returns:
+        dict: Flat baseline and one entry per nprobe
+    """
+    truth, flat_samples = [], []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(set(exact_search(vectors, query, k).tolist()))
+        flat_samples.append(time.perf_counter() - start)
+
+    results = {"flat": summarize_latencies(flat_samples), "ivfpq": {}}
+    for nprobe in nprobes:
+        samples, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            ids, _ = index.search(query, k, vectors, nprobe=nprobe, rerank=rerank)
+            samples.append(time.perf_counter() - start)
+            hits += len(expected & set(ids.tolist()))
+        recall = hits / (k * len(queries))
+        results["ivfpq"][str(nprobe)] = {f"recall@{k}": round(recall, 4), **summarize_latencies(samples)}
+        print(f"[ann] nprobe={nprobe}: recall@{k}={recall:.3f} "
+              f"p95={results['ivfpq'][str(nprobe)]['p95_ms']}ms", file=sys.stderr)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the CLI argument parser.
+
+    Returns:
+        ArgumentParser: Parser
+    """
+    parser = argparse.ArgumentParser(description="IVF-PQ recall/latency sweep")
+    parser.add_argument("--artifact", help="Index artifact to use instead of synthetic vectors")
+    parser.add_argument("--count", type=int, default=100_000, help="Synthetic vectors")
+    parser.add_argument("--dim", type=int, default=256, help="Synthetic dimension")
+    parser.add_argument("--clusters", type=int, default=1000, help="Synthetic cluster centres")
+    parser.add_argument("--spread", type=float, default=0.6, help="Synthetic noise around centres")
+    parser.add_argument("--nlist", type=int, help="Inverted lists (default ~4*sqrt(count))")
+    parser.add_argument("--m", type=int, help="PQ sub-quantizers (default dim/16)")
+    parser.add_argument("--train-size", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--nprobe", type=parse_int_list, default=[1, 4, 16, 64])
+    parser.add_argument("--rerank", type=int, default=256, help="Candidates re-ranked exactly")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None,
+                        help="Results file (default benchmarks/results/ann-<timestamp>.json)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+
+    if args.artifact:
+        vectors = IndexArtifact.load(args.artifact).vectors
+        existing = ivfpq_path_for(args.artifact)
+        index = IVFPQIndex.load(str(existing)) if existing.is_file() and not (args.nlist or args.m) else None
+    else:
+        vectors = synthetic_vectors(args.count, args.dim, args.clusters, args.spread, args.seed)
+        index = None
+
+    build_seconds = None
+    if index is None:
+        start = time.perf_counter()
+        index = IVFPQIndex.build(vectors, nlist=args.nlist, m=args.m, train_size=args.train_size,
+                                 iterations=args.iterations, seed=args.seed)
+        build_seconds = round(time.perf_counter() - start, 2)
+
+    queries = make_queries(vectors, args.queries, args.query_noise, args.seed)
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key != "output"}
+        },
+        "index": {**index.get_stats(), "build_seconds": build_seconds},
+        **sweep(vectors, index, queries, args.k, args.nprobe, args.rerank)
+    }
+
+    output = Path(args.output or f"benchmarks/results/ann-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"[ann] results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
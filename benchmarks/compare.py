@@ -0,0 +1,122 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+
+Exits with status 1 if any tracked metric regressed by more than the
+threshold (relative change), so it can gate a deployment pipeline.
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import sys
+
+# Metric name suffixes and whether higher values are better
+TRACKED_METRICS: Dict[str, bool] = {
+    "seconds": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "qps": True,
+    "rps": True,
+    "peak_rss_mb": False,
+    "index_size_bytes": False,
+    "errors": False,
+}
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    """
+    Flatten nested results into dotted metric paths.
+
+    Args:
+        results (dict): Results document (or a sub-tree)
+        prefix (str): Path prefix
+
+    Returns:
+        dict: Dotted path -> numeric value
+    """
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(
+    baseline: dict,
+    candidate: dict,
+    threshold: float
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Compare tracked metrics between two result documents.
+
+    Args:
+        baseline (dict): Baseline results
+        candidate (dict): Candidate results
+        threshold (float): Relative change counted as a regression
+
+    Returns:
+        tuple: (all comparisons, regressions)
+    """
+    old = flatten(baseline.get("scales", {}))
+    new = flatten(candidate.get("scales", {}))
+    rows, regressions = [], []
+
+    for path in sorted(set(old) & set(new)):
+        metric = path.rsplit(".", 1)[-1]
+        if metric not in TRACKED_METRICS:
+            continue
+        higher_is_better = TRACKED_METRICS[metric]
+        before, after = old[path], new[path]
+        if before == 0:
+            change = 0.0 if after == 0 else float("inf")
+        else:
+            change = (after - before) / abs(before)
+        worse = -change if higher_is_better else change
+        row = {
+            "metric": path,
+            "baseline": before,
+            "candidate": after,
+            "change": round(change, 4),
+            "regression": worse > threshold
+        }
+        rows.append(row)
+        if row["regression"]:
+            regressions.append(row)
+
+    return rows, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Compare Risk-Guardian benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Relative change counted as a regression (default 0.15)")
+    parser.add_argument("--all", action="store_true", help="Print every compared metric")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    for row in rows if args.all else regressions:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{flag:10} {row['metric']:55} {row['baseline']:>12.3f} -> "
+              f"{row['candidate']:>12.3f} ({row['change']:+.1%})")
+
+    print(f"{len(rows)} metrics compared, {len(regressions)} regressions "
+          f"(threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
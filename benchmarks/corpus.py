@@ -0,0 +1,99 @@
+"""
+Synthetic corpora and query sets for the benchmark suite.
+"""
+from pathlib import Path
+from typing import List
+import json
+import random
+import re
+
+
+def build_synthetic_corpus(source_dir: str, output_dir: str, scale: int, seed: int = 42) -> Path:
+    """
+    Write a corpus `scale` times the size of the source documents.
+
+    Scale 1 is a plain copy. Each further replica shuffles paragraphs and
+    appends a replica marker, so chunks are not exact duplicates and the
+    index does real work.
+
+    Args:
+        source_dir (str): Directory with the source .txt documents
+        output_dir (str): Destination directory
+        scale (int): Size multiplier
+        seed (int): Random seed for reproducible shuffling
+
+    Returns:
+        Path: The corpus directory
+    """
+    rng = random.Random(seed)
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    for source in sorted(Path(source_dir).glob("*.txt")):
+        text = source.read_text(encoding="utf-8")
+        paragraphs = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+        for replica in range(scale):
+            if replica == 0:
+                content = text
+            else:
+                shuffled = paragraphs[:]
+                rng.shuffle(shuffled)
+                content = "\n\n".join(
+                    f"{paragraph} [r{replica}]" for paragraph in shuffled
+                )
+            (output / f"{source.stem}_{replica:04d}.txt").write_text(content, encoding="utf-8")
+
+    return output
+
+
+def corpus_size_bytes(corpus_dir: str) -> int:
+    """
+    Get the total size of a corpus.
+
+    Args:
+        corpus_dir (str): Corpus directory
+
+    Returns:
+        int: Size in bytes
+    """
+    return sum(path.stat().st_size for path in Path(corpus_dir).glob("*.txt"))
+
+
+def load_incident_queries(examples_path: str = "data/incident_examples.json") -> List[str]:
+    """
+    Build benchmark queries from the bundled incident examples.
+
+    Args:
+        examples_path (str): Path to incident_examples.json
+
+    Returns:
+        list: Query strings ("titulo. descripcion")
+    """
+    with open(examples_path, "r", encoding="utf-8") as f:
+        examples = json.load(f)
+    return [
+        f"{incident['titulo']}. {incident['descripcion']}"
+        for incident in examples.get("incidentes", [])
+    ]
+
+
+def load_incident_payloads(examples_path: str = "data/incident_examples.json") -> List[dict]:
+    """
+    Build /api/analyze request bodies from the bundled incident examples.
+
+    Args:
+        examples_path (str): Path to incident_examples.json
+
+    Returns:
+        list: Request bodies
+    """
+    with open(examples_path, "r", encoding="utf-8") as f:
+        examples = json.load(f)
+    return [
+        {
+            "titulo": incident["titulo"],
+            "descripcion": incident["descripcion"],
+            "urgencia": incident.get("severidad", "media")
+        }
+        for incident in examples.get("incidentes", [])
+    ]
@@ -0,0 +1,577 @@
+"""
+Retrieval quality and latency evaluation harness.
+
+Grid-searches the chunker (parent/child sizes, child overlap) and the
+retriever (search type, k, fetch_k, lambda_mult) over docs/ and reports,
+for every configuration, recall@k, MRR and nDCG@k next to p95 search
+latency and index size. Configurations that no other configuration beats
+on every objective are marked Pareto-optimal.
+
+    python -m benchmarks.eval_retrieval --parent-chunk-sizes 1000,2000,3000 \\
+        --child-chunk-sizes 200,400,800 --k 4,8,12 --fetch-k 16,32 \\
+        --lambda-mult 0.5,0.7,0.9 --jobs 4 --output benchmarks/results/retrieval.json
+
+Relevance is judged on a fixed reference unit, the paragraphs of docs/, so
+the labels do not depend on the chunking under test: a query's relevant
+passages are the paragraphs matching its label keywords
+(benchmarks/retrieval_labels.json), and a retrieved section covers a
+passage when it contains most of the passage's word shingles.
+
+One worker process builds one index per chunking configuration and then
+evaluates every retriever configuration against it. Workers share the CPU,
+so use --jobs 1 when the latency columns matter more than wall time. With
+the default fake embeddings the quality numbers measure lexical overlap;
+run with --embeddings openai for numbers that reflect the real model.
+
+The chosen values are deployed through RAG_PARENT_CHUNK_SIZE,
+RAG_CHILD_CHUNK_SIZE, RAG_CHILD_CHUNK_OVERLAP, RAG_SEARCH_TYPE, RAG_K,
+RAG_FETCH_K and RAG_LAMBDA_MULT.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.run import directory_size_bytes, git_revision, parse_int_list, summarize_latencies
+from benchmarks.stubs import install_stubs
+
+# Objective -> direction used for the Pareto front
+OBJECTIVES = {
+    "recall": "max",
+    "mrr": "max",
+    "ndcg": "max",
+    "p95_ms": "min",
+    "index_size_bytes": "min",
+    "context_chars": "min"
+}
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+# ================================
+# LABELED QUERY SET
+# ================================
+
+def split_passages(docs_path: str) -> List[Dict[str, Any]]:
+    """
+    Split the source documents into reference passages (paragraphs).
+
+    Args:
+        docs_path (str): Directory with the .txt documents
+
+    Returns:
+        list: Passages with id, filename and text
+    """
+    passages = []
+    for source in sorted(Path(docs_path).glob("*.txt")):
+        text = source.read_text(encoding="utf-8")
+        for paragraph in re.split(r"\n\s*\n", text):
+            if len(_WORD_PATTERN.findall(paragraph)) >= 3:
+                passages.append({"id": len(passages), "filename": source.name, "text": paragraph.strip()})
+    return passages
+
+
+def keyword_hits(text: str, keywords: Sequence[str]) -> int:
+    """
+    Count the keywords that appear in a text as a word prefix.
+
+    Args:
+        text (str): Text to search
+        keywords (list): Keywords or stems (e.g. "contraseñ")
+
+    Returns:
+        int: Number of distinct keywords found
+    """
+    lowered = text.lower()
+    return sum(1 for keyword in keywords if re.search(r"\b" + re.escape(keyword.lower()), lowered))
+
+
+def relevant_passages(passages: List[Dict[str, Any]], label: Dict[str, Any]) -> Set[int]:
+    """
+    Select the passages that match a relevance label.
+
+    Args:
+        passages (list): Reference passages
+        label (dict): keywords, min_hits and optional required keywords
+
+    Returns:
+        set: Relevant passage ids
+    """
+    required = label.get("required") or []
+    return {
+        passage["id"] for passage in passages
+        if keyword_hits(passage["text"], label["keywords"]) >= label.get("min_hits", 1)
+        and (not required or keyword_hits(passage["text"], required) > 0)
+    }
+
+
+def build_labeled_queries(
+    passages: List[Dict[str, Any]],
+    examples_path: str = "data/incident_examples.json",
+    labels_path: str = "benchmarks/retrieval_labels.json"
+) -> List[Dict[str, Any]]:
+    """
+    Build the query -> relevant passages set.
+
+    Incident category queries are the category examples and the incidents
+    of that type in incident_examples.json. Methodology queries use the
+    same query expansion as `search_by_methodology` and the keyword map it
+    filters with.
+
+    Args:
+        passages (list): Reference passages
+        examples_path (str): Path to incident_examples.json
+        labels_path (str): Path to retrieval_labels.json
+
+    Returns:
+        list: Labeled queries (query, label, relevant passage ids)
+    """
+    from src.services.rag.core import METHODOLOGY_KEYWORDS
+
+    with open(examples_path, "r", encoding="utf-8") as f:
+        examples = json.load(f)
+    with open(labels_path, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+
+    labeled = []
+    for category, label in labels.get("categories", {}).items():
+        relevant = relevant_passages(passages, label)
+        incidents = list(examples.get("categorias", {}).get(category, {}).get("ejemplos", []))
+        incidents += [i for i in examples.get("incidentes", []) if i.get("tipo") == category]
+        seen = set()
+        for incident in incidents:
+            query = f"{incident['titulo']}. {incident['descripcion']}"
+            if query not in seen:
+                seen.add(query)
+                labeled.append({"query": query, "label": category, "relevant": relevant})
+
+    for methodology, label in labels.get("methodologies", {}).items():
+        full_label = {**label, "keywords": METHODOLOGY_KEYWORDS.get(methodology, [methodology.lower()])}
+        relevant = relevant_passages(passages, full_label)
+        for query in label.get("queries", []):
+            labeled.append({"query": f"{query} {methodology}", "label": methodology, "relevant": relevant})
+
+    return [item for item in labeled if item["relevant"]]
+
+
+# ================================
+# METRICS
+# ================================
+
+def shingles(text: str, size: int = 3) -> Set[tuple]:
+    """
+    Get the word shingles of a text.
+
+    Args:
+        text (str): Text
+        size (int): Words per shingle
+
+    Returns:
+        set: Shingles (texts shorter than `size` give one shingle)
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def covered_passages(
+    section_text: str,
+    passage_shingles: Dict[int, Set[tuple]],
+    candidates: Set[int],
+    threshold: float = 0.5
+) -> Set[int]:
+    """
+    Find the candidate passages a retrieved section covers.
+
+    Args:
+        section_text (str): Retrieved section content
+        passage_shingles (dict): Passage id -> shingles
+        candidates (set): Passage ids to check
+        threshold (float): Minimum fraction of passage shingles in the section
+
+    Returns:
+        set: Covered passage ids
+    """
+    section = shingles(section_text)
+    covered = set()
+    for passage_id in candidates:
+        own = passage_shingles[passage_id]
+        if own and len(own & section) / len(own) >= threshold:
+            covered.add(passage_id)
+    return covered
+
+
+def recall_at_k(ranked: List[Set[int]], relevant: Set[int], k: int) -> float:
+    """
+    Fraction of the relevant passages covered by the top k results.
+
+    Args:
+        ranked (list): Covered relevant passage ids per result rank
+        relevant (set): Relevant passage ids
+        k (int): Cut-off
+
+    Returns:
+        float: Recall in [0, 1]
+    """
+    if not relevant:
+        return 0.0
+    found = set().union(*ranked[:k]) if ranked[:k] else set()
+    return len(found & relevant) / len(relevant)
+
+
+def reciprocal_rank(ranked: List[Set[int]], k: int) -> float:
+    """
+    Reciprocal rank of the first result covering a relevant passage.
+
+    Args:
+        ranked (list): Covered relevant passage ids per result rank
+        k (int): Cut-off
+
+    Returns:
+        float: 1/rank, or 0 when nothing relevant is in the top k
+    """
+    for rank, covered in enumerate(ranked[:k], start=1):
+        if covered:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked: List[Set[int]], relevant: Set[int], k: int) -> float:
+    """
+    Binary nDCG@k where a result only gains if it covers a relevant passage
+    no higher-ranked result already covered (duplicates earn nothing).
+
+    Args:
+        ranked (list): Covered relevant passage ids per result rank
+        relevant (set): Relevant passage ids
+        k (int): Cut-off
+
+    Returns:
+        float: nDCG in [0, 1]
+    """
+    ideal = sum(1.0 / math.log2(rank + 2) for rank in range(min(k, len(relevant))))
+    if not ideal:
+        return 0.0
+    seen: Set[int] = set()
+    dcg = 0.0
+    for rank, covered in enumerate(ranked[:k]):
+        if covered - seen:
+            dcg += 1.0 / math.log2(rank + 2)
+        seen |= covered
+    return dcg / ideal
+
+
+def pareto_front(rows: List[Dict[str, Any]], objectives: Dict[str, str]) -> List[int]:
+    """
+    Find the rows no other row dominates.
+
+    A row dominates another when it is at least as good on every objective
+    and strictly better on one.
+
+    Args:
+        rows (list): Result rows
+        objectives (dict): Metric name -> "max" or "min"
+
+    Returns:
+        list: Indices of the Pareto-optimal rows
+    """
+    def oriented(row: Dict[str, Any]) -> List[float]:
+        return [row[name] if direction == "max" else -row[name] for name, direction in objectives.items()]
+
+    points = [oriented(row) for row in rows]
+    front = []
+    for i, point in enumerate(points):
+        dominated = any(
+            all(o >= p for o, p in zip(other, point)) and any(o > p for o, p in zip(other, point))
+            for j, other in enumerate(points) if j != i
+        )
+        if not dominated:
+            front.append(i)
+    return front
+
+
+# ================================
+# GRID EVALUATION
+# ================================
+
+def build_grid(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Expand the CLI ranges into chunking configurations, each with its
+    list of retriever configurations. Invalid combinations are dropped.
+
+    Args:
+        args (Namespace): CLI arguments
+
+    Returns:
+        list: {"chunking": {...}, "retrieval": [{...}, ...]}
+    """
+    retrieval = []
+    for search_type, k, fetch_k, lambda_mult in product(args.search_types, args.k, args.fetch_k, args.lambda_mult):
+        if search_type == "similarity":
+            fetch_k, lambda_mult = k, 1.0
+        elif fetch_k < k:
+            continue
+        config = {"search_type": search_type, "k": k, "fetch_k": fetch_k, "lambda_mult": lambda_mult}
+        if config not in retrieval:
+            retrieval.append(config)
+
+    grid = []
+    for parent_size, child_size, overlap in product(
+        args.parent_chunk_sizes, args.child_chunk_sizes, args.child_chunk_overlaps
+    ):
+        if child_size > parent_size or overlap >= child_size:
+            continue
+        grid.append({
+            "chunking": {
+                "parent_chunk_size": parent_size,
+                "child_chunk_size": child_size,
+                "child_chunk_overlap": overlap
+            },
+            "retrieval": retrieval
+        })
+    return grid
+
+
+async def _evaluate_chunking(
+    chunking: Dict[str, int],
+    retrieval_configs: List[Dict[str, Any]],
+    labeled: List[Dict[str, Any]],
+    passage_shingles: Dict[int, Set[tuple]],
+    args: argparse.Namespace,
+    workdir: Path
+) -> List[Dict[str, Any]]:
+    """Build one index and evaluate every retriever configuration on it."""
+    from src.services.rag.core import SecurityKnowledgeRAG
+
+    persist_dir = workdir / "p{parent_chunk_size}_c{child_chunk_size}_o{child_chunk_overlap}".format(**chunking)
+    rag = SecurityKnowledgeRAG(args.docs, str(persist_dir))
+    rag.config.update({f"rag_{key}": value for key, value in chunking.items()})
+
+    start = time.perf_counter()
+    if not await rag.initialize():
+        raise RuntimeError(f"Index build failed for {chunking}")
+    index_seconds = time.perf_counter() - start
+    index_size = directory_size_bytes(persist_dir)
+
+    rows = []
+    for retrieval in retrieval_configs:
+        rag.retriever.configure_retriever(**retrieval)
+        await rag.search_relevant_context(labeled[0]["query"], max_chunks=args.eval_k)  # warm-up
+
+        latencies, recalls, mrrs, ndcgs, context_chars = [], [], [], [], []
+        for item in labeled:
+            search_start = time.perf_counter()
+            results = await rag.search_relevant_context(item["query"], max_chunks=args.eval_k)
+            latencies.append(time.perf_counter() - search_start)
+
+            ranked = [
+                covered_passages(result["content"], passage_shingles, item["relevant"], args.coverage)
+                for result in results
+            ]
+            recalls.append(recall_at_k(ranked, item["relevant"], args.eval_k))
+            mrrs.append(reciprocal_rank(ranked, args.eval_k))
+            ndcgs.append(ndcg_at_k(ranked, item["relevant"], args.eval_k))
+            context_chars.append(sum(len(result["content"]) for result in results))
+
+        latency = summarize_latencies(latencies)
+        rows.append({
+            **chunking,
+            **retrieval,
+            "recall": round(sum(recalls) / len(recalls), 4),
+            "mrr": round(sum(mrrs) / len(mrrs), 4),
+            "ndcg": round(sum(ndcgs) / len(ndcgs), 4),
+            "p50_ms": latency["p50_ms"],
+            "p95_ms": latency["p95_ms"],
+            "context_chars": round(sum(context_chars) / len(context_chars)),
+            "index_size_bytes": index_size,
+            "index_build_seconds": round(index_seconds, 3),
+            "chunks": rag.stats["chunks_created"],
+            "parent_sections": rag.stats["parent_sections"]
+        })
+
+    await rag.cleanup()
+    shutil.rmtree(persist_dir, ignore_errors=True)
+    return rows
+
+
+def evaluate_chunking(
+    chunking: Dict[str, int],
+    retrieval_configs: List[Dict[str, Any]],
+    labeled: List[Dict[str, Any]],
+    passage_shingles: Dict[int, Set[tuple]],
+    args: argparse.Namespace,
+    workdir: str
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate one chunking configuration (worker process entry point).
+
+    Args:
+        chunking (dict): parent_chunk_size, child_chunk_size, child_chunk_overlap
+        retrieval_configs (list): Retriever settings to evaluate on this index
+        labeled (list): Labeled queries
+        passage_shingles (dict): Passage id -> shingles
+        args (Namespace): CLI arguments
+        workdir (str): Scratch directory
+
+    Returns:
+        list: One result row per retriever configuration
+    """
+    coroutine = _evaluate_chunking(chunking, retrieval_configs, labeled, passage_shingles, args, Path(workdir))
+    if args.embeddings == "fake":
+        with install_stubs(args.embedding_latency_ms / 1000):
+            return asyncio.run(coroutine)
+    return asyncio.run(coroutine)
+
+
+def parse_float_list(value: str) -> List[float]:
+    """Parse a comma-separated list of floats."""
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def parse_str_list(value: str) -> List[str]:
+    """Parse a comma-separated list of names."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the CLI argument parser.
+
+    Returns:
+        ArgumentParser: Parser
+    """
+    parser = argparse.ArgumentParser(description="Risk-Guardian retrieval evaluation")
+    parser.add_argument("--parent-chunk-sizes", type=parse_int_list, default=[1000, 2000, 3000])
+    parser.add_argument("--child-chunk-sizes", type=parse_int_list, default=[200, 400, 800])
+    parser.add_argument("--child-chunk-overlaps", type=parse_int_list, default=[50])
+    parser.add_argument("--search-types", type=parse_str_list, default=["mmr"],
+                        help="mmr and/or similarity")
+    parser.add_argument("--k", type=parse_int_list, default=[4, 8, 12, 16], help="Child chunks retrieved")
+    parser.add_argument("--fetch-k", type=parse_int_list, default=[16, 32, 64], help="MMR candidates")
+    parser.add_argument("--lambda-mult", type=parse_float_list, default=[0.5, 0.7, 0.9])
+    parser.add_argument("--eval-k", type=int, default=5,
+                        help="Sections scored per query (the analyzer uses max_chunks=5)")
+    parser.add_argument("--coverage", type=float, default=0.5,
+                        help="Fraction of a passage's shingles a section must contain to cover it")
+    parser.add_argument("--objectives", type=parse_str_list, default=["recall", "ndcg", "p95_ms", "index_size_bytes"],
+                        help=f"Pareto objectives among {', '.join(OBJECTIVES)}")
+    parser.add_argument("--embeddings", default="fake", choices=["fake", "openai"])
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0,
+                        help="Simulated latency per fake embedding call")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Chunking configurations evaluated in parallel")
+    parser.add_argument("--docs", default="docs")
+    parser.add_argument("--examples", default="data/incident_examples.json")
+    parser.add_argument("--labels", default="benchmarks/retrieval_labels.json")
+    parser.add_argument("--workdir", default=None, help="Scratch directory (temporary by default)")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default benchmarks/results/retrieval-<timestamp>.json)")
+    return parser
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the grid and rank the results.
+
+    Args:
+        args (Namespace): CLI arguments
+
+    Returns:
+        dict: Results document
+    """
+    unknown = [name for name in args.objectives if name not in OBJECTIVES]
+    if unknown:
+        raise ValueError(f"Unknown objectives: {unknown}")
+
+    passages = split_passages(args.docs)
+    labeled = build_labeled_queries(passages, args.examples, args.labels)
+    if not labeled:
+        raise RuntimeError("No labeled query has relevant passages in the corpus")
+    passage_shingles = {passage["id"]: shingles(passage["text"]) for passage in passages}
+    grid = build_grid(args)
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="riskguardian-eval-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    rows: List[Dict[str, Any]] = []
+    try:
+        print(f"[eval] {len(labeled)} queries, {len(grid)} indexes x "
+              f"{len(grid[0]['retrieval']) if grid else 0} retriever configs, {args.jobs} jobs",
+              file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futures = [
+                pool.submit(evaluate_chunking, cell["chunking"], cell["retrieval"],
+                            labeled, passage_shingles, args, str(workdir))
+                for cell in grid
+            ]
+            for future in futures:
+                rows.extend(future.result())
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    objectives = {name: OBJECTIVES[name] for name in args.objectives}
+    front = set(pareto_front(rows, objectives))
+    for i, row in enumerate(rows):
+        row["pareto_optimal"] = i in front
+    rows.sort(key=lambda row: (-row["ndcg"], -row["recall"], row["p95_ms"]))
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")}
+        },
+        "labeled_set": {
+            "passages": len(passages),
+            "queries": len(labeled),
+            "by_label": {
+                label: {
+                    "queries": sum(1 for item in labeled if item["label"] == label),
+                    "relevant_passages": next(len(item["relevant"]) for item in labeled if item["label"] == label)
+                }
+                for label in dict.fromkeys(item["label"] for item in labeled)
+            }
+        },
+        "objectives": objectives,
+        "results": rows,
+        "pareto_front": [row for row in rows if row["pareto_optimal"]]
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+    results = run(args)
+
+    columns = ["parent_chunk_size", "child_chunk_size", "child_chunk_overlap", "search_type", "k",
+               "fetch_k", "lambda_mult", "recall", "mrr", "ndcg", "p95_ms", "index_size_bytes"]
+    print("[eval] Pareto-optimal configurations:", file=sys.stderr)
+    print("  " + " ".join(columns), file=sys.stderr)
+    for row in results["pareto_front"]:
+        print("  " + " ".join(str(row[column]) for column in columns), file=sys.stderr)
+
+    output = Path(args.output or f"benchmarks/results/retrieval-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"[eval] results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+OpenAI-compatible HTTP stub backed by the deterministic fake backends.
+
+Serves /v1/chat/completions (including SSE streaming), /v1/embeddings and
+/v1/models, so the unmodified application can be load-tested end to end
+through the real OpenAI client code:
+
+    FAKE_LLM_LATENCY_MS=800 FAKE_LLM_STREAM_CHUNK_DELAY_MS=15 FAKE_ERROR_RATE=0.01 \\
+        uvicorn benchmarks.fake_openai_server:app --port 9000
+
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=sk-stub python -m src.main
+
+Latency, stream chunking and error/timeout rates come from the same FAKE_*
+settings as the in-process fakes. Embedding requests sent as token arrays
+(the default for text-embedding-ada-002) are hashed over the token ids.
+"""
+from typing import Any, Dict, List, Union
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.services.fake_backends import (
+    HashingEmbeddings,
+    build_fake_analysis,
+    estimate_tokens,
+    fault_injector
+)
+from src.utils.config import config
+
+app = FastAPI(title="Risk-Guardian fake OpenAI API")
+
+_embeddings = HashingEmbeddings(size=config.get("fake_embeddings_size", 256))
+
+
+def _error_response(status_code: int, message: str, error_type: str) -> JSONResponse:
+    """Build an error in the OpenAI format."""
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "code": None}}
+    )
+
+
+async def _inject_fault(latency_seconds: float):
+    """
+    Apply simulated latency and faults to a request.
+
+    Returns:
+        JSONResponse: Error response to return, or None
+    """
+    fault = fault_injector.draw(config.get("fake_error_rate", 0.0), config.get("fake_timeout_rate", 0.0))
+    if fault == "timeout":
+        await asyncio.sleep(config.get("fake_timeout_seconds", 30.0))
+        return _error_response(504, "Simulated upstream timeout", "timeout")
+    await asyncio.sleep(latency_seconds)
+    if fault == "error":
+        return _error_response(500, "Simulated server error", "server_error")
+    return None
+
+
+@app.get("/v1/models")
+async def list_models() -> Dict[str, Any]:
+    """List the model names the stub answers to (any name is accepted)."""
+    return {
+        "object": "list",
+        "data": [
+            {"id": name, "object": "model", "owned_by": "risk-guardian-fake"}
+            for name in ("gpt-3.5-turbo", "gpt-4.1-turbo", "text-embedding-ada-002")
+        ]
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    """Chat completions with a deterministic, schema-valid analysis."""
+    error = await _inject_fault(config.get("fake_llm_latency_ms", 0.0) / 1000)
+    if error is not None:
+        return error
+
+    model = body.get("model", "gpt-3.5-turbo")
+    prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+    content = json.dumps(build_fake_analysis(prompt), ensure_ascii=False)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    usage = {
+        "prompt_tokens": estimate_tokens(prompt),
+        "completion_tokens": estimate_tokens(content),
+        "total_tokens": estimate_tokens(prompt) + estimate_tokens(content)
+    }
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    chunk_chars = max(1, config.get("fake_llm_stream_chunk_chars", 20))
+    chunk_delay = config.get("fake_llm_stream_chunk_delay_ms", 0.0) / 1000
+
+    def event(delta: Dict[str, Any], finish_reason: Union[str, None] = None) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+    async def stream():
+        yield event({"role": "assistant", "content": ""})
+        for start in range(0, len(content), chunk_chars):
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+            yield event({"content": content[start:start + chunk_chars]})
+        yield event({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(body: Dict[str, Any]):
+    """Deterministic embeddings for strings or token arrays."""
+    error = await _inject_fault(config.get("fake_embeddings_latency_ms", 0.0) / 1000)
+    if error is not None:
+        return error
+
+    raw_input = body.get("input", [])
+    if isinstance(raw_input, str) or (raw_input and isinstance(raw_input[0], int)):
+        raw_input = [raw_input]
+
+    texts: List[str] = [
+        item if isinstance(item, str) else " ".join(f"t{token}" for token in item)
+        for item in raw_input
+    ]
+    return {
+        "object": "list",
+        "model": body.get("model", "text-embedding-ada-002"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": _embeddings.embed_text(text)}
+            for i, text in enumerate(texts)
+        ],
+        "usage": {
+            "prompt_tokens": sum(estimate_tokens(text) for text in texts),
+            "total_tokens": sum(estimate_tokens(text) for text in texts)
+        }
+    }
@@ -0,0 +1,192 @@
+"""
+Closed-loop load driver for a running Risk-Guardian instance.
+
+Simulates N concurrent users (each sends a request, waits for the answer,
+optionally thinks, repeats) in increasing steps and reports throughput,
+error rate and latency percentiles per step. The capacity of the instance
+is the highest throughput reached while p95 latency and error rate stay
+within the given SLO.
+
+    LLM_BACKEND=fake EMBEDDINGS_BACKEND=fake uvicorn src.main:app --port 8000
+    python -m benchmarks.load --base-url http://localhost:8000 --users 1,4,16,64 \\
+        --step-duration 30 --slo-p95-ms 3000 --output benchmarks/results/load.json
+"""
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+from benchmarks.corpus import load_incident_payloads, load_incident_queries
+from benchmarks.run import parse_int_list, summarize_latencies
+
+
+async def run_step(
+    client: httpx.AsyncClient,
+    users: int,
+    duration_seconds: float,
+    args: argparse.Namespace,
+    payloads: List[dict],
+    queries: List[str]
+) -> Dict[str, Any]:
+    """
+    Run one load step.
+
+    Args:
+        client (AsyncClient): HTTP client bound to the target
+        users (int): Concurrent users
+        duration_seconds (float): Step duration
+        args (Namespace): CLI arguments
+        payloads (list): /api/analyze bodies
+        queries (list): /api/rag/search queries
+
+    Returns:
+        dict: Step results
+    """
+    rng = random.Random(args.seed + users)
+    deadline = time.perf_counter() + duration_seconds
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+
+    async def user() -> None:
+        while time.perf_counter() < deadline:
+            if rng.random() < args.search_ratio:
+                endpoint = "search"
+                request = client.post(
+                    "/api/rag/search",
+                    params={"query": rng.choice(queries)[:300], "max_results": 5}
+                )
+            else:
+                endpoint = "analyze"
+                request = client.post(
+                    "/api/analyze",
+                    params={"analysis_type": args.analysis_type},
+                    json=rng.choice(payloads)
+                )
+            start = time.perf_counter()
+            try:
+                response = await request
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[endpoint].append(time.perf_counter() - start)
+            statuses[status] += 1
+            if args.think_time_ms:
+                await asyncio.sleep(args.think_time_ms / 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(statuses.values())
+    errors = total - statuses.get("200", 0)
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "users": users,
+        "duration_seconds": round(elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "status_codes": dict(statuses),
+        "latency": summarize_latencies(all_latencies),
+        "latency_by_endpoint": {
+            endpoint: summarize_latencies(samples) for endpoint, samples in latencies.items()
+        }
+    }
+
+
+def find_capacity(steps: List[Dict[str, Any]], slo_p95_ms: float, max_error_rate: float) -> Optional[dict]:
+    """
+    Pick the step with the highest throughput that meets the SLO.
+
+    Args:
+        steps (list): Step results
+        slo_p95_ms (float): Maximum p95 latency
+        max_error_rate (float): Maximum error rate
+
+    Returns:
+        dict: users and rps of the best step, or None
+    """
+    passing = [
+        step for step in steps
+        if step["requests"]
+        and step["latency"].get("p95_ms", float("inf")) <= slo_p95_ms
+        and step["error_rate"] <= max_error_rate
+    ]
+    if not passing:
+        return None
+    best = max(passing, key=lambda step: step["rps"])
+    return {"users": best["users"], "rps": best["rps"], "p95_ms": best["latency"]["p95_ms"]}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run every load step against the target.
+
+    Args:
+        args (Namespace): CLI arguments
+
+    Returns:
+        dict: Results document
+    """
+    payloads = load_incident_payloads(args.examples)
+    queries = load_incident_queries(args.examples)
+    limits = httpx.Limits(max_connections=max(args.users) + 10, max_keepalive_connections=max(args.users))
+
+    steps = []
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        for users in args.users:
+            print(f"[load] {users} users for {args.step_duration}s ...", file=sys.stderr)
+            step = await run_step(client, users, args.step_duration, args, payloads, queries)
+            print(f"[load]   {step['rps']} rps, p95 {step['latency'].get('p95_ms')} ms, "
+                  f"errors {step['error_rate']:.2%}", file=sys.stderr)
+            steps.append(step)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "args": {key: value for key, value in vars(args).items() if key != "output"}
+        },
+        "steps": steps,
+        "capacity": find_capacity(steps, args.slo_p95_ms, args.max_error_rate)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Risk-Guardian load driver")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=parse_int_list, default=[1, 4, 16],
+                        help="Concurrent users per step (e.g. 1,4,16,64)")
+    parser.add_argument("--step-duration", type=float, default=30.0, help="Seconds per step")
+    parser.add_argument("--think-time-ms", type=float, default=0.0)
+    parser.add_argument("--search-ratio", type=float, default=0.0,
+                        help="Fraction of requests sent to /api/rag/search instead of /api/analyze")
+    parser.add_argument("--analysis-type", default="rapido", choices=["rapido", "estandar", "experto"])
+    parser.add_argument("--slo-p95-ms", type=float, default=5000.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout")
+    parser.add_argument("--examples", default="data/incident_examples.json")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Results JSON file")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results["capacity"]), file=sys.stderr)
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Recall/memory tradeoff of quantized embedding storage.
+
+For float32, int8 and binary storage, reports the bytes kept in RAM per
+vector, recall@k against exact float32 search (with and without the exact
+re-rank step) and the per-query latency:
+
+    python -m benchmarks.quantization --count 200000 --dim 1536 --rerank 50,100,400
+    python -m benchmarks.quantization --artifact vectorstore/index.rgidx
+
+Vectors and queries come from the same generators as benchmarks/ann_recall.py.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.ann_recall import exact_search, make_queries, synthetic_vectors
+from benchmarks.run import git_revision, parse_int_list, summarize_latencies
+from src.services.rag.index_artifact import IndexArtifact
+from src.services.rag.quantization import QUANTIZED_STORAGES, QuantizedVectors
+
+
+def measure(vectors: np.ndarray, quantized: QuantizedVectors, queries: np.ndarray,
+            truth: List[set], k: int, reranks: List[int]) -> Dict[str, Any]:
+    """
+    Recall and latency of one quantized storage.
+
+    Args:
+        vectors: Exact vectors
+        quantized: Quantized vectors
+        queries: Query vectors
+        truth: Exact top-k rows per query
+        k: Neighbours per query
+        reranks: Re-rank pool sizes to test (0 = approximate scores only)
+
+    Returns:
+        dict: Memory and one entry per re-rank size
+    """
+    stats = quantized.get_stats()
+    results = {
+        "bytes_per_vector": round(stats["code_bytes"] / stats["count"], 2),
+        "compression_ratio": stats["compression_ratio"],
+        "build_seconds": quantized.meta.get("build_seconds"),
+        "rerank": {}
+    }
+    for rerank in reranks:
+        samples, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            if rerank:
+                ids, _ = quantized.search(query, k, vectors, rerank=rerank)
+            else:
+                scores = quantized.scores(query)
+                ids = np.argpartition(-scores, k - 1)[:k]
+            samples.append(time.perf_counter() - start)
+            hits += len(expected & set(ids.tolist()))
+        recall = hits / (k * len(queries))
+        results["rerank"][str(rerank)] = {f"recall@{k}": round(recall, 4), **summarize_latencies(samples)}
+        print(f"[quant] {quantized.storage} rerank={rerank}: recall@{k}={recall:.3f} "
+              f"({results['bytes_per_vector']} B/vector)", file=sys.stderr)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the CLI argument parser.
+
+    Returns:
+        ArgumentParser: Parser
+    """
+    parser = argparse.ArgumentParser(description="Quantized storage recall/memory benchmark")
+    parser.add_argument("--artifact", help="Index artifact to use instead of synthetic vectors")
+    parser.add_argument("--count", type=int, default=100_000, help="Synthetic vectors")
+    parser.add_argument("--dim", type=int, default=1536, help="Synthetic dimension")
+    parser.add_argument("--clusters", type=int, default=1000, help="Synthetic cluster centres")
+    parser.add_argument("--spread", type=float, default=0.6, help="Synthetic noise around centres")
+    parser.add_argument("--storage", type=lambda value: value.split(","), default=list(QUANTIZED_STORAGES))
+    parser.add_argument("--rerank", type=parse_int_list, default=[0, 50, 100, 400],
+                        help="Exact re-rank pool sizes (0 = no re-rank)")
+    parser.add_argument("--sample-size", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None,
+                        help="Results file (default benchmarks/results/quant-<timestamp>.json)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+
+    if args.artifact:
+        vectors = IndexArtifact.load(args.artifact).vectors
+    else:
+        vectors = synthetic_vectors(args.count, args.dim, args.clusters, args.spread, args.seed)
+    queries = make_queries(vectors, args.queries, args.query_noise, args.seed)
+
+    truth, flat_samples = [], []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(set(exact_search(vectors, query, args.k).tolist()))
+        flat_samples.append(time.perf_counter() - start)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key != "output"}
+        },
+        "float32": {"bytes_per_vector": vectors.shape[1] * 4, **summarize_latencies(flat_samples)}
+    }
+    for storage in args.storage:
+        quantized = QuantizedVectors.build(vectors, storage, sample_size=args.sample_size, seed=args.seed)
+        results[storage] = measure(vectors, quantized, queries, truth, args.k, args.rerank)
+
+    output = Path(args.output or f"benchmarks/results/quant-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"[quant] results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""
+Offline benchmark runner for the RAG and analysis pipeline.
+
+Usage:
+    python -m benchmarks.run --scales 1,10,100 --output benchmarks/results/run.json
+    python -m benchmarks.compare baseline.json run.json
+
+Everything runs against deterministic stubs (see benchmarks/stubs.py), so no
+OpenAI key is needed and runs on the same machine are comparable.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.corpus import (
+    build_synthetic_corpus,
+    corpus_size_bytes,
+    load_incident_payloads,
+    load_incident_queries
+)
+from benchmarks.stubs import install_stubs
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples (seconds) with nearest-rank percentiles.
+
+    Args:
+        samples (list): Latencies in seconds
+
+    Returns:
+        dict: count, mean/p50/p95/p99/max in milliseconds
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(rank(0.50) * 1000, 3),
+        "p95_ms": round(rank(0.95) * 1000, 3),
+        "p99_ms": round(rank(0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+
+def peak_rss_mb() -> float:
+    """
+    Get the peak resident set size of this process.
+
+    Returns:
+        float: Peak RSS in MiB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def directory_size_bytes(path: Path) -> int:
+    """
+    Get the size of all files under a directory.
+
+    Args:
+        path (Path): Directory
+
+    Returns:
+        int: Size in bytes
+    """
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+async def bench_index_build(corpus_dir: Path, persist_dir: Path):
+    """
+    Build a fresh index over a corpus.
+
+    Args:
+        corpus_dir (Path): Corpus directory
+        persist_dir (Path): Empty persistence directory
+
+    Returns:
+        tuple: (initialized RAG service, metrics dict)
+    """
+    from src.services.rag.core import SecurityKnowledgeRAG
+
+    rag = SecurityKnowledgeRAG(str(corpus_dir), str(persist_dir))
+    start = time.perf_counter()
+    if not await rag.initialize():
+        raise RuntimeError(f"Index build failed for {corpus_dir}")
+    elapsed = time.perf_counter() - start
+
+    return rag, {
+        "seconds": round(elapsed, 3),
+        "documents": rag.stats["documents_loaded"],
+        "chunks": rag.stats["chunks_created"],
+        "parent_sections": rag.stats["parent_sections"],
+        "index_size_bytes": directory_size_bytes(persist_dir),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+async def bench_query_latency(rag, queries: List[str], iterations: int) -> Dict[str, Any]:
+    """
+    Measure sequential search latency.
+
+    Args:
+        rag: Initialized RAG service
+        queries (list): Query pool (cycled)
+        iterations (int): Number of searches
+
+    Returns:
+        dict: Latency summary
+    """
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await rag.search_relevant_context(queries[i % len(queries)], max_chunks=5)
+        samples.append(time.perf_counter() - start)
+    return {**summarize_latencies(samples), "peak_rss_mb": peak_rss_mb()}
+
+
+async def bench_throughput(rag, queries: List[str], concurrency: int, total: int) -> Dict[str, Any]:
+    """
+    Measure throughput with `concurrency` searches in flight.
+
+    Args:
+        rag: Initialized RAG service
+        queries (list): Query pool (cycled)
+        concurrency (int): Concurrent searches
+        total (int): Total searches
+
+    Returns:
+        dict: Queries per second and latency summary
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await rag.search_relevant_context(queries[i % len(queries)], max_chunks=5)
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "qps": round(total / elapsed, 2),
+        **summarize_latencies(samples)
+    }
+
+
+async def bench_analyze(
+    rag,
+    payloads: List[dict],
+    requests: int,
+    concurrency: int,
+    analysis_type: str,
+    workdir: Path
+) -> Dict[str, Any]:
+    """
+    Measure /api/analyze end-to-end latency through the ASGI app.
+
+    The in-process transport waits for the whole ASGI call, so the numbers
+    include background tasks (incident indexing) scheduled by the request.
+
+    Args:
+        rag: Initialized RAG service (installed as the app singleton)
+        payloads (list): Request bodies (cycled)
+        requests (int): Total requests
+        concurrency (int): Requests in flight
+        analysis_type (str): rapido / estandar / experto
+        workdir (Path): Scratch directory for the analysis DB and incident index
+
+    Returns:
+        dict: Requests per second, error count and latency summary
+    """
+    import httpx
+
+    import src.services.rag as rag_module
+    from src.main import app
+    from src.services.analysis_repository import AnalysisRepository
+    import src.controllers.incident_controller as controller_module
+    from src.utils.config import config
+
+    rag_module._rag_instance = rag
+    rag_module._incident_index = None
+    config["incident_index_dir"] = str(workdir / "incident_index")
+    repository = AnalysisRepository(db_url=f"sqlite:///{workdir / 'analyses.sqlite3'}")
+    controller_module.analysis_repository = repository
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        timeout=120
+    ) as client:
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    f"/api/analyze?analysis_type={analysis_type}",
+                    json=payloads[i % len(payloads)]
+                )
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    await repository.stop()
+    rag_module._rag_instance = None
+    rag_module._incident_index = None
+
+    return {
+        "analysis_type": analysis_type,
+        "concurrency": concurrency,
+        "rps": round(requests / elapsed, 2),
+        "errors": errors,
+        **summarize_latencies(samples),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+async def run_scale(scale: int, args: argparse.Namespace, workdir: Path) -> Dict[str, Any]:
+    """
+    Run every benchmark for one corpus scale.
+
+    Args:
+        scale (int): Corpus size multiplier
+        args (Namespace): CLI arguments
+        workdir (Path): Scratch directory
+
+    Returns:
+        dict: Results for this scale
+    """
+    scale_dir = workdir / f"scale_{scale}"
+    corpus_dir = build_synthetic_corpus(args.docs, str(scale_dir / "corpus"), scale, seed=args.seed)
+    queries = load_incident_queries(args.examples)
+    payloads = load_incident_payloads(args.examples)
+
+    rag, index_build = await bench_index_build(corpus_dir, scale_dir / "vectorstore")
+    results: Dict[str, Any] = {
+        "corpus_bytes": corpus_size_bytes(str(corpus_dir)),
+        "index_build": index_build,
+        "query_latency": await bench_query_latency(rag, queries, args.queries),
+        "throughput": {
+            str(concurrency): await bench_throughput(rag, queries, concurrency, args.throughput_queries)
+            for concurrency in args.concurrency
+        }
+    }
+    if args.analyze_requests:
+        results["analyze_e2e"] = await bench_analyze(
+            rag,
+            payloads,
+            args.analyze_requests,
+            args.analyze_concurrency,
+            args.analysis_type,
+            scale_dir
+        )
+
+    await rag.cleanup()
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    """
+    Get the current git revision, if available.
+
+    Returns:
+        str: Short commit hash or None
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_int_list(value: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the CLI argument parser.
+
+    Returns:
+        ArgumentParser: Parser
+    """
+    parser = argparse.ArgumentParser(description="Risk-Guardian offline benchmarks")
+    parser.add_argument("--scales", type=parse_int_list, default=[1, 10, 100],
+                        help="Corpus multipliers over docs/ (e.g. 1,10,100,1000)")
+    parser.add_argument("--queries", type=int, default=100, help="Sequential searches per scale")
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 8, 32],
+                        help="Concurrency levels for the throughput test")
+    parser.add_argument("--throughput-queries", type=int, default=200,
+                        help="Searches per concurrency level")
+    parser.add_argument("--analyze-requests", type=int, default=50,
+                        help="/api/analyze requests per scale (0 to skip)")
+    parser.add_argument("--analyze-concurrency", type=int, default=8)
+    parser.add_argument("--analysis-type", default="rapido", choices=["rapido", "estandar", "experto"])
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0,
+                        help="Simulated latency per embedding call")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Simulated latency per LLM call")
+    parser.add_argument("--docs", default="docs", help="Source documents")
+    parser.add_argument("--examples", default="data/incident_examples.json")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=None, help="Scratch directory (temporary by default)")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default benchmarks/results/<timestamp>.json)")
+    return parser
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the full suite.
+
+    Args:
+        args (Namespace): CLI arguments
+
+    Returns:
+        dict: Results document
+    """
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="riskguardian-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        with install_stubs(args.embedding_latency_ms / 1000, args.llm_latency_ms / 1000):
+            scales = {}
+            for scale in args.scales:
+                print(f"[benchmark] scale {scale}x ...", file=sys.stderr)
+                scales[str(scale)] = await run_scale(scale, args, workdir)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")}
+        },
+        "scales": scales
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+    results = asyncio.run(run(args))
+
+    output = Path(args.output or f"benchmarks/results/{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"[benchmark] results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
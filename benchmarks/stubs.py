@@ -0,0 +1,53 @@
+"""
+Offline stand-ins for OpenAI embeddings and chat models.
+
+The benchmark suite must run without an API key and produce comparable
+numbers between runs, so it switches the application to the deterministic
+fake backends (src/services/fake_backends.py) for the duration of a run.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from src.services.fake_backends import (
+    FakeSecurityChatModel,
+    HashingEmbeddings,
+    build_fake_analysis
+)
+from src.utils.config import config
+
+
+@contextmanager
+def install_stubs(
+    embedding_latency_seconds: float = 0.0,
+    llm_latency_seconds: float = 0.0,
+    **fake_settings: Any
+) -> Iterator[None]:
+    """
+    Route the RAG embeddings and the analyzer models to the fake backends.
+
+    Args:
+        embedding_latency_seconds (float): Simulated embedding latency
+        llm_latency_seconds (float): Simulated LLM latency
+        **fake_settings: Extra `fake_*` config overrides (error rate, chunking...)
+    """
+    overrides: Dict[str, Any] = {
+        "llm_backend": "fake",
+        "embeddings_backend": "fake",
+        "fake_embeddings_latency_ms": embedding_latency_seconds * 1000,
+        "fake_llm_latency_ms": llm_latency_seconds * 1000,
+        **fake_settings
+    }
+    saved = {key: config.get(key) for key in overrides}
+    config.update(overrides)
+    try:
+        yield
+    finally:
+        config.update(saved)
+
+
+__all__ = [
+    "FakeSecurityChatModel",
+    "HashingEmbeddings",
+    "build_fake_analysis",
+    "install_stubs"
+]
@@ -0,0 +1,92 @@
+"""
+pytest-benchmark cases for hot paths of the RAG and analysis pipeline.
+
+Run with:
+    python -m pytest benchmarks --benchmark-only --benchmark-json=benchmarks/results/micro.json
+
+These are not part of the regular test suite (`pytest tests`).
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.corpus import load_incident_queries
+from benchmarks.stubs import HashingEmbeddings, build_fake_analysis, install_stubs
+
+
+@pytest.fixture(scope="module")
+def queries():
+    """Incident queries from the bundled examples."""
+    return load_incident_queries()
+
+
+@pytest.fixture(scope="module")
+def rag_service(tmp_path_factory):
+    """RAG service over docs/ built with stub embeddings."""
+    from src.services.rag.core import SecurityKnowledgeRAG
+
+    with install_stubs():
+        rag = SecurityKnowledgeRAG("docs", str(tmp_path_factory.mktemp("vectorstore")))
+        loop = asyncio.new_event_loop()
+        assert loop.run_until_complete(rag.initialize())
+        yield rag, loop
+        loop.run_until_complete(rag.cleanup())
+        loop.close()
+
+
+def test_embed_query(benchmark, queries):
+    """Stub embedding cost (baseline for the retrieval numbers)."""
+    embeddings = HashingEmbeddings()
+    benchmark(embeddings.embed_query, queries[0])
+
+
+def test_hierarchical_split(benchmark):
+    """Parent/child chunking of the full docs/ corpus."""
+    from src.services.rag.document_loader import SecurityDocumentLoader
+
+    loader = SecurityDocumentLoader("docs")
+    loop = asyncio.new_event_loop()
+    documents = loop.run_until_complete(loader.load_all_documents())
+
+    parents, children = benchmark(
+        lambda: loop.run_until_complete(loader.split_documents_hierarchical(documents))
+    )
+    loop.close()
+    assert children and parents
+
+
+def test_search_relevant_context(benchmark, rag_service, queries):
+    """Single RAG search: embedding, MMR search and parent expansion."""
+    rag, loop = rag_service
+    results = benchmark(
+        lambda: loop.run_until_complete(rag.search_relevant_context(queries[1], max_chunks=5))
+    )
+    assert results
+
+
+def test_format_context(benchmark, rag_service, queries):
+    """Formatting retrieved sections for the prompt."""
+    rag, loop = rag_service
+    chunks = loop.run_until_complete(rag.search_relevant_context(queries[2], max_chunks=5))
+    benchmark(rag.format_context_for_prompt, chunks)
+
+
+def test_parse_llm_response(benchmark):
+    """JSON extraction from a model answer wrapped in prose."""
+    from src.services.langchain_security_analyzer import LangChainSecurityAnalyzer
+
+    with install_stubs():
+        analyzer = LangChainSecurityAnalyzer()
+    payload = build_fake_analysis("benchmark")
+    content = f"Aquí está el análisis:\n\n{json.dumps(payload, ensure_ascii=False)}\n\nFin."
+
+    result = benchmark(analyzer._extract_json_from_content, content)
+    assert set(result) == {"vulnerabilidades", "impactos", "controles"}
@@ -2,14 +2,17 @@
 Risk-Guardian API - Versión Limpia
 Endpoints esenciales sin duplicaciones ni código redundante.
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Header, Request
+from fastapi.responses import JSONResponse
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from src.controllers.incident_controller import IncidentController
 from src.models.models import AnalysisRequest
 from src.utils.logger import setup_logger
 from src.services.rag import search_security_knowledge, get_rag_service
+from src.services.health_monitor import health_monitor
+from src.utils.deadline import parse_client_timeout
 
 logger = setup_logger(__name__)
 
@@ -23,10 +26,12 @@ controller = IncidentController()
 # ============================================================================
 
 @router.get("/examples", tags=["incidents"])
-async def get_incident_examples():
-    """Obtiene ejemplos de incidentes por categoría."""
+async def get_incident_examples(
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """Obtiene ejemplos de incidentes por categoría (cacheado, con ETag)."""
     try:
-        return await controller.get_incident_examples()
+        return await controller.get_incident_examples_response(if_none_match)
     except Exception as e:
         logger.error(f"Error en /examples: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -36,11 +41,14 @@ async def get_incident_examples():
 async def analyze_incident(
     request: Dict[str, Any],
     background_tasks: BackgroundTasks,
+    http_request: Request,
     analysis_type: str = Query(
         default="estandar",
         description="Tipo: rapido, estandar, experto",
         regex="^(rapido|estandar|experto)$"
-    )
+    ),
+    timeout: Optional[float] = Query(default=None, gt=0, description="Segundos que el cliente espera la respuesta"),
+    x_request_timeout: Optional[str] = Header(default=None, description="Segundos que el cliente espera la respuesta")
 ):
     """
     Analiza incidente con LangChain + RAG + GPT-4.1.
@@ -49,14 +57,23 @@ async def analyze_incident(
     - titulo: Título del incidente (requerido)
     - descripcion: Descripción detallada (requerido)
     - categoria_inicial: Categoría opcional
-    - urgencia: Nivel de urgencia opcional
+    - urgencia: Nivel de urgencia opcional (critica, alta, media, baja: prioridad en cola,
+      con cupo de peticiones protegidas por cliente)
     - contexto_adicional: Información adicional opcional
+    
+    El reparto justo de la cola LLM se hace por IP de la conexión (detrás de
+    un proxy, la que uvicorn toma de `X-Forwarded-For` con `--proxy-headers`).
+    El plazo del cliente (`timeout` o cabecera `X-Request-Timeout`, en
+    segundos) acota todas las etapas; si se agota se responde 504.
     """
     try:
+        client_timeouts = [value for value in (timeout, parse_client_timeout(x_request_timeout)) if value]
         return await controller.analyze_incident(
             incident_data=request,
             analysis_type=analysis_type,
-            background_tasks=background_tasks
+            background_tasks=background_tasks,
+            client_id=http_request.client.host if http_request.client else None,
+            timeout_seconds=min(client_timeouts) if client_timeouts else None
         )
     except HTTPException:
         raise
@@ -75,16 +92,67 @@ async def get_analysis_types():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# HISTÓRICO DE ANÁLISIS
+# ============================================================================
+
+@router.get("/analyses", tags=["incidents"])
+async def list_analyses(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Cursor de la página anterior"),
+    risk_level: Optional[str] = Query(default=None, description="baja, media, alta"),
+    categoria: Optional[str] = Query(default=None),
+    modelo: Optional[str] = Query(default=None),
+    analysis_type: Optional[str] = Query(default=None),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    include_payload: bool = Query(default=False, description="Incluir resultado completo")
+):
+    """Lista análisis históricos (paginación keyset, más recientes primero)."""
+    return await controller.list_analyses(
+        limit=limit,
+        cursor=cursor,
+        risk_level=risk_level,
+        categoria=categoria,
+        modelo=modelo,
+        analysis_type=analysis_type,
+        since=since,
+        until=until,
+        include_payload=include_payload
+    )
+
+
+@router.get("/analyses/{analysis_id}", tags=["incidents"])
+async def get_analysis(analysis_id: str):
+    """Obtiene un análisis histórico por su ID."""
+    return await controller.get_analysis(analysis_id)
+
+
+@router.get("/incidents/similar", tags=["incidents"])
+async def find_similar_incidents(
+    q: Optional[str] = Query(default=None, description="Texto libre del incidente"),
+    titulo: Optional[str] = Query(default=None),
+    descripcion: Optional[str] = Query(default=None),
+    k: int = Query(default=5, ge=1, le=20)
+):
+    """Busca incidentes analizados previamente similares (top-k con similitud)."""
+    query = q or ". ".join(filter(None, [titulo, descripcion]))
+    return await controller.find_similar_incidents(query, k)
+
+
 # ============================================================================
 # ENDPOINTS RAG (Sistema de Conocimiento)
 # ============================================================================
 
 @router.get("/rag/health", tags=["rag"])
-async def rag_health_check():
-    """Verifica estado del sistema RAG."""
+async def rag_health_check(
+    force: bool = Query(default=False, description="Ejecutar el check profundo ahora")
+):
+    """Estado del sistema RAG (último check profundo en segundo plano)."""
     try:
-        rag_service = await get_rag_service()
-        return await rag_service.health_check()
+        if force:
+            await health_monitor.run_deep_check()
+        return health_monitor.get_last_deep_check()
     except Exception as e:
         logger.error(f"Error en RAG health: {str(e)}")
         return {"status": "error", "message": str(e)}
@@ -111,11 +179,13 @@ async def search_knowledge(
 
 
 @router.get("/rag/stats", tags=["rag"])
-async def get_rag_stats():
+async def get_rag_stats(
+    refresh: bool = Query(default=False, description="Forzar recuento completo")
+):
     """Obtiene estadísticas del sistema RAG."""
     try:
         rag_service = await get_rag_service()
-        stats = rag_service.get_stats()
+        stats = rag_service.get_stats(refresh=refresh)
         return {
             "status": "success",
             "statistics": stats,
@@ -126,15 +196,62 @@ async def get_rag_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/admin/rag/reindex", tags=["admin"], status_code=202)
+async def start_rag_reindex():
+    """Reindexa la base de conocimiento en segundo plano (blue/green, sin cortes)."""
+    return await controller.start_reindex()
+
+
+@router.get("/admin/rag/reindex", tags=["admin"])
+async def get_rag_reindex_status():
+    """Estado de la reindexación y de las versiones del índice."""
+    return await controller.get_reindex_status()
+
+
+# ============================================================================
+# HEALTH PROBES (Kubernetes)
+# ============================================================================
+
+@router.get("/health/live", tags=["system"])
+async def liveness_probe():
+    """Liveness: el proceso responde (O(1), sin I/O)."""
+    return health_monitor.liveness()
+
+
+@router.get("/health/ready", tags=["system"])
+async def readiness_probe():
+    """Readiness: componentes RAG listos según estado cacheado."""
+    readiness = health_monitor.readiness()
+    status_code = 200 if readiness["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=readiness)
+
+
 # ============================================================================
 # ESTADÍSTICAS CONSOLIDADAS (Delega al controlador)
 # ============================================================================
 
 @router.get("/system/stats", tags=["system"])
-async def get_system_stats():
+async def get_system_stats(
+    refresh: bool = Query(default=False, description="Forzar recuento completo")
+):
     """Obtiene estadísticas consolidadas del sistema completo."""
     try:
-        return await controller.get_system_stats()
+        return await controller.get_system_stats(refresh=refresh)
     except Exception as e:
         logger.error(f"Error en estadísticas del sistema: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/system/traces", tags=["system"])
+async def get_recent_traces(
+    limit: int = Query(default=20, ge=1, le=200),
+    name: Optional[str] = Query(default=None, description="Operación (ej. analyze_incident)")
+):
+    """Trazas recientes con desglose de latencia por etapa (buffer en memoria)."""
+    return await controller.get_recent_traces(limit=limit, name=name)
+
+@router.get("/system/usage", tags=["system"])
+async def get_token_usage(
+    days: int = Query(default=1, ge=1, le=31, description="Días a incluir (incluido hoy)")
+):
+    """Uso de tokens y coste estimado por día y tier, y estado del router de modelos."""
+    return await controller.get_token_usage(days=days)
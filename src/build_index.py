@@ -0,0 +1,258 @@
+"""
+Offline builder for prebuilt RAG index artifacts.
+
+Embeds docs/ once (in CI or on a build machine) and writes a single
+immutable file that pods load read-only via mmap at startup, without
+calling the embedding API:
+
+    python -m src.build_index build --docs docs --output vectorstore/index.rgidx
+    python -m src.build_index inspect vectorstore/index.rgidx --verify
+
+For million-chunk corpora, `ivfpq` trains an IVF-PQ approximate index on
+an artifact's vectors (in batches, straight from the mmap) and writes it
+next to it as `<artifact>.ivfpq`; the server then searches the compressed
+codes and re-ranks with the exact vectors (RAG_IVFPQ_NPROBE trades recall
+for latency, see benchmarks/ann_recall.py):
+
+    python -m src.build_index ivfpq vectorstore/index.rgidx --nlist 4000 --m 96
+
+`quantize` writes int8 (4x smaller) or binary (32x smaller) codes of the
+vectors as `<artifact>.int8` / `<artifact>.binary`; the server keeps only
+those in RAM with RAG_VECTOR_STORAGE=int8|binary and reads the exact rows
+it re-ranks from the mmap (see benchmarks/quantization.py):
+
+    python -m src.build_index quantize vectorstore/index.rgidx --storage int8
+
+With RAG_VECTOR_BACKEND=http, `publish` builds a new index version on the
+shared Chroma server instead and points every API worker at it. It is the
+single writer of the shared index:
+
+    python -m src.build_index publish --docs docs
+
+The artifact records the embedding backend and a hash of the source
+documents and chunking parameters; the server ignores it (and falls back
+to Chroma) when either no longer matches. Chunking uses the same
+RAG_PARENT_CHUNK_SIZE / RAG_CHILD_CHUNK_SIZE / RAG_CHILD_CHUNK_OVERLAP
+settings as the server, and EMBEDDINGS_BACKEND=fake builds a
+hashing-embeddings artifact for load tests.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+
+from src.services.rag.core import SecurityKnowledgeRAG
+from src.services.rag.ivfpq import IVFPQIndex, build_ivfpq_for_artifact, ivfpq_path_for
+from src.services.rag.quantization import (
+    QUANTIZED_STORAGES,
+    QuantizedVectors,
+    build_quantized_for_artifact,
+    quantized_path_for
+)
+from src.services.rag.vector_service import use_vector_service
+from src.services.rag.index_artifact import (
+    IndexArtifact,
+    IndexArtifactError,
+    IndexArtifactWriter,
+    compute_docs_manifest,
+    embedding_backend_id
+)
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def build_artifact(docs_path: str, output: str, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Load, split and embed the documents and write the artifact.
+
+    Args:
+        docs_path: Source documents directory
+        output: Artifact file to write
+        batch_size: Chunks per embedding call
+
+    Returns:
+        Dict: Written artifact header
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        rag = SecurityKnowledgeRAG(docs_path, scratch)
+        await rag._initialize_embeddings()
+        embeddings = rag.vector_store.embeddings
+
+        documents = await rag.document_loader.load_all_documents()
+        if not documents:
+            raise ValueError(f"No documents found in {docs_path}")
+
+        chunking = rag.get_chunking_params()
+        parents, chunks = await rag.document_loader.split_documents_hierarchical(documents, **chunking)
+
+        manifest = {
+            "embedding_backend": embedding_backend_id(embeddings),
+            "docs_manifest": compute_docs_manifest(Path(docs_path), chunking),
+            "chunking": chunking
+        }
+        # Each batch is normalized and appended to the artifact as it arrives,
+        # so memory stays flat for million-chunk corpora
+        with IndexArtifactWriter(output, chunks, parents, manifest) as writer:
+            for start in range(0, len(chunks), batch_size):
+                batch = [chunk.page_content for chunk in chunks[start:start + batch_size]]
+                writer.add_vectors(await asyncio.to_thread(embeddings.embed_documents, batch))
+                logger.info(f"Embedded {writer.rows}/{len(chunks)} chunks")
+            return writer.close()
+
+
+async def publish_index(docs_path: str) -> Dict[str, Any]:
+    """
+    Build a new index version on the shared vector service and activate it.
+
+    Same blue/green path as the API reindex: build, smoke-test, swap the
+    shared pointer and drop versions beyond RAG_INDEX_KEEP_VERSIONS.
+
+    Args:
+        docs_path: Source documents directory
+
+    Returns:
+        Dict: Final rebuild status
+    """
+    if not use_vector_service():
+        raise ValueError("publish requires RAG_VECTOR_BACKEND=http")
+
+    rag = SecurityKnowledgeRAG(docs_path)
+    rag.config["rag_vector_service_writer"] = True
+    await rag._initialize_embeddings()
+    return await rag.rebuild_index()
+
+
+def inspect_artifact(path: str, verify: bool = False) -> Dict[str, Any]:
+    """
+    Read an artifact header and time a full mmap load.
+
+    Args:
+        path: Artifact file
+        verify: Check the content hash
+
+    Returns:
+        Dict: Header plus load time
+    """
+    start = time.perf_counter()
+    artifact = IndexArtifact.load(path, verify=verify)
+    load_ms = (time.perf_counter() - start) * 1000
+    info = {**artifact.header, "load_ms": round(load_ms, 2), "verified": verify}
+
+    ivfpq_path = ivfpq_path_for(path)
+    if ivfpq_path.is_file():
+        try:
+            ivfpq = IVFPQIndex.load(str(ivfpq_path))
+            info["ivfpq"] = {
+                **ivfpq.get_stats(),
+                "matches_artifact": ivfpq.meta.get("artifact_sha256") == artifact.header["content_sha256"]
+            }
+        except IndexArtifactError as e:
+            info["ivfpq"] = {"error": str(e)}
+
+    for storage in QUANTIZED_STORAGES:
+        quantized_path = quantized_path_for(path, storage)
+        if quantized_path.is_file():
+            try:
+                quantized = QuantizedVectors.load(str(quantized_path))
+                info[storage] = {
+                    **quantized.get_stats(),
+                    "matches_artifact": quantized.meta.get("artifact_sha256") == artifact.header["content_sha256"]
+                }
+            except IndexArtifactError as e:
+                info[storage] = {"error": str(e)}
+    return info
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the CLI argument parser.
+
+    Returns:
+        ArgumentParser: Parser
+    """
+    parser = argparse.ArgumentParser(description="Risk-Guardian RAG index artifacts")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Embed docs/ and write an artifact")
+    build.add_argument("--docs", default="docs")
+    build.add_argument("--output", default="vectorstore/index.rgidx")
+    build.add_argument("--batch-size", type=int, default=500, help="Chunks per embedding call")
+    build.add_argument("--ivfpq", action="store_true", help="Also train an IVF-PQ index with default parameters")
+    build.add_argument("--quantize", choices=QUANTIZED_STORAGES, action="append", default=[],
+                       help="Also write quantized vectors (repeatable)")
+
+    ivfpq = commands.add_parser("ivfpq", help="Train an IVF-PQ approximate index on an artifact")
+    ivfpq.add_argument("path", help="Artifact file")
+    ivfpq.add_argument("--output", help="Defaults to <artifact>.ivfpq")
+    ivfpq.add_argument("--nlist", type=int, help="Inverted lists (default ~4*sqrt(count))")
+    ivfpq.add_argument("--m", type=int, help="PQ sub-quantizers, must divide dim (default dim/16)")
+    ivfpq.add_argument("--train-size", type=int, default=100_000, help="Vectors sampled for training")
+    ivfpq.add_argument("--iterations", type=int, default=20, help="k-means iterations")
+    ivfpq.add_argument("--batch-size", type=int, default=8192, help="Rows per training/encoding batch")
+    ivfpq.add_argument("--seed", type=int, default=0)
+
+    quantize = commands.add_parser("quantize", help="Write int8/binary quantized vectors of an artifact")
+    quantize.add_argument("path", help="Artifact file")
+    quantize.add_argument("--storage", choices=QUANTIZED_STORAGES, default="int8")
+    quantize.add_argument("--output", help="Defaults to <artifact>.<storage>")
+    quantize.add_argument("--sample-size", type=int, default=100_000, help="Vectors sampled for calibration")
+    quantize.add_argument("--batch-size", type=int, default=8192, help="Rows per encoding batch")
+    quantize.add_argument("--seed", type=int, default=0)
+
+    publish = commands.add_parser("publish", help="Build and activate an index version on the vector service")
+    publish.add_argument("--docs", default="docs")
+
+    inspect = commands.add_parser("inspect", help="Print an artifact manifest")
+    inspect.add_argument("path")
+    inspect.add_argument("--verify", action="store_true", help="Check the content hash")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+
+    if args.command == "build":
+        header = asyncio.run(build_artifact(args.docs, args.output, args.batch_size))
+        print(f"[index] {header['count']} chunks ({header['embedding_backend']}, dim {header['dim']}) "
+              f"written to {args.output}", file=sys.stderr)
+        if args.ivfpq:
+            build_ivfpq_for_artifact(args.output)
+        for storage in args.quantize:
+            build_quantized_for_artifact(args.output, storage)
+        return 0
+
+    if args.command == "ivfpq":
+        ivfpq = build_ivfpq_for_artifact(
+            args.path, args.output, nlist=args.nlist, m=args.m, train_size=args.train_size,
+            iterations=args.iterations, batch_size=args.batch_size, seed=args.seed
+        )
+        print(json.dumps(ivfpq.get_stats(), indent=2), file=sys.stderr)
+        return 0
+
+    if args.command == "quantize":
+        quantized = build_quantized_for_artifact(
+            args.path, args.storage, args.output,
+            sample_size=args.sample_size, batch_size=args.batch_size, seed=args.seed
+        )
+        print(json.dumps(quantized.get_stats(), indent=2), file=sys.stderr)
+        return 0
+
+    if args.command == "publish":
+        status = asyncio.run(publish_index(args.docs))
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+        return 0 if status["state"] == "completed" else 1
+
+    info = inspect_artifact(args.path, verify=args.verify)
+    info.get("docs_manifest", {}).pop("files", None)
+    print(json.dumps(info, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
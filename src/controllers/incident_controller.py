@@ -3,7 +3,9 @@ Risk-Guardian Controller - Versión Limpia
 Controller minimalista sin duplicaciones, delega estadísticas al sistema RAG.
 """
 from typing import Dict, Any, Optional
-from fastapi import HTTPException, BackgroundTasks
+import asyncio
+import os
+from fastapi import HTTPException, BackgroundTasks, Response
 from datetime import datetime
 
 from src.models.models import (
@@ -12,10 +14,27 @@ from src.models.models import (
     LangChainAnalysisConfig
 )
 from src.services.langchain_security_analyzer import LangChainSecurityAnalyzer
+from src.services.model_router import model_router, token_usage_ledger
+from src.services.admission_control import admission_controller
+from src.services.priority_scheduler import request_priority
+from src.services.fake_backends import use_fake_llm
+from src.services.llm_resilience import get_resilience_status
+from src.services.llm_hedging import get_hedging_status
 from src.services.data_service import DataService
-from src.services.rag import get_rag_stats, get_rag_health
+from src.services.analysis_repository import analysis_repository
+from src.services.rag import (
+    get_rag_stats,
+    get_incident_index,
+    find_similar_incidents,
+    start_rag_reindex,
+    get_rag_reindex_status
+)
+from src.services.health_monitor import health_monitor
 from src.utils.logger import setup_logger
 from src.utils.validators import validate_incident_data
+from src.utils.tracing import start_trace, span, trace_buffer
+from src.utils.deadline import DeadlineExceededError, deadline_scope, resolve_budget
+from src.utils import metrics
 
 logger = setup_logger(__name__)
 
@@ -62,12 +81,51 @@ class IncidentController:
                 nivel_detalle="experto",
                 usar_streaming=True,
                 incluir_marcos_referencia=True,
-                validar_con_cti=True
+                validar_con_cti=True,
+                incluir_incidentes_similares=True
             )
         }
         
+        # Analizadores reutilizados por tipo de análisis (clientes y chains se crean una vez)
+        self._analyzers: Dict[tuple, LangChainSecurityAnalyzer] = {}
+        
         logger.info("Incident Controller limpio inicializado")
 
+    def _get_analyzer(self, analysis_type: str, config: LangChainAnalysisConfig) -> LangChainSecurityAnalyzer:
+        """
+        Obtiene el analizador de un tipo de análisis, creándolo la primera vez.
+        
+        Args:
+            analysis_type: Tipo de análisis
+            config: Configuración del tipo
+            
+        Returns:
+            LangChainSecurityAnalyzer: Analizador reutilizable
+        """
+        key = (analysis_type, use_fake_llm())
+        if key not in self._analyzers:
+            self._analyzers[key] = LangChainSecurityAnalyzer(config, analysis_type=analysis_type)
+        return self._analyzers[key]
+
+    def preload_analyzers(self) -> int:
+        """
+        Crea los analizadores de todos los tipos (prompts, clientes y chains).
+        
+        Lo usa el master del servidor pre-fork para que los workers los
+        hereden ya construidos.
+        
+        Returns:
+            int: Analizadores creados
+        """
+        created = 0
+        for analysis_type, analysis_config in self.analysis_configs.items():
+            try:
+                self._get_analyzer(analysis_type, analysis_config)
+                created += 1
+            except Exception as e:
+                logger.error(f"Error precargando analizador {analysis_type}: {str(e)}")
+        return created
+
     # ============================================================================
     # ANÁLISIS PRINCIPAL
     # ============================================================================
@@ -76,68 +134,178 @@ class IncidentController:
         self,
         incident_data: Dict[str, Any],
         analysis_type: str = "estandar",
-        background_tasks: Optional[BackgroundTasks] = None
+        background_tasks: Optional[BackgroundTasks] = None,
+        client_id: Optional[str] = None,
+        timeout_seconds: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Analiza un incidente usando LangChain + RAG + GPT-4.1.
         
+        Las llamadas al LLM esperan hueco por urgencia y tipo de análisis,
+        con reparto justo entre clientes (`client_id`). El plazo del cliente
+        (`timeout_seconds`) acota todas las etapas: al agotarse se cancela el
+        análisis y se responde 504.
+        
         Args:
             incident_data: Datos del incidente
             analysis_type: Tipo de análisis (rapido/estandar/experto)
             background_tasks: Tareas en segundo plano (opcional)
+            client_id: Cliente que envía la petición (IP de la conexión)
+            timeout_seconds: Segundos que el cliente espera la respuesta (opcional)
             
         Returns:
             dict: Resultado del análisis estructurado
         """
-        try:
-            # Validar datos
-            validation_errors = validate_incident_data(incident_data)
-            if validation_errors:
+        with start_trace("analyze_incident", analysis_type=analysis_type) as trace, \
+                deadline_scope(resolve_budget(timeout_seconds)) as deadline:
+            try:
+                # Validar datos
+                with span("validation"):
+                    validation_errors = validate_incident_data(incident_data)
+                if validation_errors:
+                    raise HTTPException(
+                        status_code=400,
+                        detail={"errors": validation_errors}
+                    )
+                
+                # Crear request
+                request = IncidentAnalysisRequest(
+                    titulo=incident_data.get("titulo", ""),
+                    descripcion=incident_data.get("descripcion", ""),
+                    categoria_inicial=incident_data.get("categoria_inicial"),
+                    urgencia=incident_data.get("urgencia", "media"),
+                    contexto_adicional=incident_data.get("contexto_adicional")
+                )
+                
+                if analysis_type not in self.analysis_configs:
+                    analysis_type = "estandar"
+                
+                # Admisión: bajo presión se degrada el análisis o se rechaza (503)
+                admission = admission_controller.admit(analysis_type, request.urgencia, client_id)
+                if not admission.admitted:
+                    raise HTTPException(
+                        status_code=503,
+                        detail={
+                            "error": "Servicio saturado, reintente más tarde",
+                            "degradation": admission.to_dict()
+                        },
+                        headers={"Retry-After": str(admission.retry_after_seconds)}
+                    )
+                analysis_type = admission.analysis_type
+                trace.attributes["degradation"] = admission.action
+                
+                # Obtener configuración y crear analizador
+                config = self.analysis_configs[analysis_type]
+                with span("analyzer_setup"):
+                    analyzer = self._get_analyzer(analysis_type, config)
+                
+                # Ejecutar análisis
+                logger.info(f"Iniciando análisis {analysis_type}: {request.titulo}")
+                with admission_controller.track(admission), \
+                        request_priority(admission.urgency, admission.requested_type, client_id) as priority:
+                    try:
+                        analysis_response = await asyncio.wait_for(
+                            analyzer.analyze_incident(request, rag_max_chunks=admission.rag_max_chunks),
+                            deadline.remaining() if deadline else None
+                        )
+                    except asyncio.TimeoutError as e:
+                        if deadline is None:
+                            raise
+                        stage = e.stage if isinstance(e, DeadlineExceededError) else "analysis"
+                        metrics.DEADLINE_EVENTS.labels(stage=stage, outcome="exceeded").inc()
+                        trace.attributes["deadline"] = deadline.to_dict()
+                        logger.warning(f"Plazo agotado en {stage} tras {trace.elapsed():.2f}s: {request.titulo}")
+                        raise HTTPException(
+                            status_code=504,
+                            detail={
+                                "error": "Plazo de la petición agotado",
+                                "stage": stage,
+                                "deadline": deadline.to_dict()
+                            }
+                        )
+                if deadline is not None:
+                    trace.attributes["deadline"] = deadline.to_dict()
+                
+                processing_time = trace.elapsed()
+                metrics.observe_analysis(
+                    analysis_type,
+                    analysis_response.status,
+                    processing_time,
+                    trace.breakdown()
+                )
+                logger.info(f"Análisis completado en {processing_time:.2f}s - ID: {analysis_response.id_analisis}")
+                
+                result = {
+                    "status": "success",
+                    "data": analysis_response.data,  # Solo los datos, sin anidación
+                    "processing_time": processing_time,
+                    "analysis_type": analysis_type,
+                    "degradation": admission.to_dict(),
+                    "scheduling": priority.to_dict(),
+                    "deadline": deadline.to_dict() if deadline else None,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "id_analisis": analysis_response.id_analisis,
+                    "modelo_utilizado": analysis_response.modelo_utilizado,
+                    "routing": (analysis_response.metadatos or {}).get("routing"),
+                    "token_usage": (analysis_response.metadatos or {}).get("token_usage"),
+                    "trace_id": trace.trace_id,
+                    "latency_breakdown_ms": trace.breakdown()
+                }
+                
+                # Persistir fuera del request path (writer por lotes)
+                analysis_repository.enqueue(analysis_repository.build_record(
+                    analysis_response.id_analisis,
+                    incident_data,
+                    analysis_type,
+                    {**result, "status": analysis_response.status},
+                    risk_level=(analysis_response.metadatos or {}).get("nivel_riesgo")
+                ))
+                
+                # Indexar como precedente fuera del request path
+                if analysis_response.status == "success":
+                    index_args = (
+                        analysis_response.id_analisis,
+                        incident_data,
+                        analysis_response.data,
+                        (analysis_response.metadatos or {}).get("nivel_riesgo")
+                    )
+                    if background_tasks is not None:
+                        background_tasks.add_task(self._index_analysis, *index_args)
+                    else:
+                        asyncio.create_task(self._index_analysis(*index_args))
+                
+                return result
+                
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Error en análisis: {str(e)}")
                 raise HTTPException(
-                    status_code=400,
-                    detail={"errors": validation_errors}
+                    status_code=500,
+                    detail=f"Error interno en análisis: {str(e)}"
                 )
-            
-            # Crear request
-            request = IncidentAnalysisRequest(
-                titulo=incident_data.get("titulo", ""),
-                descripcion=incident_data.get("descripcion", ""),
-                categoria_inicial=incident_data.get("categoria_inicial"),
-                urgencia=incident_data.get("urgencia", "media"),
-                contexto_adicional=incident_data.get("contexto_adicional")
-            )
-            
-            # Obtener configuración y crear analizador
-            config = self.analysis_configs.get(analysis_type, self.analysis_configs["estandar"])
-            analyzer = LangChainSecurityAnalyzer(config)
-            
-            # Ejecutar análisis
-            logger.info(f"Iniciando análisis {analysis_type}: {request.titulo}")
-            start_time = datetime.utcnow()
-            
-            analysis_response = await analyzer.analyze_incident(request)
-            
-            processing_time = (datetime.utcnow() - start_time).total_seconds()
-            logger.info(f"Análisis completado en {processing_time:.2f}s - ID: {analysis_response.id_analisis}")
-            
-            return {
-                "status": "success",
-                "data": analysis_response.data,  # Solo los datos, sin anidación
-                "processing_time": processing_time,
-                "analysis_type": analysis_type,
-                "timestamp": datetime.utcnow().isoformat(),
-                "id_analisis": analysis_response.id_analisis,
-                "modelo_utilizado": analysis_response.modelo_utilizado
-            }
-            
-        except HTTPException:
-            raise
+
+    async def _index_analysis(
+        self,
+        analysis_id: str,
+        incident_data: Dict[str, Any],
+        analysis_data: Dict[str, Any],
+        risk_level: Optional[Dict[str, Any]]
+    ) -> None:
+        """
+        Indexa un análisis completado en el histórico de incidentes.
+        
+        Args:
+            analysis_id: ID del análisis
+            incident_data: Datos originales del incidente
+            analysis_data: Resultado del análisis
+            risk_level: Nivel de riesgo calculado
+        """
+        try:
+            incident_index = await get_incident_index()
+            await incident_index.index_analysis(analysis_id, incident_data, analysis_data, risk_level)
         except Exception as e:
-            logger.error(f"Error en análisis: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error interno en análisis: {str(e)}"
-            )
+            logger.error(f"Error indexando análisis {analysis_id}: {str(e)}")
 
     # ============================================================================
     # EJEMPLOS Y CONFIGURACIÓN
@@ -173,6 +341,52 @@ class IncidentController:
                 detail="Error retrieving incident examples"
             )
 
+    async def get_incident_examples_response(self, if_none_match: Optional[str] = None) -> Response:
+        """
+        Obtiene ejemplos como respuesta HTTP pre-serializada con ETag.
+        
+        El cuerpo se serializa una vez por versión del fichero; si el cliente
+        envía un ETag vigente en If-None-Match se responde 304 sin cuerpo.
+        
+        Args:
+            if_none_match: Valor de la cabecera If-None-Match del cliente
+            
+        Returns:
+            Response: 200 con JSON cacheado o 304 Not Modified
+        """
+        try:
+            payload = self.data_service.get_serialized_payload(
+                "incident_examples.json",
+                lambda examples: {
+                    "status": "success",
+                    "data": examples,
+                    "timestamp": datetime.utcnow().isoformat()
+                },
+                payload_name="examples_response"
+            )
+            if payload is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="No incident examples found"
+                )
+            
+            body, etag = payload
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            
+            if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+                return Response(status_code=304, headers=headers)
+            
+            return Response(content=body, media_type="application/json", headers=headers)
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error cargando ejemplos: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Error retrieving incident examples"
+            )
+
     async def get_analysis_types(self) -> Dict[str, Any]:
         """
         Obtiene tipos de análisis disponibles con configuraciones.
@@ -205,22 +419,189 @@ class IncidentController:
                 detail="Error retrieving analysis types"
             )
 
+    # ============================================================================
+    # HISTÓRICO DE ANÁLISIS
+    # ============================================================================
+
+    async def list_analyses(self, **filters: Any) -> Dict[str, Any]:
+        """
+        Lista análisis persistidos con paginación keyset y filtros.
+        
+        Args:
+            **filters: limit, cursor, risk_level, categoria, modelo,
+                analysis_type, since, until, include_payload
+            
+        Returns:
+            dict: Página de análisis y cursor siguiente
+        """
+        try:
+            page = await asyncio.to_thread(analysis_repository.query, **filters)
+            return {
+                "status": "success",
+                **page,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+            
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error consultando análisis: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Error retrieving analyses"
+            )
+
+    async def get_analysis(self, analysis_id: str) -> Dict[str, Any]:
+        """
+        Obtiene un análisis persistido por su ID.
+        
+        Args:
+            analysis_id: ID del análisis
+            
+        Returns:
+            dict: Análisis completo
+        """
+        analysis = await asyncio.to_thread(analysis_repository.get, analysis_id)
+        if analysis is None:
+            raise HTTPException(status_code=404, detail=f"Análisis {analysis_id} no encontrado")
+        
+        return {
+            "status": "success",
+            "data": analysis,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    async def find_similar_incidents(self, query: str, k: int = 5) -> Dict[str, Any]:
+        """
+        Busca incidentes analizados previamente similares a una consulta.
+        
+        Args:
+            query: Texto del incidente
+            k: Número máximo de resultados
+            
+        Returns:
+            dict: Incidentes similares con su análisis persistido
+        """
+        if not query.strip():
+            raise HTTPException(status_code=400, detail="Se requiere texto de consulta")
+        
+        try:
+            similar = await find_similar_incidents(query, k=k)
+            stored = await asyncio.to_thread(
+                analysis_repository.get_many,
+                [incident["id_analisis"] for incident in similar]
+            )
+            
+            return {
+                "status": "success",
+                "data": [
+                    {**incident, "analisis": stored.get(incident["id_analisis"])}
+                    for incident in similar
+                ],
+                "total": len(similar),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Error buscando incidentes similares: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Error retrieving similar incidents"
+            )
+
+    # ============================================================================
+    # ADMINISTRACIÓN DEL ÍNDICE RAG
+    # ============================================================================
+
+    async def start_reindex(self) -> Dict[str, Any]:
+        """
+        Lanza la reindexación blue/green de la base de conocimiento.
+        
+        El índice activo sigue sirviendo hasta el swap atómico.
+        
+        Returns:
+            dict: Estado inicial de la reindexación
+        """
+        try:
+            rebuild = await start_rag_reindex()
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        
+        return {
+            "status": "accepted",
+            "rebuild": rebuild,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    async def get_reindex_status(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado de la reindexación y de las versiones del índice.
+        
+        Returns:
+            dict: Estado de la reindexación, versión activa y lectores por versión
+        """
+        return {
+            "status": "success",
+            "index": get_rag_reindex_status(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
     # ============================================================================
     # ESTADÍSTICAS (Delegadas al sistema RAG)
     # ============================================================================
 
-    async def get_system_stats(self) -> Dict[str, Any]:
+    async def get_recent_traces(self, limit: int = 20, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Obtiene las trazas recientes con desglose de latencia por etapa.
+        
+        Args:
+            limit: Número máximo de trazas
+            name: Filtrar por operación (ej. analyze_incident)
+            
+        Returns:
+            dict: Trazas recientes y resumen por etapa
+        """
+        return {
+            "status": "success",
+            "buffered": len(trace_buffer),
+            "stage_summary": trace_buffer.stage_summary(name),
+            "traces": trace_buffer.recent(limit, name),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    async def get_token_usage(self, days: int = 1) -> Dict[str, Any]:
+        """
+        Obtiene el uso de tokens y coste estimado por día y tier, y el
+        estado del router de modelos.
+        
+        Args:
+            days: Días a incluir (incluido hoy)
+            
+        Returns:
+            dict: Uso por día/tier/modelo y configuración del router
+        """
+        return {
+            "status": "success",
+            "usage": token_usage_ledger.summary(days),
+            "router": model_router.get_status(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    async def get_system_stats(self, refresh: bool = False) -> Dict[str, Any]:
         """
         Obtiene estadísticas del sistema completo.
         Delega al sistema RAG para evitar duplicaciones.
         
+        Args:
+            refresh: Forzar recuento completo del vector store
+            
         Returns:
             dict: Estadísticas consolidadas
         """
         try:
             # Obtener estadísticas RAG
-            rag_stats = await get_rag_stats()
-            rag_health = await get_rag_health()
+            rag_stats = await get_rag_stats(refresh=refresh)
+            rag_health = health_monitor.get_last_deep_check()
             
             return {
                 "status": "success",
@@ -230,6 +611,11 @@ class IncidentController:
                     "version": "2.1.0-clean"
                 },
                 "rag_system": rag_stats,
+                "llm_resilience": get_resilience_status(),
+                "llm_hedging": get_hedging_status(),
+                "admission": admission_controller.get_status(),
+                # Con `python -m src.serve` cada worker responde con su propio estado en memoria
+                "worker": {"pid": os.getpid(), "id": os.getenv("SERVE_WORKER_ID")},
                 "system_health": rag_health,
                 "timestamp": datetime.utcnow().isoformat()
             }
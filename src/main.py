@@ -4,13 +4,19 @@ Main application entry point.
 This module initializes the FastAPI application, configures routes,
 middleware, and static files.
 """
+import time
+
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.api import incidents
+from src.services.health_monitor import health_monitor
+from src.services.analysis_repository import analysis_repository
+from src.utils.config import config
+from src.utils import metrics
 
 
 # Initialize FastAPI application
@@ -40,6 +46,47 @@ templates = Jinja2Templates(directory="src/templates")
 app.include_router(incidents.router, prefix="/api", tags=["incidents"])
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Registra conteo y latencia por plantilla de ruta (no por URL)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        if route_path != "/metrics":
+            metrics.HTTP_REQUESTS.labels(request.method, route_path, str(status)).inc()
+            metrics.HTTP_LATENCY.labels(request.method, route_path).observe(time.perf_counter() - start)
+
+
+@app.on_event("startup")
+async def start_background_services():
+    """Arranca el check de salud profundo y el writer de análisis."""
+    health_monitor.start(warmup_rag=config.get("rag_warmup_on_startup", True))
+    analysis_repository.start()
+    metrics.event_loop_lag_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    """Detiene los servicios en segundo plano."""
+    await health_monitor.stop()
+    await analysis_repository.stop()
+    await metrics.event_loop_lag_monitor.stop()
+    metrics.mark_process_dead()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Métricas en formato Prometheus (agregadas entre workers si aplica)."""
+    payload, content_type = metrics.render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """
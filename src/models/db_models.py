@@ -0,0 +1,49 @@
+"""
+Risk-Guardian DB Models
+Modelos SQLAlchemy para persistencia de resultados de análisis.
+"""
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Index, String, Text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+class Base(DeclarativeBase):
+    """Base declarativa para modelos persistentes."""
+
+
+class AnalysisRecord(Base):
+    """
+    Resultado de un análisis de incidente persistido.
+
+    Los campos filtrables (timestamp, riesgo, categoría, modelo) son columnas
+    indexadas; el resultado completo se guarda como JSON en `payload`.
+    """
+    __tablename__ = "analyses"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    titulo: Mapped[str] = mapped_column(String(200), nullable=False)
+    categoria: Mapped[str] = mapped_column(String(100), nullable=True)
+    urgencia: Mapped[str] = mapped_column(String(20), nullable=True)
+    analysis_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    modelo: Mapped[str] = mapped_column(String(100), nullable=True)
+    risk_level: Mapped[str] = mapped_column(String(20), nullable=True)
+    risk_score: Mapped[float] = mapped_column(Float, nullable=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    processing_time: Mapped[float] = mapped_column(Float, nullable=True)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_analyses_created_at_id", "created_at", "id"),
+        Index("ix_analyses_risk_level_created_at", "risk_level", "created_at"),
+        Index("ix_analyses_categoria_created_at", "categoria", "created_at"),
+        Index("ix_analyses_modelo_created_at", "modelo", "created_at"),
+    )
+
+
+__all__ = [
+    "Base",
+    "AnalysisRecord"
+]
@@ -135,6 +135,20 @@ class LangChainAnalysisConfig(BaseModel):
         default=False,
         description="Validar análisis con Cyber Threat Intelligence"
     )
+    usar_hedging: bool = Field(
+        default=False,
+        description="Lanzar una petición de cobertura si el modelo principal tarda en dar el primer token"
+    )
+    incluir_incidentes_similares: bool = Field(
+        default=False,
+        description="Inyectar en el prompt incidentes similares ya analizados"
+    )
+    max_incidentes_similares: int = Field(
+        default=3,
+        ge=1,
+        le=10,
+        description="Máximo de incidentes similares a inyectar"
+    )
 
     class Config:
         """Configuración del modelo."""
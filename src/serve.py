@@ -0,0 +1,327 @@
+"""
+Pre-fork production server.
+
+The master process loads everything that is read-only and expensive once
+(the RAG index from its prebuilt artifact, the analyzers with their prompts
+and chains), freezes the heap out of the garbage collector and then forks N
+uvicorn workers that share one listening socket and, copy-on-write, the
+memory pages of the preloaded state:
+
+    python -m src.serve --host 0.0.0.0 --port 8000 --workers 4
+
+Without a usable index artifact the master builds one (as
+`python -m src.build_index build` would) before forking, so the documents
+are embedded once and not once per worker. Workers never build or collect
+index versions: reader counts are per process, so one worker's collection
+would delete the version another is serving. They only open the active
+one (RAG_INDEX_READ_ONLY).
+
+The incident history (`/api/incidents/similar`) is written after every
+analysis. On the local backend it is a Chroma directory whose in-memory
+HNSW is per process, so several workers would be concurrent writers on
+one directory and would not see each other's inserts: the server then
+runs a single worker. With RAG_VECTOR_BACKEND=http the collection lives on
+the shared Chroma server and any number of workers is safe.
+
+Per-worker state is reset after the fork (fault-injection sequence, LLM
+circuit breakers and hedging policies); counters and caches that live in
+memory (traces, retriever stats, token ledger) are per worker, while
+Prometheus metrics are aggregated across workers through
+PROMETHEUS_MULTIPROC_DIR, which is created here when unset. Dead workers
+are respawned; SIGTERM/SIGINT drain every worker gracefully.
+"""
+from typing import Dict, List, Optional
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+SHUTDOWN_TIMEOUT_SECONDS = 30.0
+RESPAWN_BACKOFF_SECONDS = 1.0
+
+
+def _prepare_metrics_dir() -> str:
+    """
+    Create (or empty) the shared Prometheus multiprocess directory.
+
+    It must exist before prometheus_client is imported, so this runs before
+    any `src` import.
+
+    Returns:
+        str: Directory path
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        path = tempfile.mkdtemp(prefix="risk-guardian-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    return path
+
+
+def preload() -> Dict[str, object]:
+    """
+    Load the shared read-only state in the master and freeze the heap.
+
+    Returns:
+        Dict: What was preloaded
+    """
+    import asyncio
+
+    from src.api.incidents import controller
+    from src.services.rag import preload_rag_service
+    from src.services.rag.vector_service import use_vector_service
+
+    rag_preloaded = asyncio.run(preload_rag_service())
+    if not rag_preloaded and not use_vector_service():
+        rag_preloaded = build_missing_artifact() and asyncio.run(preload_rag_service())
+    analyzers = controller.preload_analyzers()
+
+    # Objects that survive until here are shared by every worker: keep the
+    # collector from touching (and thereby copying) their pages
+    gc.collect()
+    gc.freeze()
+    return {"rag_index": rag_preloaded, "analyzers": analyzers, "frozen_objects": gc.get_freeze_count()}
+
+
+def build_missing_artifact() -> bool:
+    """
+    Build the configured index artifact in the master, before forking.
+
+    Returns:
+        bool: True if the artifact was written
+    """
+    import asyncio
+
+    from src.build_index import build_artifact
+    from src.utils.config import config
+
+    output = config.get("rag_index_artifact") or "vectorstore/index.rgidx"
+    print(f"[serve] no usable index artifact, building {output} before forking", file=sys.stderr)
+    try:
+        asyncio.run(build_artifact("docs", output))
+        return True
+    except Exception as e:
+        print(f"[serve] could not build the index artifact ({e}); workers will only open "
+              f"an existing index version", file=sys.stderr)
+        return False
+
+
+def init_worker(worker_id: int) -> None:
+    """
+    Reset per-worker state right after the fork.
+
+    Args:
+        worker_id: Worker index (0..N-1)
+    """
+    from src.services.fake_backends import fault_injector
+    from src.services.llm_hedging import reset_hedging_policies
+    from src.services.llm_resilience import reset_model_guards
+    from src.services.rag import set_index_read_only
+    from src.utils.config import config
+
+    os.environ["SERVE_WORKER_ID"] = str(worker_id)
+    fault_injector.reseed(config.get("fake_seed", 42) + worker_id)
+    reset_model_guards()
+    reset_hedging_policies()
+    set_index_read_only()
+    gc.enable()
+
+
+def run_worker(worker_id: int, sock: socket.socket, args: argparse.Namespace) -> int:
+    """
+    Worker process: serve the preloaded app on the inherited socket.
+
+    Args:
+        worker_id: Worker index
+        sock: Listening socket bound by the master
+        args: CLI arguments
+
+    Returns:
+        int: Exit code
+    """
+    import uvicorn
+
+    from src.main import app
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    init_worker(worker_id)
+
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        log_level=args.log_level,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT_SECONDS
+    ))
+    server.run(sockets=[sock])
+    return 0
+
+
+class PreforkMaster:
+    """
+    Forks the workers, respawns the ones that die and drains all of them on
+    SIGTERM/SIGINT.
+    """
+
+    def __init__(self, sock: socket.socket, args: argparse.Namespace):
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, int] = {}  # pid -> worker_id
+        self.stopping = False
+
+    def spawn(self, worker_id: int) -> None:
+        """Fork one worker."""
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(worker_id, self.sock, self.args)
+            finally:
+                os._exit(code)
+        self.workers[pid] = worker_id
+        print(f"[serve] worker {worker_id} started (pid {pid})", file=sys.stderr)
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> int:
+        """Master loop."""
+        from src.utils import metrics
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for worker_id in range(self.args.workers):
+            self.spawn(worker_id)
+
+        while self.workers and not self.stopping:
+            # Polling: a blocking waitpid would be resumed after the signal handler (PEP 475)
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                time.sleep(0.2)
+                continue
+            worker_id = self.workers.pop(pid, None)
+            metrics.mark_process_dead(pid)
+            if worker_id is not None and not self.stopping:
+                print(f"[serve] worker {worker_id} (pid {pid}) exited with status {status}, respawning",
+                      file=sys.stderr)
+                time.sleep(RESPAWN_BACKOFF_SECONDS)
+                self.spawn(worker_id)
+
+        return self.shutdown()
+
+    def shutdown(self) -> int:
+        """Ask every worker to finish in-flight requests, then kill stragglers."""
+        from src.utils import metrics
+
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SECONDS + 5
+        while self.workers and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.workers.pop(pid, None)
+                metrics.mark_process_dead(pid)
+            else:
+                time.sleep(0.1)
+
+        for pid in self.workers:
+            os.kill(pid, signal.SIGKILL)
+        print("[serve] stopped", file=sys.stderr)
+        return 0
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    Bind the listening socket shared by all workers.
+
+    Args:
+        host: Interface
+        port: Port
+        backlog: Listen backlog
+
+    Returns:
+        socket.socket: Listening, inheritable socket
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the CLI argument parser.
+
+    Returns:
+        ArgumentParser: Parser
+    """
+    parser = argparse.ArgumentParser(description="Risk-Guardian pre-fork server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", "0")) or os.cpu_count() or 1,
+                        help="Worker processes (SERVE_WORKERS, one per core by default)")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--keep-alive", type=int, default=5, help="Keep-alive timeout in seconds")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-preload", action="store_true", help="Let every worker load its own state (the index must already exist)")
+    return parser
+
+
+def resolve_workers(requested: int) -> int:
+    """
+    Number of workers that can safely share the incident history.
+
+    Args:
+        requested: Workers asked for on the command line
+
+    Returns:
+        int: `requested` on the shared vector service, 1 on the local backend
+    """
+    from src.services.rag.vector_service import use_vector_service
+
+    if requested > 1 and not use_vector_service():
+        print(f"[serve] local incident index has a single writer: running 1 worker instead of {requested} "
+              f"(RAG_VECTOR_BACKEND=http shares it across workers)", file=sys.stderr)
+        return 1
+    return requested
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point."""
+    args = build_parser().parse_args(argv)
+    metrics_dir = _prepare_metrics_dir()
+    args.workers = resolve_workers(args.workers)
+
+    # Collections during preload would only move objects between generations
+    gc.disable()
+    preloaded = {} if args.no_preload else preload()
+    print(f"[serve] preloaded {preloaded} - metrics in {metrics_dir}", file=sys.stderr)
+
+    if threading.active_count() > 1:
+        # Locks held by another thread at fork time would stay locked in the workers
+        names = [thread.name for thread in threading.enumerate() if thread is not threading.main_thread()]
+        print(f"[serve] refusing to fork with background threads running: {names}", file=sys.stderr)
+        return 1
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    return PreforkMaster(sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""
+Admission Control para Risk-Guardian
+Control de admisión de análisis con degradación progresiva bajo carga: a
+partir de umbrales de presión configurables se rebaja el tier, se reduce
+o se omite el contexto RAG y, en último término, se rechaza la petición
+con 503 + Retry-After en lugar de dejar que la latencia crezca para todos.
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+import math
+import threading
+import time
+
+from src.services.priority_scheduler import DEFAULT_URGENCY, normalize_urgency
+from src.utils.config import config
+from src.utils.logger import setup_logger
+from src.utils import metrics
+
+logger = setup_logger(__name__)
+
+# Escalones de degradación, de menor a mayor presión
+DEGRADATION_LADDER = ("normal", "tier_downgrade", "tier_minimum", "rag_reduced", "rag_skipped", "shed")
+# Tiers de análisis de más barato a más caro
+TIER_ORDER = ("rapido", "estandar", "experto")
+
+
+class _SlidingWindow:
+    """
+    Muestras de los últimos `window_seconds`: sin tráfico la señal vuelve a
+    cero en lugar de quedarse con el último valor (una petición rechazada no
+    genera muestras nuevas).
+    """
+
+    def __init__(self, window_seconds: float, max_samples: int = 1000):
+        self.window_seconds = window_seconds
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+
+    def add(self, value: float) -> None:
+        self._samples.append((time.monotonic(), value))
+
+    def mean(self) -> float:
+        cutoff = time.monotonic() - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        if not self._samples:
+            return 0.0
+        return sum(value for _, value in self._samples) / len(self._samples)
+
+
+class AdmissionDecision:
+    """
+    Escalón de degradación aplicado a una petición.
+    """
+
+    def __init__(
+        self,
+        level: int,
+        requested_type: str,
+        analysis_type: str,
+        rag_max_chunks: Optional[int],
+        pressure: float,
+        signals: Dict[str, float],
+        retry_after_seconds: int,
+        urgency: str = DEFAULT_URGENCY,
+        protected: bool = False,
+        client_id: Optional[str] = None
+    ):
+        self.level = level
+        self.requested_type = requested_type
+        self.analysis_type = analysis_type
+        self.rag_max_chunks = rag_max_chunks
+        self.pressure = pressure
+        self.signals = signals
+        self.retry_after_seconds = retry_after_seconds
+        self.urgency = urgency
+        self.protected = protected
+        self.client_id = client_id
+
+    @property
+    def action(self) -> str:
+        """Nombre del escalón (normal, tier_downgrade... shed)."""
+        return DEGRADATION_LADDER[self.level]
+
+    @property
+    def admitted(self) -> bool:
+        """Si la petición se atiende (aunque sea degradada)."""
+        return self.action != "shed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decisión serializable (respuesta del análisis o del 503)."""
+        return {
+            "level": self.level,
+            "action": self.action,
+            "requested_type": self.requested_type,
+            "analysis_type": self.analysis_type,
+            "rag_max_chunks": self.rag_max_chunks,
+            "urgency": self.urgency,
+            "protected": self.protected,
+            "pressure": round(self.pressure, 3),
+            "signals": {name: round(value, 3) for name, value in self.signals.items()},
+            "retry_after_seconds": None if self.admitted else self.retry_after_seconds
+        }
+
+
+class AdmissionController:
+    """
+    Controlador de admisión por proceso.
+
+    Señales, cada una normalizada contra su objetivo (1.0 = en el límite):
+    - Análisis en curso frente a `max_in_flight`
+    - Espera media en la cola del limitador LLM frente a `queue_wait_target_seconds`
+    - Latencia media de las llamadas al LLM frente a `llm_latency_target_seconds`
+
+    La presión es la mayor de las tres; cada umbral de `thresholds` que
+    supera activa el siguiente escalón de DEGRADATION_LADDER:
+    un tier menos, tier `rapido`, `reduced_rag_chunks` chunks RAG, sin RAG
+    y rechazo. Las esperas y latencias se promedian sobre `window_seconds`.
+
+    Una llamada lenta no es carga por sí sola (un `experto` tarda lo que
+    tarda aunque el proceso esté ocioso): la espera en cola y la latencia
+    solo cuentan mientras `saturation_probe` (ocupación del limitador LLM
+    más cargado, en curso + en cola frente a su límite) llegue a
+    `llm_saturation_threshold`, y la latencia nunca pasa del escalón
+    `rag_skipped`: el rechazo lo deciden los análisis en curso o la cola.
+    Las urgencias protegidas (por defecto `critica`) se degradan pero no se
+    rechazan y el planificador de prioridad las atiende primero. La urgencia
+    la declara el cliente, así que la protección está acotada: como mucho
+    `max_protected_in_flight` peticiones protegidas en curso en el proceso y
+    `max_protected_per_client` por cliente; por encima se tratan como
+    urgencia `media` (se rechazan y encolan como las demás).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_in_flight: int = 32,
+        queue_wait_target_seconds: float = 2.0,
+        llm_latency_target_seconds: float = 30.0,
+        thresholds: Optional[List[float]] = None,
+        reduced_rag_chunks: int = 2,
+        window_seconds: float = 30.0,
+        retry_after_seconds: int = 5,
+        protected_urgencies: Optional[List[str]] = None,
+        llm_saturation_threshold: float = 0.9,
+        saturation_probe: Optional[Callable[[], float]] = None,
+        max_protected_in_flight: int = 8,
+        max_protected_per_client: int = 2
+    ):
+        """
+        Args:
+            enabled: Si False se admite todo sin degradar
+            max_in_flight: Análisis en curso que equivalen a presión 1.0
+            queue_wait_target_seconds: Espera en cola LLM que equivale a presión 1.0
+            llm_latency_target_seconds: Latencia LLM que equivale a presión 1.0
+            thresholds: Presión a partir de la que se activa cada escalón (5 valores crecientes)
+            reduced_rag_chunks: Chunks RAG en el escalón `rag_reduced`
+            window_seconds: Ventana de las señales de espera y latencia
+            retry_after_seconds: Retry-After mínimo de los rechazos
+            protected_urgencies: Urgencias que no se rechazan
+            llm_saturation_threshold: Ocupación del limitador LLM a partir de la que cuentan espera y latencia
+            saturation_probe: Ocupación actual del limitador LLM (sin ella no cuentan)
+            max_protected_in_flight: Peticiones protegidas en curso como máximo
+            max_protected_per_client: Peticiones protegidas en curso por cliente como máximo
+        """
+        self.enabled = enabled
+        self.max_in_flight = max(1, max_in_flight)
+        self.queue_wait_target_seconds = queue_wait_target_seconds
+        self.llm_latency_target_seconds = llm_latency_target_seconds
+        self.thresholds = sorted(thresholds or [0.6, 0.7, 0.8, 0.9, 1.0])[:len(DEGRADATION_LADDER) - 1]
+        self.reduced_rag_chunks = reduced_rag_chunks
+        self.retry_after_seconds = max(1, retry_after_seconds)
+        self.protected_urgencies = {normalize_urgency(urgency) for urgency in protected_urgencies or []}
+        self.llm_saturation_threshold = llm_saturation_threshold
+        self.saturation_probe = saturation_probe
+        self.max_protected_in_flight = max(0, max_protected_in_flight)
+        self.max_protected_per_client = max(0, max_protected_per_client)
+        self._protected: Dict[str, int] = {}
+        self._in_flight = 0
+        self._queue_wait = _SlidingWindow(window_seconds)
+        self._llm_latency = _SlidingWindow(window_seconds)
+        self._decisions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "AdmissionController":
+        """Crea el controlador con la configuración de la aplicación."""
+        return cls(
+            enabled=config.get("admission_enabled", True),
+            max_in_flight=config.get("admission_max_in_flight", 32),
+            queue_wait_target_seconds=config.get("admission_queue_wait_target_seconds", 2.0),
+            llm_latency_target_seconds=config.get("admission_llm_latency_target_seconds", 30.0),
+            thresholds=parse_thresholds(config.get("admission_thresholds", "")),
+            reduced_rag_chunks=config.get("admission_reduced_rag_chunks", 2),
+            window_seconds=config.get("admission_window_seconds", 30.0),
+            retry_after_seconds=config.get("admission_retry_after_seconds", 5),
+            protected_urgencies=[
+                urgency.strip() for urgency in config.get("admission_protected_urgencies", "critica").split(",")
+                if urgency.strip()
+            ],
+            llm_saturation_threshold=config.get("admission_llm_saturation_threshold", 0.9),
+            saturation_probe=_llm_saturation,
+            max_protected_in_flight=config.get("admission_max_protected_in_flight", 8),
+            max_protected_per_client=config.get("admission_max_protected_per_client", 2)
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Análisis en curso en este proceso."""
+        return self._in_flight
+
+    def record_queue_wait(self, seconds: float) -> None:
+        """Espera de una llamada en la cola del limitador LLM."""
+        with self._lock:
+            self._queue_wait.add(seconds)
+
+    def record_llm_latency(self, seconds: float) -> None:
+        """Duración de una llamada al LLM."""
+        with self._lock:
+            self._llm_latency.add(seconds)
+
+    def pressure(self) -> Tuple[float, Dict[str, float]]:
+        """
+        Presión actual.
+
+        Returns:
+            Tuple: Presión (máximo de las señales normalizadas) y señales
+            (espera y latencia a 0 si el limitador LLM no está saturado)
+        """
+        with self._lock:
+            queue_wait = self._queue_wait.mean()
+            llm_latency = self._llm_latency.mean()
+            in_flight = self._in_flight
+
+        saturation = self.saturation_probe() if self.saturation_probe is not None else 0.0
+        saturated = saturation >= self.llm_saturation_threshold
+        signals = {"in_flight": in_flight / self.max_in_flight, "queue_wait": 0.0, "llm_latency": 0.0}
+        if saturated and self.queue_wait_target_seconds > 0:
+            signals["queue_wait"] = queue_wait / self.queue_wait_target_seconds
+        if saturated and self.llm_latency_target_seconds > 0:
+            signals["llm_latency"] = llm_latency / self.llm_latency_target_seconds
+        return max(signals.values()), {**signals, "llm_saturation": saturation, "llm_latency_seconds": llm_latency}
+
+    def _protection_available(self, client_id: Optional[str]) -> bool:
+        """Si queda cupo de peticiones protegidas, global y del cliente."""
+        with self._lock:
+            return (sum(self._protected.values()) < self.max_protected_in_flight
+                    and self._protected.get(client_id or "anonymous", 0) < self.max_protected_per_client)
+
+    def _level(self, pressure: float) -> int:
+        """Escalón que corresponde a una presión."""
+        return sum(1 for threshold in self.thresholds if pressure >= threshold)
+
+    def admit(
+        self,
+        analysis_type: str,
+        urgency: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> AdmissionDecision:
+        """
+        Decide el escalón de degradación de una petición.
+
+        Args:
+            analysis_type: Tipo de análisis solicitado
+            urgency: Urgencia del incidente (las protegidas no se rechazan, con cupo)
+            client_id: Cliente que envía la petición (cupo de protegidas)
+
+        Returns:
+            AdmissionDecision: Tier efectivo, chunks RAG, urgencia efectiva o rechazo
+        """
+        pressure, signals = self.pressure()
+        level = 0
+        if self.enabled:
+            # La latencia del LLM degrada pero no rechaza
+            latency_level = min(self._level(signals["llm_latency"]), DEGRADATION_LADDER.index("shed") - 1)
+            level = max(self._level(max(signals["in_flight"], signals["queue_wait"])), latency_level)
+        effective_urgency = normalize_urgency(urgency)
+        protected = False
+        if effective_urgency in self.protected_urgencies:
+            protected = self._protection_available(client_id)
+            if protected:
+                level = min(level, DEGRADATION_LADDER.index("shed") - 1)
+            else:
+                effective_urgency = DEFAULT_URGENCY
+                logger.warning(f"Cupo de urgencias protegidas agotado (cliente {client_id}): se trata como "
+                               f"{effective_urgency}")
+
+        effective_type = analysis_type
+        if level >= 1 and analysis_type in TIER_ORDER:
+            steps = 1 if level == 1 else len(TIER_ORDER)
+            effective_type = TIER_ORDER[max(0, TIER_ORDER.index(analysis_type) - steps)]
+
+        rag_max_chunks = None
+        if level >= DEGRADATION_LADDER.index("rag_skipped"):
+            rag_max_chunks = 0
+        elif level >= DEGRADATION_LADDER.index("rag_reduced"):
+            rag_max_chunks = self.reduced_rag_chunks
+
+        # Tiempo estimado para que se vacíe el trabajo en curso
+        retry_after = max(self.retry_after_seconds, math.ceil(signals["llm_latency_seconds"]))
+        decision = AdmissionDecision(
+            level, analysis_type, effective_type, rag_max_chunks, pressure, signals, retry_after,
+            urgency=effective_urgency, protected=protected, client_id=client_id
+        )
+
+        with self._lock:
+            self._decisions[decision.action] = self._decisions.get(decision.action, 0) + 1
+        metrics.ADMISSION_DECISIONS.labels(analysis_type=analysis_type, action=decision.action).inc()
+        metrics.ADMISSION_PRESSURE.observe(pressure)
+        if level:
+            logger.warning(f"Admisión [{analysis_type}]: {decision.action} "
+                           f"(presión {pressure:.2f}, tier {effective_type}, en curso {self._in_flight})")
+        return decision
+
+    @contextmanager
+    def track(self, decision: Optional[AdmissionDecision] = None) -> Iterator[None]:
+        """
+        Marca un análisis admitido en curso.
+
+        Args:
+            decision: Decisión de admisión (las protegidas ocupan cupo mientras duran)
+        """
+        client = (decision.client_id or "anonymous") if decision is not None and decision.protected else None
+        with self._lock:
+            self._in_flight += 1
+            if client is not None:
+                self._protected[client] = self._protected.get(client, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if client is not None:
+                    self._protected[client] -= 1
+                    if not self._protected[client]:
+                        del self._protected[client]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Configuración, presión actual y decisiones tomadas."""
+        pressure, signals = self.pressure()
+        return {
+            "enabled": self.enabled,
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_wait_target_seconds": self.queue_wait_target_seconds,
+            "llm_latency_target_seconds": self.llm_latency_target_seconds,
+            "thresholds": dict(zip(DEGRADATION_LADDER[1:], self.thresholds)),
+            "protected_urgencies": sorted(self.protected_urgencies),
+            "llm_saturation_threshold": self.llm_saturation_threshold,
+            "protected_in_flight": sum(self._protected.values()),
+            "max_protected_in_flight": self.max_protected_in_flight,
+            "max_protected_per_client": self.max_protected_per_client,
+            "pressure": round(pressure, 3),
+            "signals": {name: round(value, 3) for name, value in signals.items()},
+            "decisions": dict(self._decisions)
+        }
+
+
+def _llm_saturation() -> float:
+    """
+    Ocupación del limitador LLM más cargado del proceso.
+
+    Import diferido: llm_resilience importa este módulo.
+    """
+    from src.services.llm_resilience import llm_saturation
+    return llm_saturation()
+
+
+def parse_thresholds(value: str) -> Optional[List[float]]:
+    """
+    Interpreta los umbrales de la escalera ("0.6,0.7,0.8,0.9,1.0").
+
+    Args:
+        value: Cadena de configuración
+
+    Returns:
+        List[float]: Umbrales, o None si la cadena está vacía o es inválida
+    """
+    try:
+        thresholds = [float(item) for item in (value or "").split(",") if item.strip()]
+    except ValueError:
+        logger.warning(f"Umbrales de admisión inválidos ignorados: {value}")
+        return None
+    return thresholds or None
+
+
+# Instancia global (por proceso)
+admission_controller = AdmissionController.from_config()
@@ -0,0 +1,430 @@
+"""
+Analysis Repository para Risk-Guardian
+Almacén durable de resultados de análisis (SQLAlchemy + SQLite en modo WAL).
+
+Las escrituras se encolan desde el request path y un writer en segundo plano
+las persiste por lotes; las lecturas usan paginación keyset sobre índices.
+"""
+import asyncio
+import base64
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import and_, create_engine, event, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.db_models import Base, AnalysisRecord
+from src.utils.config import config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AnalysisRepository:
+    """
+    Repositorio de análisis con escrituras asíncronas por lotes.
+
+    Características:
+    - SQLite en modo WAL: lecturas concurrentes sin bloquear al writer
+    - Índices por timestamp, nivel de riesgo, categoría y modelo
+    - Cola acotada + writer en segundo plano (fuera del request path)
+    - Paginación keyset (created_at, id) sin OFFSET
+    """
+
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        batch_size: int = 50,
+        flush_interval_seconds: float = 0.5,
+        max_queue_size: int = 10000
+    ):
+        """
+        Inicializa el repositorio.
+
+        Args:
+            db_url: URL SQLAlchemy de la base de datos
+            batch_size: Máximo de registros por transacción
+            flush_interval_seconds: Espera máxima antes de escribir un lote parcial
+            max_queue_size: Tamaño máximo de la cola de escritura
+        """
+        self.db_url = db_url or config.get("analysis_db_url", "sqlite:///data/analyses.sqlite3")
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_queue_size = max_queue_size
+
+        self._engine: Optional[Engine] = None
+        self._session_factory: Optional[sessionmaker] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0}
+
+    # ============================================================================
+    # CONEXIÓN
+    # ============================================================================
+
+    def _get_session_factory(self) -> sessionmaker:
+        """
+        Crea (una sola vez) el engine, el esquema y la fábrica de sesiones.
+
+        Returns:
+            sessionmaker: Fábrica de sesiones
+        """
+        if self._session_factory is None:
+            if self.db_url.startswith("sqlite:///"):
+                Path(self.db_url.replace("sqlite:///", "", 1)).parent.mkdir(parents=True, exist_ok=True)
+
+            self._engine = create_engine(self.db_url, future=True)
+            if self._engine.dialect.name == "sqlite":
+                event.listen(self._engine, "connect", self._configure_sqlite)
+
+            Base.metadata.create_all(self._engine)
+            self._session_factory = sessionmaker(self._engine, expire_on_commit=False)
+            logger.info(f"AnalysisRepository conectado: {self.db_url}")
+
+        return self._session_factory
+
+    @staticmethod
+    def _configure_sqlite(dbapi_connection, connection_record) -> None:
+        """Activa WAL y sincronización normal en cada conexión SQLite."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    # ============================================================================
+    # ESCRITURA ASÍNCRONA POR LOTES
+    # ============================================================================
+
+    def start(self) -> None:
+        """Arranca el writer en segundo plano si no está activo en este event loop."""
+        loop = asyncio.get_running_loop()
+        if self._writer_task is not None and not self._writer_task.done() and self._loop is loop:
+            return
+        
+        # Cola ligada al event loop actual; conservar lo pendiente de un loop anterior
+        pending = self._drain_queue() if self._queue is not None else []
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        for record in pending:
+            self._queue.put_nowait(record)
+        
+        self._loop = loop
+        self._writer_task = loop.create_task(self._writer_loop())
+        logger.info("Writer de análisis iniciado")
+
+    async def stop(self) -> None:
+        """Detiene el writer tras persistir los registros pendientes."""
+        if self._writer_task and not self._writer_task.done():
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+        self._writer_task = None
+
+        if self._queue and not self._queue.empty():
+            await self._flush(self._drain_queue())
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """
+        Encola un análisis para persistencia sin bloquear la petición.
+
+        Args:
+            record: Campos del análisis (ver `build_record`)
+
+        Returns:
+            bool: False si la cola está llena y el registro se descarta
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(record)
+            self._stats["enqueued"] += 1
+            return True
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            logger.warning(f"Cola de análisis llena, descartado {record.get('id')}")
+            return False
+
+    async def _writer_loop(self) -> None:
+        """Agrupa registros de la cola y los escribe por lotes."""
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = asyncio.get_running_loop().time() + self.flush_interval_seconds
+                while len(batch) < self.batch_size:
+                    timeout = deadline - asyncio.get_running_loop().time()
+                    if timeout <= 0:
+                        break
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                await self._flush(batch)
+                raise
+
+            await self._flush(batch)
+
+    def _drain_queue(self) -> List[Dict[str, Any]]:
+        """
+        Extrae todos los registros pendientes de la cola.
+
+        Returns:
+            List[Dict]: Registros pendientes
+        """
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        return pending
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Persiste un lote en un thread para no bloquear el event loop.
+
+        Args:
+            batch: Registros a escribir
+        """
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+        except Exception as e:
+            logger.error(f"Error persistiendo lote de {len(batch)} análisis: {str(e)}")
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Escribe un lote en una única transacción.
+
+        Args:
+            batch: Registros a escribir
+        """
+        with self._get_session_factory()() as session, session.begin():
+            for record in batch:
+                session.merge(AnalysisRecord(**record))
+
+    def save(self, record: Dict[str, Any]) -> None:
+        """
+        Persiste un análisis de forma síncrona (scripts y tests).
+
+        Args:
+            record: Campos del análisis
+        """
+        self._write_batch([record])
+
+    # ============================================================================
+    # CONSULTAS
+    # ============================================================================
+
+    def query(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        categoria: Optional[str] = None,
+        modelo: Optional[str] = None,
+        analysis_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        include_payload: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Lista análisis del más reciente al más antiguo con paginación keyset.
+
+        Args:
+            limit: Tamaño de página
+            cursor: Cursor opaco devuelto en `next_cursor` de la página anterior
+            risk_level: Filtrar por nivel de riesgo
+            categoria: Filtrar por categoría
+            modelo: Filtrar por modelo utilizado
+            analysis_type: Filtrar por tipo de análisis
+            since: Desde esta fecha (incluida)
+            until: Hasta esta fecha (excluida)
+            include_payload: Incluir el resultado completo de cada análisis
+
+        Returns:
+            Dict: Página de resultados y cursor siguiente
+        """
+        conditions = []
+        for column, value in (
+            (AnalysisRecord.risk_level, risk_level),
+            (AnalysisRecord.categoria, categoria),
+            (AnalysisRecord.modelo, modelo),
+            (AnalysisRecord.analysis_type, analysis_type)
+        ):
+            if value is not None:
+                conditions.append(column == value)
+        if since is not None:
+            conditions.append(AnalysisRecord.created_at >= since)
+        if until is not None:
+            conditions.append(AnalysisRecord.created_at < until)
+        if cursor:
+            cursor_time, cursor_id = self._decode_cursor(cursor)
+            conditions.append(or_(
+                AnalysisRecord.created_at < cursor_time,
+                and_(AnalysisRecord.created_at == cursor_time, AnalysisRecord.id < cursor_id)
+            ))
+
+        statement = (
+            select(AnalysisRecord)
+            .where(*conditions)
+            .order_by(AnalysisRecord.created_at.desc(), AnalysisRecord.id.desc())
+            .limit(limit + 1)
+        )
+
+        with self._get_session_factory()() as session:
+            rows = session.scalars(statement).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": [self._to_dict(row, include_payload) for row in rows],
+            "count": len(rows),
+            "next_cursor": self._encode_cursor(rows[-1]) if has_more else None
+        }
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene un análisis por su identificador.
+
+        Args:
+            analysis_id: ID del análisis
+
+        Returns:
+            Optional[Dict]: Análisis completo o None
+        """
+        with self._get_session_factory()() as session:
+            row = session.get(AnalysisRecord, analysis_id)
+        return self._to_dict(row, include_payload=True) if row else None
+
+    def get_many(self, analysis_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene varios análisis completos en una sola consulta.
+
+        Args:
+            analysis_ids: IDs de análisis
+
+        Returns:
+            Dict[str, Dict]: Análisis encontrados indexados por ID
+        """
+        if not analysis_ids:
+            return {}
+        statement = select(AnalysisRecord).where(AnalysisRecord.id.in_(analysis_ids))
+        with self._get_session_factory()() as session:
+            rows = session.scalars(statement).all()
+        return {row.id: self._to_dict(row, include_payload=True) for row in rows}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene contadores del writer.
+
+        Returns:
+            Dict: Contadores y tamaño de la cola
+        """
+        return {
+            **self._stats,
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "writer_running": bool(self._writer_task and not self._writer_task.done())
+        }
+
+    # ============================================================================
+    # UTILIDADES
+    # ============================================================================
+
+    @staticmethod
+    def build_record(
+        analysis_id: str,
+        incident_data: Dict[str, Any],
+        analysis_type: str,
+        response: Dict[str, Any],
+        risk_level: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Construye el registro persistible de un análisis.
+
+        Args:
+            analysis_id: ID del análisis
+            incident_data: Datos del incidente recibidos
+            analysis_type: Tipo de análisis ejecutado
+            response: Respuesta devuelta al cliente
+            risk_level: Nivel de riesgo calculado
+
+        Returns:
+            Dict: Campos de AnalysisRecord
+        """
+        risk_level = risk_level or {}
+        return {
+            "id": analysis_id,
+            "created_at": datetime.utcnow(),
+            "titulo": str(incident_data.get("titulo", ""))[:200],
+            "categoria": incident_data.get("categoria_inicial"),
+            "urgencia": incident_data.get("urgencia", "media"),
+            "analysis_type": analysis_type,
+            "modelo": response.get("modelo_utilizado"),
+            "risk_level": risk_level.get("nivel"),
+            "risk_score": risk_level.get("puntuacion"),
+            "status": response.get("status", "success"),
+            "processing_time": response.get("processing_time"),
+            "payload": json.dumps({
+                "incident": incident_data,
+                "data": response.get("data", {}),
+                "nivel_riesgo": risk_level
+            }, ensure_ascii=False, default=str)
+        }
+
+    @staticmethod
+    def _to_dict(row: AnalysisRecord, include_payload: bool) -> Dict[str, Any]:
+        """
+        Convierte un registro a diccionario serializable.
+
+        Args:
+            row: Registro ORM
+            include_payload: Incluir el resultado completo
+
+        Returns:
+            Dict: Registro serializable
+        """
+        result = {
+            "id_analisis": row.id,
+            "timestamp": row.created_at.isoformat(),
+            "titulo": row.titulo,
+            "categoria": row.categoria,
+            "urgencia": row.urgencia,
+            "analysis_type": row.analysis_type,
+            "modelo_utilizado": row.modelo,
+            "risk_level": row.risk_level,
+            "risk_score": row.risk_score,
+            "status": row.status,
+            "processing_time": row.processing_time
+        }
+        if include_payload:
+            result.update(json.loads(row.payload))
+        return result
+
+    @staticmethod
+    def _encode_cursor(row: AnalysisRecord) -> str:
+        """Codifica (created_at, id) como cursor opaco."""
+        raw = f"{row.created_at.isoformat()}|{row.id}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        """
+        Decodifica un cursor de paginación.
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+            timestamp, analysis_id = raw.split("|", 1)
+            return datetime.fromisoformat(timestamp), analysis_id
+        except Exception as e:
+            raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+# Instancia compartida por la aplicación
+analysis_repository = AnalysisRepository()
@@ -1,44 +1,190 @@
 """
 Data service for handling JSON data files.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import copy
+import hashlib
 import json
 import os
+import threading
+import time
 from src.utils.logger import setup_logger
+from src.utils import metrics
 
 logger = setup_logger(__name__)
 
 class DataService:
     """
     Service for handling data operations.
+    
+    Parsed JSON files are cached in memory and invalidated when the file's
+    mtime or size changes. Serialized payloads are cached per file version
+    together with an ETag so HTTP handlers can answer without re-encoding.
     """
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", check_interval_seconds: float = 1.0):
         """
         Initialize the data service with data directory.
         
         Args:
             data_dir (str): Path to the data directory
+            check_interval_seconds (float): Minimum time between file stat checks
         """
         self.data_dir = data_dir
+        self.check_interval_seconds = check_interval_seconds
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._cache_stats = {"hits": 0, "misses": 0}
     
-    def load_json_file(self, filename: str) -> Dict[str, Any]:
+    def _file_signature(self, file_path: str) -> Tuple[int, int]:
+        """
+        Get the change signature of a file.
+        
+        Args:
+            file_path (str): Path to the file
+        
+        Returns:
+            tuple: (mtime in nanoseconds, size in bytes)
         """
-        Load data from a JSON file.
+        stat = os.stat(file_path)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _get_cache_entry(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cache entry for a file, reloading it if it changed.
         
         Args:
             filename (str): Name of the JSON file
-            
+        
         Returns:
-            dict: Loaded JSON data or empty dict if error
+            dict: Cache entry with parsed data, or None if the file is unreadable
         """
+        file_path = os.path.join(self.data_dir, filename)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._cache.get(filename)
+            if entry and now - entry["checked_at"] < self.check_interval_seconds:
+                self._cache_stats["hits"] += 1
+                metrics.record_cache_lookup("data_files", hit=True)
+                return entry
+        
+        try:
+            signature = self._file_signature(file_path)
+        except OSError as e:
+            logger.error(f"Error loading JSON file {filename}: {str(e)}")
+            return None
+        
+        with self._lock:
+            entry = self._cache.get(filename)
+            if entry and entry["signature"] == signature:
+                entry["checked_at"] = now
+                self._cache_stats["hits"] += 1
+                metrics.record_cache_lookup("data_files", hit=True)
+                return entry
+        
         try:
-            file_path = os.path.join(self.data_dir, filename)
             with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                data = json.load(f)
         except Exception as e:
             logger.error(f"Error loading JSON file {filename}: {str(e)}")
-            return {}
+            return None
+        
+        entry = {
+            "signature": signature,
+            "checked_at": now,
+            "data": data,
+            "payloads": {}
+        }
+        with self._lock:
+            self._cache[filename] = entry
+            self._cache_stats["misses"] += 1
+        metrics.record_cache_lookup("data_files", hit=False)
+        
+        logger.info(f"JSON file {filename} (re)loaded into cache")
+        return entry
+    
+    def load_json_file(self, filename: str) -> Dict[str, Any]:
+        """
+        Load data from a JSON file (served from the in-memory cache).
+        
+        Returns a deep copy: callers may mutate it without changing the
+        cached data behind the pre-serialized payloads and their ETags.
+        
+        Args:
+            filename (str): Name of the JSON file
+        
+        Returns:
+            dict: Loaded JSON data or empty dict if error
+        """
+        entry = self._get_cache_entry(filename)
+        return copy.deepcopy(entry["data"]) if entry else {}
+    
+    def get_serialized_payload(
+        self,
+        filename: str,
+        build_payload: Callable[[Dict[str, Any]], Dict[str, Any]],
+        payload_name: str = "default"
+    ) -> Optional[Tuple[bytes, str]]:
+        """
+        Get a pre-serialized JSON payload built from a data file.
+        
+        The payload is built and encoded once per file version; later calls
+        return the cached bytes until the file changes.
+        
+        Args:
+            filename (str): Name of the JSON file
+            build_payload (callable): Builds the response body from the data
+            payload_name (str): Cache key for this payload shape
+        
+        Returns:
+            tuple: (UTF-8 JSON bytes, quoted ETag) or None if the file is unreadable
+        """
+        entry = self._get_cache_entry(filename)
+        if not entry or not entry["data"]:
+            return None
+        
+        with self._lock:
+            cached = entry["payloads"].get(payload_name)
+        if cached:
+            return cached
+        
+        body = json.dumps(build_payload(entry["data"]), ensure_ascii=False).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        with self._lock:
+            entry["payloads"][payload_name] = (body, etag)
+        return body, etag
+    
+    def invalidate_cache(self, filename: Optional[str] = None) -> None:
+        """
+        Drop cached data for one file or for all files.
+        
+        Args:
+            filename (str): File to invalidate; all files if None
+        """
+        with self._lock:
+            if filename is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(filename, None)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss counters.
+        
+        Returns:
+            dict: Hits, misses, hit ratio and cached files
+        """
+        with self._lock:
+            hits = self._cache_stats["hits"]
+            misses = self._cache_stats["misses"]
+            total = hits + misses
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / total, 4) if total else None,
+                "cached_files": list(self._cache)
+            }
     
     def save_json_file(self, data: Dict[str, Any], 
                       filename: str) -> bool:
@@ -48,7 +194,7 @@ class DataService:
         Args:
             data (dict): Data to save
             filename (str): Name of the JSON file
-            
+        
         Returns:
             bool: True if successful, False otherwise
         """
@@ -56,6 +202,7 @@ class DataService:
             file_path = os.path.join(self.data_dir, filename)
             with open(file_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            self.invalidate_cache(filename)
             return True
         except Exception as e:
             logger.error(f"Error saving JSON file {filename}: {str(e)}")
@@ -68,4 +215,4 @@ class DataService:
         Returns:
             dict: Incident examples data
         """
-        return self.load_json_file("incident_examples.json") 
\ No newline at end of file
+        return self.load_json_file("incident_examples.json")
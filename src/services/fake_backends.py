@@ -0,0 +1,403 @@
+"""
+Fake Backends para Risk-Guardian
+Sustitutos locales y deterministas de los modelos de OpenAI para pruebas de
+carga y benchmarks sin consumir créditos.
+
+Se seleccionan por configuración (`LLM_BACKEND=fake`, `EMBEDDINGS_BACKEND=fake`)
+y también los sirve el stub HTTP compatible con OpenAI
+(`benchmarks/fake_openai_server.py`).
+"""
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.utils.config import config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class FakeBackendError(RuntimeError):
+    """Error simulado del proveedor (equivalente a un 5xx de la API)."""
+
+
+class FaultInjector:
+    """
+    Inyección de errores y timeouts con una secuencia reproducible.
+
+    Un único generador compartido por proceso: con la misma semilla y el
+    mismo orden de llamadas se obtiene la misma secuencia de fallos.
+    """
+
+    def __init__(self, seed: int = 42):
+        """
+        Args:
+            seed: Semilla del generador
+        """
+        self.reseed(seed)
+
+    def reseed(self, seed: int) -> None:
+        """
+        Reinicia la secuencia (p. ej. en cada worker tras un fork, para que
+        los workers no repitan la misma secuencia de fallos).
+
+        Args:
+            seed: Semilla del generador
+        """
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self, error_rate: float, timeout_rate: float) -> Optional[str]:
+        """
+        Decide si la llamada actual falla.
+
+        Args:
+            error_rate: Probabilidad de error (0-1)
+            timeout_rate: Probabilidad de timeout (0-1)
+
+        Returns:
+            str: "error", "timeout" o None
+        """
+        if not error_rate and not timeout_rate:
+            return None
+        with self._lock:
+            value = self._random.random()
+        if value < error_rate:
+            return "error"
+        if value < error_rate + timeout_rate:
+            return "timeout"
+        return None
+
+
+fault_injector = FaultInjector(config.get("fake_seed", 42))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimación barata de tokens (~4 caracteres por token).
+
+    Args:
+        text: Texto
+
+    Returns:
+        int: Tokens estimados
+    """
+    return max(1, len(text) // 4)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeddings deterministas por feature hashing con signo de los tokens.
+
+    Son léxicamente significativos: textos que comparten vocabulario quedan
+    cerca, de modo que MMR y las puntuaciones de relevancia se comportan
+    como con un índice real.
+    """
+
+    def __init__(
+        self,
+        size: int = 256,
+        latency_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 30.0
+    ):
+        """
+        Args:
+            size: Dimensión de los vectores
+            latency_seconds: Latencia simulada por llamada
+            error_rate: Probabilidad de error simulado
+            timeout_rate: Probabilidad de timeout simulado
+            timeout_seconds: Espera antes de fallar por timeout
+        """
+        self.size = size
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+
+    @classmethod
+    def from_config(cls) -> "HashingEmbeddings":
+        """Crea los embeddings con los parámetros `fake_*` de configuración."""
+        return cls(
+            size=config.get("fake_embeddings_size", 256),
+            latency_seconds=config.get("fake_embeddings_latency_ms", 0.0) / 1000,
+            error_rate=config.get("fake_error_rate", 0.0),
+            timeout_rate=config.get("fake_timeout_rate", 0.0),
+            timeout_seconds=config.get("fake_timeout_seconds", 30.0)
+        )
+
+    def embed_text(self, text: str) -> List[float]:
+        """
+        Calcula el vector de un texto (sin latencia ni fallos simulados).
+
+        Args:
+            text: Texto
+
+        Returns:
+            List[float]: Vector normalizado L2
+        """
+        vector = [0.0] * self.size
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.size] += 1.0 if digest & 0x80000000 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _simulate_call(self) -> None:
+        """Aplica latencia y fallos simulados a una llamada."""
+        fault = fault_injector.draw(self.error_rate, self.timeout_rate)
+        if fault == "timeout":
+            time.sleep(self.timeout_seconds)
+            raise TimeoutError("Fake embeddings timeout")
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if fault == "error":
+            raise FakeBackendError("Fake embeddings error")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de un lote de documentos."""
+        self._simulate_call()
+        return [self.embed_text(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embedding de una consulta."""
+        self._simulate_call()
+        return self.embed_text(text)
+
+
+def build_fake_analysis(prompt: str) -> Dict[str, Any]:
+    """
+    Genera un análisis válido (vulnerabilidades/impactos/controles)
+    determinado por el hash del prompt.
+
+    Args:
+        prompt: Texto completo del prompt
+
+    Returns:
+        Dict: Análisis con el esquema esperado por el parser
+    """
+    seed = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), 16)
+    levels = ["baja", "media", "alta", "critica"]
+    return {
+        "vulnerabilidades": [
+            {
+                "tipo": "tecnica",
+                "descripcion": f"Vulnerabilidad simulada {seed % 997}",
+                "severidad": levels[seed % 4],
+                "categoria": "simulacion",
+                "recomendacion": "Aplicar parches y revisar configuración"
+            },
+            {
+                "tipo": "procesos",
+                "descripcion": "Procedimiento de verificación insuficiente",
+                "severidad": levels[(seed >> 4) % 4],
+                "categoria": "simulacion",
+                "recomendacion": "Reforzar el procedimiento de doble verificación"
+            }
+        ],
+        "impactos": [
+            {
+                "tipo": "operacional",
+                "descripcion": "Impacto simulado en la operación",
+                "impacto": levels[(seed >> 2) % 4],
+                "recuperable": True,
+                "tiempo_recuperacion": "24 horas"
+            }
+        ],
+        "controles": [
+            {
+                "tipo": "correctivo",
+                "descripcion": "Aislar los sistemas afectados",
+                "prioridad": "alta",
+                "costo_estimado": "bajo",
+                "tiempo_implementacion": "inmediato"
+            },
+            {
+                "tipo": "preventivo",
+                "descripcion": "Formación de concienciación para el personal",
+                "prioridad": "media",
+                "costo_estimado": "medio",
+                "tiempo_implementacion": "1 mes"
+            }
+        ]
+    }
+
+
+class FakeSecurityChatModel(BaseChatModel):
+    """
+    Modelo de chat que responde con un análisis determinista y válido.
+
+    Simula latencia hasta el primer token, streaming por fragmentos y
+    errores/timeouts según la configuración.
+    """
+
+    model_name: str = "fake-security-analyst"
+    streaming: bool = False
+    latency_seconds: float = 0.0
+    chunk_chars: int = 20
+    chunk_delay_seconds: float = 0.0
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 30.0
+
+    @classmethod
+    def from_config(cls, model_name: str, streaming: bool = False) -> "FakeSecurityChatModel":
+        """
+        Crea el modelo con los parámetros `fake_*` de configuración.
+
+        Args:
+            model_name: Nombre a reportar (el del modelo real sustituido)
+            streaming: Emitir la respuesta en fragmentos
+        """
+        return cls(
+            model_name=model_name,
+            streaming=streaming,
+            latency_seconds=config.get("fake_llm_latency_ms", 0.0) / 1000,
+            chunk_chars=config.get("fake_llm_stream_chunk_chars", 20),
+            chunk_delay_seconds=config.get("fake_llm_stream_chunk_delay_ms", 0.0) / 1000,
+            error_rate=config.get("fake_error_rate", 0.0),
+            timeout_rate=config.get("fake_timeout_rate", 0.0),
+            timeout_seconds=config.get("fake_timeout_seconds", 30.0)
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-security-analysis"
+
+    def _render(self, messages: List[BaseMessage]) -> tuple:
+        """Devuelve (prompt, respuesta JSON) para los mensajes."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        return prompt, json.dumps(build_fake_analysis(prompt), ensure_ascii=False)
+
+    def _llm_output(self, prompt: str, content: str) -> Dict[str, Any]:
+        """Uso de tokens estimado en el formato de OpenAI."""
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(content)
+        return {
+            "model_name": self.model_name,
+            "token_usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _combine_llm_outputs(self, llm_outputs: List[Optional[dict]]) -> dict:
+        """Suma el uso de tokens de varias generaciones (como ChatOpenAI)."""
+        token_usage: Dict[str, int] = {}
+        for output in llm_outputs:
+            for key, value in ((output or {}).get("token_usage") or {}).items():
+                token_usage[key] = token_usage.get(key, 0) + value
+        return {"model_name": self.model_name, "token_usage": token_usage}
+
+    def _chunks(self, content: str) -> List[str]:
+        """Divide la respuesta en fragmentos de `chunk_chars` caracteres."""
+        size = max(1, self.chunk_chars)
+        return [content[i:i + size] for i in range(0, len(content), size)]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        fault = fault_injector.draw(self.error_rate, self.timeout_rate)
+        if fault == "timeout":
+            time.sleep(self.timeout_seconds)
+            raise TimeoutError("Fake LLM timeout")
+        time.sleep(self.latency_seconds)
+        if fault == "error":
+            raise FakeBackendError("Fake LLM error")
+
+        prompt, content = self._render(messages)
+        if self.streaming:
+            for piece in self._chunks(content):
+                if self.chunk_delay_seconds:
+                    time.sleep(self.chunk_delay_seconds)
+                if run_manager:
+                    run_manager.on_llm_new_token(piece)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output=self._llm_output(prompt, content)
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        fault = fault_injector.draw(self.error_rate, self.timeout_rate)
+        if fault == "timeout":
+            await asyncio.sleep(self.timeout_seconds)
+            raise TimeoutError("Fake LLM timeout")
+        await asyncio.sleep(self.latency_seconds)
+        if fault == "error":
+            raise FakeBackendError("Fake LLM error")
+
+        prompt, content = self._render(messages)
+        if self.streaming:
+            for piece in self._chunks(content):
+                if self.chunk_delay_seconds:
+                    await asyncio.sleep(self.chunk_delay_seconds)
+                if run_manager:
+                    await run_manager.on_llm_new_token(piece)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output=self._llm_output(prompt, content)
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_seconds)
+        _, content = self._render(messages)
+        for piece in self._chunks(content):
+            if self.chunk_delay_seconds:
+                time.sleep(self.chunk_delay_seconds)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_seconds)
+        _, content = self._render(messages)
+        for piece in self._chunks(content):
+            if self.chunk_delay_seconds:
+                await asyncio.sleep(self.chunk_delay_seconds)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+def use_fake_llm() -> bool:
+    """Indica si el backend LLM configurado es el fake."""
+    return config.get("llm_backend", "openai") == "fake"
+
+
+def use_fake_embeddings() -> bool:
+    """Indica si el backend de embeddings configurado es el fake."""
+    return config.get("embeddings_backend", "openai") == "fake"
@@ -0,0 +1,172 @@
+"""
+Health Monitor para Risk-Guardian
+Sistema de salud por niveles: liveness O(1), readiness desde estado cacheado
+y check profundo ejecutado en segundo plano.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from src.services.rag import get_rag_service, get_rag_health, get_rag_component_status
+from src.utils.config import config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class HealthMonitor:
+    """
+    Monitor de salud con tres niveles de coste.
+
+    Niveles:
+    - liveness: el proceso responde (sin I/O)
+    - readiness: estado de componentes RAG en memoria + último check profundo
+    - deep: búsqueda real en el RAG, ejecutada periódicamente en segundo plano
+      y servida desde cache con su antigüedad (age_seconds)
+    """
+
+    def __init__(self, interval_seconds: Optional[float] = None):
+        """
+        Inicializa el monitor.
+
+        Args:
+            interval_seconds: Periodo entre checks profundos
+        """
+        self.interval_seconds = interval_seconds or config.get("health_check_interval_seconds", 60.0)
+        self._started_at = time.monotonic()
+        self._last_deep_result: Optional[Dict[str, Any]] = None
+        self._last_deep_run: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ============================================================================
+    # CICLO DE VIDA
+    # ============================================================================
+
+    def start(self, warmup_rag: bool = False) -> None:
+        """
+        Arranca el bucle de checks profundos en segundo plano.
+
+        Args:
+            warmup_rag: Inicializar el servicio RAG antes del primer check
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_loop(warmup_rag))
+            logger.info(f"HealthMonitor iniciado - intervalo {self.interval_seconds:.0f}s")
+
+    async def stop(self) -> None:
+        """Detiene el bucle de checks profundos."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run_loop(self, warmup_rag: bool) -> None:
+        """
+        Bucle periódico de checks profundos.
+
+        Args:
+            warmup_rag: Inicializar el servicio RAG antes del primer check
+        """
+        if warmup_rag:
+            try:
+                await get_rag_service()
+            except Exception as e:
+                logger.warning(f"Warmup RAG fallido: {str(e)}")
+
+        while True:
+            await self.run_deep_check()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_deep_check(self) -> Dict[str, Any]:
+        """
+        Ejecuta el check profundo y guarda su resultado.
+
+        Returns:
+            Dict: Resultado del check profundo
+        """
+        try:
+            result = await get_rag_health()
+        except Exception as e:
+            logger.error(f"Error en check profundo: {str(e)}")
+            result = {"status": "error", "error": str(e)}
+
+        self._last_deep_result = result
+        self._last_deep_run = time.monotonic()
+        return result
+
+    # ============================================================================
+    # PROBES
+    # ============================================================================
+
+    def liveness(self) -> Dict[str, Any]:
+        """
+        Probe de liveness: solo confirma que el proceso atiende peticiones.
+
+        Returns:
+            Dict: Estado vivo y uptime
+        """
+        return {
+            "status": "alive",
+            "uptime_seconds": round(time.monotonic() - self._started_at, 1)
+        }
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Probe de readiness basado en estado de componentes en memoria.
+
+        No ejecuta búsquedas ni llamadas externas; incorpora el estado del
+        último check profundo si ya existe.
+
+        Returns:
+            Dict: Estado ready/not_ready con detalle de componentes
+        """
+        rag_status = get_rag_component_status()
+        deep_status = (self._last_deep_result or {}).get("status")
+
+        ready = rag_status["status"] == "ready" and deep_status not in ("unhealthy", "error")
+        return {
+            "status": "ready" if ready else "not_ready",
+            "components": rag_status["components"],
+            "last_deep_check_status": deep_status,
+            "last_deep_check_age_seconds": self._get_deep_check_age()
+        }
+
+    def get_last_deep_check(self) -> Dict[str, Any]:
+        """
+        Devuelve el último resultado del check profundo con su antigüedad.
+
+        Returns:
+            Dict: Último resultado (o pending si aún no se ha ejecutado)
+        """
+        if self._last_deep_result is None:
+            return {
+                "status": "pending",
+                "message": "Check profundo aún no ejecutado",
+                "age_seconds": None,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+
+        return {
+            **self._last_deep_result,
+            "age_seconds": self._get_deep_check_age(),
+            "check_interval_seconds": self.interval_seconds
+        }
+
+    def _get_deep_check_age(self) -> Optional[float]:
+        """
+        Calcula la antigüedad del último check profundo.
+
+        Returns:
+            Optional[float]: Segundos desde el último check, o None
+        """
+        if self._last_deep_run is None:
+            return None
+        return round(time.monotonic() - self._last_deep_run, 1)
+
+
+# Instancia compartida por la aplicación
+health_monitor = HealthMonitor()
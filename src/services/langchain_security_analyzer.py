@@ -2,7 +2,9 @@
 LangChain Security Analyzer para Risk-Guardian
 Analizador avanzado de incidentes de ciberseguridad usando LangChain + GPT-4.
 """
+import asyncio
 import json
+import time
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, List
@@ -13,20 +15,80 @@ from langchain_core.runnables import RunnablePassthrough, RunnableBranch, Runnab
 from langchain_core.exceptions import LangChainException
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.callbacks.manager import CallbackManager
+from langchain_core.callbacks import AsyncCallbackHandler
 
 from src.models.models import (
     IncidentAnalysisRequest,
     IncidentAnalysisResponse,
     LangChainAnalysisConfig
 )
-from src.services.rag import get_rag_service
+from src.services.rag import get_rag_service, get_incident_index
 from src.prompts.security_analysis_prompts import create_security_analysis_prompt
 from src.utils.logger import setup_logger
 from src.utils.config import config
+from src.services.fake_backends import FakeSecurityChatModel, use_fake_llm
+from src.services.model_router import count_tokens, model_router, token_usage_ledger
+from src.services.llm_resilience import get_model_guard, with_resilient_fallback
+from src.services.llm_hedging import with_hedging
+from src.utils.tracing import span, record_span, get_current_trace
+from src.utils.deadline import DeadlineExceededError, get_deadline, skip_stage
+from src.utils import metrics
 
 logger = setup_logger(__name__)
 
 
+class LLMTimingCallbackHandler(AsyncCallbackHandler):
+    """
+    Callback que mide el time-to-first-token de la llamada al LLM y
+    registra uso de tokens y errores del modelo (activación de fallback).
+    
+    Solo hay primer token observable con modelos en streaming; en modo no
+    streaming el TTFT coincide con la duración total de la llamada.
+    """
+
+    def __init__(self, start: float):
+        """
+        Args:
+            start: Valor de perf_counter al iniciar la llamada
+        """
+        self.start = start
+        self.first_token_at: Optional[float] = None
+        self.llm_errors = 0
+        self.model_name: Optional[str] = None
+        self.completion_tokens: Optional[int] = None
+        self._run_models: Dict[Any, str] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], **kwargs: Any) -> None:
+        """Registra qué modelo atiende cada llamada (principal, fallback o cobertura)."""
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model")
+        if model:
+            self._run_models[kwargs.get("run_id")] = model
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        """Registra el instante del primer token recibido."""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    async def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        """Cuenta errores del modelo (se pasa al fallback)."""
+        self.llm_errors += 1
+
+    async def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        """Registra tokens y coste cuando el proveedor informa del uso."""
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get("token_usage") or {}
+        # La llamada que termina es la que responde (la perdedora de una cobertura se cancela)
+        self.model_name = llm_output.get("model_name") or self._run_models.get(kwargs.get("run_id")) or self.model_name
+        if token_usage:
+            self.completion_tokens = token_usage.get("completion_tokens")
+            metrics.record_llm_usage(
+                llm_output.get("model_name", "unknown"),
+                token_usage.get("prompt_tokens", 0),
+                token_usage.get("completion_tokens", 0)
+            )
+
+
 class LangChainSecurityAnalyzer:
     """
     Analizador de seguridad avanzado usando LangChain y GPT-4.
@@ -39,14 +101,18 @@ class LangChainSecurityAnalyzer:
     - Integración con marcos de seguridad (MAGERIT, OCTAVE, etc.)
     """
 
-    def __init__(self, config: Optional[LangChainAnalysisConfig] = None):
+    def __init__(self, config: Optional[LangChainAnalysisConfig] = None, analysis_type: Optional[str] = None):
         """
         Inicializa el analizador de seguridad con LangChain.
         
         Args:
             config: Configuración específica para el análisis
+            analysis_type: Tier de análisis para contabilidad y enrutado
+                (por defecto el nivel de detalle de la configuración)
         """
         self.config = config or LangChainAnalysisConfig()
+        self.analysis_type = analysis_type or self.config.nivel_detalle
+        self._routed_chains: Dict[str, Any] = {}
         self._setup_models()
         self._setup_parsers()
         self._setup_chains()
@@ -56,33 +122,103 @@ class LangChainSecurityAnalyzer:
         """Configura los modelos de OpenAI con LangChain."""
         try:
             # Modelo principal (GPT-4)
-            self.primary_model = ChatOpenAI(
-                model=self.config.modelo_principal,
-                temperature=self.config.temperatura,
-                max_tokens=self.config.max_tokens,
-                openai_api_key=config.get("openai_api_key"),
-                callbacks=[StreamingStdOutCallbackHandler()] if self.config.usar_streaming else None,
+            self.primary_model = self._create_chat_model(
+                self.config.modelo_principal,
                 streaming=self.config.usar_streaming
             )
             
-            # Modelo de fallback (GPT-3.5-turbo)
-            self.fallback_model = ChatOpenAI(
-                model=self.config.modelo_fallback,
-                temperature=self.config.temperatura,
-                max_tokens=self.config.max_tokens,
-                openai_api_key=config.get("openai_api_key"),
-                streaming=False  # Fallback no necesita streaming
-            )
+            # Modelo de fallback (GPT-3.5-turbo, no necesita streaming)
+            self.fallback_model = self._create_chat_model(self.config.modelo_fallback, streaming=False)
             
-            # Modelo con fallback automático
-            self.model_with_fallback = self.primary_model.with_fallbacks([self.fallback_model])
+            # Modelo con fallback automático, limitador adaptativo y circuit breaker
+            self.model_with_fallback = self._protect_model(self.config.modelo_principal, self.primary_model)
             
-            logger.info(f"Modelos configurados: {self.config.modelo_principal} → {self.config.modelo_fallback}")
+            backend = "fake" if use_fake_llm() else "OpenAI"
+            logger.info(f"Modelos {backend} configurados: {self.config.modelo_principal} → {self.config.modelo_fallback}")
             
         except Exception as e:
             logger.error(f"Error configurando modelos: {str(e)}")
             raise
 
+    def _create_chat_model(self, model_name: str, streaming: bool):
+        """
+        Crea el cliente de chat para un modelo.
+        
+        Args:
+            model_name: Nombre del modelo
+            streaming: Si se reciben tokens en streaming
+            
+        Returns:
+            Modelo de chat de LangChain
+        """
+        if use_fake_llm():
+            # Backend local determinista (pruebas de carga sin OpenAI)
+            return FakeSecurityChatModel.from_config(model_name, streaming=streaming)
+        
+        return ChatOpenAI(
+            model=model_name,
+            temperature=self.config.temperatura,
+            max_tokens=self.config.max_tokens,
+            openai_api_key=config.get("openai_api_key"),
+            base_url=config.get("openai_base_url"),
+            callbacks=[StreamingStdOutCallbackHandler()] if streaming else None,
+            streaming=streaming
+        )
+
+    def _get_llm_chain(self, model_name: str):
+        """
+        Obtiene la chain prompt + modelo para el modelo elegido por el router.
+        
+        Las chains de modelos alternativos se crean una vez y se reutilizan;
+        todas mantienen el modelo de fallback configurado.
+        
+        Args:
+            model_name: Modelo elegido
+            
+        Returns:
+            Runnable: Chain prompt | modelo con fallback
+        """
+        if model_name == self.config.modelo_principal:
+            return self.llm_chain
+        
+        if model_name not in self._routed_chains:
+            model = self._protect_model(
+                model_name,
+                self._create_chat_model(model_name, streaming=self.config.usar_streaming)
+            )
+            self._routed_chains[model_name] = self.analysis_prompt | model
+        return self._routed_chains[model_name]
+
+    def _protect_model(self, model_name: str, model):
+        """
+        Envuelve un modelo con fallback resiliente y, si está habilitado,
+        con peticiones de cobertura al modelo de fallback (u otra réplica
+        del mismo modelo si coinciden).
+        
+        Args:
+            model_name: Nombre del modelo
+            model: Modelo de chat
+            
+        Returns:
+            Runnable: Modelo protegido
+        """
+        protected = with_resilient_fallback(
+            model_name, model,
+            self.config.modelo_fallback, self.fallback_model
+        )
+        if not self._hedging_enabled():
+            return protected
+        
+        async def hedge(input: Any, config: Any) -> Any:
+            return await get_model_guard(self.config.modelo_fallback).call(self.fallback_model, input, config)
+        
+        return with_hedging(model_name, protected, self.config.modelo_fallback, RunnableLambda(hedge))
+
+    def _hedging_enabled(self) -> bool:
+        """Hedging activo por configuración del análisis o por tier (LLM_HEDGING_TIERS)."""
+        tiers = [tier.strip() for tier in config.get("llm_hedging_tiers", "").split(",") if tier.strip()]
+        return self.config.usar_hedging or self.analysis_type in tiers
+
     def _setup_parsers(self):
         """Configura parsers esenciales."""
         # Solo el parser JSON necesario
@@ -95,11 +231,9 @@ class LangChainSecurityAnalyzer:
         try:
             # Chain principal de análisis (simplificado)
             self.analysis_prompt = create_security_analysis_prompt()
-            self.analysis_chain = (
-                self.analysis_prompt
-                | self.model_with_fallback
-                | self._create_robust_parser()
-            )
+            self.llm_chain = self.analysis_prompt | self.model_with_fallback
+            self.output_parser = self._create_robust_parser()
+            self.analysis_chain = self.llm_chain | self.output_parser
             
             logger.info("Chains de LangChain configuradas correctamente")
             
@@ -134,6 +268,7 @@ class LangChainSecurityAnalyzer:
                 
             except (json.JSONDecodeError, ValueError) as e:
                 logger.warning(f"Error parsing JSON: {str(e)}. Usando fallback.")
+                metrics.JSON_PARSE_FALLBACKS.inc()
                 return self._create_fallback_response()
         
         return RunnableLambda(parse_with_fallback)
@@ -253,23 +388,51 @@ class LangChainSecurityAnalyzer:
         except Exception:
             return {"nivel": "media", "puntuacion": 50.0, "factores": [], "justificacion": "Error en cálculo"}
 
-    async def analyze_incident(self, request: IncidentAnalysisRequest) -> IncidentAnalysisResponse:
+    async def analyze_incident(
+        self,
+        request: IncidentAnalysisRequest,
+        rag_max_chunks: Optional[int] = None
+    ) -> IncidentAnalysisResponse:
         """
         Analiza un incidente de ciberseguridad usando LangChain.
         
         Args:
             request: Solicitud de análisis de incidente
+            rag_max_chunks: Chunks de contexto RAG (None = 5; 0 = sin RAG ni
+                incidentes similares, degradación bajo carga)
             
         Returns:
             IncidentAnalysisResponse: Respuesta estructurada del análisis
+            
+        Raises:
+            DeadlineExceededError: Se agotó el plazo de la petición
         """
         analysis_id = str(uuid.uuid4())
+        start_time = time.perf_counter()
         
         try:
             logger.info(f"Iniciando análisis de incidente {analysis_id}: {request.titulo}")
             
-            # Buscar contexto relevante usando RAG
-            rag_context = await self._get_rag_context(request)
+            # Buscar contexto RAG e incidentes similares en paralelo (etapa
+            # opcional: se omite o se corta si el plazo no deja margen al LLM)
+            rag_timeout = self._get_rag_timeout()
+            if rag_max_chunks == 0 or rag_timeout == 0:
+                if rag_timeout == 0:
+                    skip_stage("rag")
+                rag_context, similar_context, similar_ids = "", "", []
+            else:
+                try:
+                    rag_context, (similar_context, similar_ids) = await asyncio.wait_for(
+                        asyncio.gather(
+                            self._get_rag_context(request, rag_max_chunks or 5),
+                            self._get_similar_incidents_context(request)
+                        ),
+                        rag_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Contexto RAG descartado: sin plazo tras {rag_timeout:.2f}s")
+                    skip_stage("rag")
+                    rag_context, similar_context, similar_ids = "", "", []
             
             # Preparar datos de entrada para la chain (con contexto RAG)
             input_data = {
@@ -278,17 +441,33 @@ class LangChainSecurityAnalyzer:
                 "urgencia": request.urgencia,
                 "contexto_adicional": request.contexto_adicional or "",
                 "categoria_inicial": request.categoria_inicial or "",
-                "rag_context": rag_context  # Nuevo: contexto de documentación
+                "rag_context": "\n".join(filter(None, [rag_context, similar_context]))
             }
             
-            # Ejecutar análisis principal
-            analysis_result = await self.analysis_chain.ainvoke(input_data)
+            # Elegir modelo según tamaño del prompt, presupuesto y presión de cola
+            with span("llm.route"):
+                prompt_tokens = count_tokens(
+                    self.analysis_prompt.format(**input_data),
+                    self.config.modelo_principal
+                )
+                routing = model_router.route(
+                    self.analysis_type,
+                    self.config.modelo_principal,
+                    prompt_tokens,
+                    self.config.max_tokens
+                )
+            
+            # Ejecutar análisis principal (LLM y parsing medidos por separado)
+            llm_message, token_usage = await self._invoke_llm(input_data, routing)
+            with span("llm.parse_json"):
+                analysis_result = await self.output_parser.ainvoke(llm_message)
             
             # Calcular nivel de riesgo
-            risk_level = self._calculate_risk_level(
-                analysis_result["vulnerabilidades"],
-                analysis_result["impactos"]
-            )
+            with span("risk_scoring"):
+                risk_level = self._calculate_risk_level(
+                    analysis_result["vulnerabilidades"],
+                    analysis_result["impactos"]
+                )
             
             # Resumen ejecutivo simplificado
             executive_summary = f"Incidente '{request.titulo}' - Riesgo: {risk_level['nivel']} ({risk_level['puntuacion']:.0f}/100)"
@@ -308,27 +487,111 @@ class LangChainSecurityAnalyzer:
                 },
                 id_analisis=analysis_id,
                 timestamp=datetime.utcnow(),
-                modelo_utilizado=f"{self.config.modelo_principal} (fallback: {self.config.modelo_fallback})",
+                modelo_utilizado=self._describe_model(routing, token_usage["model"]),
                 # Datos simplificados sin objetos Pydantic adicionales
                 resumen_ejecutivo=executive_summary,
                 recomendaciones_inmediatas=immediate_recommendations,
-                confianza_analisis=self._calculate_confidence(analysis_result),
+                confianza_analisis=self._calculate_confidence(analysis_result, token_usage["model"]),
                 metadatos={
                     "model_config": self.config.dict(),
                     "analysis_version": "langchain-v1.0",
-                    "processing_time": "calculated_later"
+                    "processing_time": round(time.perf_counter() - start_time, 4),
+                    "nivel_riesgo": risk_level,
+                    "incidentes_similares": similar_ids,
+                    "routing": routing.to_dict(),
+                    "token_usage": token_usage,
+                    "latency_breakdown_ms": self._get_latency_breakdown()
                 }
             )
             
             logger.info(f"Análisis completado exitosamente para {analysis_id}")
             return response
             
+        except DeadlineExceededError:
+            # Sin plazo no hay respuesta útil: lo resuelve el controlador (504)
+            raise
         except Exception as e:
             logger.error(f"Error en análisis de incidente {analysis_id}: {str(e)}")
             return self._create_error_response(analysis_id, str(e))
 
 
 
+    async def _invoke_llm(self, input_data: Dict[str, Any], routing) -> tuple:
+        """
+        Invoca prompt + modelo elegido midiendo TTFT y duración total, y
+        registra el uso de tokens del tier.
+        
+        Los tokens del prompt son los contados con tiktoken al enrutar; los
+        de la respuesta, los que informa el proveedor (o tiktoken sobre el
+        contenido si no hay uso informado, p. ej. en streaming).
+        
+        Args:
+            input_data: Variables del prompt
+            routing: Decisión del router (RoutingDecision)
+            
+        Returns:
+            tuple: (mensaje devuelto por el modelo, uso de tokens)
+        """
+        start = time.perf_counter()
+        timing = LLMTimingCallbackHandler(start)
+        try:
+            with model_router.track():
+                message = await self._get_llm_chain(routing.model).ainvoke(
+                    input_data, config={"callbacks": [timing]}
+                )
+            answered_by = timing.model_name or routing.model
+            completion_tokens = timing.completion_tokens
+            if completion_tokens is None:
+                completion_tokens = count_tokens(getattr(message, "content", str(message)), answered_by)
+            cost = token_usage_ledger.record(
+                self.analysis_type, answered_by, routing.prompt_tokens, completion_tokens
+            )
+            return message, {
+                "model": answered_by,
+                "prompt_tokens": routing.prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": round(cost, 6)
+            }
+        finally:
+            end = time.perf_counter()
+            record_span(
+                "llm.ttft",
+                start,
+                timing.first_token_at or end,
+                streaming=timing.first_token_at is not None
+            )
+            # Modelo que respondió (fallback o cobertura incluidos), como en el uso de tokens
+            record_span("llm.total", start, end, model=timing.model_name or routing.model)
+
+    def _describe_model(self, routing, answered_by: Optional[str] = None) -> str:
+        """
+        Describe el modelo utilizado incluyendo la decisión del router.
+        
+        Args:
+            routing: Decisión del router (RoutingDecision)
+            answered_by: Modelo que respondió (si no es el elegido: fallback o cobertura)
+            
+        Returns:
+            str: Ej. "gpt-3.5-turbo (fallback: gpt-3.5-turbo; router: budget, solicitado gpt-4.1-turbo)"
+        """
+        model = answered_by or routing.model
+        description = f"{model} (fallback: {self.config.modelo_fallback}"
+        if model != routing.model:
+            description += f"; elegido {routing.model}"
+        if routing.rerouted:
+            description += f"; router: {routing.reason}, solicitado {routing.requested_model}"
+        return description + ")"
+
+    def _get_latency_breakdown(self) -> Optional[Dict[str, float]]:
+        """
+        Obtiene el desglose de latencia por etapa de la traza activa.
+        
+        Returns:
+            Dict: Etapa -> milisegundos, o None si no hay traza
+        """
+        trace = get_current_trace()
+        return trace.breakdown() if trace else None
+
     def _extract_immediate_recommendations(self, controles: List[Dict[str, Any]]) -> List[str]:
         """
         Extrae recomendaciones que requieren acción inmediata.
@@ -353,10 +616,10 @@ class LangChainSecurityAnalyzer:
         
         return immediate[:5]  # Limitar a 5 recomendaciones inmediatas
 
-    def _calculate_confidence(self, analysis_result: Dict[str, Any]) -> float:
+    def _calculate_confidence(self, analysis_result: Dict[str, Any], model: Optional[str] = None) -> float:
         """Calcula confianza simplificada."""
         # Confianza base por modelo
-        if self.config.modelo_principal == "gpt-4.1-turbo":
+        if (model or self.config.modelo_principal) == "gpt-4.1-turbo":
             return 0.85
         else:
             return 0.75
@@ -388,12 +651,28 @@ class LangChainSecurityAnalyzer:
 
 
 
-    async def _get_rag_context(self, request: IncidentAnalysisRequest) -> str:
+    def _get_rag_timeout(self) -> Optional[float]:
+        """
+        Tiempo disponible para recuperar contexto según el plazo de la petición.
+        
+        Se reserva `deadline_llm_reserve_seconds` para la llamada al LLM.
+        
+        Returns:
+            float: None sin plazo; 0 si no queda margen (se omite la etapa)
+        """
+        deadline = get_deadline()
+        if deadline is None:
+            return None
+        timeout = deadline.timeout(reserve=config.get("deadline_llm_reserve_seconds", 5.0))
+        return timeout if timeout >= config.get("deadline_min_rag_seconds", 0.5) else 0.0
+
+    async def _get_rag_context(self, request: IncidentAnalysisRequest, max_chunks: int = 5) -> str:
         """
         Obtiene contexto relevante usando RAG para enriquecer el análisis.
         
         Args:
             request: Solicitud de análisis de incidente
+            max_chunks: Chunks de contexto como máximo
             
         Returns:
             str: Contexto formateado de la documentación
@@ -410,17 +689,19 @@ class LangChainSecurityAnalyzer:
             rag_service = await get_rag_service()
             
             # Buscar contexto relevante (5 chunks máximo para no sobrecargar el prompt)
-            context_chunks = await rag_service.search_relevant_context(
-                search_query, 
-                max_chunks=5
-            )
+            with span("rag.search"):
+                context_chunks = await rag_service.search_relevant_context(
+                    search_query, 
+                    max_chunks=max_chunks
+                )
             
             if not context_chunks:
                 logger.warning("No se encontró contexto RAG relevante")
                 return ""
             
             # Formatear contexto para el prompt
-            formatted_context = rag_service.format_context_for_prompt(context_chunks)
+            with span("rag.format_context"):
+                formatted_context = rag_service.format_context_for_prompt(context_chunks)
             
             logger.info(f"Contexto RAG obtenido: {len(context_chunks)} chunks relevantes")
             return formatted_context
@@ -430,6 +711,41 @@ class LangChainSecurityAnalyzer:
             # Si falla RAG, continuar sin contexto
             return ""
 
+    async def _get_similar_incidents_context(self, request: IncidentAnalysisRequest) -> tuple:
+        """
+        Obtiene incidentes similares ya analizados como contexto precalculado.
+        
+        Solo se ejecuta si la configuración lo habilita; se inyectan únicamente
+        los precedentes por encima del umbral de similitud configurado.
+        
+        Args:
+            request: Solicitud de análisis de incidente
+            
+        Returns:
+            tuple: (contexto formateado, lista de IDs de análisis usados)
+        """
+        if not self.config.incluir_incidentes_similares:
+            return "", []
+        
+        try:
+            incident_index = await get_incident_index()
+            with span("similar_incidents"):
+                similar = await incident_index.find_similar(
+                    f"{request.titulo}. {request.descripcion}",
+                    k=self.config.max_incidentes_similares,
+                    min_score=config.get("similar_incidents_min_score", 0.75)
+                )
+            
+            logger.info(f"Incidentes similares inyectados: {len(similar)}")
+            return (
+                incident_index.format_similar_for_prompt(similar),
+                [incident["id_analisis"] for incident in similar]
+            )
+            
+        except Exception as e:
+            logger.error(f"Error obteniendo incidentes similares: {str(e)}")
+            return "", []
+
     def get_analysis_statistics(self) -> Dict[str, Any]:
         """Obtiene estadísticas básicas del analizador."""
         return {
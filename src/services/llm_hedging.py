@@ -0,0 +1,270 @@
+"""
+LLM Hedging para Risk-Guardian
+Peticiones de cobertura (hedged requests) para recortar la cola de latencia:
+si el modelo principal no produce su primer token dentro de un umbral
+dinámico (p90 reciente del TTFT), se lanza una segunda petición y se usa
+la primera respuesta que llegue, cancelando la otra.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import asyncio
+import time
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.callbacks.base import BaseCallbackManager
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import patch_config
+
+from src.utils.config import config
+from src.utils.logger import setup_logger
+from src.utils.tracing import span
+from src.utils import metrics
+
+logger = setup_logger(__name__)
+
+
+class FirstTokenSignal(AsyncCallbackHandler):
+    """
+    Callback que señala el primer token (o el final, sin streaming) de una llamada.
+    """
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.first_token_at: Optional[float] = None
+
+    def _signal(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            self.event.set()
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        """Primer token en streaming."""
+        self._signal()
+
+    async def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        """Respuesta completa (modelos sin streaming)."""
+        self._signal()
+
+
+class HedgingPolicy:
+    """
+    Umbral dinámico y presupuesto de coberturas de un modelo.
+
+    - Umbral: cuantil `quantile` de los últimos `window` TTFT del principal,
+      con un mínimo de `min_delay_seconds`; hasta reunir `min_samples`
+      muestras se usa `default_delay_seconds`
+    - Presupuesto: como mucho `max_ratio` de las últimas `window`
+      peticiones pueden lanzar cobertura
+    """
+
+    def __init__(
+        self,
+        name: str,
+        quantile: float = 0.9,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay_seconds: float = 0.5,
+        default_delay_seconds: float = 3.0,
+        max_ratio: float = 0.1
+    ):
+        """
+        Args:
+            name: Nombre del modelo principal
+            quantile: Cuantil del TTFT usado como umbral
+            window: Muestras y peticiones recientes consideradas
+            min_samples: Muestras mínimas para usar el cuantil
+            min_delay_seconds: Umbral mínimo
+            default_delay_seconds: Umbral sin muestras suficientes
+            max_ratio: Fracción máxima de peticiones con cobertura
+        """
+        self.name = name
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.default_delay_seconds = default_delay_seconds
+        self.max_ratio = max_ratio
+        self._ttft: Deque[float] = deque(maxlen=window)
+        self._hedged: Deque[bool] = deque(maxlen=window)
+
+    @classmethod
+    def from_config(cls, name: str) -> "HedgingPolicy":
+        """Crea la política con la configuración de la aplicación."""
+        return cls(
+            name,
+            quantile=config.get("llm_hedge_quantile", 0.9),
+            window=config.get("llm_hedge_window", 200),
+            min_samples=config.get("llm_hedge_min_samples", 20),
+            min_delay_seconds=config.get("llm_hedge_min_delay_ms", 500.0) / 1000,
+            default_delay_seconds=config.get("llm_hedge_default_delay_ms", 3000.0) / 1000,
+            max_ratio=config.get("llm_hedge_max_ratio", 0.1)
+        )
+
+    def observe_ttft(self, seconds: float) -> None:
+        """Añade una muestra de TTFT del principal."""
+        self._ttft.append(seconds)
+
+    def threshold(self) -> float:
+        """
+        Umbral actual de espera antes de cubrir.
+
+        Returns:
+            float: Segundos
+        """
+        if len(self._ttft) < self.min_samples:
+            return self.default_delay_seconds
+        ordered = sorted(self._ttft)
+        index = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+        return max(self.min_delay_seconds, ordered[index])
+
+    def can_hedge(self) -> bool:
+        """
+        Indica si el presupuesto permite cubrir una petición más.
+
+        Returns:
+            bool: True si la fracción de coberturas seguiría bajo `max_ratio`
+        """
+        return (sum(self._hedged) + 1) / (len(self._hedged) + 1) <= self.max_ratio
+
+    def record_request(self, hedged: bool) -> None:
+        """Registra una petición elegible y si se cubrió."""
+        self._hedged.append(hedged)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado de la política."""
+        return {
+            "threshold_ms": round(self.threshold() * 1000, 1),
+            "ttft_samples": len(self._ttft),
+            "hedge_ratio": round(sum(self._hedged) / len(self._hedged), 4) if self._hedged else 0.0,
+            "max_ratio": self.max_ratio
+        }
+
+
+_policies: Dict[str, HedgingPolicy] = {}
+
+
+def get_hedging_policy(model_name: str) -> HedgingPolicy:
+    """
+    Obtiene la política de cobertura de un modelo (una por proceso).
+
+    Args:
+        model_name: Modelo principal
+
+    Returns:
+        HedgingPolicy: Política del modelo
+    """
+    if model_name not in _policies:
+        _policies[model_name] = HedgingPolicy.from_config(model_name)
+    return _policies[model_name]
+
+
+def get_hedging_status() -> Dict[str, Any]:
+    """Estado de las políticas de cobertura de todos los modelos usados."""
+    return {name: policy.get_status() for name, policy in _policies.items()}
+
+
+def reset_hedging_policies() -> None:
+    """Descarta las políticas de todos los modelos (p. ej. tras cambiar la configuración)."""
+    _policies.clear()
+
+
+def _with_handler(run_config: Optional[RunnableConfig], handler: AsyncCallbackHandler) -> RunnableConfig:
+    """Copia la configuración de ejecución añadiendo un callback."""
+    callbacks = (run_config or {}).get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    else:
+        callbacks = list(callbacks or []) + [handler]
+    return patch_config(run_config, callbacks=callbacks)
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    """Cancela una tarea y espera a que termine."""
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+async def _race(primary_name: str, primary_task: asyncio.Task, hedge_task: asyncio.Task) -> Any:
+    """
+    Devuelve la primera respuesta correcta de dos peticiones y cancela la otra.
+
+    Args:
+        primary_name: Modelo principal (etiqueta de métricas)
+        primary_task: Petición al principal
+        hedge_task: Petición de cobertura
+
+    Returns:
+        Respuesta ganadora
+
+    Raises:
+        Exception: El último error si ambas fallan
+    """
+    pending = {primary_task, hedge_task}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    outcome = "primary_won" if task is primary_task else "hedge_won"
+                    metrics.LLM_HEDGES.labels(model=primary_name, outcome=outcome).inc()
+                    return task.result()
+                error = task.exception()
+        metrics.LLM_HEDGES.labels(model=primary_name, outcome="both_failed").inc()
+        raise error
+    finally:
+        for task in pending:
+            await _cancel(task)
+
+
+def with_hedging(primary_name: str, primary: Runnable, hedge_name: str, hedge: Runnable) -> Runnable:
+    """
+    Envuelve un modelo con peticiones de cobertura.
+
+    Args:
+        primary_name: Nombre del modelo principal (clave de la política)
+        primary: Modelo principal (normalmente ya con fallback resiliente)
+        hedge_name: Nombre del modelo de cobertura (fallback u otra réplica)
+        hedge: Modelo de cobertura
+
+    Returns:
+        Runnable: Modelo con cobertura, componible en chains
+    """
+    async def invoke(input: Any, config: RunnableConfig) -> Any:
+        policy = get_hedging_policy(primary_name)
+        signal = FirstTokenSignal()
+        start = time.perf_counter()
+        primary_task = asyncio.ensure_future(primary.ainvoke(input, _with_handler(config, signal)))
+        hedged = False
+
+        try:
+            # Esperar al primer token del principal como mucho el umbral actual
+            threshold = policy.threshold()
+            signal_task = asyncio.ensure_future(signal.event.wait())
+            await asyncio.wait({primary_task, signal_task}, timeout=threshold,
+                               return_when=asyncio.FIRST_COMPLETED)
+            signal_task.cancel()
+
+            if primary_task.done() or signal.first_token_at is not None:
+                return await primary_task
+            if not policy.can_hedge():
+                metrics.LLM_HEDGES.labels(model=primary_name, outcome="skipped_budget").inc()
+                return await primary_task
+
+            hedged = True
+            logger.info(f"Hedging: {primary_name} sin primer token en {threshold * 1000:.0f} ms, "
+                        f"lanzando cobertura en {hedge_name}")
+            with span("llm.hedge", primary=primary_name, hedge=hedge_name, threshold_ms=round(threshold * 1000, 1)):
+                return await _race(primary_name, primary_task, asyncio.ensure_future(hedge.ainvoke(input, config)))
+
+        finally:
+            if not primary_task.done():
+                await _cancel(primary_task)
+            policy.record_request(hedged)
+            # Sin primer token (perdió la carrera) se registra el tiempo esperado como cota inferior
+            policy.observe_ttft((signal.first_token_at or time.perf_counter()) - start)
+
+    return RunnableLambda(invoke, name=f"{primary_name}_hedged")
@@ -0,0 +1,481 @@
+"""
+LLM Resilience para Risk-Guardian
+Limitador de concurrencia adaptativo (AIMD) y circuit breaker por modelo,
+con paso directo al modelo de fallback cuando el principal está degradado.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import asyncio
+import time
+
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from src.services.admission_control import admission_controller
+from src.services.priority_scheduler import PriorityWaitQueue, RequestPriority, get_request_priority
+from src.utils.config import config
+from src.utils.deadline import DeadlineExceededError, get_deadline, has_budget_for, skip_stage, stage_timeout
+from src.utils.logger import setup_logger
+from src.utils.tracing import span
+from src.utils import metrics
+
+logger = setup_logger(__name__)
+
+
+class LLMUnavailableError(RuntimeError):
+    """No hay modelo disponible (circuito abierto o cola del limitador llena)."""
+
+
+# ============================================================================
+# LIMITADOR DE CONCURRENCIA (AIMD)
+# ============================================================================
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limitador de llamadas concurrentes con ajuste AIMD.
+
+    - Aumento aditivo: cada llamada correcta y por debajo de la latencia
+      objetivo suma 1/límite (≈ +1 por "ventana" completa de llamadas)
+    - Disminución multiplicativa: un error, timeout o llamada lenta
+      multiplica el límite por `backoff`
+
+    Las llamadas por encima del límite esperan hasta `queue_timeout` en una
+    cola con prioridad (urgencia, tipo de análisis, envejecimiento y reparto
+    por cliente; FIFO entre peticiones sin prioridad); el estado vive en el
+    event loop (sin locks).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.7,
+        latency_target_seconds: float = 20.0,
+        queue: Optional[PriorityWaitQueue] = None
+    ):
+        """
+        Args:
+            name: Nombre del modelo protegido
+            initial_limit: Límite inicial
+            min_limit: Límite mínimo
+            max_limit: Límite máximo
+            backoff: Factor multiplicativo ante congestión (0-1)
+            latency_target_seconds: Latencia a partir de la que una llamada cuenta como congestión
+            queue: Cola de espera (por defecto con la configuración de la aplicación)
+        """
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.latency_target_seconds = latency_target_seconds
+        self.in_flight = 0
+        self._waiters = queue if queue is not None else PriorityWaitQueue.from_config()
+
+    async def acquire(self, timeout: Optional[float] = None, priority: Optional[RequestPriority] = None) -> bool:
+        """
+        Reserva un hueco de concurrencia.
+
+        Args:
+            timeout: Espera máxima en cola (None = sin límite)
+            priority: Prioridad en cola (por defecto la de la petición en curso)
+
+        Returns:
+            bool: True si se obtuvo el hueco, False si expiró la espera
+        """
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(waiter, priority or get_request_priority())
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Se concedió justo al expirar: devolver el hueco
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    def cancel(self) -> None:
+        """Libera un hueco sin ajustar el límite (llamada cancelada, p. ej. cobertura perdedora)."""
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake_waiters()
+
+    def release(self, latency_seconds: float, success: bool) -> None:
+        """
+        Libera un hueco y ajusta el límite según el resultado.
+
+        Args:
+            latency_seconds: Duración de la llamada
+            success: Si la llamada terminó sin error
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        if success and latency_seconds <= self.latency_target_seconds:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        else:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        """Concede huecos libres a las llamadas en cola, por plazo virtual."""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.pop()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    def saturation(self) -> float:
+        """Ocupación: llamadas en curso y en cola frente al límite (1.0 = lleno)."""
+        return (self.in_flight + len(self._waiters)) / max(1, int(self.limit))
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado actual del limitador."""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "queue": self._waiters.get_status()
+        }
+
+
+# ============================================================================
+# CIRCUIT BREAKER
+# ============================================================================
+
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de errores y de llamadas lentas.
+
+    - closed: pasan todas las llamadas; se evalúan las últimas `window_size`
+    - open: se rechazan durante `open_seconds` (tráfico directo al fallback)
+    - half_open: pasan hasta `half_open_max_calls` llamadas de prueba; si
+      salen bien se cierra, si fallan o son lentas se vuelve a abrir
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Args:
+            name: Nombre del modelo protegido
+            failure_rate_threshold: Fracción de errores que abre el circuito
+            slow_call_seconds: Duración a partir de la que una llamada es lenta
+            slow_call_rate_threshold: Fracción de llamadas lentas que abre el circuito
+            window_size: Llamadas recientes evaluadas
+            min_calls: Llamadas mínimas en ventana antes de evaluar
+            open_seconds: Tiempo abierto antes de probar (half-open)
+            half_open_max_calls: Llamadas de prueba simultáneas en half-open
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = max(1, min_calls)
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.state = self.CLOSED
+        self._outcomes: Deque[tuple] = deque(maxlen=max(1, window_size))
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    def _transition(self, state: str) -> None:
+        """Cambia de estado y lo registra."""
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.name}: {self.state} → {state}")
+        self.state = state
+        metrics.LLM_CIRCUIT_TRANSITIONS.labels(model=self.name, state=state).inc()
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if state != self.HALF_OPEN:
+            self._probes_in_flight = 0
+        if state == self.CLOSED:
+            self._outcomes.clear()
+
+    def allow_request(self) -> bool:
+        """
+        Indica si una llamada puede pasar (y la cuenta como prueba en half-open).
+
+        Returns:
+            bool: True si la llamada puede ir a este modelo
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self._transition(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_max_calls:
+                return False
+            self._probes_in_flight += 1
+
+        return True
+
+    def cancel_probe(self) -> None:
+        """Devuelve el hueco de prueba de una llamada permitida que no llegó a ejecutarse."""
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, latency_seconds: float, success: bool) -> None:
+        """
+        Registra el resultado de una llamada permitida.
+
+        Args:
+            latency_seconds: Duración de la llamada
+            success: Si terminó sin error
+        """
+        slow = latency_seconds >= self.slow_call_seconds
+
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._transition(self.CLOSED if success and not slow else self.OPEN)
+            return
+
+        self._outcomes.append((not success, slow))
+        if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+            failure_rate = sum(failed for failed, _ in self._outcomes) / len(self._outcomes)
+            slow_rate = sum(is_slow for _, is_slow in self._outcomes) / len(self._outcomes)
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._transition(self.OPEN)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado actual del circuito."""
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "failure_rate": round(sum(f for f, _ in self._outcomes) / calls, 3) if calls else 0.0,
+            "slow_rate": round(sum(s for _, s in self._outcomes) / calls, 3) if calls else 0.0,
+            "seconds_until_probe": (
+                round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+                if self.state == self.OPEN else None
+            )
+        }
+
+
+# ============================================================================
+# PROTECCIÓN POR MODELO
+# ============================================================================
+
+class ModelGuard:
+    """
+    Limitador + circuit breaker de un modelo (compartido por todos los
+    analizadores del proceso).
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Nombre del modelo
+        """
+        self.name = name
+        self.call_timeout_seconds = config.get("llm_call_timeout_seconds", 60.0)
+        self.queue_timeout_seconds = config.get("llm_limiter_queue_timeout_seconds", 5.0)
+        slow_call_seconds = config.get("circuit_breaker_slow_call_seconds", 20.0)
+
+        self.limiter = AdaptiveConcurrencyLimiter(
+            name,
+            initial_limit=config.get("llm_limiter_initial", 8),
+            min_limit=config.get("llm_limiter_min", 1),
+            max_limit=config.get("llm_limiter_max", 64),
+            backoff=config.get("llm_limiter_backoff", 0.7),
+            latency_target_seconds=slow_call_seconds
+        )
+        self.breaker = CircuitBreaker(
+            name,
+            failure_rate_threshold=config.get("circuit_breaker_failure_rate", 0.5),
+            slow_call_seconds=slow_call_seconds,
+            slow_call_rate_threshold=config.get("circuit_breaker_slow_call_rate", 0.8),
+            window_size=config.get("circuit_breaker_window", 20),
+            min_calls=config.get("circuit_breaker_min_calls", 5),
+            open_seconds=config.get("circuit_breaker_open_seconds", 30.0),
+            half_open_max_calls=config.get("circuit_breaker_half_open_calls", 1)
+        )
+
+    async def call(self, model: Runnable, input: Any, run_config: Optional[RunnableConfig] = None) -> Any:
+        """
+        Invoca el modelo a través del circuito y el limitador.
+
+        Args:
+            model: Modelo de chat
+            input: Prompt
+            run_config: Configuración de ejecución (callbacks)
+
+        Returns:
+            Mensaje del modelo
+
+        Raises:
+            LLMUnavailableError: Circuito abierto o sin hueco en el limitador
+            DeadlineExceededError: Se agotó el plazo de la petición en cola o en la llamada
+            Exception: Error o timeout de la propia llamada
+        """
+        # Espera en cola acotada por el plazo de la petición (si lo hay)
+        queue_timeout = stage_timeout("llm.queue", self.queue_timeout_seconds)
+        if not self.breaker.allow_request():
+            metrics.LLM_SHORT_CIRCUITS.labels(model=self.name, reason="circuit_open").inc()
+            raise LLMUnavailableError(f"Circuito abierto para {self.name}")
+
+        queued_at = time.perf_counter()
+        acquired = await self.limiter.acquire(queue_timeout)
+        queue_wait = time.perf_counter() - queued_at
+        admission_controller.record_queue_wait(queue_wait)
+        priority = get_request_priority()
+        if priority is not None:
+            priority.queue_wait_seconds += queue_wait
+        metrics.LLM_QUEUE_WAIT.labels(urgency=priority.urgency if priority else "none").observe(queue_wait)
+        if not acquired:
+            self.breaker.cancel_probe()
+            deadline = get_deadline()
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceededError("llm.queue", deadline)
+            metrics.LLM_SHORT_CIRCUITS.labels(model=self.name, reason="limiter_queue_timeout").inc()
+            raise LLMUnavailableError(f"Límite de concurrencia alcanzado para {self.name}")
+
+        try:
+            call_timeout = stage_timeout("llm.call", self.call_timeout_seconds)
+        except DeadlineExceededError:
+            self.limiter.cancel()
+            self.breaker.cancel_probe()
+            raise
+
+        start = time.perf_counter()
+        success = False
+        try:
+            result = await asyncio.wait_for(model.ainvoke(input, run_config), call_timeout)
+            success = True
+            return result
+        except asyncio.CancelledError:
+            # Cancelada desde fuera (hedging): no dice nada de la salud del modelo
+            self.limiter.cancel()
+            self.breaker.cancel_probe()
+            raise
+        except asyncio.TimeoutError as e:
+            if call_timeout < self.call_timeout_seconds:
+                # Cortada por el plazo de la petición, no por lentitud del modelo
+                self.limiter.cancel()
+                self.breaker.cancel_probe()
+                raise DeadlineExceededError("llm.call", get_deadline()) from e
+            latency = time.perf_counter() - start
+            self.limiter.release(latency, False)
+            self.breaker.record(latency, False)
+            admission_controller.record_llm_latency(latency)
+            raise
+        except BaseException:
+            latency = time.perf_counter() - start
+            self.limiter.release(latency, False)
+            self.breaker.record(latency, False)
+            admission_controller.record_llm_latency(latency)
+            raise
+        finally:
+            if success:
+                latency = time.perf_counter() - start
+                self.limiter.release(latency, True)
+                self.breaker.record(latency, True)
+                admission_controller.record_llm_latency(latency)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado del limitador y del circuito."""
+        return {"limiter": self.limiter.get_status(), "circuit": self.breaker.get_status()}
+
+
+_model_guards: Dict[str, ModelGuard] = {}
+
+
+def get_model_guard(model_name: str) -> ModelGuard:
+    """
+    Obtiene la protección de un modelo (una por proceso y modelo).
+
+    Args:
+        model_name: Nombre del modelo
+
+    Returns:
+        ModelGuard: Limitador y circuit breaker del modelo
+    """
+    if model_name not in _model_guards:
+        _model_guards[model_name] = ModelGuard(model_name)
+    return _model_guards[model_name]
+
+
+def llm_saturation() -> float:
+    """Ocupación del limitador del modelo más cargado (0 sin llamadas)."""
+    return max((guard.limiter.saturation() for guard in list(_model_guards.values())), default=0.0)
+
+
+def get_resilience_status() -> Dict[str, Any]:
+    """Estado de limitadores y circuitos de todos los modelos usados."""
+    return {name: guard.get_status() for name, guard in _model_guards.items()}
+
+
+def reset_model_guards() -> None:
+    """Descarta el estado de todos los modelos (p. ej. tras cambiar la configuración)."""
+    _model_guards.clear()
+
+
+def with_resilient_fallback(
+    primary_name: str,
+    primary: Runnable,
+    fallback_name: str,
+    fallback: Runnable
+) -> Runnable:
+    """
+    Sustituye a `primary.with_fallbacks([fallback])`.
+
+    Si el circuito del principal está abierto o su limitador no da hueco a
+    tiempo, la petición va directamente al fallback sin esperar el timeout
+    del principal. Si el principal falla, se reintenta una vez en el
+    fallback (también protegido por su propio circuito y limitador), salvo
+    que al plazo de la petición le quede menos que `deadline_llm_reserve_seconds`.
+
+    Args:
+        primary_name: Nombre del modelo principal
+        primary: Modelo principal
+        fallback_name: Nombre del modelo de fallback
+        fallback: Modelo de fallback
+
+    Returns:
+        Runnable: Modelo protegido, componible en chains
+    """
+    fallback_min_seconds = config.get("deadline_llm_reserve_seconds", 5.0)
+
+    async def invoke(input: Any, config: RunnableConfig) -> Any:
+        try:
+            return await get_model_guard(primary_name).call(primary, input, config)
+        except DeadlineExceededError:
+            raise
+        except LLMUnavailableError as e:
+            logger.warning(f"{str(e)}: usando fallback {fallback_name}")
+        except Exception as e:
+            logger.warning(f"Error en {primary_name} ({type(e).__name__}): usando fallback {fallback_name}")
+
+        # El reintento en el fallback solo si queda plazo para una llamada útil
+        if not has_budget_for(fallback_min_seconds):
+            skip_stage("llm.fallback")
+            raise DeadlineExceededError("llm.fallback", get_deadline())
+
+        with span("llm.fallback", primary=primary_name, fallback=fallback_name):
+            result = await get_model_guard(fallback_name).call(fallback, input, config)
+        metrics.LLM_FALLBACKS.labels(primary=primary_name, fallback=fallback_name).inc()
+        return result
+
+    return RunnableLambda(invoke, name=f"{primary_name}_with_fallback")
@@ -0,0 +1,470 @@
+"""
+Model Router para Risk-Guardian
+Contabilidad de tokens por tier y día, y enrutado de modelos según coste,
+tamaño del prompt y presión de cola.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+import threading
+
+import tiktoken
+
+from src.services.fake_backends import estimate_tokens, use_fake_llm
+from src.utils.config import config
+from src.utils.logger import setup_logger
+from src.utils import metrics
+
+logger = setup_logger(__name__)
+
+# Ventana de contexto (tokens) por modelo; prefijo para variantes con fecha
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1-turbo": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+}
+
+
+# ============================================================================
+# CONTEO DE TOKENS
+# ============================================================================
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: str) -> Optional[Any]:
+    """
+    Obtiene (una vez por modelo) el encoding de tiktoken.
+
+    Args:
+        model: Nombre del modelo
+
+    Returns:
+        Encoding de tiktoken, o None si no está disponible (p. ej. sin red
+        para descargar el vocabulario)
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken no disponible para {model} ({str(e)[:80]}); se estimarán tokens por longitud")
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Cuenta los tokens de un texto con el tokenizer del modelo.
+
+    Con el backend fake se usa la misma estimación que el modelo fake
+    informa como uso, para que las cifras sean coherentes.
+
+    Args:
+        text: Texto a contar
+        model: Nombre del modelo
+
+    Returns:
+        int: Número de tokens
+    """
+    if not text:
+        return 0
+    encoding = None if use_fake_llm() else _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def get_context_window(model: str) -> Optional[int]:
+    """
+    Obtiene la ventana de contexto de un modelo.
+
+    Args:
+        model: Nombre del modelo (admite variantes con fecha)
+
+    Returns:
+        int: Tokens de contexto, o None si el modelo no es conocido
+    """
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    return next(
+        (window for name, window in MODEL_CONTEXT_WINDOWS.items() if model.startswith(name)),
+        None
+    )
+
+
+# ============================================================================
+# CONTABILIDAD DE USO
+# ============================================================================
+
+class TokenUsageLedger:
+    """
+    Acumulado de tokens y coste estimado por día (UTC), tier y modelo.
+
+    El estado es por proceso: con varios workers cada uno aplica su parte
+    del presupuesto. Los totales globales están en las métricas Prometheus.
+    """
+
+    def __init__(self, retention_days: int = 7):
+        """
+        Args:
+            retention_days: Días que se conservan en memoria
+        """
+        self.retention_days = max(1, retention_days)
+        self._days: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _today() -> str:
+        """Día UTC actual en formato ISO."""
+        return datetime.utcnow().date().isoformat()
+
+    @staticmethod
+    def _empty_totals() -> Dict[str, Any]:
+        """Acumulado vacío."""
+        return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+    def record(
+        self,
+        tier: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        day: Optional[str] = None
+    ) -> float:
+        """
+        Registra el uso de una petición.
+
+        Args:
+            tier: Tipo de análisis (rapido/estandar/experto)
+            model: Modelo que respondió
+            prompt_tokens: Tokens del prompt
+            completion_tokens: Tokens de la respuesta
+            day: Día ISO (por defecto hoy)
+
+        Returns:
+            float: Coste estimado de la petición en USD
+        """
+        cost = metrics.estimate_cost(model, prompt_tokens, completion_tokens)
+        day = day or self._today()
+
+        with self._lock:
+            tiers = self._days.setdefault(day, {})
+            tier_totals = tiers.setdefault(tier, {**self._empty_totals(), "models": {}})
+            model_totals = tier_totals["models"].setdefault(model, self._empty_totals())
+            for totals in (tier_totals, model_totals):
+                totals["requests"] += 1
+                totals["prompt_tokens"] += prompt_tokens
+                totals["completion_tokens"] += completion_tokens
+                totals["cost_usd"] += cost
+            self._prune()
+
+        return cost
+
+    def _prune(self) -> None:
+        """Descarta los días fuera de la ventana de retención."""
+        if len(self._days) > self.retention_days:
+            for day in sorted(self._days)[:-self.retention_days]:
+                del self._days[day]
+
+    def spent_usd(self, tier: Optional[str] = None, day: Optional[str] = None) -> float:
+        """
+        Coste acumulado de un día.
+
+        Args:
+            tier: Tier concreto (None = todos)
+            day: Día ISO (por defecto hoy)
+
+        Returns:
+            float: USD gastados
+        """
+        with self._lock:
+            tiers = self._days.get(day or self._today(), {})
+            if tier is not None:
+                return tiers.get(tier, {}).get("cost_usd", 0.0)
+            return sum(totals["cost_usd"] for totals in tiers.values())
+
+    def summary(self, days: int = 1) -> Dict[str, Any]:
+        """
+        Resumen de uso de los últimos días.
+
+        Args:
+            days: Número de días (incluido hoy)
+
+        Returns:
+            Dict: Día -> tier -> acumulados (con desglose por modelo)
+        """
+        today = datetime.utcnow().date()
+        wanted = [(today - timedelta(days=offset)).isoformat() for offset in range(max(1, days))]
+
+        with self._lock:
+            result = {}
+            for day in wanted:
+                if day not in self._days:
+                    continue
+                result[day] = {
+                    tier: {
+                        **{key: value for key, value in totals.items() if key != "models"},
+                        "cost_usd": round(totals["cost_usd"], 6),
+                        "models": {
+                            model: {**model_totals, "cost_usd": round(model_totals["cost_usd"], 6)}
+                            for model, model_totals in totals["models"].items()
+                        }
+                    }
+                    for tier, totals in self._days[day].items()
+                }
+            return result
+
+    def reset(self) -> None:
+        """Vacía el acumulado."""
+        with self._lock:
+            self._days.clear()
+
+
+# ============================================================================
+# ENRUTADO
+# ============================================================================
+
+class RoutingDecision:
+    """
+    Modelo elegido para una petición y motivo de la elección.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        requested_model: str,
+        reason: str,
+        tier: str,
+        prompt_tokens: int,
+        estimated_cost_usd: float,
+        in_flight: int
+    ):
+        self.model = model
+        self.requested_model = requested_model
+        self.reason = reason
+        self.tier = tier
+        self.prompt_tokens = prompt_tokens
+        self.estimated_cost_usd = estimated_cost_usd
+        self.in_flight = in_flight
+
+    @property
+    def rerouted(self) -> bool:
+        """Si el router cambió el modelo principal."""
+        return self.model != self.requested_model
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decisión serializable (metadatos de la respuesta)."""
+        return {
+            "model": self.model,
+            "requested_model": self.requested_model,
+            "reason": self.reason,
+            "tier": self.tier,
+            "prompt_tokens": self.prompt_tokens,
+            "estimated_cost_usd": round(self.estimated_cost_usd, 6),
+            "in_flight": self.in_flight
+        }
+
+
+class ModelRouter:
+    """
+    Elige entre el modelo principal de un tier y modelos más baratos.
+
+    Criterios, en orden:
+    - Ventana de contexto: se descartan modelos donde no cabe prompt + max_tokens
+    - Presupuesto: si el coste estimado supera lo que queda del presupuesto
+      diario (global o del tier), se baja al modelo más caro que quepa
+    - Prompt grande: por encima del umbral se usa el siguiente modelo más barato
+    - Presión de cola: con demasiadas llamadas al LLM en curso, igual
+
+    Los tiers protegidos solo bajan de modelo por contexto o presupuesto.
+    """
+
+    def __init__(
+        self,
+        ledger: TokenUsageLedger,
+        enabled: bool = True,
+        cheap_models: Optional[List[str]] = None,
+        daily_budget_usd: float = 0.0,
+        tier_budgets_usd: Optional[Dict[str, float]] = None,
+        queue_threshold: int = 0,
+        large_prompt_tokens: int = 0,
+        protected_tiers: Optional[List[str]] = None
+    ):
+        """
+        Args:
+            ledger: Contabilidad de uso
+            enabled: Si False siempre se usa el modelo principal
+            cheap_models: Modelos alternativos más baratos
+            daily_budget_usd: Presupuesto diario global (0 = sin límite)
+            tier_budgets_usd: Presupuesto diario por tier
+            queue_threshold: Llamadas en curso a partir de las que se baja de modelo (0 = off)
+            large_prompt_tokens: Tokens de prompt a partir de los que se baja de modelo (0 = off)
+            protected_tiers: Tiers que no bajan por tamaño de prompt ni por cola
+        """
+        self.ledger = ledger
+        self.enabled = enabled
+        self.cheap_models = cheap_models or []
+        self.daily_budget_usd = daily_budget_usd
+        self.tier_budgets_usd = tier_budgets_usd or {}
+        self.queue_threshold = queue_threshold
+        self.large_prompt_tokens = large_prompt_tokens
+        self.protected_tiers = set(protected_tiers or [])
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, ledger: TokenUsageLedger) -> "ModelRouter":
+        """Crea el router con la configuración de la aplicación."""
+        return cls(
+            ledger,
+            enabled=config.get("router_enabled", True),
+            cheap_models=_parse_list(config.get("router_cheap_models", "gpt-3.5-turbo")),
+            daily_budget_usd=config.get("router_daily_budget_usd", 0.0),
+            tier_budgets_usd=parse_tier_budgets(config.get("router_tier_budgets_usd", "")),
+            queue_threshold=config.get("router_queue_threshold", 0),
+            large_prompt_tokens=config.get("router_large_prompt_tokens", 0),
+            protected_tiers=_parse_list(config.get("router_protected_tiers", "experto"))
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Llamadas al LLM en curso en este proceso."""
+        return self._in_flight
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Marca una llamada al LLM en curso (presión de cola)."""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _candidates(self, primary: str) -> List[str]:
+        """Modelo principal seguido de los alternativos más baratos (de más a menos caro)."""
+        primary_price = metrics.estimate_cost(primary, 1000, 1000)
+        cheaper = [
+            model for model in dict.fromkeys(self.cheap_models)
+            if model != primary and metrics.estimate_cost(model, 1000, 1000) < primary_price
+        ]
+        cheaper.sort(key=lambda model: metrics.estimate_cost(model, 1000, 1000), reverse=True)
+        return [primary] + cheaper
+
+    def remaining_budget_usd(self, tier: str) -> Optional[float]:
+        """
+        Presupuesto restante hoy para un tier.
+
+        Args:
+            tier: Tipo de análisis
+
+        Returns:
+            float: USD restantes (mínimo entre global y tier), o None sin límite
+        """
+        remaining = []
+        if self.daily_budget_usd > 0:
+            remaining.append(self.daily_budget_usd - self.ledger.spent_usd())
+        if self.tier_budgets_usd.get(tier, 0) > 0:
+            remaining.append(self.tier_budgets_usd[tier] - self.ledger.spent_usd(tier))
+        return min(remaining) if remaining else None
+
+    def route(self, tier: str, primary: str, prompt_tokens: int, max_tokens: int) -> RoutingDecision:
+        """
+        Elige el modelo para una petición.
+
+        Args:
+            tier: Tipo de análisis
+            primary: Modelo principal configurado para el tier
+            prompt_tokens: Tokens estimados del prompt
+            max_tokens: Máximo de tokens de respuesta
+
+        Returns:
+            RoutingDecision: Modelo elegido y motivo
+        """
+        in_flight = self._in_flight
+
+        def cost(model: str) -> float:
+            return metrics.estimate_cost(model, prompt_tokens, max_tokens)
+
+        def decide(model: str, reason: str) -> RoutingDecision:
+            metrics.ROUTING_DECISIONS.labels(tier=tier, model=model, reason=reason).inc()
+            if model != primary:
+                logger.info(f"Router [{tier}]: {primary} → {model} ({reason}, {prompt_tokens} tokens)")
+            return RoutingDecision(model, primary, reason, tier, prompt_tokens, cost(model), in_flight)
+
+        if not self.enabled:
+            return decide(primary, "disabled")
+
+        candidates = self._candidates(primary)
+        pool = [
+            model for model in candidates
+            if (get_context_window(model) or float("inf")) >= prompt_tokens + max_tokens
+        ]
+        if not pool:
+            return decide(primary, "context_exceeded")
+        reason = "primary" if pool[0] == primary else "context_window"
+
+        remaining = self.remaining_budget_usd(tier)
+        if remaining is not None:
+            affordable = [model for model in pool if cost(model) <= remaining]
+            if not affordable:
+                return decide(pool[-1], "budget_exhausted")
+            if affordable[0] != pool[0]:
+                reason = "budget"
+            pool = affordable
+
+        if tier not in self.protected_tiers and len(pool) > 1:
+            if self.large_prompt_tokens and prompt_tokens >= self.large_prompt_tokens:
+                return decide(pool[1], "large_prompt")
+            if self.queue_threshold and in_flight >= self.queue_threshold:
+                return decide(pool[1], "queue_pressure")
+
+        return decide(pool[0], reason)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Configuración y estado del router."""
+        return {
+            "enabled": self.enabled,
+            "cheap_models": self.cheap_models,
+            "daily_budget_usd": self.daily_budget_usd,
+            "tier_budgets_usd": self.tier_budgets_usd,
+            "spent_today_usd": round(self.ledger.spent_usd(), 6),
+            "queue_threshold": self.queue_threshold,
+            "large_prompt_tokens": self.large_prompt_tokens,
+            "protected_tiers": sorted(self.protected_tiers),
+            "in_flight": self._in_flight
+        }
+
+
+def _parse_list(value: str) -> List[str]:
+    """Lista separada por comas."""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def parse_tier_budgets(value: str) -> Dict[str, float]:
+    """
+    Interpreta presupuestos por tier ("estandar=5,experto=20").
+
+    Args:
+        value: Cadena de configuración
+
+    Returns:
+        Dict: Tier -> USD diarios
+    """
+    budgets = {}
+    for item in _parse_list(value):
+        tier, _, amount = item.partition("=")
+        try:
+            budgets[tier.strip()] = float(amount)
+        except ValueError:
+            logger.warning(f"Presupuesto de tier inválido ignorado: {item}")
+    return budgets
+
+
+# Instancias globales (por proceso)
+token_usage_ledger = TokenUsageLedger(config.get("token_usage_retention_days", 7))
+model_router = ModelRouter.from_config(token_usage_ledger)
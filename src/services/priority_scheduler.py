@@ -0,0 +1,239 @@
+"""
+Priority Scheduler para Risk-Guardian
+Cola de espera con prioridad delante de los huecos de concurrencia LLM:
+las llamadas se ordenan por urgencia del incidente y tipo de análisis, con
+envejecimiento para evitar inanición y reparto justo entre clientes.
+
+Cada llamada en cola recibe un plazo virtual:
+
+    plazo = llegada + offset(urgencia) + offset(tier) + fair_share · en_cola(cliente)
+
+y se atiende siempre la de menor plazo. Una petición `baja` que lleva en
+cola más que la diferencia de offsets pasa por delante de una `critica`
+recién llegada (envejecimiento), y cada petición pendiente de un mismo
+cliente retrasa la siguiente suya `fair_share` segundos, así que un cliente
+con ráfagas no acapara la cola. Una `critica` solo espera a las llamadas con
+plazo anterior al suyo: su espera está acotada aunque el sistema esté saturado.
+
+La prioridad de la petición en curso viaja en un ContextVar (igual que la
+traza), así que el limitador la ve sin pasarla por la chain de LangChain.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import heapq
+import itertools
+import time
+import unicodedata
+
+from src.utils.config import config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+URGENCY_LEVELS = ("critica", "alta", "media", "baja")
+DEFAULT_URGENCY = "media"
+
+
+def normalize_urgency(value: Optional[str]) -> str:
+    """
+    Normaliza la urgencia de una petición ("Crítica" -> "critica").
+
+    Args:
+        value: Urgencia recibida
+
+    Returns:
+        str: Uno de URGENCY_LEVELS (por defecto `media`)
+    """
+    text = unicodedata.normalize("NFKD", (value or "").strip().lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return text if text in URGENCY_LEVELS else DEFAULT_URGENCY
+
+
+def parse_offsets(value: str) -> Dict[str, float]:
+    """
+    Interpreta offsets por clave ("critica=0,alta=5").
+
+    Args:
+        value: Cadena de configuración
+
+    Returns:
+        Dict: Clave -> segundos
+    """
+    offsets = {}
+    for item in (value or "").split(","):
+        key, _, amount = item.strip().partition("=")
+        if not key:
+            continue
+        try:
+            offsets[key.strip()] = float(amount)
+        except ValueError:
+            logger.warning(f"Offset de prioridad inválido ignorado: {item}")
+    return offsets
+
+
+# ============================================================================
+# PRIORIDAD DE LA PETICIÓN EN CURSO
+# ============================================================================
+
+class RequestPriority:
+    """
+    Urgencia, tipo de análisis y cliente de una petición, más la espera
+    acumulada en las colas LLM.
+    """
+
+    def __init__(self, urgency: Optional[str] = None, analysis_type: Optional[str] = None,
+                 client_id: Optional[str] = None):
+        self.urgency = normalize_urgency(urgency)
+        self.analysis_type = analysis_type
+        self.client_id = client_id or "anonymous"
+        self.queue_wait_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Prioridad serializable (respuesta del análisis)."""
+        return {
+            "urgency": self.urgency,
+            "analysis_type": self.analysis_type,
+            "queue_wait_ms": round(self.queue_wait_seconds * 1000, 2)
+        }
+
+
+_current_priority: ContextVar[Optional[RequestPriority]] = ContextVar("current_priority", default=None)
+
+
+def get_request_priority() -> Optional[RequestPriority]:
+    """Prioridad de la petición en curso (None fuera de un análisis)."""
+    return _current_priority.get()
+
+
+@contextmanager
+def request_priority(urgency: Optional[str], analysis_type: Optional[str],
+                     client_id: Optional[str] = None) -> Iterator[RequestPriority]:
+    """
+    Asocia una prioridad al contexto actual (y a sus tareas hijas).
+
+    Args:
+        urgency: Urgencia del incidente
+        analysis_type: Tipo de análisis
+        client_id: Cliente que envía la petición
+
+    Yields:
+        RequestPriority: Prioridad activa
+    """
+    priority = RequestPriority(urgency, analysis_type, client_id)
+    token = _current_priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _current_priority.reset(token)
+
+
+# ============================================================================
+# COLA CON PRIORIDAD
+# ============================================================================
+
+class PriorityWaitQueue:
+    """
+    Cola de esperas ordenada por plazo virtual (ver módulo).
+
+    Las entradas retiradas (timeout o cancelación) se marcan y se descartan
+    al llegar a la cabeza del heap.
+    """
+
+    def __init__(
+        self,
+        urgency_offsets: Optional[Dict[str, float]] = None,
+        tier_offsets: Optional[Dict[str, float]] = None,
+        fair_share_seconds: float = 2.0
+    ):
+        """
+        Args:
+            urgency_offsets: Segundos de retraso virtual por urgencia
+            tier_offsets: Segundos de retraso virtual por tipo de análisis
+            fair_share_seconds: Retraso por cada petición del mismo cliente ya en cola
+        """
+        self.urgency_offsets = urgency_offsets or {"critica": 0.0, "alta": 5.0, "media": 15.0, "baja": 30.0}
+        self.tier_offsets = tier_offsets or {"experto": 0.0, "estandar": 2.0, "rapido": 4.0}
+        self.fair_share_seconds = fair_share_seconds
+        self._heap: List[List[Any]] = []
+        self._entries: Dict[Any, List[Any]] = {}
+        self._per_client: Dict[str, int] = {}
+        self._per_urgency: Dict[str, int] = {}
+        self._counter = itertools.count()
+
+    @classmethod
+    def from_config(cls) -> "PriorityWaitQueue":
+        """Crea la cola con la configuración de la aplicación."""
+        return cls(
+            urgency_offsets=parse_offsets(config.get("scheduler_urgency_offsets_seconds", "")) or None,
+            tier_offsets=parse_offsets(config.get("scheduler_tier_offsets_seconds", "")) or None,
+            fair_share_seconds=config.get("scheduler_fair_share_seconds", 2.0)
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def push(self, waiter: Any, priority: Optional[RequestPriority] = None) -> float:
+        """
+        Encola una espera.
+
+        Args:
+            waiter: Future de la espera
+            priority: Prioridad de la petición (None = `media`, sin cliente)
+
+        Returns:
+            float: Plazo virtual asignado
+        """
+        urgency = priority.urgency if priority else DEFAULT_URGENCY
+        client = priority.client_id if priority else "anonymous"
+        tier = priority.analysis_type if priority else None
+
+        deadline = (
+            time.monotonic()
+            + self.urgency_offsets.get(urgency, self.urgency_offsets.get(DEFAULT_URGENCY, 0.0))
+            + self.tier_offsets.get(tier, 0.0)
+            + self.fair_share_seconds * self._per_client.get(client, 0)
+        )
+        entry = [deadline, next(self._counter), waiter, client, urgency]
+        heapq.heappush(self._heap, entry)
+        self._entries[waiter] = entry
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        self._per_urgency[urgency] = self._per_urgency.get(urgency, 0) + 1
+        return deadline
+
+    def pop(self) -> Optional[Any]:
+        """
+        Retira la espera de menor plazo.
+
+        Returns:
+            Future de la espera, o None si la cola está vacía
+        """
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if entry[2] is not None:
+                self._forget(entry)
+                return entry[2]
+        return None
+
+    def remove(self, waiter: Any) -> None:
+        """Retira una espera (timeout o cancelación)."""
+        entry = self._entries.get(waiter)
+        if entry is not None:
+            self._forget(entry)
+            entry[2] = None
+
+    def _forget(self, entry: List[Any]) -> None:
+        _, _, waiter, client, urgency = entry
+        del self._entries[waiter]
+        for counts, key in ((self._per_client, client), (self._per_urgency, urgency)):
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Esperas en cola por urgencia y número de clientes en cola."""
+        return {
+            "queued": len(self),
+            "by_urgency": dict(self._per_urgency),
+            "clients": len(self._per_client)
+        }
@@ -9,18 +9,24 @@ Exports principales:
 """
 from typing import List, Dict, Any, Optional
 import logging
+import os
 
 from .core import SecurityKnowledgeRAG
 from .document_loader import SecurityDocumentLoader
 from .vector_store import SecurityVectorStore
 from .retriever import SecurityRetriever
+from .docstore import SecurityDocStore
+from .incident_index import IncidentHistoryIndex
+from .vector_service import get_chroma_client, use_vector_service
 
+from src.utils.config import config
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 # Singleton instance para uso global
 _rag_instance: Optional[SecurityKnowledgeRAG] = None
+_incident_index: Optional[IncidentHistoryIndex] = None
 
 
 async def get_rag_service(
@@ -71,6 +77,55 @@ async def get_rag_service(
         raise RuntimeError(f"Error inicializando servicio RAG: {str(e)}")
 
 
+async def preload_rag_service(
+    docs_path: str = "docs",
+    persist_directory: str = "vectorstore"
+) -> bool:
+    """
+    Crea el singleton RAG solo desde el artefacto de índice precompilado.
+    
+    Pensado para el master del servidor pre-fork: el artefacto (mmap de solo
+    lectura y objetos Python) se hereda por copy-on-write en los workers,
+    mientras que Chroma (conexiones SQLite) no es seguro entre fork, así que
+    sin artefacto no se carga nada y cada worker inicializa el suyo. Con el
+    servicio vectorial compartido tampoco: no hay índice local que heredar y
+    cada worker abre su propio cliente HTTP.
+    
+    Returns:
+        bool: True si el singleton quedó cargado
+    """
+    global _rag_instance
+    
+    if _rag_instance is not None:
+        return True
+    if use_vector_service():
+        return False
+    
+    try:
+        instance = SecurityKnowledgeRAG(docs_path, persist_directory)
+        if not await instance.initialize(artifact_only=True):
+            return False
+        _rag_instance = instance
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error precargando servicio RAG: {str(e)}")
+        return False
+
+
+def set_index_read_only() -> None:
+    """
+    Marca el proceso como lector del índice (workers del servidor pre-fork):
+    solo abre la versión activa, nunca construye ni recolecta versiones.
+    
+    Afecta al singleton heredado del master y a los que se creen después.
+    """
+    os.environ["RAG_INDEX_READ_ONLY"] = "true"
+    config["rag_index_read_only"] = True
+    if _rag_instance is not None:
+        _rag_instance.config["rag_index_read_only"] = True
+
+
 async def search_security_knowledge(
     query: str, 
     max_results: int = 5,
@@ -126,6 +181,54 @@ async def search_by_methodology(
         return []
 
 
+async def get_incident_index() -> IncidentHistoryIndex:
+    """
+    Obtiene el índice singleton de incidentes analizados.
+    
+    Comparte el modelo de embeddings del servicio RAG y, con el servicio
+    vectorial, su servidor Chroma (el histórico lo ven todos los workers).
+    
+    Returns:
+        IncidentHistoryIndex: Índice de incidentes
+    """
+    global _incident_index
+    
+    if _incident_index is None:
+        rag_service = await get_rag_service()
+        _incident_index = IncidentHistoryIndex(
+            config.get("incident_index_dir", "data/incident_index"),
+            rag_service.vector_store.embeddings,
+            client=get_chroma_client() if use_vector_service() else None
+        )
+    
+    return _incident_index
+
+
+async def find_similar_incidents(
+    query: str,
+    k: int = 5,
+    min_score: float = 0.0
+) -> List[Dict[str, Any]]:
+    """
+    Busca incidentes analizados previamente similares a la consulta.
+    
+    Args:
+        query: Texto del incidente
+        k: Número máximo de resultados
+        min_score: Relevancia mínima (0-1)
+        
+    Returns:
+        List[Dict]: Incidentes similares (vacío si el índice no está disponible)
+    """
+    try:
+        incident_index = await get_incident_index()
+        return await incident_index.find_similar(query, k, min_score)
+        
+    except Exception as e:
+        logger.error(f"Error buscando incidentes similares: {str(e)}")
+        return []
+
+
 def format_context_for_prompt(context_chunks: List[Dict[str, Any]]) -> str:
     """
     Formatea contexto para uso en prompts (función sincrónica).
@@ -188,16 +291,36 @@ async def get_rag_health() -> Dict[str, Any]:
         }
 
 
-async def get_rag_stats() -> Dict[str, Any]:
+def get_rag_component_status() -> Dict[str, Any]:
+    """
+    Obtiene el estado de componentes RAG sin ejecutar búsquedas (O(1)).
+    
+    Returns:
+        Dict: Estado de componentes, o not_initialized
+    """
+    if _rag_instance is None:
+        return {"status": "not_initialized", "components": {"initialized": False}}
+    
+    components = _rag_instance.get_component_status()
+    return {
+        "status": "ready" if all(components.values()) else "degraded",
+        "components": components
+    }
+
+
+async def get_rag_stats(refresh: bool = False) -> Dict[str, Any]:
     """
     Obtiene estadísticas del sistema RAG.
     
+    Args:
+        refresh: Forzar recuento completo del vector store
+        
     Returns:
         Dict: Estadísticas del sistema
     """
     try:
         if _rag_instance:
-            return _rag_instance.get_stats()
+            return _rag_instance.get_stats(refresh=refresh)
         else:
             return {
                 "status": "not_initialized",
@@ -211,6 +334,36 @@ async def get_rag_stats() -> Dict[str, Any]:
         return {"error": str(e)}
 
 
+async def start_rag_reindex() -> Dict[str, Any]:
+    """
+    Lanza la reindexación blue/green del servicio RAG en segundo plano.
+    
+    Returns:
+        Dict: Estado inicial de la reindexación
+        
+    Raises:
+        RuntimeError: Si ya hay una reindexación en curso
+    """
+    rag_service = await get_rag_service()
+    return rag_service.start_rebuild()
+
+
+def get_rag_reindex_status() -> Dict[str, Any]:
+    """
+    Obtiene el estado de la última reindexación y de las versiones del índice.
+    
+    Returns:
+        Dict: Estado de la reindexación, o not_initialized
+    """
+    if _rag_instance is None:
+        return {"status": "not_initialized"}
+    
+    return {
+        "rebuild": dict(_rag_instance.rebuild_status),
+        **_rag_instance.index_versions.get_status()
+    }
+
+
 async def reset_rag_service() -> bool:
     """
     Reinicia el servicio RAG completamente.
@@ -288,16 +441,25 @@ __all__ = [
     "SecurityDocumentLoader", 
     "SecurityVectorStore",
     "SecurityRetriever",
+    "SecurityDocStore",
+    "IncidentHistoryIndex",
     
     # Funciones principales
     "get_rag_service",
+    "preload_rag_service",
+    "set_index_read_only",
     "search_security_knowledge",
     "search_by_methodology",
+    "get_incident_index",
+    "find_similar_incidents",
     "format_context_for_prompt",
     
     # Utilidades y estado
     "get_rag_health",
+    "get_rag_component_status",
     "get_rag_stats", 
+    "start_rag_reindex",
+    "get_rag_reindex_status",
     "reset_rag_service",
     "get_document_types",
     "test_rag_system"
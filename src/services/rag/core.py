@@ -2,20 +2,42 @@
 Core Module para RAG System
 Orquestador principal del sistema de Retrieval-Augmented Generation.
 """
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import asyncio
 import logging
+import time
 from datetime import datetime
 
 from .document_loader import SecurityDocumentLoader
 from .vector_store import SecurityVectorStore
 from .retriever import SecurityRetriever
+from .index_versions import IndexVersionManager
+from .index_artifact import compute_docs_manifest
+from .vector_service import RemoteIndexVersionManager, get_chroma_client, use_vector_service
 
 from src.utils.config import load_config
+from src.services.fake_backends import use_fake_embeddings
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Keywords por metodología (búsquedas filtradas y etiquetas de evaluación)
+METHODOLOGY_KEYWORDS = {
+    "MAGERIT": ["magerit", "activo", "amenaza", "vulnerabilidad", "impacto", "riesgo"],
+    "OCTAVE": ["octave", "asset", "threat", "vulnerability"],
+    "ISO27001": ["iso", "27001", "sgsi", "control", "anexo"],
+    "NIST": ["nist", "framework", "cybersecurity", "function"]
+}
+
+# Consultas de validación de un índice recién construido (antes del swap)
+DEFAULT_SMOKE_QUERIES = [
+    "análisis de riesgos MAGERIT",
+    "controles ISO 27001",
+    "ingeniería social phishing"
+]
+
 
 class SecurityKnowledgeRAG:
     """
@@ -39,13 +61,33 @@ class SecurityKnowledgeRAG:
         """
         self.docs_path = Path(docs_path)
         self.persist_directory = Path(persist_directory)
+        if use_fake_embeddings():
+            # Vectores de otra dimensión/espacio: nunca mezclar con el índice real
+            self.persist_directory = self.persist_directory / "fake-embeddings"
         self.config = load_config()
         
+        # Índice versionado (blue/green): la versión activa la indica el puntero ACTIVE
+        # (fichero local, o metadata de una colección en el servicio vectorial compartido)
+        keep_versions = self.config.get("rag_index_keep_versions", 2)
+        if use_vector_service():
+            base_name = self.config.get("chroma_collection", "security_knowledge")
+            if use_fake_embeddings():
+                base_name = f"{base_name}-fake"
+            self.index_versions = RemoteIndexVersionManager(get_chroma_client(), base_name, keep_versions)
+        else:
+            self.index_versions = IndexVersionManager(str(self.persist_directory), keep_versions)
+        self.active_version = self.index_versions.active_version()
+        self._next_version_check = 0.0
+        
         # Componentes especializados
         self.document_loader = SecurityDocumentLoader(str(self.docs_path))
-        self.vector_store = SecurityVectorStore(str(self.persist_directory))
+        self.vector_store = self._open_vector_store(self.active_version)
         self.retriever = None
         
+        # Reindexación en segundo plano
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self.rebuild_status: Dict[str, Any] = {"state": "idle"}
+        
         # Estado del sistema
         self.is_initialized = False
         self.initialization_time = None
@@ -54,6 +96,7 @@ class SecurityKnowledgeRAG:
         self.stats = {
             "documents_loaded": 0,
             "chunks_created": 0,
+            "parent_sections": 0,
             "initialization_time": None,
             "retrieval_calls": 0,
             "last_search": None
@@ -61,10 +104,14 @@ class SecurityKnowledgeRAG:
         
         logger.info(f"SecurityKnowledgeRAG inicializado - Docs: {self.docs_path}")
 
-    async def initialize(self) -> bool:
+    async def initialize(self, artifact_only: bool = False) -> bool:
         """
         Inicializa el sistema RAG completo.
         
+        Args:
+            artifact_only: Usar solo el artefacto precompilado (sin abrir Chroma
+                ni reindexar); lo usa el master del servidor pre-fork
+        
         Returns:
             bool: True si se inicializa correctamente
         """
@@ -76,7 +123,7 @@ class SecurityKnowledgeRAG:
             await self._initialize_embeddings()
             
             # 2. Cargar o crear vector store
-            success = await self._setup_vector_store()
+            success = await self._setup_vector_store(artifact_only)
             if not success:
                 return False
             
@@ -100,75 +147,277 @@ class SecurityKnowledgeRAG:
     async def _initialize_embeddings(self) -> None:
         """Inicializa el modelo de embeddings."""
         api_key = self.config.get("openai_api_key")  # ✅ CORREGIDO: usar lowercase
-        if not api_key:
+        if not api_key and not use_fake_embeddings():
             raise ValueError("OPENAI_API_KEY no configurada en variables de entorno")
         
         await self.vector_store.initialize_embeddings(api_key)
         logger.info("Embeddings inicializados")
 
-    async def _setup_vector_store(self) -> bool:
+    async def _setup_vector_store(self, artifact_only: bool = False) -> bool:
         """
         Configura el vector store (carga desde cache o crea nuevo).
         
+        Args:
+            artifact_only: No recurrir a Chroma si no hay artefacto utilizable
+        
         Returns:
             bool: True si se configuró correctamente
         """
         try:
+            # Artefacto precompilado: arranque en caliente sin la API de embeddings
+            # (en modo servicio vectorial el índice compartido es la única fuente)
+            if not self._is_remote() and self._load_index_artifact():
+                return True
+            if artifact_only:
+                logger.info("Sin artefacto de índice utilizable")
+                return False
+            
             # Intentar cargar desde cache
             vectorstore = await self.vector_store.load_existing_vectorstore()
             
-            if vectorstore and not self.vector_store.should_reindex(self.docs_path):
+            # Un proceso que no construye sirve la versión activa aunque esté desactualizada
+            if vectorstore and (not self._is_writer() or not self.vector_store.should_reindex(self.docs_path)):
                 logger.info("Vector store cargado desde cache")
                 stats = self.vector_store.get_vectorstore_stats()
                 self.stats["chunks_created"] = stats.get("total_documents", 0)
+                self.stats["parent_sections"] = stats.get("parent_sections", 0)
                 return True
             
-            # Crear nuevo vector store
-            logger.info("Creando nuevo vector store...")
-            
-            # Cargar documentos
-            documents = await self.document_loader.load_all_documents()
-            self.stats["documents_loaded"] = len(documents)
-            
-            if not documents:
-                logger.error("No se encontraron documentos para indexar")
-                return False
-            
-            # Dividir en chunks
-            chunks = await self.document_loader.split_documents(documents)
-            self.stats["chunks_created"] = len(chunks)
-            
-            # Crear vector store
-            vectorstore = await self.vector_store.create_vectorstore(chunks)
-            if not vectorstore:
+            if not self._is_writer():
+                logger.warning("No hay índice activo y este proceso no lo construye; publicarlo con "
+                              "`python -m src.build_index publish` (servicio vectorial) o "
+                              "`python -m src.build_index build` (artefacto)")
                 return False
             
-            # Persistir
-            self.vector_store.persist_vectorstore()
-            
-            logger.info(f"Nuevo vector store creado con {len(chunks)} chunks")
+            # Crear nuevo vector store en una versión nueva (nada la está leyendo aún)
+            logger.info("Creando nuevo vector store...")
+            version = self.index_versions.new_version()
+            try:
+                vector_store, build_stats = await self._build_version(version)
+            except Exception:
+                self.index_versions.discard(version)
+                raise
+            
+            self.index_versions.activate(version)
+            self.active_version = version
+            self.vector_store = vector_store
+            self.stats.update(build_stats)
+            self.index_versions.collect()
             return True
             
         except Exception as e:
             logger.error(f"Error configurando vector store: {str(e)}")
             return False
 
+    def _is_remote(self) -> bool:
+        """Indica si el índice vive en el servicio vectorial compartido."""
+        return isinstance(self.index_versions, RemoteIndexVersionManager)
+
+    def _is_writer(self) -> bool:
+        """
+        Indica si este proceso puede construir, publicar y recolectar versiones.
+        
+        En local sí, salvo en los workers del servidor pre-fork
+        (RAG_INDEX_READ_ONLY): el master prepara el índice antes del fork y
+        los workers solo abren la versión activa, porque los lectores de cada
+        versión se cuentan por proceso y la recolección de uno borraría la
+        que sirven los demás. Con el servicio vectorial solo el proceso
+        marcado con RAG_VECTOR_SERVICE_WRITER (o el job `build_index
+        publish`), de modo que las escrituras al índice compartido se
+        serializan en un único sitio.
+        """
+        if self.config.get("rag_index_read_only", False):
+            return False
+        return not self._is_remote() or self.config.get("rag_vector_service_writer", False)
+
+    def _open_vector_store(self, version: str) -> SecurityVectorStore:
+        """
+        Vector store (sin cargar) de una versión del índice.
+        
+        Args:
+            version: Versión del índice
+            
+        Returns:
+            SecurityVectorStore: Directorio local o colección del servicio vectorial
+        """
+        if self._is_remote():
+            return SecurityVectorStore(
+                str(self.persist_directory),
+                collection_name=self.index_versions.collection_for(version),
+                client=self.index_versions.client
+            )
+        return SecurityVectorStore(str(self.index_versions.path_for(version)))
+
+    def get_chunking_params(self) -> Dict[str, int]:
+        """Parámetros de chunking configurados (forman parte del manifiesto del índice)."""
+        return {
+            "parent_chunk_size": self.config.get("rag_parent_chunk_size", 2000),
+            "child_chunk_size": self.config.get("rag_child_chunk_size", 400),
+            "child_chunk_overlap": self.config.get("rag_child_chunk_overlap", 50)
+        }
+
+    def _load_index_artifact(self) -> bool:
+        """
+        Carga el artefacto de índice configurado si existe, es del mismo
+        backend de embeddings y corresponde a los documentos actuales.
+        
+        Sin documentos fuente (imágenes que solo incluyen el artefacto) no se
+        comprueba la frescura.
+        
+        Returns:
+            bool: True si se cargó el artefacto
+        """
+        path = Path(self.config.get("rag_index_artifact") or "")
+        if not path.is_file():
+            return False
+        
+        docs_hash = None
+        if any(self.docs_path.glob("**/*.txt")):
+            docs_hash = compute_docs_manifest(self.docs_path, self.get_chunking_params())["hash"]
+        
+        vector_store = SecurityVectorStore(str(self.persist_directory))
+        vector_store.embeddings = self.vector_store.embeddings
+        if not vector_store.load_index_artifact(str(path), docs_hash=docs_hash):
+            return False
+        
+        self.vector_store = vector_store
+        self.active_version = "artifact"
+        stats = vector_store.get_vectorstore_stats()
+        self.stats["chunks_created"] = stats.get("total_documents", 0)
+        self.stats["parent_sections"] = stats.get("parent_sections", 0)
+        return True
+
+    async def _build_version(self, version: str) -> Tuple[SecurityVectorStore, Dict[str, int]]:
+        """
+        Construye un índice completo en el directorio de una versión.
+        
+        Reutiliza el modelo de embeddings del vector store activo.
+        
+        Args:
+            version: Versión a construir
+            
+        Returns:
+            Tuple: Vector store construido y estadísticas de construcción
+        """
+        vector_store = self._open_vector_store(version)
+        vector_store.embeddings = self.vector_store.embeddings
+        
+        # Cargar documentos
+        documents = await self.document_loader.load_all_documents()
+        if not documents:
+            raise ValueError("No se encontraron documentos para indexar")
+        
+        # Dividir en secciones padre (docstore) y chunks hijos (embeddings)
+        parents, chunks = await self.document_loader.split_documents_hierarchical(
+            documents, **self.get_chunking_params()
+        )
+        
+        # Crear vector store
+        await vector_store.create_vectorstore(chunks, parent_sections=parents)
+        vector_store.persist_vectorstore()
+        
+        logger.info(f"Vector store {version} creado con {len(chunks)} chunks "
+                   f"({len(parents)} secciones padre)")
+        return vector_store, {
+            "documents_loaded": len(documents),
+            "chunks_created": len(chunks),
+            "parent_sections": len(parents)
+        }
+
     async def _setup_retriever(self) -> None:
         """Configura el sistema de retrieval."""
-        if not self.vector_store.vectorstore:
+        self.retriever = self._build_retriever(self.vector_store)
+        logger.info("Retriever configurado")
+
+    def _build_retriever(self, vector_store: SecurityVectorStore) -> SecurityRetriever:
+        """
+        Crea un retriever configurado sobre un vector store.
+        
+        Args:
+            vector_store: Vector store ya cargado o construido
+            
+        Returns:
+            SecurityRetriever: Retriever configurado
+        """
+        if not vector_store.vectorstore:
             raise ValueError("Vector store no disponible")
         
-        self.retriever = SecurityRetriever(self.vector_store.vectorstore)
+        retriever = SecurityRetriever(
+            vector_store.vectorstore,
+            docstore=vector_store.docstore
+        )
         
         # Configurar con parámetros optimizados para ciberseguridad
-        self.retriever.configure_retriever(
-            search_type="mmr",
-            k=8,           # Recuperar 8 chunks
-            fetch_k=16,    # Buscar en 16 candidatos
-            lambda_mult=0.7  # Balance relevancia/diversidad
+        # (chunks hijos pequeños: se recuperan más y se agrupan por sección padre).
+        # Ajustables por entorno; ver benchmarks/eval_retrieval.py para elegirlos.
+        retriever.configure_retriever(
+            search_type=self.config.get("rag_search_type", "mmr"),
+            k=self.config.get("rag_k", 12),                 # Chunks hijos a recuperar
+            fetch_k=self.config.get("rag_fetch_k", 32),     # Candidatos iniciales
+            lambda_mult=self.config.get("rag_lambda_mult", 0.7)  # Balance relevancia/diversidad
         )
+        return retriever
+
+    @contextmanager
+    def _reading(self) -> Iterator[SecurityRetriever]:
+        """
+        Fija el retriever de la versión activa durante una búsqueda.
         
-        logger.info("Retriever configurado")
+        La búsqueda termina sobre la versión con la que empezó aunque haya un
+        swap entretanto; la versión antigua no se borra hasta que sus
+        lectores terminan.
+        
+        Yields:
+            SecurityRetriever: Retriever de la versión activa
+        """
+        version, retriever = self.active_version, self.retriever
+        self.index_versions.acquire(version)
+        try:
+            yield retriever
+        finally:
+            self.index_versions.release(version)
+
+    async def _follow_active_version(self) -> None:
+        """
+        Sigue el puntero compartido del servicio vectorial.
+        
+        Si otro proceso publicó una versión nueva, la abre y hace el swap del
+        vector store y el retriever. Se comprueba como mucho una vez cada
+        `rag_vector_service_refresh_seconds`; la versión anterior la conserva
+        el escritor (`rag_index_keep_versions`) mientras los demás la siguen.
+        """
+        if not self._is_remote() or not self.is_initialized:
+            return
+        if self._rebuild_task and not self._rebuild_task.done():
+            return
+        
+        now = time.monotonic()
+        if now < self._next_version_check:
+            return
+        self._next_version_check = now + self.config.get("rag_vector_service_refresh_seconds", 10.0)
+        
+        try:
+            version = await asyncio.to_thread(self.index_versions.active_version)
+            if version == self.active_version:
+                return
+            
+            vector_store = self._open_vector_store(version)
+            vector_store.embeddings = self.vector_store.embeddings
+            if not await vector_store.load_existing_vectorstore():
+                return
+            retriever = self._build_retriever(vector_store)
+            
+            previous_version = self.active_version
+            self.vector_store = vector_store
+            self.retriever = retriever
+            self.active_version = version
+            stats = vector_store.get_vectorstore_stats()
+            self.stats["chunks_created"] = stats.get("total_documents", 0)
+            self.stats["parent_sections"] = stats.get("parent_sections", 0)
+            logger.info(f"Versión publicada en el servicio vectorial: {previous_version} -> {version}")
+            
+        except Exception as e:
+            logger.warning(f"No se pudo comprobar la versión activa del servicio vectorial: {str(e)}")
 
     async def search_relevant_context(
         self, 
@@ -191,13 +440,16 @@ class SecurityKnowledgeRAG:
             if not self.is_initialized:
                 raise ValueError("Sistema RAG no inicializado")
             
+            await self._follow_active_version()
+            
             # Realizar búsqueda
-            if document_types:
-                results = await self.retriever.search_by_document_type(
-                    query, document_types, max_chunks
-                )
-            else:
-                results = await self.retriever.search_documents(query, max_chunks)
+            with self._reading() as retriever:
+                if document_types:
+                    results = await retriever.search_by_document_type(
+                        query, document_types, max_chunks
+                    )
+                else:
+                    results = await retriever.search_documents(query, max_chunks)
             
             # Actualizar estadísticas
             self.stats["retrieval_calls"] += 1
@@ -241,17 +493,12 @@ class SecurityKnowledgeRAG:
         Returns:
             List[Dict]: Resultados específicos de la metodología
         """
-        methodology_keywords = {
-            "MAGERIT": ["magerit", "activo", "amenaza", "vulnerabilidad", "impacto", "riesgo"],
-            "OCTAVE": ["octave", "asset", "threat", "vulnerability"],
-            "ISO27001": ["iso", "27001", "sgsi", "control", "anexo"],
-            "NIST": ["nist", "framework", "cybersecurity", "function"]
-        }
-        
-        keywords = methodology_keywords.get(methodology.upper(), [methodology.lower()])
+        keywords = METHODOLOGY_KEYWORDS.get(methodology.upper(), [methodology.lower()])
         enhanced_query = f"{query} {methodology}"
         
-        return await self.retriever.search_by_keywords(enhanced_query, keywords, max_results)
+        await self._follow_active_version()
+        with self._reading() as retriever:
+            return await retriever.search_by_keywords(enhanced_query, keywords, max_results)
 
     async def get_document_types_available(self) -> List[str]:
         """
@@ -271,10 +518,13 @@ class SecurityKnowledgeRAG:
             logger.error(f"Error obteniendo tipos de documento: {str(e)}")
             return []
 
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, refresh: bool = False) -> Dict[str, Any]:
         """
         Obtiene estadísticas completas del sistema RAG.
         
+        Args:
+            refresh: Forzar recuento completo del vector store
+            
         Returns:
             Dict: Estadísticas centralizadas
         """
@@ -282,12 +532,16 @@ class SecurityKnowledgeRAG:
             **self.stats,
             "is_initialized": self.is_initialized,
             "docs_path": str(self.docs_path),
-            "persist_directory": str(self.persist_directory)
+            "persist_directory": str(self.persist_directory),
+            "index": {
+                **self.index_versions.get_status(),
+                "rebuild": dict(self.rebuild_status)
+            }
         }
         
         # Añadir estadísticas de componentes si están disponibles
         if self.vector_store:
-            vectorstore_stats = self.vector_store.get_vectorstore_stats()
+            vectorstore_stats = self.vector_store.get_vectorstore_stats(refresh=refresh)
             base_stats["vectorstore"] = vectorstore_stats
         
         if self.retriever:
@@ -296,10 +550,28 @@ class SecurityKnowledgeRAG:
         
         return base_stats
 
+    def get_component_status(self) -> Dict[str, bool]:
+        """
+        Obtiene el estado de los componentes sin I/O ni búsquedas (O(1)).
+        
+        Returns:
+            Dict[str, bool]: Disponibilidad de cada componente
+        """
+        return {
+            "initialized": self.is_initialized,
+            "docs_accessible": self.docs_path.exists(),
+            "vector_store": self.vector_store.vectorstore is not None,
+            "retriever": self.retriever is not None,
+            "embeddings": self.vector_store.embeddings is not None
+        }
+
     async def health_check(self) -> Dict[str, Any]:
         """
         Verifica el estado de salud del sistema completo.
         
+        Check profundo (búsqueda real con embeddings): pensado para ejecutarse
+        en segundo plano desde el HealthMonitor, no en cada probe.
+        
         Returns:
             Dict: Estado de salud detallado
         """
@@ -307,13 +579,7 @@ class SecurityKnowledgeRAG:
             health = {
                 "status": "healthy",
                 "timestamp": datetime.utcnow().isoformat(),
-                "components": {
-                    "initialized": self.is_initialized,
-                    "docs_accessible": self.docs_path.exists(),
-                    "vector_store": self.vector_store.vectorstore is not None,
-                    "retriever": self.retriever is not None,
-                    "embeddings": self.vector_store.embeddings is not None
-                },
+                "components": self.get_component_status(),
                 "stats": self.get_stats()
             }
             
@@ -346,6 +612,134 @@ class SecurityKnowledgeRAG:
                 "stats": {}
             }
 
+    def start_rebuild(self) -> Dict[str, Any]:
+        """
+        Lanza la reindexación blue/green en segundo plano.
+        
+        Returns:
+            Dict: Estado inicial de la reindexación
+            
+        Raises:
+            RuntimeError: Si el sistema no está inicializado, el proceso no
+                escribe en el servicio vectorial o ya hay una en curso
+        """
+        if not self.is_initialized:
+            raise RuntimeError("Sistema RAG no inicializado")
+        if not self._is_writer():
+            raise RuntimeError("Este proceso no construye el índice (worker pre-fork: reconstruir el "
+                               "artefacto y reiniciar; servicio vectorial: RAG_VECTOR_SERVICE_WRITER o "
+                               "`python -m src.build_index publish`)")
+        if self._rebuild_task and not self._rebuild_task.done():
+            raise RuntimeError("Ya hay una reindexación en curso")
+        
+        self._rebuild_task = asyncio.create_task(self.rebuild_index())
+        return dict(self.rebuild_status)
+
+    async def rebuild_index(self) -> Dict[str, Any]:
+        """
+        Reindexa sin cortar el servicio (blue/green).
+        
+        1. Construye el índice en un directorio de versión nuevo
+        2. Lo valida con consultas de prueba
+        3. Hace el swap del vector store/retriever activos y del puntero ACTIVE
+        4. Espera a que terminen los lectores de la versión anterior y
+           recolecta las versiones antiguas
+        
+        Si falla la construcción o la validación, la versión nueva se descarta
+        y la activa sigue sirviendo.
+        
+        Returns:
+            Dict: Estado final de la reindexación
+        """
+        version = self.index_versions.new_version()
+        start = time.perf_counter()
+        self.rebuild_status = {
+            "state": "building",
+            "version": version,
+            "previous_version": self.active_version,
+            "started_at": datetime.utcnow().isoformat()
+        }
+        logger.info(f"Reindexación blue/green iniciada: {version}")
+        
+        try:
+            vector_store, build_stats = await self._build_version(version)
+            
+            self.rebuild_status["state"] = "validating"
+            retriever = self._build_retriever(vector_store)
+            self.rebuild_status["validation"] = await self._validate_index(retriever)
+            
+            # Swap: sin awaits entre asignaciones, ninguna búsqueda ve un estado mixto
+            self.index_versions.activate(version)
+            previous_version, previous_store = self.active_version, self.vector_store
+            self.vector_store = vector_store
+            self.retriever = retriever
+            self.active_version = version
+            self.stats.update(build_stats)
+            
+            self.rebuild_status["state"] = "draining"
+            self.rebuild_status["removed_versions"] = await self._retire_version(
+                previous_version, previous_store
+            )
+            self.rebuild_status["state"] = "completed"
+            logger.info(f"Reindexación completada: {previous_version} -> {version}")
+            
+        except Exception as e:
+            logger.error(f"Error en reindexación {version}: {str(e)}")
+            self.index_versions.discard(version)
+            self.rebuild_status["state"] = "failed"
+            self.rebuild_status["error"] = str(e)
+        
+        self.rebuild_status["finished_at"] = datetime.utcnow().isoformat()
+        self.rebuild_status["duration_seconds"] = round(time.perf_counter() - start, 3)
+        return dict(self.rebuild_status)
+
+    async def _validate_index(self, retriever: SecurityRetriever) -> Dict[str, int]:
+        """
+        Valida un índice nuevo con consultas de prueba antes del swap.
+        
+        Args:
+            retriever: Retriever del índice nuevo
+            
+        Returns:
+            Dict[str, int]: Resultados por consulta
+            
+        Raises:
+            ValueError: Si alguna consulta no devuelve resultados
+        """
+        queries = [q.strip() for q in self.config.get("rag_smoke_queries", "").split(",") if q.strip()]
+        validation = {}
+        for query in queries or DEFAULT_SMOKE_QUERIES:
+            validation[query] = len(await retriever.search_documents(query, max_results=3))
+        
+        empty = [query for query, count in validation.items() if not count]
+        if empty:
+            raise ValueError(f"Validación fallida, sin resultados para: {empty}")
+        return validation
+
+    async def _retire_version(self, version: str, vector_store: SecurityVectorStore) -> List[str]:
+        """
+        Espera a que terminen los lectores de una versión retirada y recolecta
+        las versiones antiguas.
+        
+        Args:
+            version: Versión retirada
+            vector_store: Su vector store
+            
+        Returns:
+            List[str]: Versiones eliminadas del disco
+        """
+        deadline = time.monotonic() + self.config.get("rag_index_drain_timeout_seconds", 30.0)
+        while self.index_versions.readers(version) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        
+        if self.index_versions.readers(version):
+            # Se recolectará en la próxima reindexación
+            logger.warning(f"Versión {version} con lectores tras el drenaje; se conserva")
+            return []
+        
+        vector_store.docstore.close()
+        return await asyncio.to_thread(self.index_versions.collect)
+
     async def cleanup(self) -> bool:
         """
         Limpia recursos del sistema RAG.
@@ -369,6 +763,7 @@ class SecurityKnowledgeRAG:
             self.stats = {
                 "documents_loaded": 0,
                 "chunks_created": 0,
+                "parent_sections": 0,
                 "initialization_time": None,
                 "retrieval_calls": 0,
                 "last_search": None
@@ -394,9 +789,13 @@ class SecurityKnowledgeRAG:
         try:
             logger.info("Reinicializando sistema RAG...")
             
-            # Limpiar si se fuerza reindexación
-            if force_reindex:
-                await self.cleanup()
+            # Reindexación blue/green: el índice activo sigue sirviendo hasta el swap.
+            # Pasa por la misma guarda que la API: si ya hay una en curso se espera a esa
+            if force_reindex and self.is_initialized:
+                if not self._rebuild_task or self._rebuild_task.done():
+                    self.start_rebuild()
+                status = await asyncio.shield(self._rebuild_task)
+                return status["state"] == "completed"
             
             # Reinicializar
             return await self.initialize()
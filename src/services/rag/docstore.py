@@ -0,0 +1,174 @@
+"""
+DocStore Module para RAG System
+Almacén local de secciones padre para retrieval small-to-big.
+
+Los chunks hijos (pequeños) se indexan en el vector store; las secciones
+padre completas se guardan aquí, indexadas por `chunk_id`, de modo que la
+expansión hijo → padre es una consulta SQLite y no una búsqueda vectorial.
+"""
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import json
+import sqlite3
+import threading
+
+from langchain_core.documents import Document
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class SecurityDocStore:
+    """
+    DocStore SQLite para secciones padre de documentos de ciberseguridad.
+
+    Características:
+    - Clave primaria `chunk_id` (lookup O(log n) por sección)
+    - Lecturas memory-mapped (PRAGMA mmap_size) sin copias intermedias
+    - Recuperación por lotes de varias secciones en una sola consulta
+    - Seguro para uso concurrente desde threads (asyncio.to_thread)
+    """
+
+    MMAP_SIZE_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, db_path: str):
+        """
+        Inicializa el docstore.
+
+        Args:
+            db_path: Ruta al fichero SQLite
+        """
+        self.db_path = Path(db_path)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        logger.info(f"SecurityDocStore inicializado - DB: {self.db_path}")
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """
+        Abre (una sola vez) la conexión SQLite con mmap habilitado.
+
+        Returns:
+            sqlite3.Connection: Conexión compartida
+        """
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._connection.execute(f"PRAGMA mmap_size={self.MMAP_SIZE_BYTES}")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS parent_sections ("
+                "chunk_id TEXT PRIMARY KEY, "
+                "content TEXT NOT NULL, "
+                "metadata TEXT NOT NULL)"
+            )
+        return self._connection
+
+    def exists(self) -> bool:
+        """
+        Verifica si el fichero del docstore existe en disco.
+
+        Returns:
+            bool: True si existe
+        """
+        return self.db_path.exists()
+
+    def add_sections(self, sections: List[Document]) -> int:
+        """
+        Guarda (o reemplaza) secciones padre indexadas por su chunk_id.
+
+        Args:
+            sections: Secciones padre con `chunk_id` en metadata
+
+        Returns:
+            int: Número de secciones guardadas
+        """
+        rows = [
+            (
+                section.metadata["chunk_id"],
+                section.page_content,
+                json.dumps(section.metadata, ensure_ascii=False)
+            )
+            for section in sections
+        ]
+
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO parent_sections (chunk_id, content, metadata) "
+                    "VALUES (?, ?, ?)",
+                    rows
+                )
+
+        logger.info(f"DocStore: {len(rows)} secciones padre guardadas")
+        return len(rows)
+
+    def get_sections(self, chunk_ids: List[str]) -> Dict[str, Document]:
+        """
+        Recupera varias secciones padre en una sola consulta.
+
+        Args:
+            chunk_ids: Lista de chunk_id de secciones padre
+
+        Returns:
+            Dict[str, Document]: Secciones encontradas indexadas por chunk_id
+        """
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        if not unique_ids:
+            return {}
+
+        placeholders = ", ".join("?" for _ in unique_ids)
+        with self._lock:
+            rows = self._get_connection().execute(
+                f"SELECT chunk_id, content, metadata FROM parent_sections "
+                f"WHERE chunk_id IN ({placeholders})",
+                unique_ids
+            ).fetchall()
+
+        return {
+            chunk_id: Document(page_content=content, metadata=json.loads(metadata))
+            for chunk_id, content, metadata in rows
+        }
+
+    def count(self) -> int:
+        """
+        Cuenta las secciones padre almacenadas.
+
+        Returns:
+            int: Número de secciones
+        """
+        if not self.exists():
+            return 0
+
+        with self._lock:
+            return self._get_connection().execute(
+                "SELECT COUNT(*) FROM parent_sections"
+            ).fetchone()[0]
+
+    def clear(self) -> None:
+        """Elimina todas las secciones del docstore."""
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                connection.execute("DELETE FROM parent_sections")
+
+    def close(self) -> None:
+        """Cierra la conexión SQLite si está abierta."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas del docstore.
+
+        Returns:
+            Dict: Estadísticas básicas
+        """
+        return {
+            "db_path": str(self.db_path),
+            "exists": self.exists(),
+            "parent_sections": self.count()
+        }
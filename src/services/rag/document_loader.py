@@ -3,7 +3,7 @@ Document Loader para RAG System
 Módulo especializado en carga y procesamiento de documentos de ciberseguridad.
 """
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import logging
 
 from langchain_community.document_loaders import TextLoader, DirectoryLoader
@@ -129,16 +129,24 @@ class SecurityDocumentLoader:
         else:
             return "documentacion_general"
 
-    def create_text_splitter(self) -> RecursiveCharacterTextSplitter:
+    def create_text_splitter(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200
+    ) -> RecursiveCharacterTextSplitter:
         """
         Crea un text splitter optimizado para documentos de ciberseguridad.
         
+        Args:
+            chunk_size: Tamaño máximo de cada chunk en caracteres
+            chunk_overlap: Solapamiento entre chunks consecutivos
+            
         Returns:
             RecursiveCharacterTextSplitter: Splitter configurado
         """
         return RecursiveCharacterTextSplitter(
-            chunk_size=1000,        # Tamaño óptimo para contexto técnico
-            chunk_overlap=200,      # Overlap para mantener continuidad
+            chunk_size=chunk_size,        # 1000: tamaño óptimo para contexto técnico
+            chunk_overlap=chunk_overlap,  # 200: overlap para mantener continuidad
             length_function=len,
             separators=[
                 "\n\n# ",          # Headers nivel 1
@@ -153,17 +161,24 @@ class SecurityDocumentLoader:
             add_start_index=True    # Añadir índice de inicio para trazabilidad
         )
 
-    async def split_documents(self, documents: List[Document]) -> List[Document]:
+    async def split_documents(
+        self,
+        documents: List[Document],
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200
+    ) -> List[Document]:
         """
         Divide documentos en chunks optimizados con metadata enriquecida.
         
         Args:
             documents: Lista de documentos a dividir
+            chunk_size: Tamaño máximo de cada chunk
+            chunk_overlap: Solapamiento entre chunks consecutivos
             
         Returns:
             List[Document]: Lista de chunks con metadata
         """
-        text_splitter = self.create_text_splitter()
+        text_splitter = self.create_text_splitter(chunk_size, chunk_overlap)
         all_chunks = []
         
         for doc in documents:
@@ -171,19 +186,82 @@ class SecurityDocumentLoader:
             
             # Enriquecer metadata de chunks
             for i, chunk in enumerate(chunks):
-                chunk.metadata.update({
-                    "chunk_id": f"{doc.metadata['filename']}_{i}",
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "keywords": ", ".join(self._extract_keywords(chunk.page_content)),
-                    "chunk_type": self._classify_chunk_content(chunk.page_content)
-                })
+                chunk.metadata.update(self._build_chunk_metadata(
+                    chunk, f"{doc.metadata['filename']}_{i}", i, len(chunks)
+                ))
             
             all_chunks.extend(chunks)
         
         logger.info(f"Creados {len(all_chunks)} chunks de {len(documents)} documentos")
         return all_chunks
 
+    async def split_documents_hierarchical(
+        self,
+        documents: List[Document],
+        parent_chunk_size: int = 2000,
+        child_chunk_size: int = 400,
+        child_chunk_overlap: int = 50
+    ) -> Tuple[List[Document], List[Document]]:
+        """
+        Divide documentos en dos niveles para retrieval small-to-big.
+        
+        Las secciones padre conservan el contexto completo para el prompt;
+        los chunks hijos, más pequeños, son los que se embeben y buscan.
+        Cada hijo referencia a su padre mediante `parent_id`.
+        
+        Args:
+            documents: Lista de documentos a dividir
+            parent_chunk_size: Tamaño de las secciones padre
+            child_chunk_size: Tamaño de los chunks hijos
+            child_chunk_overlap: Solapamiento entre chunks hijos
+            
+        Returns:
+            Tuple[List[Document], List[Document]]: (secciones padre, chunks hijos)
+        """
+        parents = await self.split_documents(documents, parent_chunk_size, chunk_overlap=0)
+        
+        child_splitter = self.create_text_splitter(child_chunk_size, child_chunk_overlap)
+        children = []
+        
+        for parent in parents:
+            sub_chunks = child_splitter.split_documents([parent])
+            for j, child in enumerate(sub_chunks):
+                child.metadata.update(self._build_chunk_metadata(
+                    child, f"{parent.metadata['chunk_id']}_{j}", j, len(sub_chunks)
+                ))
+                child.metadata["parent_id"] = parent.metadata["chunk_id"]
+            children.extend(sub_chunks)
+        
+        logger.info(f"Split jerárquico: {len(parents)} secciones padre, {len(children)} chunks hijos")
+        return parents, children
+
+    def _build_chunk_metadata(
+        self,
+        chunk: Document,
+        chunk_id: str,
+        chunk_index: int,
+        total_chunks: int
+    ) -> Dict[str, Any]:
+        """
+        Construye la metadata enriquecida de un chunk.
+        
+        Args:
+            chunk: Chunk a describir
+            chunk_id: Identificador único del chunk
+            chunk_index: Posición del chunk dentro de su documento/sección
+            total_chunks: Total de chunks del documento/sección
+            
+        Returns:
+            Dict: Metadata del chunk
+        """
+        return {
+            "chunk_id": chunk_id,
+            "chunk_index": chunk_index,
+            "total_chunks": total_chunks,
+            "keywords": ", ".join(self._extract_keywords(chunk.page_content)),
+            "chunk_type": self._classify_chunk_content(chunk.page_content)
+        }
+
     def _extract_keywords(self, content: str) -> List[str]:
         """
         Extrae keywords relevantes del contenido.
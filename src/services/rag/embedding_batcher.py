@@ -0,0 +1,155 @@
+"""
+Embedding Batcher Module para RAG System
+Micro-batching de embeddings de consultas entre peticiones concurrentes:
+las consultas que llegan dentro de una ventana corta se agrupan en una
+sola llamada `embed_documents` al backend.
+"""
+from concurrent.futures import Future, wait
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.config import config
+from src.utils.deadline import Deadline, DeadlineExceededError, bind_deadline, get_deadline, stage_timeout
+from src.utils.logger import setup_logger
+from src.utils import metrics
+
+logger = setup_logger(__name__)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Envoltorio de un modelo de embeddings que agrupa las consultas concurrentes.
+
+    Sin hilo dedicado: la primera consulta de una ventana actúa de líder,
+    espera `window_seconds` (o hasta reunir `max_batch_size` consultas),
+    lanza un único `embed_documents` y reparte los vectores. Las consultas
+    que llegan mientras el líder está en la llamada abren la ventana
+    siguiente, de modo que los lotes se solapan.
+
+    `embed_documents` (indexación) se delega directamente: ya va en lotes.
+
+    Cada consulta espera su vector como mucho hasta su propio plazo; el lote
+    se lanza con el plazo más lejano de sus consultas (ninguno si alguna no
+    lo tiene), para que una consulta con prisa no recorte a las demás.
+    """
+
+    def __init__(self, embeddings: Embeddings, window_seconds: float = 0.005, max_batch_size: int = 64):
+        """
+        Args:
+            embeddings: Modelo de embeddings real
+            window_seconds: Espera máxima del líder para completar el lote
+            max_batch_size: Consultas que cierran el lote antes de la ventana
+        """
+        self.embeddings = embeddings
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[str, Future, Optional[Deadline]]] = []
+        self._leader_active = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "queries": 0,
+            "batches": 0,
+            "unique_texts": 0,
+            "max_batch_size_seen": 0
+        }
+
+    @classmethod
+    def from_config(cls, embeddings: Embeddings) -> "MicroBatchingEmbeddings":
+        """Crea el batcher con la configuración de la aplicación."""
+        return cls(
+            embeddings,
+            window_seconds=config.get("embedding_batch_window_ms", 5.0) / 1000,
+            max_batch_size=config.get("embedding_batch_max_size", 64)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # Atributos propios del backend (p. ej. `size` de los embeddings fake)
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de un lote de documentos (sin agrupar)."""
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embedding de una consulta, agrupado con las consultas concurrentes.
+
+        Args:
+            text: Consulta
+
+        Returns:
+            List[float]: Vector de la consulta
+        """
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((text, future, get_deadline()))
+            lead = not self._leader_active
+            if lead:
+                self._leader_active = True
+            elif len(self._pending) >= self.max_batch_size:
+                self._cond.notify()
+
+        if lead:
+            self._lead()
+        if not future.done() and not wait([future], stage_timeout("rag.embed_query")).done:
+            raise DeadlineExceededError("rag.embed_query", get_deadline())
+        return future.result()
+
+    def _lead(self) -> None:
+        """Completa la ventana actual y resuelve su lote."""
+        deadline = time.monotonic() + self.window_seconds
+        with self._cond:
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending, []
+            self._leader_active = False
+
+        # Consultas repetidas en el mismo lote se calculan una vez
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            with bind_deadline(_latest_deadline([deadline for _, _, deadline in batch])):
+                vectors = dict(zip(unique_texts, self.embeddings.embed_documents(unique_texts)))
+        except BaseException as e:
+            logger.error(f"Error en lote de embeddings ({len(batch)} consultas): {str(e)}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for text, future, _ in batch:
+            future.set_result(vectors[text])
+
+        metrics.EMBEDDING_BATCH_SIZE.observe(len(batch))
+        with self._cond:
+            self._stats["queries"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["unique_texts"] += len(unique_texts)
+            self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(batch))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de agrupación.
+
+        Returns:
+            Dict: Consultas, lotes y tamaño medio de lote
+        """
+        with self._cond:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = round(stats["queries"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["window_ms"] = self.window_seconds * 1000
+        stats["max_batch_size"] = self.max_batch_size
+        return stats
+
+
+def _latest_deadline(deadlines: List[Optional[Deadline]]) -> Optional[Deadline]:
+    """Plazo más lejano de un lote (None si alguna consulta no tiene plazo)."""
+    if not deadlines or any(deadline is None for deadline in deadlines):
+        return None
+    return max(deadlines, key=lambda deadline: deadline.expires_at)
@@ -0,0 +1,130 @@
+"""
+Embedding Deadline Module para RAG System
+Timeout y reintentos de las llamadas de embeddings dimensionados con el
+plazo de la petición en curso, en lugar de los fijos del cliente
+(`request_timeout=30`, `max_retries=3`).
+"""
+from typing import Any, List
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.config import config
+from src.utils.deadline import DeadlineExceededError, has_budget_for, stage_timeout
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class _TimeoutBoundClient:
+    """
+    Recurso `embeddings` del cliente de OpenAI con el timeout de cada
+    `create()` tomado del plazo activo (el parámetro `timeout` por llamada
+    sustituye al del cliente).
+    """
+
+    def __init__(self, client: Any, request_timeout_seconds: float):
+        self.client = client
+        self.request_timeout_seconds = request_timeout_seconds
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def create(self, **kwargs: Any) -> Any:
+        kwargs.setdefault("timeout", stage_timeout("rag.embed", self.request_timeout_seconds))
+        return self.client.create(**kwargs)
+
+
+class DeadlineBoundEmbeddings(Embeddings):
+    """
+    Envoltorio de un modelo de embeddings con reintentos propios.
+
+    Cada intento usa como timeout el menor entre `request_timeout_seconds` y
+    lo que queda del plazo (en OpenAI, por petición HTTP); se reintenta con
+    backoff exponencial mientras queden reintentos y plazo para un intento útil. Sin plazo activo se
+    comporta como el cliente original (mismo timeout y reintentos).
+
+    El modelo envuelto debe crearse sin reintentos propios (`max_retries=0`).
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        request_timeout_seconds: float = 30.0,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5
+    ):
+        """
+        Args:
+            embeddings: Modelo de embeddings real
+            request_timeout_seconds: Timeout de cada intento sin plazo activo
+            max_retries: Reintentos tras el primer intento
+            backoff_seconds: Espera antes del primer reintento (se duplica en cada uno)
+        """
+        self.embeddings = embeddings
+        self.request_timeout_seconds = request_timeout_seconds
+        client = getattr(embeddings, "client", None)
+        if client is not None and hasattr(client, "create"):
+            # OpenAIEmbeddings: el timeout de cada petición HTTP sale del plazo
+            embeddings.client = _TimeoutBoundClient(client, request_timeout_seconds)
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+
+    @classmethod
+    def from_config(cls, embeddings: Embeddings) -> "DeadlineBoundEmbeddings":
+        """Crea el envoltorio con la configuración de la aplicación."""
+        return cls(
+            embeddings,
+            request_timeout_seconds=config.get("embedding_request_timeout_seconds", 30.0),
+            max_retries=config.get("embedding_max_retries", 3),
+            backoff_seconds=config.get("embedding_retry_backoff_seconds", 0.5)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # Atributos propios del backend (p. ej. `model`)
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de un lote de documentos."""
+        return self._call("embed_documents", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embedding de una consulta."""
+        return self._call("embed_query", text)
+
+    def _call(self, method: str, payload: Any) -> Any:
+        """
+        Ejecuta la llamada con timeout y reintentos acotados por el plazo.
+
+        Args:
+            method: `embed_documents` o `embed_query`
+            payload: Textos o consulta
+
+        Returns:
+            Vectores devueltos por el backend
+
+        Raises:
+            DeadlineExceededError: Sin plazo para (otro) intento
+            Exception: Último error del backend
+        """
+        attempt = 0
+        while True:
+            stage_timeout("rag.embed", self.request_timeout_seconds)
+            try:
+                return getattr(self.embeddings, method)(payload)
+            except DeadlineExceededError:
+                raise
+            except Exception as e:
+                attempt += 1
+                delay = self.backoff_seconds * 2 ** (attempt - 1)
+                if attempt > self.max_retries or not has_budget_for(
+                    delay + config.get("deadline_min_rag_seconds", 0.5)
+                ):
+                    raise
+                logger.warning(f"Error en embeddings ({type(e).__name__}), reintento {attempt}/{self.max_retries} "
+                               f"en {delay:.2f}s")
+                time.sleep(delay)
@@ -0,0 +1,206 @@
+"""
+Incident Index Module para RAG System
+Índice vectorial de análisis completados para búsqueda de incidentes similares.
+
+Segunda colección (`incident_history`) junto a `security_knowledge`. Vive en
+su propio directorio para que la reindexación de la base de conocimiento
+no elimine el histórico de incidentes; con el servicio vectorial
+(RAG_VECTOR_BACKEND=http) es una colección más del servidor compartido.
+"""
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class IncidentHistoryIndex:
+    """
+    Índice de incidentes analizados previamente.
+
+    Cada documento contiene el texto del incidente más sus vulnerabilidades
+    y controles, de modo que el propio contenido sirve como contexto
+    precalculado sin volver a llamar al LLM.
+    """
+
+    COLLECTION_NAME = "incident_history"
+
+    def __init__(self, persist_directory: str, embeddings: Embeddings, client: Optional[Any] = None):
+        """
+        Inicializa el índice de incidentes.
+
+        Args:
+            persist_directory: Directorio de persistencia del índice
+            embeddings: Modelo de embeddings compartido con el RAG
+            client: Cliente HTTP del servicio vectorial (None: Chroma local)
+        """
+        self.persist_directory = Path(persist_directory)
+        self.client = client
+        if client is not None:
+            self.vectorstore = Chroma(
+                client=client,
+                embedding_function=embeddings,
+                collection_name=self.COLLECTION_NAME,
+                collection_metadata={"description": "Risk-Guardian analyzed incidents"}
+            )
+        else:
+            self.persist_directory.mkdir(parents=True, exist_ok=True)
+            self.vectorstore = Chroma(
+                persist_directory=str(self.persist_directory),
+                embedding_function=embeddings,
+                collection_name=self.COLLECTION_NAME,
+                collection_metadata={"description": "Risk-Guardian analyzed incidents"}
+            )
+
+        location = "servicio vectorial" if client is not None else self.persist_directory
+        logger.info(f"IncidentHistoryIndex inicializado - Persist: {location}")
+
+    @staticmethod
+    def build_incident_text(
+        incident_data: Dict[str, Any],
+        analysis_data: Dict[str, Any]
+    ) -> str:
+        """
+        Construye el texto indexado de un incidente analizado.
+
+        Args:
+            incident_data: Datos originales del incidente
+            analysis_data: Resultado (vulnerabilidades, impactos, controles)
+
+        Returns:
+            str: Texto del incidente con su análisis resumido
+        """
+        lines = [
+            f"Incidente: {incident_data.get('titulo', '')}",
+            f"Descripción: {incident_data.get('descripcion', '')}"
+        ]
+        for vulnerability in analysis_data.get("vulnerabilidades", [])[:5]:
+            lines.append(
+                f"Vulnerabilidad ({vulnerability.get('severidad', '')}): "
+                f"{vulnerability.get('descripcion', '')}"
+            )
+        for control in analysis_data.get("controles", [])[:5]:
+            lines.append(
+                f"Control {control.get('tipo', '')} ({control.get('prioridad', '')}): "
+                f"{control.get('descripcion', '')}"
+            )
+        return "\n".join(lines)
+
+    async def index_analysis(
+        self,
+        analysis_id: str,
+        incident_data: Dict[str, Any],
+        analysis_data: Dict[str, Any],
+        risk_level: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Indexa un análisis completado.
+
+        Args:
+            analysis_id: ID del análisis (se usa como ID del documento)
+            incident_data: Datos originales del incidente
+            analysis_data: Resultado del análisis
+            risk_level: Nivel de riesgo calculado
+
+        Returns:
+            bool: True si se indexó correctamente
+        """
+        try:
+            metadata = {
+                "analysis_id": analysis_id,
+                "titulo": str(incident_data.get("titulo", ""))[:200],
+                "categoria": incident_data.get("categoria_inicial") or "",
+                "risk_level": (risk_level or {}).get("nivel", "") or ""
+            }
+            await asyncio.to_thread(
+                self.vectorstore.add_texts,
+                [self.build_incident_text(incident_data, analysis_data)],
+                metadatas=[metadata],
+                ids=[analysis_id]
+            )
+            logger.info(f"Incidente {analysis_id} indexado en {self.COLLECTION_NAME}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error indexando incidente {analysis_id}: {str(e)}")
+            return False
+
+    async def find_similar(
+        self,
+        query: str,
+        k: int = 5,
+        min_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca incidentes previos similares a una consulta.
+
+        Args:
+            query: Texto del incidente a comparar
+            k: Número máximo de resultados
+            min_score: Relevancia mínima (0-1)
+
+        Returns:
+            List[Dict]: Incidentes similares con su puntuación
+        """
+        try:
+            results = await asyncio.to_thread(self._search, query, k)
+            return [
+                {
+                    "id_analisis": doc.metadata.get("analysis_id"),
+                    "titulo": doc.metadata.get("titulo"),
+                    "categoria": doc.metadata.get("categoria") or None,
+                    "risk_level": doc.metadata.get("risk_level") or None,
+                    "similarity": round(score, 4),
+                    "summary": doc.page_content
+                }
+                for doc, score in results
+                if score >= min_score
+            ]
+
+        except Exception as e:
+            logger.error(f"Error buscando incidentes similares: {str(e)}")
+            return []
+
+    def _search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Búsqueda bloqueante (en un hilo): recuento y consulta fuera del event loop."""
+        if self.vectorstore._collection.count() == 0:
+            return []
+        return self.vectorstore.similarity_search_with_relevance_scores(query, k=k)
+
+    def format_similar_for_prompt(self, similar_incidents: List[Dict[str, Any]]) -> str:
+        """
+        Formatea incidentes similares como contexto precalculado para el prompt.
+
+        Args:
+            similar_incidents: Resultados de `find_similar`
+
+        Returns:
+            str: Contexto formateado
+        """
+        if not similar_incidents:
+            return ""
+
+        lines = ["=== INCIDENTES SIMILARES ANALIZADOS PREVIAMENTE ==="]
+        for i, incident in enumerate(similar_incidents, 1):
+            lines.append(
+                f"\n--- Precedente {i} (similitud {incident['similarity']:.2f}, "
+                f"riesgo {incident.get('risk_level') or 'n/d'}) ---"
+            )
+            lines.append(incident["summary"])
+        lines.append("\n=== FIN DE PRECEDENTES ===\n")
+        return "\n".join(lines)
+
+    def count(self) -> int:
+        """
+        Cuenta los incidentes indexados.
+
+        Returns:
+            int: Número de incidentes
+        """
+        return self.vectorstore._collection.count()
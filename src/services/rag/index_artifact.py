@@ -0,0 +1,487 @@
+"""
+Index Artifact Module para RAG System
+Artefacto de índice precompilado e inmutable: un único fichero versionado con
+los embeddings, los chunks, las secciones padre y un manifiesto (hash de los
+documentos fuente y backend de embeddings). Se construye offline
+(`python -m src.build_index`) y se carga en solo lectura con mmap, sin llamar
+a la API de embeddings.
+
+Formato (little-endian):
+- 8 bytes: MAGIC
+- 8 bytes: longitud de la cabecera JSON (H)
+- 8 bytes: longitud del bloque de registros JSON (R)
+- H bytes: cabecera (manifiesto)
+- R bytes: registros (chunks y secciones padre)
+- relleno hasta múltiplo de 64
+- count x dim float32: embeddings normalizados L2 (fila i = chunk i)
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import struct
+
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MAGIC = b"RGIDX\x00\x00\x01"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sQQ")
+_ALIGNMENT = 64
+
+
+class IndexArtifactError(ValueError):
+    """Artefacto inválido, corrupto o incompatible con la configuración."""
+
+
+def embedding_backend_id(embeddings: Embeddings) -> str:
+    """
+    Identificador del backend de embeddings (los vectores solo son
+    comparables entre índices del mismo backend).
+
+    Args:
+        embeddings: Modelo de embeddings (se desenvuelve el micro-batcher)
+
+    Returns:
+        str: Ej. `openai:text-embedding-ada-002` o `hashing:256`
+    """
+    inner = getattr(embeddings, "embeddings", embeddings)
+    model = getattr(inner, "model", None)
+    if model:
+        return f"openai:{model}"
+    size = getattr(inner, "size", None)
+    if size:
+        return f"hashing:{size}"
+    return type(inner).__name__
+
+
+def compute_docs_manifest(docs_path: Path, chunking: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Manifiesto de los documentos fuente: hash de cada fichero y hash global
+    (incluye los parámetros de chunking, que también cambian el índice).
+
+    Args:
+        docs_path: Directorio de documentos
+        chunking: Tamaños de sección padre/chunk hijo y solape
+
+    Returns:
+        Dict: `files` (ruta relativa -> sha256) y `hash`
+    """
+    files = {}
+    for doc_file in sorted(docs_path.glob("**/*.txt")):
+        files[doc_file.relative_to(docs_path).as_posix()] = hashlib.sha256(doc_file.read_bytes()).hexdigest()
+
+    digest = hashlib.sha256(json.dumps({"files": files, "chunking": chunking}, sort_keys=True).encode("utf-8"))
+    return {"files": files, "hash": digest.hexdigest()}
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _serialize_document(doc: Document) -> Dict[str, Any]:
+    return {"text": doc.page_content, "metadata": doc.metadata}
+
+
+def _deserialize_documents(records: List[Dict[str, Any]]) -> List[Document]:
+    return [Document(page_content=record["text"], metadata=record["metadata"]) for record in records]
+
+
+_WRITE_BATCH_ROWS = 8192
+_COPY_BUFFER_BYTES = 1 << 20
+
+
+class IndexArtifactWriter:
+    """
+    Escritura incremental de un artefacto: los registros se serializan chunk
+    a chunk y cada lote de embeddings se normaliza y se añade directamente al
+    bloque de vectores, con el hash calculado sobre la marcha. La memoria no
+    crece con el corpus (1M chunks x 1536 son ~6 GB de vectores).
+
+    La cabecera se escribe con el primer lote (cuando ya se conoce la
+    dimensión) con un hash provisional y se reescribe en su sitio al cerrar:
+    ocupa lo mismo porque el hash tiene longitud fija. El fichero se publica
+    de forma atómica (fichero temporal + rename) en `close()`; si no se
+    llega a cerrar, `abort()` (o salir del bloque `with`) lo descarta.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        chunks: List[Document],
+        parent_sections: List[Document],
+        manifest: Dict[str, Any]
+    ):
+        """
+        Args:
+            path: Fichero de salida
+            chunks: Chunks hijos indexados (los vectores llegan en este orden)
+            parent_sections: Secciones padre (small-to-big)
+            manifest: Campos del manifiesto (backend, documentos, chunking...)
+        """
+        if not chunks:
+            raise IndexArtifactError("Se requiere al menos un vector")
+
+        self.output = Path(path)
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        self.count = len(chunks)
+        self.rows = 0
+        self.header: Dict[str, Any] = {
+            **manifest,
+            "format_version": FORMAT_VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "count": self.count,
+            "dim": None,
+            "dtype": "float32",
+            "parent_sections": len(parent_sections),
+            "content_sha256": "0" * 64
+        }
+        self._digest = hashlib.sha256()
+        self._file = None
+        self._tmp_path = self.output.with_name(f".{self.output.name}.{os.getpid()}.tmp")
+        self._records_path = self.output.with_name(f".{self.output.name}.{os.getpid()}.records.tmp")
+        try:
+            self._records_length = self._write_records(chunks, parent_sections)
+        except BaseException:
+            self.abort()
+            raise
+
+    def __enter__(self) -> "IndexArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if self._file is not None or self._records_path.exists():
+            self.abort()
+
+    def _write_records(self, chunks: List[Document], parent_sections: List[Document]) -> int:
+        """
+        Serializa los registros a un fichero auxiliar, documento a documento
+        (mismo JSON que `json.dumps` del bloque completo). El hash empieza
+        por los registros, como en la lectura.
+
+        Returns:
+            int: Longitud del bloque de registros
+        """
+        length = 0
+        with open(self._records_path, "wb") as f:
+            def emit(text: str) -> None:
+                nonlocal length
+                data = text.encode("utf-8")
+                f.write(data)
+                self._digest.update(data)
+                length += len(data)
+
+            for prefix, documents in (('{"chunks": [', chunks), ('], "parents": [', parent_sections)):
+                emit(prefix)
+                for i, doc in enumerate(documents):
+                    emit((", " if i else "") + json.dumps(_serialize_document(doc), ensure_ascii=False))
+            emit("]}")
+        return length
+
+    def _header_bytes(self) -> bytes:
+        return json.dumps(self.header, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+    def _open(self, dim: int) -> None:
+        """Abre el fichero temporal: preámbulo, cabecera provisional, registros y relleno."""
+        self.header["dim"] = dim
+        header_bytes = self._header_bytes()
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(_PREAMBLE.pack(MAGIC, len(header_bytes), self._records_length))
+        self._file.write(header_bytes)
+        with open(self._records_path, "rb") as records:
+            shutil.copyfileobj(records, self._file, _COPY_BUFFER_BYTES)
+        self._records_path.unlink()
+        self._file.write(b"\x00" * (_aligned(self._file.tell()) - self._file.tell()))
+
+    def add_vectors(self, vectors: Any) -> None:
+        """
+        Normaliza (L2) un lote de embeddings y lo añade al bloque de vectores.
+
+        Args:
+            vectors: Lote de embeddings (filas en el orden de los chunks)
+        """
+        matrix = np.asarray(vectors, dtype="<f4")
+        if matrix.ndim != 2 or not len(matrix):
+            raise IndexArtifactError("Lote de vectores vacío o mal formado")
+        if self._file is None:
+            self._open(int(matrix.shape[1]))
+        elif matrix.shape[1] != self.header["dim"]:
+            raise IndexArtifactError(f"Dimensión {matrix.shape[1]} distinta de {self.header['dim']}")
+        if self.rows + len(matrix) > self.count:
+            raise IndexArtifactError("El número de chunks y de vectores no coincide")
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        data = (matrix / np.where(norms == 0, 1.0, norms)).astype("<f4", copy=False).tobytes()
+        self._file.write(data)
+        self._digest.update(data)
+        self.rows += len(matrix)
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Completa la cabecera con el hash del contenido y publica el fichero.
+
+        Returns:
+            Dict: Cabecera escrita
+        """
+        if self._file is None or self.rows != self.count:
+            raise IndexArtifactError("El número de chunks y de vectores no coincide")
+
+        provisional = len(self._header_bytes())
+        self.header["content_sha256"] = self._digest.hexdigest()
+        header_bytes = self._header_bytes()
+        if len(header_bytes) != provisional:
+            raise IndexArtifactError("La cabecera cambió de longitud al completar el hash")
+        self._file.seek(_PREAMBLE.size)
+        self._file.write(header_bytes)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.output)
+
+        logger.info(f"Artefacto de índice escrito: {self.output} ({self.count} chunks, dim {self.header['dim']})")
+        return self.header
+
+    def abort(self) -> None:
+        """Descarta el fichero temporal y el auxiliar de registros."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._tmp_path.unlink(missing_ok=True)
+        self._records_path.unlink(missing_ok=True)
+
+
+def write_index_artifact(
+    path: str,
+    chunks: List[Document],
+    vectors: Any,
+    parent_sections: List[Document],
+    manifest: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Escribe un artefacto de índice con los vectores ya calculados (lista o
+    matriz), por lotes con `IndexArtifactWriter`.
+
+    Args:
+        path: Fichero de salida
+        chunks: Chunks hijos indexados
+        vectors: Embedding de cada chunk (mismo orden)
+        parent_sections: Secciones padre (small-to-big)
+        manifest: Campos del manifiesto (backend, documentos, chunking...)
+
+    Returns:
+        Dict: Cabecera escrita
+    """
+    if len(chunks) != len(vectors):
+        raise IndexArtifactError("El número de chunks y de vectores no coincide")
+
+    with IndexArtifactWriter(path, chunks, parent_sections, manifest) as writer:
+        for start in range(0, len(vectors), _WRITE_BATCH_ROWS):
+            writer.add_vectors(vectors[start:start + _WRITE_BATCH_ROWS])
+        return writer.close()
+
+
+class IndexArtifact:
+    """
+    Artefacto cargado: cabecera, registros y matriz de embeddings en mmap
+    de solo lectura (las páginas se comparten entre procesos).
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any], chunks: List[Document],
+                 parents: List[Document], vectors: np.ndarray):
+        self.path = Path(path)
+        self.header = header
+        self.chunks = chunks
+        self.parents = parents
+        self.vectors = vectors
+
+    @staticmethod
+    def read_header(path: str) -> Tuple[Dict[str, Any], int, int]:
+        """
+        Lee solo la cabecera (sin registros ni vectores).
+
+        Args:
+            path: Fichero del artefacto
+
+        Returns:
+            Tuple: Cabecera, offset y longitud del bloque de registros
+        """
+        with open(path, "rb") as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) != _PREAMBLE.size:
+                raise IndexArtifactError(f"Artefacto truncado: {path}")
+            magic, header_length, records_length = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC:
+                raise IndexArtifactError(f"No es un artefacto de índice: {path}")
+            header = json.loads(f.read(header_length).decode("utf-8"))
+
+        if header.get("format_version") != FORMAT_VERSION:
+            raise IndexArtifactError(f"Versión de formato no soportada: {header.get('format_version')}")
+        return header, _PREAMBLE.size + header_length, records_length
+
+    @classmethod
+    def load(cls, path: str, verify: bool = False) -> "IndexArtifact":
+        """
+        Carga un artefacto mapeando los vectores en memoria.
+
+        Args:
+            path: Fichero del artefacto
+            verify: Comprobar el hash del contenido (lee el fichero completo)
+
+        Returns:
+            IndexArtifact: Artefacto cargado
+        """
+        header, records_offset, records_length = cls.read_header(path)
+        vectors_offset = _aligned(records_offset + records_length)
+        shape = (header["count"], header["dim"])
+
+        if os.path.getsize(path) < vectors_offset + shape[0] * shape[1] * 4:
+            raise IndexArtifactError(f"Artefacto truncado: {path}")
+
+        with open(path, "rb") as f:
+            f.seek(records_offset)
+            records_bytes = f.read(records_length)
+        vectors = np.memmap(path, dtype="<f4", mode="r", offset=vectors_offset, shape=shape)
+
+        if verify:
+            digest = hashlib.sha256(records_bytes)
+            for start in range(0, shape[0], _WRITE_BATCH_ROWS):
+                digest.update(vectors[start:start + _WRITE_BATCH_ROWS].tobytes())
+            if digest.hexdigest() != header["content_sha256"]:
+                raise IndexArtifactError(f"Hash de contenido inválido: {path}")
+
+        records = json.loads(records_bytes.decode("utf-8"))
+        return cls(
+            path,
+            header,
+            _deserialize_documents(records["chunks"]),
+            _deserialize_documents(records["parents"]),
+            vectors
+        )
+
+
+class ArtifactDocStore:
+    """
+    DocStore en memoria de las secciones padre de un artefacto, con la
+    interfaz de lectura de SecurityDocStore.
+    """
+
+    def __init__(self, parents: List[Document]):
+        self._sections = {doc.metadata["chunk_id"]: doc for doc in parents}
+
+    def exists(self) -> bool:
+        """True si el artefacto incluye secciones padre."""
+        return bool(self._sections)
+
+    def get_sections(self, chunk_ids: List[str]) -> Dict[str, Document]:
+        """Secciones padre encontradas, indexadas por chunk_id."""
+        return {cid: self._sections[cid] for cid in dict.fromkeys(chunk_ids) if cid in self._sections}
+
+    def count(self) -> int:
+        """Número de secciones padre."""
+        return len(self._sections)
+
+    def close(self) -> None:
+        """Sin recursos que liberar."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas básicas."""
+        return {"db_path": None, "exists": self.exists(), "parent_sections": self.count()}
+
+
+class FlatVectorIndex(VectorStore):
+    """
+    Vector store de solo lectura sobre un artefacto: búsqueda exacta por
+    producto escalar (vectores normalizados = similitud coseno) y MMR.
+    """
+
+    def __init__(self, artifact: IndexArtifact, embedding: Embeddings):
+        """
+        Args:
+            artifact: Artefacto cargado
+            embedding: Modelo de embeddings para las consultas (mismo backend)
+        """
+        self.artifact = artifact
+        self._embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("FlatVectorIndex es de solo lectura: reconstruya el artefacto")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "FlatVectorIndex":
+        raise NotImplementedError("Use `python -m src.build_index` para crear artefactos")
+
+    def _scores(self, embedding: List[float]) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return self.artifact.vectors @ (query / norm if norm else query)
+
+    def _top(self, scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def _search(self, embedding: List[float], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Filas de los k chunks más similares y su similitud, de mayor a menor."""
+        scores = self._scores(embedding)
+        top = self._top(scores, k)
+        return top, scores[top]
+
+    def get_search_info(self) -> Dict[str, Any]:
+        """Tipo de búsqueda y parámetros."""
+        return {"type": "flat", "count": self.artifact.header.get("count")}
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Los k chunks más similares con su similitud coseno."""
+        ids, scores = self._search(embedding, k)
+        return [(self.artifact.chunks[i], float(score)) for i, score in zip(ids, scores)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        """Los k chunks más similares a un vector."""
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        """Los k chunks más similares a una consulta."""
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Los k chunks más similares a una consulta, con su similitud."""
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda similarity: max(0.0, similarity)
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        """MMR sobre los `fetch_k` candidatos más similares."""
+        candidates, _ = self._search(embedding, fetch_k)
+        selected = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            np.asarray(self.artifact.vectors[candidates]),
+            lambda_mult=lambda_mult,
+            k=min(k, len(candidates))
+        )
+        return [self.artifact.chunks[candidates[i]] for i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        """MMR para una consulta."""
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding.embed_query(query), k, fetch_k, lambda_mult
+        )
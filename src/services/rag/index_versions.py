@@ -0,0 +1,218 @@
+"""
+Index Versions Module para RAG System
+Versiones del índice (blue/green) con puntero a la versión activa, recuento
+de lectores por versión y recolección de versiones antiguas. El
+almacenamiento local son directorios con puntero ACTIVE atómico; el del
+servicio vectorial compartido está en `vector_service`.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+import os
+import shutil
+import threading
+import uuid
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Versión que representa el índice heredado en la raíz del directorio
+LEGACY_VERSION = "legacy"
+
+
+class BaseIndexVersionManager(ABC):
+    """
+    Lógica común a cualquier almacenamiento de versiones: nombres de
+    versión, recuento de lectores por proceso y qué versiones se recolectan.
+
+    Cada almacenamiento implementa el puntero a la versión activa, el
+    listado de versiones y el borrado de una versión.
+    """
+
+    def __init__(self, keep_versions: int = 2):
+        """
+        Args:
+            keep_versions: Versiones más recientes que se conservan (incluida la activa)
+        """
+        self.keep_versions = max(1, keep_versions)
+        self._readers: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def active_version(self) -> str:
+        """Versión activa (o `legacy` si no hay puntero válido)."""
+
+    @abstractmethod
+    def activate(self, version: str) -> None:
+        """Apunta el puntero a una versión ya construida y validada."""
+
+    @abstractmethod
+    def list_versions(self) -> List[str]:
+        """Versiones almacenadas, de la más antigua a la más reciente."""
+
+    @abstractmethod
+    def _delete_version(self, version: str) -> None:
+        """Borra el almacenamiento de una versión."""
+
+    def new_version(self) -> str:
+        """
+        Reserva el nombre (ordenable por fecha) de una versión nueva.
+
+        Returns:
+            str: Nombre de la versión
+        """
+        return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    # ========================================================================
+    # LECTORES
+    # ========================================================================
+
+    def acquire(self, version: str) -> None:
+        """Registra un lector de una versión."""
+        with self._lock:
+            self._readers[version] = self._readers.get(version, 0) + 1
+
+    def release(self, version: str) -> None:
+        """Libera un lector de una versión."""
+        with self._lock:
+            remaining = self._readers.get(version, 0) - 1
+            if remaining > 0:
+                self._readers[version] = remaining
+            else:
+                self._readers.pop(version, None)
+
+    def readers(self, version: str) -> int:
+        """Lectores en curso de una versión."""
+        with self._lock:
+            return self._readers.get(version, 0)
+
+    # ========================================================================
+    # RECOLECCIÓN
+    # ========================================================================
+
+    def collectable_versions(self) -> List[str]:
+        """
+        Versiones que pueden borrarse: fuera de las `keep_versions` más
+        recientes, distintas de la activa y sin lectores.
+
+        Returns:
+            List[str]: Versiones recolectables
+        """
+        active = self.active_version()
+        versions = self.list_versions()
+        stale = versions[:-self.keep_versions] if len(versions) > self.keep_versions else []
+        return [v for v in stale if v != active and self.readers(v) == 0]
+
+    def collect(self) -> List[str]:
+        """
+        Borra las versiones recolectables.
+
+        Returns:
+            List[str]: Versiones borradas
+        """
+        removed = []
+        for version in self.collectable_versions():
+            try:
+                self._delete_version(version)
+                removed.append(version)
+                logger.info(f"Versión de índice eliminada: {version}")
+            except Exception as e:
+                logger.warning(f"No se pudo eliminar la versión {version}: {str(e)}")
+        return removed
+
+    def discard(self, version: str) -> None:
+        """Borra una versión fallida (nunca la activa ni la heredada)."""
+        if version in (LEGACY_VERSION, self.active_version()):
+            return
+        try:
+            self._delete_version(version)
+        except Exception as e:
+            logger.warning(f"No se pudo descartar la versión {version}: {str(e)}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Versión activa, versiones almacenadas y lectores por versión."""
+        with self._lock:
+            readers = dict(self._readers)
+        return {
+            "active_version": self.active_version(),
+            "versions": self.list_versions(),
+            "readers": readers,
+            "keep_versions": self.keep_versions
+        }
+
+
+class IndexVersionManager(BaseIndexVersionManager):
+    """
+    Gestor de versiones del índice vectorial en disco.
+
+    Estructura en disco:
+    - `<root>/versions/<versión>/`: un índice completo (Chroma + docstore)
+    - `<root>/ACTIVE`: nombre de la versión activa, reemplazado con `os.replace`
+
+    Sin puntero ACTIVE (o si apunta a una versión que ya no existe) la
+    versión activa es el índice heredado de la raíz, que nunca se borra.
+    """
+
+    def __init__(self, root: str, keep_versions: int = 2):
+        """
+        Args:
+            root: Directorio raíz del índice
+            keep_versions: Versiones más recientes que se conservan (incluida la activa)
+        """
+        super().__init__(keep_versions)
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+        self.pointer_path = self.root / "ACTIVE"
+
+    def path_for(self, version: str) -> Path:
+        """Directorio de una versión."""
+        if version == LEGACY_VERSION:
+            return self.root
+        return self.versions_dir / version
+
+    def active_version(self) -> str:
+        """
+        Versión activa según el puntero ACTIVE.
+
+        Returns:
+            str: Nombre de la versión (o `legacy`)
+        """
+        try:
+            version = self.pointer_path.read_text(encoding="utf-8").strip()
+        except OSError:
+            return LEGACY_VERSION
+        if version and self.path_for(version).is_dir():
+            return version
+        return LEGACY_VERSION
+
+    def activate(self, version: str) -> None:
+        """
+        Apunta ACTIVE a una versión de forma atómica (escritura + rename).
+
+        Args:
+            version: Versión ya construida y validada
+        """
+        if not self.path_for(version).is_dir():
+            raise ValueError(f"La versión {version} no existe")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.pointer_path.with_name(f".ACTIVE.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+        logger.info(f"Índice activo: {version}")
+
+    def list_versions(self) -> List[str]:
+        """Versiones en disco, de la más antigua a la más reciente."""
+        if not self.versions_dir.is_dir():
+            return []
+        return sorted(p.name for p in self.versions_dir.iterdir() if p.is_dir())
+
+    def _delete_version(self, version: str) -> None:
+        path = self.path_for(version)
+        if path.is_dir():
+            shutil.rmtree(path)
@@ -0,0 +1,427 @@
+"""
+IVF-PQ Module para RAG System
+Índice aproximado IVF-PQ en NumPy para bases de conocimiento de millones de
+chunks: cuantización gruesa en listas invertidas (k-means) más
+cuantización de producto (PQ) de los residuos. La búsqueda recorre solo
+las `nprobe` listas más cercanas con tablas de distancia asimétricas y
+re-ordena los mejores candidatos con los vectores exactos del artefacto,
+que siguen en disco (mmap).
+
+Se guarda junto al artefacto como `<artefacto>.ivfpq` (npz sin comprimir),
+ligado a él por su `content_sha256`:
+- centroids (nlist x dim) float32
+- codebooks (m x ksub x dsub) float32
+- codes (count x m) uint8, agrupados por lista
+- list_ids (count) int64: fila del artefacto de cada código
+- list_offsets (nlist + 1) int64: inicio de cada lista en `codes`
+- meta: cabecera JSON
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import math
+import os
+import time
+import zipfile
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import setup_logger
+from .index_artifact import FlatVectorIndex, IndexArtifact, IndexArtifactError
+
+logger = setup_logger(__name__)
+
+IVFPQ_FORMAT_VERSION = 1
+IVFPQ_SUFFIX = ".ivfpq"
+# 8 bits por subcuantizador: un byte por subespacio
+KSUB = 256
+
+
+def ivfpq_path_for(artifact_path: str) -> Path:
+    """Fichero IVF-PQ asociado a un artefacto."""
+    return Path(f"{artifact_path}{IVFPQ_SUFFIX}")
+
+
+def default_nlist(count: int) -> int:
+    """Listas invertidas por defecto: ~4·sqrt(n) (4000 para un millón de chunks)."""
+    return max(1, min(count, int(4 * math.sqrt(count))))
+
+
+def default_subquantizers(dim: int) -> int:
+    """Subcuantizadores por defecto: subespacios de 16 dimensiones (96 bytes por vector con ada-002)."""
+    for dsub in (16, 8, 4, 2):
+        if dim % dsub == 0:
+            return dim // dsub
+    return dim
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray, batch_size: int) -> np.ndarray:
+    """
+    Centroide más cercano (L2) de cada fila, por lotes.
+
+    Args:
+        data: Vectores (puede ser un memmap)
+        centroids: Centroides
+        batch_size: Filas por lote (acota la matriz de distancias)
+
+    Returns:
+        np.ndarray: Índice del centroide de cada fila
+    """
+    # ||x - c||² = ||x||² - 2·x·c + ||c||²; ||x||² no cambia el argmin
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    scaled = -2.0 * centroids.T
+    assignment = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), batch_size):
+        batch = np.ascontiguousarray(data[start:start + batch_size], dtype=np.float32)
+        assignment[start:start + len(batch)] = np.argmin(batch @ scaled + centroid_norms, axis=1)
+    return assignment
+
+
+def train_kmeans(
+    data: np.ndarray,
+    k: int,
+    iterations: int = 20,
+    batch_size: int = 8192,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    K-means (Lloyd) con asignación por lotes.
+
+    Los clusters vacíos se re-inicializan con puntos aleatorios.
+
+    Args:
+        data: Vectores de entrenamiento (n x d)
+        k: Número de centroides (como mucho n)
+        iterations: Iteraciones de Lloyd
+        batch_size: Filas por lote en la asignación
+        seed: Semilla (entrenamiento reproducible)
+
+    Returns:
+        np.ndarray: Centroides (k x d) float32
+    """
+    rng = np.random.default_rng(seed)
+    # Contiguo: los subespacios PQ llegan como vistas con stride
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = _assign(data, centroids, batch_size)
+        counts = np.bincount(assignment, minlength=k)
+        nonempty = np.flatnonzero(counts)
+
+        # Sumas por cluster, una dimensión cada vez (sin copiar la muestra)
+        sums = np.stack([np.bincount(assignment, weights=data[:, d], minlength=k) for d in range(data.shape[1])], axis=1)
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+
+    return centroids
+
+
+class IVFPQIndex:
+    """
+    Listas invertidas con códigos PQ de los residuos respecto al centroide.
+
+    Para vectores normalizados la similitud aproximada de un vector x de la
+    lista l es `q·c_l + Σ_j q_j·pq_j[código_j]`: la tabla `q_j·pq_j` se
+    calcula una vez por consulta (m x ksub) y cada candidato cuesta m
+    lecturas de la tabla, sin descomprimir vectores.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        codebooks: np.ndarray,
+        codes: np.ndarray,
+        list_ids: np.ndarray,
+        list_offsets: np.ndarray,
+        meta: Dict[str, Any]
+    ):
+        """
+        Args:
+            centroids: Centroides gruesos (nlist x dim)
+            codebooks: Centroides PQ por subespacio (m x ksub x dsub)
+            codes: Códigos PQ agrupados por lista (count x m)
+            list_ids: Fila del artefacto de cada código
+            list_offsets: Inicio de cada lista en `codes` (nlist + 1)
+            meta: Cabecera (parámetros y artefacto de origen)
+        """
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.codes = codes
+        self.list_ids = list_ids
+        self.list_offsets = list_offsets
+        self.meta = meta
+        self._centroid_norms = (centroids ** 2).sum(axis=1)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def m(self) -> int:
+        return self.codebooks.shape[0]
+
+    @property
+    def dsub(self) -> int:
+        return self.codebooks.shape[2]
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        nlist: Optional[int] = None,
+        m: Optional[int] = None,
+        train_size: int = 100_000,
+        iterations: int = 20,
+        batch_size: int = 8192,
+        seed: int = 0,
+        meta: Optional[Dict[str, Any]] = None
+    ) -> "IVFPQIndex":
+        """
+        Entrena los cuantizadores con una muestra y codifica todos los vectores.
+
+        Args:
+            vectors: Vectores normalizados (count x dim), normalmente el memmap del artefacto
+            nlist: Listas invertidas (por defecto ~4·sqrt(count))
+            m: Subcuantizadores; debe dividir a dim (por defecto subespacios de 16)
+            train_size: Vectores de la muestra de entrenamiento
+            iterations: Iteraciones de k-means
+            batch_size: Filas por lote en entrenamiento y codificación
+            seed: Semilla
+            meta: Campos adicionales de la cabecera
+
+        Returns:
+            IVFPQIndex: Índice construido
+        """
+        count, dim = vectors.shape
+        nlist = min(nlist or default_nlist(count), count)
+        m = m or default_subquantizers(dim)
+        if dim % m:
+            raise ValueError(f"m={m} no divide la dimensión {dim}")
+        dsub = dim // m
+        start = time.perf_counter()
+
+        # Muestra ordenada: lectura secuencial del memmap
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(rng.choice(count, min(train_size, count), replace=False))
+        sample = np.asarray(vectors[sample_ids], dtype=np.float32)
+
+        centroids = train_kmeans(sample, nlist, iterations, batch_size, seed)
+        residuals = sample - centroids[_assign(sample, centroids, batch_size)]
+        codebooks = np.stack([
+            train_kmeans(residuals[:, j * dsub:(j + 1) * dsub], KSUB, iterations, batch_size, seed + j)
+            for j in range(m)
+        ])
+        logger.info(f"IVF-PQ entrenado: nlist={nlist}, m={m}, muestra={len(sample)} "
+                    f"({time.perf_counter() - start:.1f}s)")
+
+        # Codificación por lotes y agrupación por lista
+        assignment = np.empty(count, dtype=np.int64)
+        codes = np.empty((count, m), dtype=np.uint8)
+        for batch_start in range(0, count, batch_size):
+            batch = np.asarray(vectors[batch_start:batch_start + batch_size], dtype=np.float32)
+            batch_end = batch_start + len(batch)
+            batch_assignment = _assign(batch, centroids, batch_size)
+            residual = batch - centroids[batch_assignment]
+            for j in range(m):
+                codes[batch_start:batch_end, j] = _assign(residual[:, j * dsub:(j + 1) * dsub], codebooks[j], batch_size)
+            assignment[batch_start:batch_end] = batch_assignment
+
+        order = np.argsort(assignment, kind="stable")
+        list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=nlist)))).astype(np.int64)
+
+        header = {
+            **(meta or {}),
+            "format_version": IVFPQ_FORMAT_VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "count": int(count),
+            "dim": int(dim),
+            "nlist": int(nlist),
+            "m": int(m),
+            "ksub": int(codebooks.shape[1]),
+            "train_size": int(len(sample)),
+            "build_seconds": round(time.perf_counter() - start, 2)
+        }
+        logger.info(f"IVF-PQ codificado: {count} vectores en {header['build_seconds']}s")
+        return cls(centroids, codebooks, codes[order], order, list_offsets, header)
+
+    def search(
+        self,
+        query: List[float],
+        k: int,
+        vectors: np.ndarray,
+        nprobe: int = 16,
+        rerank: int = 256
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Los k vectores más similares: candidatos por ADC en las `nprobe`
+        listas más cercanas y re-ranking exacto de los `rerank` mejores.
+
+        Args:
+            query: Vector de la consulta
+            k: Resultados
+            vectors: Vectores exactos (memmap del artefacto)
+            nprobe: Listas exploradas (más listas: más recall y más latencia)
+            rerank: Candidatos re-ordenados con el vector exacto
+
+        Returns:
+            Tuple: Filas del artefacto y similitud coseno exacta, de mayor a menor
+        """
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+
+        # Listas más cercanas (L2, igual que en la asignación)
+        nprobe = max(1, min(nprobe, self.nlist))
+        coarse = self.centroids @ q
+        probe = np.argpartition(self._centroid_norms - 2.0 * coarse, nprobe - 1)[:nprobe]
+        starts, ends = self.list_offsets[probe], self.list_offsets[probe + 1]
+        sizes = ends - starts
+        if not sizes.sum():
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+        # Tabla asimétrica: q_j · pq_j[c] para cada subespacio j y centroide PQ c
+        table = np.einsum("jcd,jd->jc", self.codebooks, q.reshape(self.m, self.dsub))
+        approx = np.repeat(coarse[probe], sizes) + table[np.arange(self.m), self.codes[positions]].sum(axis=1)
+
+        pool = min(max(k, rerank), len(positions))
+        best = np.argpartition(-approx, pool - 1)[:pool]
+        ids = np.sort(self.list_ids[positions[best]])
+        exact = np.asarray(vectors[ids], dtype=np.float32) @ q
+        order = np.argsort(-exact)[:k]
+        return ids[order], exact[order]
+
+    def save(self, path: str) -> None:
+        """
+        Guarda el índice de forma atómica (fichero temporal + rename).
+
+        Args:
+            path: Fichero de salida
+        """
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                codebooks=self.codebooks,
+                codes=self.codes,
+                list_ids=self.list_ids,
+                list_offsets=self.list_offsets,
+                meta=np.array(json.dumps(self.meta, ensure_ascii=False, sort_keys=True))
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output)
+        logger.info(f"Índice IVF-PQ escrito: {output}")
+
+    @classmethod
+    def load(cls, path: str) -> "IVFPQIndex":
+        """
+        Carga un índice IVF-PQ (códigos y centroides en memoria).
+
+        Args:
+            path: Fichero `.ivfpq`
+
+        Returns:
+            IVFPQIndex: Índice cargado
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("format_version") != IVFPQ_FORMAT_VERSION:
+                    raise IndexArtifactError(f"Versión de formato IVF-PQ no soportada: {meta.get('format_version')}")
+                return cls(
+                    data["centroids"],
+                    data["codebooks"],
+                    data["codes"],
+                    data["list_ids"],
+                    data["list_offsets"],
+                    meta
+                )
+        except IndexArtifactError:
+            raise
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise IndexArtifactError(f"Índice IVF-PQ inválido {path}: {str(e)}") from e
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Parámetros y tamaño del índice."""
+        code_bytes = int(self.codes.nbytes + self.list_ids.nbytes)
+        list_sizes = np.diff(self.list_offsets)
+        return {
+            "count": self.meta.get("count"),
+            "nlist": self.nlist,
+            "m": self.m,
+            "ksub": self.codebooks.shape[1],
+            "code_bytes": code_bytes,
+            "compression_ratio": round(self.meta.get("count", 0) * self.meta.get("dim", 0) * 4 / code_bytes, 1)
+                                 if code_bytes else None,
+            "max_list_size": int(list_sizes.max()) if len(list_sizes) else 0,
+            "created_at": self.meta.get("created_at")
+        }
+
+
+class IVFPQVectorIndex(FlatVectorIndex):
+    """
+    Vector store de solo lectura sobre un artefacto con búsqueda IVF-PQ:
+    mismas operaciones que `FlatVectorIndex` (similitud y MMR), con
+    candidatos aproximados y similitudes exactas.
+    """
+
+    def __init__(self, artifact: IndexArtifact, embedding: Embeddings, ivfpq: IVFPQIndex,
+                 nprobe: int = 16, rerank: int = 256):
+        """
+        Args:
+            artifact: Artefacto cargado (vectores exactos en mmap)
+            embedding: Modelo de embeddings para las consultas
+            ivfpq: Índice IVF-PQ construido sobre ese artefacto
+            nprobe: Listas exploradas por consulta
+            rerank: Candidatos re-ordenados con el vector exacto
+        """
+        if ivfpq.meta.get("artifact_sha256") != artifact.header.get("content_sha256"):
+            raise IndexArtifactError("El índice IVF-PQ se construyó sobre otro artefacto")
+        super().__init__(artifact, embedding)
+        self.ivfpq = ivfpq
+        self.nprobe = nprobe
+        self.rerank = rerank
+
+    def _search(self, embedding: List[float], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.ivfpq.search(embedding, k, self.artifact.vectors, nprobe=self.nprobe, rerank=self.rerank)
+
+    def get_search_info(self) -> Dict[str, Any]:
+        """Tipo de búsqueda y parámetros."""
+        return {"type": "ivfpq", "nprobe": self.nprobe, "rerank": self.rerank, **self.ivfpq.get_stats()}
+
+
+def build_ivfpq_for_artifact(artifact_path: str, output: Optional[str] = None, **params: Any) -> IVFPQIndex:
+    """
+    Construye y guarda el índice IVF-PQ de un artefacto.
+
+    Args:
+        artifact_path: Artefacto de origen
+        output: Fichero de salida (por defecto `<artefacto>.ivfpq`)
+        **params: Parámetros de `IVFPQIndex.build` (nlist, m, train_size...)
+
+    Returns:
+        IVFPQIndex: Índice construido
+    """
+    artifact = IndexArtifact.load(artifact_path)
+    ivfpq = IVFPQIndex.build(
+        artifact.vectors,
+        meta={
+            "artifact_sha256": artifact.header["content_sha256"],
+            "embedding_backend": artifact.header.get("embedding_backend")
+        },
+        **params
+    )
+    ivfpq.save(str(output or ivfpq_path_for(artifact_path)))
+    return ivfpq
@@ -0,0 +1,313 @@
+"""
+Quantization Module para RAG System
+Almacenamiento cuantizado de los embeddings de un artefacto para reducir la
+memoria residente de cada worker y pod:
+- int8: un byte por dimensión (4x menos que float32) con desplazamiento y
+  escala por dimensión calibrados sobre una muestra
+- binary: un bit por dimensión (32x menos), umbral y magnitud por dimensión
+
+La búsqueda puntúa todos los códigos contra la consulta en float (producto
+escalar asimétrico, vectorizado por bloques) y re-ordena un conjunto pequeño
+de candidatos con los vectores exactos del artefacto, que siguen en disco
+(mmap): solo se leen las filas re-ordenadas.
+
+Se guarda junto al artefacto como `<artefacto>.int8` / `<artefacto>.binary`
+(npz sin comprimir), ligado a él por su `content_sha256`:
+- offset (dim) float32
+- scale (dim) float32
+- codes (count x dim) uint8 | (count x ceil(dim/8)) uint8 empaquetados
+- meta: cabecera JSON
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import time
+import zipfile
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import setup_logger
+from .index_artifact import FlatVectorIndex, IndexArtifact, IndexArtifactError
+
+logger = setup_logger(__name__)
+
+QUANTIZATION_FORMAT_VERSION = 1
+QUANTIZED_STORAGES = ("int8", "binary")
+# Cuantiles de calibración int8: los valores extremos se saturan en vez de
+# estirar la escala de toda la dimensión
+_INT8_CLIP_QUANTILE = 0.001
+# Elementos por bloque al puntuar (~16 MB de float32 temporales)
+_SCORE_BLOCK_ELEMENTS = 1 << 22
+
+
+def quantized_path_for(artifact_path: str, storage: str) -> Path:
+    """Fichero cuantizado (`int8` o `binary`) asociado a un artefacto."""
+    return Path(f"{artifact_path}.{storage}")
+
+
+class QuantizedVectors:
+    """
+    Embeddings cuantizados de un artefacto.
+
+    int8: x ≈ offset + scale · c con c en [0, 255], así que
+    q·x ≈ q·offset + c·(scale ∘ q).
+    binary: x ≈ offset + scale · (2b - 1) con b en {0, 1}, así que
+    q·x ≈ q·(offset - scale) + 2 · b·(scale ∘ q).
+    """
+
+    def __init__(self, storage: str, offset: np.ndarray, scale: np.ndarray, codes: np.ndarray,
+                 meta: Dict[str, Any]):
+        if storage not in QUANTIZED_STORAGES:
+            raise ValueError(f"Almacenamiento cuantizado no soportado: {storage}")
+        self.storage = storage
+        self.offset = offset
+        self.scale = scale
+        self.codes = codes
+        self.meta = meta
+
+    @property
+    def count(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.offset.shape[0]
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        storage: str = "int8",
+        sample_size: int = 100_000,
+        batch_size: int = 8192,
+        seed: int = 0,
+        meta: Optional[Dict[str, Any]] = None
+    ) -> "QuantizedVectors":
+        """
+        Calibra desplazamiento y escala por dimensión con una muestra y
+        codifica todos los vectores por lotes.
+
+        Args:
+            vectors: Vectores normalizados (count x dim), normalmente el memmap del artefacto
+            storage: `int8` o `binary`
+            sample_size: Vectores de la muestra de calibración
+            batch_size: Filas por lote de codificación
+            seed: Semilla de la muestra
+            meta: Campos adicionales de la cabecera
+
+        Returns:
+            QuantizedVectors: Vectores cuantizados
+        """
+        if storage not in QUANTIZED_STORAGES:
+            raise ValueError(f"Almacenamiento cuantizado no soportado: {storage}")
+        count, dim = vectors.shape
+        start = time.perf_counter()
+
+        # Muestra ordenada: lectura secuencial del memmap
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(count, min(sample_size, count), replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+
+        if storage == "int8":
+            low = np.quantile(sample, _INT8_CLIP_QUANTILE, axis=0)
+            high = np.quantile(sample, 1 - _INT8_CLIP_QUANTILE, axis=0)
+            offset = low.astype(np.float32)
+            scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+            codes = np.empty((count, dim), dtype=np.uint8)
+        else:
+            offset = sample.mean(axis=0).astype(np.float32)
+            scale = np.maximum(np.abs(sample - offset).mean(axis=0), 1e-12).astype(np.float32)
+            codes = np.empty((count, (dim + 7) // 8), dtype=np.uint8)
+
+        for begin in range(0, count, batch_size):
+            batch = np.asarray(vectors[begin:begin + batch_size], dtype=np.float32)
+            if storage == "int8":
+                codes[begin:begin + len(batch)] = np.clip(np.rint((batch - offset) / scale), 0, 255)
+            else:
+                codes[begin:begin + len(batch)] = np.packbits(batch > offset, axis=1)
+
+        header = {
+            **(meta or {}),
+            "format_version": QUANTIZATION_FORMAT_VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "storage": storage,
+            "count": int(count),
+            "dim": int(dim),
+            "sample_size": len(rows),
+            "build_seconds": round(time.perf_counter() - start, 2)
+        }
+        logger.info(f"Vectores cuantizados ({storage}): {count} en {header['build_seconds']}s")
+        return cls(storage, offset, scale, codes, header)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Producto escalar aproximado de la consulta con todos los vectores.
+
+        Args:
+            query: Vector de la consulta (float32, normalizado)
+
+        Returns:
+            np.ndarray: Similitud aproximada por fila
+        """
+        weights = self.scale * query
+        if self.storage == "int8":
+            base = float(self.offset @ query)
+        else:
+            base = float((self.offset - self.scale) @ query)
+            weights = 2.0 * weights
+
+        rows = max(1, _SCORE_BLOCK_ELEMENTS // self.dim)
+        scores = np.empty(self.count, dtype=np.float32)
+        for begin in range(0, self.count, rows):
+            block = self.codes[begin:begin + rows]
+            if self.storage == "binary":
+                block = np.unpackbits(block, axis=1, count=self.dim)
+            scores[begin:begin + len(block)] = block.astype(np.float32) @ weights
+        return scores + base
+
+    def search(self, query: List[float], k: int, vectors: np.ndarray,
+               rerank: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Los k vectores más similares: candidatos por similitud aproximada y
+        re-ranking exacto de los `rerank` mejores.
+
+        Args:
+            query: Vector de la consulta
+            k: Resultados
+            vectors: Vectores exactos (memmap del artefacto)
+            rerank: Candidatos re-ordenados con el vector exacto
+
+        Returns:
+            Tuple: Filas del artefacto y similitud coseno exacta, de mayor a menor
+        """
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+
+        approx = self.scores(q)
+        pool = min(max(k, rerank), self.count)
+        ids = np.sort(np.argpartition(-approx, pool - 1)[:pool])
+        exact = np.asarray(vectors[ids], dtype=np.float32) @ q
+        order = np.argsort(-exact)[:k]
+        return ids[order], exact[order]
+
+    def save(self, path: str) -> None:
+        """
+        Guarda los vectores cuantizados de forma atómica (fichero temporal + rename).
+
+        Args:
+            path: Fichero de salida
+        """
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                offset=self.offset,
+                scale=self.scale,
+                codes=self.codes,
+                meta=np.array(json.dumps(self.meta, ensure_ascii=False, sort_keys=True))
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output)
+        logger.info(f"Vectores cuantizados escritos: {output}")
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedVectors":
+        """
+        Carga vectores cuantizados (códigos en memoria).
+
+        Args:
+            path: Fichero `.int8` / `.binary`
+
+        Returns:
+            QuantizedVectors: Vectores cargados
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("format_version") != QUANTIZATION_FORMAT_VERSION:
+                    raise IndexArtifactError(
+                        f"Versión de formato cuantizado no soportada: {meta.get('format_version')}"
+                    )
+                return cls(meta.get("storage"), data["offset"], data["scale"], data["codes"], meta)
+        except IndexArtifactError:
+            raise
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise IndexArtifactError(f"Vectores cuantizados inválidos {path}: {str(e)}") from e
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tipo y tamaño de los códigos."""
+        code_bytes = int(self.codes.nbytes + self.offset.nbytes + self.scale.nbytes)
+        return {
+            "storage": self.storage,
+            "count": self.count,
+            "dim": self.dim,
+            "code_bytes": code_bytes,
+            "compression_ratio": round(self.count * self.dim * 4 / code_bytes, 1),
+            "created_at": self.meta.get("created_at")
+        }
+
+
+class QuantizedVectorIndex(FlatVectorIndex):
+    """
+    Vector store de solo lectura sobre un artefacto con los embeddings
+    cuantizados en memoria: mismas operaciones que `FlatVectorIndex`
+    (similitud y MMR), con candidatos aproximados y similitudes exactas.
+    """
+
+    def __init__(self, artifact: IndexArtifact, embedding: Embeddings, quantized: QuantizedVectors,
+                 rerank: int = 100):
+        """
+        Args:
+            artifact: Artefacto cargado (vectores exactos en mmap)
+            embedding: Modelo de embeddings para las consultas
+            quantized: Vectores cuantizados de ese artefacto
+            rerank: Candidatos re-ordenados con el vector exacto
+        """
+        if quantized.meta.get("artifact_sha256") != artifact.header.get("content_sha256"):
+            raise IndexArtifactError("Los vectores cuantizados se construyeron sobre otro artefacto")
+        super().__init__(artifact, embedding)
+        self.quantized = quantized
+        self.rerank = rerank
+
+    def _search(self, embedding: List[float], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.quantized.search(embedding, k, self.artifact.vectors, rerank=self.rerank)
+
+    def get_search_info(self) -> Dict[str, Any]:
+        """Tipo de búsqueda y parámetros."""
+        return {"type": self.quantized.storage, "rerank": self.rerank, **self.quantized.get_stats()}
+
+
+def build_quantized_for_artifact(artifact_path: str, storage: str = "int8", output: Optional[str] = None,
+                                 **params: Any) -> QuantizedVectors:
+    """
+    Cuantiza y guarda los embeddings de un artefacto.
+
+    Args:
+        artifact_path: Artefacto de origen
+        storage: `int8` o `binary`
+        output: Fichero de salida (por defecto `<artefacto>.<storage>`)
+        **params: Parámetros de `QuantizedVectors.build` (sample_size, batch_size, seed)
+
+    Returns:
+        QuantizedVectors: Vectores cuantizados
+    """
+    artifact = IndexArtifact.load(artifact_path)
+    quantized = QuantizedVectors.build(
+        artifact.vectors,
+        storage=storage,
+        meta={
+            "artifact_sha256": artifact.header["content_sha256"],
+            "embedding_backend": artifact.header.get("embedding_backend")
+        },
+        **params
+    )
+    quantized.save(str(output or quantized_path_for(artifact_path, storage)))
+    return quantized
@@ -5,12 +5,17 @@ Módulo especializado en recuperación y búsqueda semántica de documentos.
 from typing import List, Dict, Any, Optional
 import asyncio
 import logging
+import time
 
 from langchain_community.vectorstores import Chroma
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
 
 from src.utils.logger import setup_logger
+from src.utils.stats_sketch import ShardedHeavyHitters, LatencyHistogram, extract_search_terms
+from src.utils.tracing import span
+from src.utils import metrics
+from .docstore import SecurityDocStore
 
 logger = setup_logger(__name__)
 
@@ -23,23 +28,30 @@ class SecurityRetriever:
     - MMR (Maximal Marginal Relevance) para diversidad
     - Filtrado por metadata y tipos de documento
     - Scoring y ranking avanzado
+    - Expansión small-to-big: chunks hijos → secciones padre del docstore
     - Formateo optimizado para prompts
     """
     
-    def __init__(self, vectorstore: Chroma):
+    def __init__(self, vectorstore: Chroma, docstore: Optional[SecurityDocStore] = None):
         """
         Inicializa el sistema de retrieval.
         
         Args:
             vectorstore: Vector store configurado
+            docstore: DocStore de secciones padre (opcional)
         """
         self.vectorstore = vectorstore
+        self.docstore = docstore
         self.retriever = None
+        self.search_type = "mmr"
+        self.search_kwargs: Dict[str, Any] = {}
         self._search_stats = {
             "total_searches": 0,
-            "avg_results_per_search": 0.0,
-            "most_searched_terms": {}
+            "avg_results_per_search": 0.0
         }
+        # Memoria constante: sketch de términos con decaimiento + histograma de latencia
+        self._search_terms = ShardedHeavyHitters(shards=4, capacity_per_shard=64, half_life_seconds=3600)
+        self._search_latency = LatencyHistogram(window_seconds=300)
         
         logger.info("SecurityRetriever inicializado")
 
@@ -77,6 +89,8 @@ class SecurityRetriever:
                 search_type=search_type,
                 search_kwargs=search_kwargs
             )
+            self.search_type = search_type
+            self.search_kwargs = search_kwargs
             
             logger.info(f"Retriever configurado: {search_type}, k={k}, fetch_k={fetch_k}")
             return self.retriever
@@ -106,16 +120,19 @@ class SecurityRetriever:
             if not self.retriever:
                 raise ValueError("Retriever no configurado")
             
+            start_time = time.perf_counter()
+            
             # Ejecutar búsqueda de forma asíncrona
-            relevant_docs = await asyncio.to_thread(
-                self.retriever.invoke,
-                query
-            )
+            relevant_docs = await asyncio.to_thread(self._retrieve, query)
             
             # Aplicar filtros si se proporcionan
             if filter_metadata:
                 relevant_docs = self._apply_metadata_filters(relevant_docs, filter_metadata)
             
+            # Expandir chunks hijos a sus secciones padre (deduplicadas)
+            with span("rag.expand_parents"):
+                relevant_docs = await asyncio.to_thread(self._expand_to_parents, relevant_docs)
+            
             # Limitar resultados
             relevant_docs = relevant_docs[:max_results]
             
@@ -139,7 +156,7 @@ class SecurityRetriever:
                 formatted_results.append(result)
             
             # Actualizar estadísticas
-            self._update_search_stats(query, len(formatted_results))
+            self._update_search_stats(query, len(formatted_results), time.perf_counter() - start_time)
             
             logger.info(f"Búsqueda completada: '{query[:50]}...' -> {len(formatted_results)} resultados")
             return formatted_results
@@ -148,6 +165,72 @@ class SecurityRetriever:
             logger.error(f"Error en búsqueda: {str(e)}")
             return []
 
+    def _retrieve(self, query: str) -> List[Document]:
+        """
+        Ejecuta la recuperación separando el embedding de la consulta y la
+        búsqueda vectorial, para poder medir cada etapa por separado.
+        
+        Args:
+            query: Consulta de búsqueda
+            
+        Returns:
+            List[Document]: Documentos recuperados
+        """
+        embeddings = getattr(self.vectorstore, "embeddings", None)
+        if embeddings is None or self.search_type not in ("mmr", "similarity"):
+            with span("rag.vector_search", search_type=self.search_type):
+                return self.retriever.invoke(query)
+        
+        with span("rag.embed_query"):
+            query_embedding = embeddings.embed_query(query)
+        
+        with span("rag.vector_search", search_type=self.search_type):
+            if self.search_type == "mmr":
+                return self.vectorstore.max_marginal_relevance_search_by_vector(
+                    query_embedding, **self.search_kwargs
+                )
+            return self.vectorstore.similarity_search_by_vector(
+                query_embedding, k=self.search_kwargs.get("k", 4)
+            )
+
+    def _expand_to_parents(self, documents: List[Document]) -> List[Document]:
+        """
+        Sustituye cada chunk hijo por su sección padre, sin duplicados.
+        
+        Mantiene el orden de relevancia del primer hijo de cada padre. Los
+        documentos sin `parent_id` (índices planos) se devuelven tal cual.
+        
+        Args:
+            documents: Chunks hijos ordenados por relevancia
+            
+        Returns:
+            List[Document]: Secciones padre deduplicadas
+        """
+        if not self.docstore or not self.docstore.exists():
+            return documents
+        
+        parent_ids = [doc.metadata.get("parent_id") for doc in documents]
+        parents = self.docstore.get_sections([pid for pid in parent_ids if pid])
+        
+        expanded = []
+        seen = set()
+        for doc, parent_id in zip(documents, parent_ids):
+            parent = parents.get(parent_id)
+            if parent is None:
+                expanded.append(doc)
+                continue
+            
+            if parent_id in seen:
+                continue
+            seen.add(parent_id)
+            
+            expanded.append(Document(
+                page_content=parent.page_content,
+                metadata={**parent.metadata, "matched_child_id": doc.metadata.get("chunk_id", "")}
+            ))
+        
+        return expanded
+
     def _apply_metadata_filters(self, documents: List[Document], filters: Dict[str, Any]) -> List[Document]:
         """
         Aplica filtros de metadata a los documentos.
@@ -334,13 +417,14 @@ class SecurityRetriever:
         
         return "\n".join(formatted_lines), citations
 
-    def _update_search_stats(self, query: str, results_count: int) -> None:
+    def _update_search_stats(self, query: str, results_count: int, latency_seconds: float) -> None:
         """
-        Actualiza estadísticas de búsqueda.
+        Actualiza estadísticas de búsqueda (memoria constante).
         
         Args:
             query: Consulta realizada
             results_count: Número de resultados obtenidos
+            latency_seconds: Duración de la búsqueda
         """
         self._search_stats["total_searches"] += 1
         
@@ -350,12 +434,11 @@ class SecurityRetriever:
         new_avg = ((current_avg * (total_searches - 1)) + results_count) / total_searches
         self._search_stats["avg_results_per_search"] = round(new_avg, 2)
         
-        # Tracking de términos más buscados (simplificado)
-        query_words = query.lower().split()
-        for word in query_words:
-            if len(word) > 3:  # Ignorar palabras muy cortas
-                self._search_stats["most_searched_terms"][word] = \
-                    self._search_stats["most_searched_terms"].get(word, 0) + 1
+        # Términos más buscados (sin IPs, emails ni hashes) y latencia
+        for term in extract_search_terms(query):
+            self._search_terms.add(term)
+        self._search_latency.observe(latency_seconds)
+        metrics.RETRIEVAL_LATENCY.observe(latency_seconds)
 
     def get_retriever_stats(self) -> Dict[str, Any]:
         """
@@ -364,17 +447,11 @@ class SecurityRetriever:
         Returns:
             Dict: Estadísticas detalladas
         """
-        # Top términos más buscados
-        top_terms = sorted(
-            self._search_stats["most_searched_terms"].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]
-        
         return {
             "total_searches": self._search_stats["total_searches"],
             "avg_results_per_search": self._search_stats["avg_results_per_search"],
-            "top_search_terms": dict(top_terms),
+            "top_search_terms": self._search_terms.top(10),
+            "search_latency": self._search_latency.percentiles(),
             "retriever_configured": self.retriever is not None,
             "vectorstore_available": self.vectorstore is not None
         }
@@ -0,0 +1,451 @@
+"""
+Vector Service Module para RAG System
+Modo servicio vectorial compartido: en lugar de un `PersistentClient`
+privado por proceso sobre `vectorstore/`, todos los workers y pods usan un
+único servidor Chroma a través de `HttpClient`.
+
+- Un cliente HTTP por proceso (recreado tras un fork) con pool de conexiones
+- Consultas concurrentes agrupadas en una sola petición `query`
+- Secciones padre y puntero de la versión activa guardados en el servidor
+"""
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from src.utils.config import config
+from src.utils.logger import setup_logger
+from src.utils import metrics
+from .index_versions import BaseIndexVersionManager, LEGACY_VERSION
+
+logger = setup_logger(__name__)
+
+# Chroma exige al menos una dimensión: las secciones padre solo se leen por ID
+_PLACEHOLDER_EMBEDDING = [0.0]
+
+# Columnas de `QueryResult` que contienen una lista por consulta
+_QUERY_RESULT_KEYS = ("ids", "distances", "embeddings", "metadatas", "documents", "uris", "data")
+
+_client = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def use_vector_service() -> bool:
+    """Indica si el índice vive en un servidor Chroma compartido (RAG_VECTOR_BACKEND=http)."""
+    return config.get("rag_vector_backend", "local") == "http"
+
+
+def get_chroma_client():
+    """
+    Cliente HTTP del servidor Chroma, uno por proceso.
+
+    Tras un fork se crea uno nuevo: las conexiones del pool no se comparten
+    entre procesos.
+
+    Returns:
+        ClientAPI: Cliente conectado
+
+    Raises:
+        ValueError: Si el servidor no responde
+    """
+    global _client, _client_pid
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = _create_client(reset_cache=_client is not None)
+            _client_pid = os.getpid()
+        return _client
+
+
+def _create_client(reset_cache: bool = False):
+    """Crea el cliente HTTP y amplía su pool de conexiones."""
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+    from chromadb.config import Settings
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    if reset_cache:
+        # Chroma cachea un sistema (y su sesión HTTP) por host:puerto
+        SharedSystemClient.clear_system_cache()
+
+    token = config.get("chroma_auth_token")
+    client = chromadb.HttpClient(
+        host=config.get("chroma_host", "localhost"),
+        port=str(config.get("chroma_port", 8000)),
+        ssl=config.get("chroma_ssl", False),
+        headers={"Authorization": f"Bearer {token}"} if token else None,
+        settings=Settings(anonymized_telemetry=False)
+    )
+
+    # requests usa 10 conexiones por host: insuficiente con búsquedas concurrentes en threads.
+    # Solo se reintentan errores de conexión (las escrituras no son idempotentes)
+    pool_size = config.get("chroma_pool_size", 32)
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1)
+    )
+    session = client._server._session
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    logger.info(f"Cliente Chroma HTTP: {config.get('chroma_host')}:{config.get('chroma_port')} "
+                f"(pool {pool_size})")
+    return client
+
+
+def get_vector_service_info() -> Dict[str, Any]:
+    """Destino configurado del servicio vectorial (para estadísticas)."""
+    return {
+        "host": config.get("chroma_host", "localhost"),
+        "port": config.get("chroma_port", 8000),
+        "ssl": config.get("chroma_ssl", False),
+        "pool_size": config.get("chroma_pool_size", 32)
+    }
+
+
+def collection_exists(client, name: str) -> bool:
+    """Comprueba si existe una colección (el servidor no distingue el error de inexistencia)."""
+    return any(collection.name == name for collection in client.list_collections())
+
+
+# ============================================================================
+# CONSULTAS AGRUPADAS
+# ============================================================================
+
+class BatchedQueryCollection:
+    """
+    Proxy de una colección remota que agrupa las `query` concurrentes.
+
+    Las consultas de un solo embedding con los mismos parámetros
+    (`n_results`, filtros, `include`) que llegan dentro de una ventana
+    corta viajan en una única petición HTTP. Mismo esquema de líder que
+    `MicroBatchingEmbeddings`, con una ventana por combinación de
+    parámetros. El resto de operaciones se delegan sin cambios.
+    """
+
+    def __init__(self, collection: Any, window_seconds: float = 0.002, max_batch_size: int = 32):
+        """
+        Args:
+            collection: Colección Chroma (cliente HTTP)
+            window_seconds: Espera máxima del líder para completar el lote
+            max_batch_size: Consultas que cierran el lote antes de la ventana
+        """
+        self.collection = collection
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[Tuple[List[float], Future]]] = {}
+        self._cond = threading.Condition()
+        self._stats = {"queries": 0, "requests": 0, "max_batch_size_seen": 0}
+
+    @classmethod
+    def from_config(cls, collection: Any) -> "BatchedQueryCollection":
+        """Crea el proxy con la configuración de la aplicación."""
+        return cls(
+            collection,
+            window_seconds=config.get("vector_query_batch_window_ms", 2.0) / 1000,
+            max_batch_size=config.get("vector_query_batch_max_size", 32)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "collection":
+            raise AttributeError(name)
+        return getattr(self.collection, name)
+
+    def query(
+        self,
+        query_embeddings: Optional[List[List[float]]] = None,
+        query_texts: Optional[List[str]] = None,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """
+        Consulta la colección, agrupada con las consultas concurrentes compatibles.
+
+        Returns:
+            Dict: `QueryResult` de Chroma (una fila por embedding)
+        """
+        include = include or ["metadatas", "documents", "distances"]
+        if query_embeddings and isinstance(query_embeddings[0], (int, float)):
+            # LangChain pasa un único embedding sin envolver
+            query_embeddings = [query_embeddings]
+        if query_texts or kwargs or not query_embeddings or len(query_embeddings) != 1:
+            return self.collection.query(
+                query_embeddings=query_embeddings, query_texts=query_texts, n_results=n_results,
+                where=where, where_document=where_document, include=include, **kwargs
+            )
+
+        key = json.dumps([n_results, where, where_document, include], sort_keys=True, default=str)
+        future: Future = Future()
+        with self._cond:
+            batch = self._pending.get(key)
+            lead = batch is None
+            if lead:
+                batch = self._pending[key] = []
+            batch.append((list(query_embeddings[0]), future))
+            if not lead and len(batch) >= self.max_batch_size:
+                self._cond.notify_all()
+
+        if lead:
+            self._lead(key, n_results, where, where_document, include)
+        return future.result()
+
+    def _lead(
+        self,
+        key: str,
+        n_results: int,
+        where: Optional[Dict[str, Any]],
+        where_document: Optional[Dict[str, Any]],
+        include: List[str]
+    ) -> None:
+        """Completa la ventana de una combinación de parámetros y resuelve su lote."""
+        deadline = time.monotonic() + self.window_seconds
+        with self._cond:
+            while len(self._pending[key]) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending.pop(key)
+
+        try:
+            result = self.collection.query(
+                query_embeddings=[embedding for embedding, _ in batch], n_results=n_results,
+                where=where, where_document=where_document, include=include
+            )
+        except BaseException as e:
+            logger.error(f"Error en lote de consultas al servicio vectorial ({len(batch)}): {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for index, (_, future) in enumerate(batch):
+            future.set_result({
+                name: ([values[index]] if name in _QUERY_RESULT_KEYS and values is not None else values)
+                for name, values in result.items()
+            })
+
+        metrics.VECTOR_QUERY_BATCH_SIZE.observe(len(batch))
+        with self._cond:
+            self._stats["queries"] += len(batch)
+            self._stats["requests"] += 1
+            self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(batch))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de agrupación.
+
+        Returns:
+            Dict: Consultas, peticiones HTTP y tamaño medio de lote
+        """
+        with self._cond:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = round(stats["queries"] / stats["requests"], 2) if stats["requests"] else 0.0
+        stats["window_ms"] = self.window_seconds * 1000
+        stats["max_batch_size"] = self.max_batch_size
+        return stats
+
+
+# ============================================================================
+# DOCSTORE REMOTO
+# ============================================================================
+
+class RemoteDocStore:
+    """
+    Secciones padre en una colección del servidor Chroma.
+
+    Misma interfaz que `SecurityDocStore`; la expansión hijo → padre es un
+    `get` por IDs en una sola petición. Las secciones de una versión no
+    cambian tras construirla, así que su existencia se cachea.
+    """
+
+    UPSERT_BATCH_SIZE = 500
+
+    def __init__(self, client: Any, collection_name: str):
+        """
+        Args:
+            client: Cliente Chroma
+            collection_name: Colección de secciones padre
+        """
+        self.client = client
+        self.collection_name = collection_name
+        self._collection = None
+
+    def _get_collection(self) -> Any:
+        if self._collection is None:
+            self._collection = self.client.get_or_create_collection(
+                self.collection_name, embedding_function=None
+            )
+        return self._collection
+
+    def exists(self) -> bool:
+        """Verifica si la colección de secciones existe en el servidor."""
+        if self._collection is None and not collection_exists(self.client, self.collection_name):
+            return False
+        self._get_collection()
+        return True
+
+    def add_sections(self, sections: List[Document]) -> int:
+        """
+        Guarda (o reemplaza) secciones padre indexadas por su chunk_id.
+
+        Args:
+            sections: Secciones padre con `chunk_id` en metadata
+
+        Returns:
+            int: Número de secciones guardadas
+        """
+        collection = self._get_collection()
+        for start in range(0, len(sections), self.UPSERT_BATCH_SIZE):
+            batch = sections[start:start + self.UPSERT_BATCH_SIZE]
+            collection.upsert(
+                ids=[section.metadata["chunk_id"] for section in batch],
+                documents=[section.page_content for section in batch],
+                # Metadata completa serializada: Chroma solo admite valores escalares
+                metadatas=[{"json": json.dumps(section.metadata, ensure_ascii=False)} for section in batch],
+                embeddings=[_PLACEHOLDER_EMBEDDING] * len(batch)
+            )
+
+        logger.info(f"DocStore remoto {self.collection_name}: {len(sections)} secciones padre guardadas")
+        return len(sections)
+
+    def get_sections(self, chunk_ids: List[str]) -> Dict[str, Document]:
+        """
+        Recupera varias secciones padre en una sola petición.
+
+        Args:
+            chunk_ids: Lista de chunk_id de secciones padre
+
+        Returns:
+            Dict[str, Document]: Secciones encontradas indexadas por chunk_id
+        """
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        if not unique_ids:
+            return {}
+
+        result = self._get_collection().get(ids=unique_ids, include=["documents", "metadatas"])
+        return {
+            chunk_id: Document(page_content=content, metadata=json.loads(metadata["json"]))
+            for chunk_id, content, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+
+    def count(self) -> int:
+        """Cuenta las secciones padre almacenadas."""
+        if not self.exists():
+            return 0
+        return self._get_collection().count()
+
+    def close(self) -> None:
+        """Suelta la referencia a la colección (el cliente es compartido)."""
+        self._collection = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas básicas del docstore remoto."""
+        return {
+            "collection": self.collection_name,
+            "exists": self.exists(),
+            "parent_sections": self.count()
+        }
+
+
+# ============================================================================
+# VERSIONES EN EL SERVIDOR
+# ============================================================================
+
+class RemoteIndexVersionManager(BaseIndexVersionManager):
+    """
+    Versiones del índice como colecciones del servidor Chroma.
+
+    - `<base>__<versión>`: chunks de una versión
+    - `<base>__<versión>__parents`: sus secciones padre
+    - `<base>__meta`: metadata `active` con la versión activa (puntero
+      compartido por todos los procesos)
+
+    La versión `legacy` es la colección `<base>` sin versión. El recuento
+    de lectores es local a cada proceso; con `keep_versions >= 2` la
+    versión anterior sigue disponible mientras los demás procesos siguen
+    el puntero.
+    """
+
+    def __init__(self, client: Any, base_name: str, keep_versions: int = 2):
+        """
+        Args:
+            client: Cliente Chroma
+            base_name: Prefijo de las colecciones del índice
+            keep_versions: Versiones más recientes que se conservan (incluida la activa)
+        """
+        super().__init__(keep_versions)
+        self.client = client
+        self.base_name = base_name
+        self.meta_name = f"{base_name}__meta"
+
+    def collection_for(self, version: str) -> str:
+        """Colección de chunks de una versión."""
+        if version == LEGACY_VERSION:
+            return self.base_name
+        return f"{self.base_name}__{version}"
+
+    def parents_collection_for(self, version: str) -> str:
+        """Colección de secciones padre de una versión."""
+        return f"{self.collection_for(version)}__parents"
+
+    def _collection_names(self) -> List[str]:
+        return [collection.name for collection in self.client.list_collections()]
+
+    def active_version(self) -> str:
+        """
+        Versión activa según la metadata de la colección `__meta`.
+
+        Returns:
+            str: Nombre de la versión (o `legacy`)
+        """
+        names = self._collection_names()
+        if self.meta_name not in names:
+            return LEGACY_VERSION
+        metadata = self.client.get_collection(self.meta_name, embedding_function=None).metadata or {}
+        version = metadata.get("active")
+        if version and self.collection_for(version) in names:
+            return version
+        return LEGACY_VERSION
+
+    def activate(self, version: str) -> None:
+        """
+        Apunta el puntero compartido a una versión (una sola escritura de metadata).
+
+        Args:
+            version: Versión ya construida y validada
+        """
+        if self.collection_for(version) not in self._collection_names():
+            raise ValueError(f"La versión {version} no existe")
+
+        meta = self.client.get_or_create_collection(self.meta_name, embedding_function=None)
+        meta.modify(metadata={"active": version, "activated_at": datetime.utcnow().isoformat()})
+        logger.info(f"Índice activo en el servicio vectorial: {version}")
+
+    def list_versions(self) -> List[str]:
+        """Versiones en el servidor, de la más antigua a la más reciente."""
+        prefix = f"{self.base_name}__"
+        return sorted(
+            name[len(prefix):] for name in self._collection_names()
+            if name.startswith(prefix) and name != self.meta_name and not name.endswith("__parents")
+        )
+
+    def _delete_version(self, version: str) -> None:
+        names = self._collection_names()
+        for name in (self.collection_for(version), self.parents_collection_for(version)):
+            if name in names:
+                self.client.delete_collection(name)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado de las versiones, con el servidor como almacenamiento."""
+        return {**super().get_status(), "backend": "vector_service", "base_collection": self.base_name}
@@ -4,13 +4,36 @@ Módulo especializado en gestión de embeddings y almacenamiento vectorial.
 """
 from pathlib import Path
 from typing import List, Dict, Any, Optional
+import asyncio
+import json
 import logging
+import threading
 
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 
 from src.utils.logger import setup_logger
+from src.utils.config import config
+from src.services.fake_backends import HashingEmbeddings, use_fake_embeddings
+from .docstore import SecurityDocStore
+from .embedding_batcher import MicroBatchingEmbeddings
+from .embedding_deadline import DeadlineBoundEmbeddings
+from .vector_service import (
+    BatchedQueryCollection,
+    RemoteDocStore,
+    collection_exists,
+    get_vector_service_info
+)
+from .index_artifact import (
+    ArtifactDocStore,
+    FlatVectorIndex,
+    IndexArtifact,
+    IndexArtifactError,
+    embedding_backend_id
+)
+from .ivfpq import IVFPQIndex, IVFPQVectorIndex, ivfpq_path_for
+from .quantization import QUANTIZED_STORAGES, QuantizedVectorIndex, QuantizedVectors, quantized_path_for
 
 logger = setup_logger(__name__)
 
@@ -24,20 +47,50 @@ class SecurityVectorStore:
     - Persistencia automática con cache inteligente
     - Metadata enriquecida para mejor retrieval
     - Optimización específica para terminología de seguridad
+    
+    Con `client` (modo servicio vectorial) la colección y las secciones
+    padre viven en un servidor Chroma compartido en lugar de en
+    `persist_directory`.
+    
+    `storage` (`float32`, `int8` o `binary`) elige cómo se guardan en
+    memoria los embeddings de un artefacto precompilado.
     """
     
-    def __init__(self, persist_directory: str = "vectorstore", openai_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        persist_directory: str = "vectorstore",
+        openai_api_key: Optional[str] = None,
+        collection_name: str = "security_knowledge",
+        client: Optional[Any] = None,
+        storage: Optional[str] = None
+    ):
         """
         Inicializa el gestor de vector store.
         
         Args:
             persist_directory: Directorio para persistencia
             openai_api_key: API key de OpenAI
+            collection_name: Colección Chroma del índice
+            client: Cliente HTTP del servicio vectorial (None: Chroma local)
+            storage: Embeddings del artefacto en float32, int8 o binary
+                (None: RAG_VECTOR_STORAGE)
         """
         self.persist_directory = Path(persist_directory)
         self.openai_api_key = openai_api_key
+        self.collection_name = collection_name
+        self.client = client
+        self.storage = storage or config.get("rag_vector_storage", "float32")
         self.embeddings = None
         self.vectorstore = None
+        if client is not None:
+            self.docstore = RemoteDocStore(client, f"{collection_name}__parents")
+        else:
+            self.docstore = SecurityDocStore(str(self.persist_directory / "docstore.sqlite3"))
+        self.artifact: Optional[IndexArtifact] = None
+        
+        # Agregados de estadísticas mantenidos incrementalmente (O(1) en lectura)
+        self._stats_aggregates: Optional[Dict[str, Any]] = None
+        self._stats_lock = threading.Lock()
         
         logger.info(f"SecurityVectorStore inicializado - Persist: {self.persist_directory}")
 
@@ -49,26 +102,40 @@ class SecurityVectorStore:
             api_key: API key de OpenAI (opcional)
         """
         try:
-            self.embeddings = OpenAIEmbeddings(
-                model="text-embedding-ada-002",
-                openai_api_key=api_key or self.openai_api_key,
-                chunk_size=1000,
-                max_retries=3,
-                request_timeout=30
-            )
-            
-            logger.info("Embeddings inicializados: text-embedding-ada-002")
+            if use_fake_embeddings():
+                self.embeddings = HashingEmbeddings.from_config()
+                logger.info(f"Embeddings fake inicializados: hashing-{self.embeddings.size}")
+            else:
+                # Timeout y reintentos por llamada según el plazo de la petición
+                self.embeddings = DeadlineBoundEmbeddings.from_config(OpenAIEmbeddings(
+                    model="text-embedding-ada-002",
+                    openai_api_key=api_key or self.openai_api_key,
+                    base_url=config.get("openai_base_url"),
+                    chunk_size=1000,
+                    max_retries=0,
+                    request_timeout=config.get("embedding_request_timeout_seconds", 30.0)
+                ))
+                logger.info("Embeddings inicializados: text-embedding-ada-002")
+            
+            # Agrupar las consultas concurrentes en una sola llamada al backend
+            if config.get("embedding_batching_enabled", True):
+                self.embeddings = MicroBatchingEmbeddings.from_config(self.embeddings)
             
         except Exception as e:
             logger.error(f"Error inicializando embeddings: {str(e)}")
             raise
 
-    async def create_vectorstore(self, documents: List[Document]) -> Chroma:
+    async def create_vectorstore(
+        self,
+        documents: List[Document],
+        parent_sections: Optional[List[Document]] = None
+    ) -> Chroma:
         """
         Crea un nuevo vector store con los documentos proporcionados.
         
         Args:
-            documents: Lista de documentos a indexar
+            documents: Lista de documentos a indexar (chunks hijos si hay padres)
+            parent_sections: Secciones padre para el docstore (small-to-big)
             
         Returns:
             Chroma: Vector store creado
@@ -80,17 +147,34 @@ class SecurityVectorStore:
             if not documents:
                 raise ValueError("No hay documentos para indexar")
             
-            # Asegurar que el directorio existe
-            self.persist_directory.mkdir(parents=True, exist_ok=True)
-            
-            # Crear vector store con configuración optimizada
-            self.vectorstore = Chroma.from_documents(
+            if self.client is not None:
+                location = {"client": self.client}
+            else:
+                # Asegurar que el directorio existe
+                self.persist_directory.mkdir(parents=True, exist_ok=True)
+                location = {"persist_directory": str(self.persist_directory)}
+            
+            # Crear vector store con configuración optimizada (embeddings de todos
+            # los chunks: fuera del event loop, que sigue sirviendo búsquedas)
+            self.vectorstore = await asyncio.to_thread(
+                Chroma.from_documents,
                 documents=documents,
                 embedding=self.embeddings,
-                persist_directory=str(self.persist_directory),
-                collection_name="security_knowledge",
-                collection_metadata=self._get_collection_metadata()
+                collection_name=self.collection_name,
+                collection_metadata=self._get_collection_metadata(),
+                **location
             )
+            self._batch_remote_queries()
+            
+            # Guardar secciones padre para expansión sin búsqueda vectorial
+            if parent_sections:
+                await asyncio.to_thread(self.docstore.add_sections, parent_sections)
+            
+            # Inicializar agregados de estadísticas y persistirlos en la colección
+            self._stats_aggregates = self._empty_stats_aggregates()
+            self._stats_aggregates["parent_sections"] = len(parent_sections or [])
+            self._accumulate_stats([doc.metadata for doc in documents], sign=1)
+            self._persist_stats_aggregates()
             
             logger.info(f"Vector store creado con {len(documents)} documentos")
             return self.vectorstore
@@ -130,25 +214,131 @@ class SecurityVectorStore:
             if not self.embeddings:
                 raise ValueError("Embeddings no inicializados")
             
-            self.vectorstore = Chroma(
-                persist_directory=str(self.persist_directory),
-                embedding_function=self.embeddings,
-                collection_name="security_knowledge"
-            )
-            
-            # Verificar que el vector store tiene contenido
-            collection = self.vectorstore.get()
-            if not collection["ids"]:
+            if self.client is not None:
+                self.vectorstore = Chroma(
+                    client=self.client,
+                    embedding_function=self.embeddings,
+                    collection_name=self.collection_name
+                )
+                self._batch_remote_queries()
+            else:
+                self.vectorstore = Chroma(
+                    persist_directory=str(self.persist_directory),
+                    embedding_function=self.embeddings,
+                    collection_name=self.collection_name
+                )
+            
+            # Verificar que el vector store tiene contenido (count, sin volcar la colección)
+            total_documents = self.vectorstore._collection.count()
+            if not total_documents:
                 logger.warning("Vector store existe pero está vacío")
                 return None
             
-            logger.info(f"Vector store cargado desde cache - {len(collection['ids'])} documentos")
+            # Cargar agregados persistidos; recontar solo si no existen
+            self._stats_aggregates = self._load_persisted_stats_aggregates()
+            if self._stats_aggregates is None:
+                self._recount_stats_aggregates()
+            
+            logger.info(f"Vector store cargado desde cache - {total_documents} documentos")
             return self.vectorstore
             
         except Exception as e:
             logger.error(f"Error cargando vector store desde cache: {str(e)}")
             return None
 
+    def _batch_remote_queries(self) -> None:
+        """Agrupa las consultas concurrentes a la colección remota en una sola petición."""
+        if self.client is not None and not isinstance(self.vectorstore._collection, BatchedQueryCollection):
+            self.vectorstore._collection = BatchedQueryCollection.from_config(self.vectorstore._collection)
+
+    def load_index_artifact(self, path: str, docs_hash: Optional[str] = None) -> Optional[FlatVectorIndex]:
+        """
+        Carga un artefacto de índice precompilado (mmap, solo lectura).
+        
+        No llama a la API de embeddings: solo se usan para las consultas.
+        
+        Args:
+            path: Fichero del artefacto
+            docs_hash: Hash del manifiesto de los documentos actuales; si se
+                indica y no coincide, el artefacto se considera obsoleto
+            
+        Returns:
+            Optional[FlatVectorIndex]: Vector store cargado o None si no es utilizable
+        """
+        try:
+            if not self.embeddings:
+                raise ValueError("Embeddings no inicializados")
+            
+            header, _, _ = IndexArtifact.read_header(path)
+            backend = embedding_backend_id(self.embeddings)
+            if header.get("embedding_backend") != backend:
+                logger.warning(f"Artefacto {path} de otro backend de embeddings "
+                              f"({header.get('embedding_backend')} != {backend})")
+                return None
+            if docs_hash and header.get("docs_manifest", {}).get("hash") != docs_hash:
+                logger.warning(f"Artefacto {path} obsoleto: los documentos han cambiado")
+                return None
+            
+            self.artifact = IndexArtifact.load(path)
+            self.vectorstore = self._open_artifact_index(path)
+            self.docstore = ArtifactDocStore(self.artifact.parents)
+            
+            self._stats_aggregates = self._empty_stats_aggregates()
+            self._stats_aggregates["parent_sections"] = len(self.artifact.parents)
+            self._accumulate_stats([doc.metadata for doc in self.artifact.chunks], sign=1)
+            
+            logger.info(f"Artefacto de índice cargado: {path} - {header['count']} chunks")
+            return self.vectorstore
+            
+        except (OSError, IndexArtifactError, ValueError) as e:
+            logger.error(f"Error cargando artefacto de índice {path}: {str(e)}")
+            return None
+
+    def _open_artifact_index(self, path: str) -> FlatVectorIndex:
+        """
+        Índice de búsqueda sobre el artefacto cargado: IVF-PQ si existe un
+        `<artefacto>.ivfpq` construido sobre él; si no, con almacenamiento
+        `int8`/`binary`, búsqueda sobre `<artefacto>.<storage>`; si no,
+        búsqueda exacta.
+        
+        Args:
+            path: Fichero del artefacto
+            
+        Returns:
+            FlatVectorIndex: Vector store de solo lectura
+        """
+        ivfpq_path = ivfpq_path_for(path)
+        if config.get("rag_ivfpq_enabled", True) and ivfpq_path.is_file():
+            try:
+                index = IVFPQVectorIndex(
+                    self.artifact,
+                    self.embeddings,
+                    IVFPQIndex.load(str(ivfpq_path)),
+                    nprobe=config.get("rag_ivfpq_nprobe", 16),
+                    rerank=config.get("rag_ivfpq_rerank", 256)
+                )
+                logger.info(f"Índice IVF-PQ cargado: {ivfpq_path} (nprobe={index.nprobe})")
+                return index
+            except (OSError, ValueError) as e:
+                logger.warning(f"Índice IVF-PQ {ivfpq_path} no utilizable, búsqueda exacta: {str(e)}")
+
+        if self.storage in QUANTIZED_STORAGES:
+            quantized_path = quantized_path_for(path, self.storage)
+            try:
+                index = QuantizedVectorIndex(
+                    self.artifact,
+                    self.embeddings,
+                    QuantizedVectors.load(str(quantized_path)),
+                    rerank=config.get("rag_quantized_rerank", 100)
+                )
+                logger.info(f"Vectores cuantizados cargados: {quantized_path}")
+                return index
+            except (OSError, ValueError) as e:
+                logger.warning(f"Vectores {self.storage} {quantized_path} no utilizables, float32: {str(e)}")
+        elif self.storage != "float32":
+            logger.warning(f"Almacenamiento de vectores desconocido: {self.storage}, se usa float32")
+        return FlatVectorIndex(self.artifact, self.embeddings)
+
     def persist_vectorstore(self) -> bool:
         """
         Persiste el vector store actual.
@@ -176,21 +366,12 @@ class SecurityVectorStore:
         Returns:
             bool: True si existe cache
         """
-        if not self.persist_directory.exists():
-            return False
+        if self.client is not None:
+            return collection_exists(self.client, self.collection_name)
         
-        # Verificar archivos específicos de Chroma
-        required_files = [
-            "chroma.sqlite3",
-            "index"
-        ]
-        
-        for file_name in required_files:
-            file_path = self.persist_directory / file_name
-            if not (file_path.exists() or file_path.is_dir()):
-                return False
-        
-        return True
+        # Chroma >= 0.4 persiste la colección en chroma.sqlite3 (los segmentos HNSW
+        # `<uuid>/` sin ese fichero no son un índice utilizable)
+        return (self.persist_directory / "chroma.sqlite3").is_file()
 
     def should_reindex(self, documents_path: Path) -> bool:
         """
@@ -205,6 +386,10 @@ class SecurityVectorStore:
         if not self._cache_exists():
             return True
         
+        # Servicio vectorial: las versiones las publica el proceso escritor
+        if self.client is not None:
+            return False
+        
         try:
             # Obtener timestamp del cache
             cache_time = self.persist_directory.stat().st_mtime
@@ -243,6 +428,10 @@ class SecurityVectorStore:
             # Añadir documentos al vector store
             self.vectorstore.add_documents(documents)
             
+            # Actualizar estadísticas incrementalmente
+            self._accumulate_stats([doc.metadata for doc in documents], sign=1)
+            self._persist_stats_aggregates()
+            
             # Persistir cambios
             self.persist_vectorstore()
             
@@ -269,10 +458,17 @@ class SecurityVectorStore:
                 logger.error("Vector store no inicializado")
                 return False
             
+            # Metadata previa para descontarla de las estadísticas (lookup por ID)
+            previous = self.vectorstore.get(ids=[document_id], include=["metadatas"])
+            
             # Para Chroma, necesitamos eliminar y añadir
             # ya que no soporta actualización directa
             self.vectorstore.delete([document_id])
-            self.vectorstore.add_documents([new_document])
+            self.vectorstore.add_documents([new_document], ids=[document_id])
+            
+            self._accumulate_stats(previous.get("metadatas") or [], sign=-1)
+            self._accumulate_stats([new_document.metadata], sign=1)
+            self._persist_stats_aggregates()
             
             self.persist_vectorstore()
             
@@ -283,10 +479,16 @@ class SecurityVectorStore:
             logger.error(f"Error actualizando documento {document_id}: {str(e)}")
             return False
 
-    def get_vectorstore_stats(self) -> Dict[str, Any]:
+    def get_vectorstore_stats(self, refresh: bool = False) -> Dict[str, Any]:
         """
         Obtiene estadísticas del vector store.
         
+        Sirve los agregados mantenidos en memoria (O(1)); solo recorre la
+        colección completa si se fuerza con `refresh` o si no hay agregados.
+        
+        Args:
+            refresh: Forzar un recuento completo de la colección
+            
         Returns:
             Dict: Estadísticas detalladas
         """
@@ -297,30 +499,27 @@ class SecurityVectorStore:
                     "total_documents": 0
                 }
             
-            collection = self.vectorstore.get()
+            if refresh or self._stats_aggregates is None:
+                self._recount_stats_aggregates()
             
-            # Calcular estadísticas de metadata
-            doc_types = {}
-            languages = set()
-            
-            for metadata in collection.get("metadatas", []):
-                if metadata:
-                    doc_type = metadata.get("document_type", "unknown")
-                    doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
-                    
-                    language = metadata.get("language", "unknown")
-                    languages.add(language)
-            
-            return {
-                "status": "initialized",
-                "total_documents": len(collection["ids"]) if collection["ids"] else 0,
-                "collection_name": "security_knowledge",
-                "persist_directory": str(self.persist_directory),
-                "cache_exists": self._cache_exists(),
-                "document_types": doc_types,
-                "languages": list(languages),
-                "embeddings_model": "text-embedding-ada-002"
-            }
+            with self._stats_lock:
+                aggregates = self._stats_aggregates
+                return {
+                    "status": "initialized",
+                    "total_documents": aggregates["total_documents"],
+                    "collection_name": self.collection_name,
+                    "persist_directory": str(self.persist_directory),
+                    "cache_exists": self._cache_exists(),
+                    "document_types": dict(aggregates["document_types"]),
+                    "languages": list(aggregates["languages"]),
+                    "parent_sections": aggregates["parent_sections"],
+                    "embeddings_model": "text-embedding-ada-002",
+                    "source": self._get_source(),
+                    "artifact": self._get_artifact_info(),
+                    "vector_service": self._get_vector_service_info(),
+                    "embedding_batching": self.get_embedding_batching_stats(),
+                    "stats_refreshed": refresh
+                }
             
         except Exception as e:
             logger.error(f"Error obteniendo estadísticas: {str(e)}")
@@ -329,6 +528,138 @@ class SecurityVectorStore:
                 "error": str(e)
             }
 
+    def get_embedding_batching_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Estadísticas del micro-batching de consultas.
+        
+        Returns:
+            Optional[Dict]: Estadísticas, o None si no está activo
+        """
+        if isinstance(self.embeddings, MicroBatchingEmbeddings):
+            return self.embeddings.get_stats()
+        return None
+
+    def _empty_stats_aggregates(self) -> Dict[str, Any]:
+        """
+        Crea la estructura vacía de agregados de estadísticas.
+        
+        Returns:
+            Dict: Agregados a cero
+        """
+        return {
+            "total_documents": 0,
+            "document_types": {},
+            "languages": {},
+            "parent_sections": 0
+        }
+
+    def _accumulate_stats(self, metadatas: List[Optional[Dict[str, Any]]], sign: int) -> None:
+        """
+        Suma (sign=1) o resta (sign=-1) documentos de los agregados.
+        
+        Args:
+            metadatas: Metadata de los documentos afectados
+            sign: +1 al indexar, -1 al eliminar
+        """
+        with self._stats_lock:
+            if self._stats_aggregates is None:
+                self._stats_aggregates = self._empty_stats_aggregates()
+            aggregates = self._stats_aggregates
+            
+            for metadata in metadatas:
+                aggregates["total_documents"] += sign
+                if not metadata:
+                    continue
+                
+                for key, counter in (("document_type", "document_types"), ("language", "languages")):
+                    value = metadata.get(key, "unknown")
+                    count = aggregates[counter].get(value, 0) + sign
+                    if count > 0:
+                        aggregates[counter][value] = count
+                    else:
+                        aggregates[counter].pop(value, None)
+
+    def _get_source(self) -> str:
+        """Origen del índice cargado."""
+        if self.artifact:
+            return "artifact"
+        return "vector_service" if self.client is not None else "chroma"
+
+    def _get_vector_service_info(self) -> Optional[Dict[str, Any]]:
+        """Servidor y agrupación de consultas del servicio vectorial (o None)."""
+        if self.client is None:
+            return None
+        collection = self.vectorstore._collection if self.vectorstore else None
+        return {
+            **get_vector_service_info(),
+            "query_batching": collection.get_stats() if isinstance(collection, BatchedQueryCollection) else None
+        }
+
+    def _get_artifact_info(self) -> Optional[Dict[str, Any]]:
+        """Manifiesto resumido del artefacto cargado (o None)."""
+        if not self.artifact:
+            return None
+        header = self.artifact.header
+        return {
+            "path": str(self.artifact.path),
+            "embedding_backend": header.get("embedding_backend"),
+            "docs_hash": header.get("docs_manifest", {}).get("hash"),
+            "created_at": header.get("created_at"),
+            "dim": header.get("dim"),
+            "search": self.vectorstore.get_search_info() if self.vectorstore else None
+        }
+
+    def _recount_stats_aggregates(self) -> None:
+        """Recalcula los agregados recorriendo la colección completa (costoso)."""
+        if self.artifact:
+            # Inmutable: los agregados calculados al cargar siguen siendo exactos
+            return
+        
+        collection = self.vectorstore.get(include=["metadatas"])
+        
+        with self._stats_lock:
+            self._stats_aggregates = self._empty_stats_aggregates()
+            self._stats_aggregates["parent_sections"] = self.docstore.count()
+        
+        self._accumulate_stats(collection.get("metadatas") or [], sign=1)
+        self._persist_stats_aggregates()
+        logger.info("Estadísticas del vector store recalculadas con recuento completo")
+
+    def _persist_stats_aggregates(self) -> None:
+        """Guarda los agregados en la metadata de la colección Chroma."""
+        try:
+            collection = self.vectorstore._collection
+            with self._stats_lock:
+                stats_json = json.dumps(self._stats_aggregates, ensure_ascii=False)
+            
+            # Chroma no permite reenviar claves hnsw:* al modificar la metadata
+            metadata = {
+                key: value for key, value in (collection.metadata or {}).items()
+                if not key.startswith("hnsw:")
+            }
+            metadata["stats_json"] = stats_json
+            collection.modify(metadata=metadata)
+            
+        except Exception as e:
+            logger.warning(f"No se pudieron persistir las estadísticas: {str(e)}")
+
+    def _load_persisted_stats_aggregates(self) -> Optional[Dict[str, Any]]:
+        """
+        Lee los agregados persistidos en la metadata de la colección.
+        
+        Returns:
+            Optional[Dict]: Agregados o None si no existen o son inválidos
+        """
+        try:
+            stats_json = (self.vectorstore._collection.metadata or {}).get("stats_json")
+            if not stats_json:
+                return None
+            return {**self._empty_stats_aggregates(), **json.loads(stats_json)}
+            
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"Estadísticas persistidas inválidas, se recalcularán: {str(e)}")
+            return None
+
     async def cleanup_vectorstore(self) -> bool:
         """
         Limpia y reinicia el vector store.
@@ -337,6 +668,17 @@ class SecurityVectorStore:
             bool: True si se limpió correctamente
         """
         try:
+            # Cerrar docstore antes de eliminar sus ficheros
+            self.docstore.close()
+            
+            # El artefacto (inmutable) y las colecciones del servicio vectorial son
+            # compartidos: solo se sueltan las referencias
+            if self.artifact or self.client is not None:
+                self.artifact = None
+                self.vectorstore = None
+                self._stats_aggregates = None
+                return True
+            
             # Eliminar archivos de cache
             if self.persist_directory.exists():
                 import shutil
@@ -345,6 +687,7 @@ class SecurityVectorStore:
             
             # Reiniciar referencias
             self.vectorstore = None
+            self._stats_aggregates = None
             
             return True
             
@@ -18,6 +18,108 @@ def load_config():
         "openai_api_key": os.getenv("OPENAI_API_KEY"),
         "app_environment": os.getenv("APP_ENVIRONMENT", "development"),
         "log_level": os.getenv("LOG_LEVEL", "INFO"),
+        "health_check_interval_seconds": float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "60")),
+        "rag_warmup_on_startup": os.getenv("RAG_WARMUP_ON_STARTUP", "true").lower() == "true",
+        "analysis_db_url": os.getenv("ANALYSIS_DB_URL", "sqlite:///data/analyses.sqlite3"),
+        "incident_index_dir": os.getenv("INCIDENT_INDEX_DIR", "data/incident_index"),
+        "similar_incidents_min_score": float(os.getenv("SIMILAR_INCIDENTS_MIN_SCORE", "0.75")),
+        "rag_parent_chunk_size": int(os.getenv("RAG_PARENT_CHUNK_SIZE", "2000")),
+        "rag_child_chunk_size": int(os.getenv("RAG_CHILD_CHUNK_SIZE", "400")),
+        "rag_child_chunk_overlap": int(os.getenv("RAG_CHILD_CHUNK_OVERLAP", "50")),
+        "rag_search_type": os.getenv("RAG_SEARCH_TYPE", "mmr"),
+        "rag_k": int(os.getenv("RAG_K", "12")),
+        "rag_fetch_k": int(os.getenv("RAG_FETCH_K", "32")),
+        "rag_lambda_mult": float(os.getenv("RAG_LAMBDA_MULT", "0.7")),
+        "rag_index_artifact": os.getenv("RAG_INDEX_ARTIFACT", "vectorstore/index.rgidx"),
+        "rag_index_keep_versions": int(os.getenv("RAG_INDEX_KEEP_VERSIONS", "2")),
+        "rag_index_drain_timeout_seconds": float(os.getenv("RAG_INDEX_DRAIN_TIMEOUT_SECONDS", "30")),
+        "rag_smoke_queries": os.getenv("RAG_SMOKE_QUERIES", ""),
+        "rag_ivfpq_enabled": os.getenv("RAG_IVFPQ_ENABLED", "true").lower() == "true",
+        "rag_ivfpq_nprobe": int(os.getenv("RAG_IVFPQ_NPROBE", "16")),
+        "rag_ivfpq_rerank": int(os.getenv("RAG_IVFPQ_RERANK", "256")),
+        "rag_vector_storage": os.getenv("RAG_VECTOR_STORAGE", "float32").lower(),
+        "rag_quantized_rerank": int(os.getenv("RAG_QUANTIZED_RERANK", "100")),
+        "rag_vector_backend": os.getenv("RAG_VECTOR_BACKEND", "local"),
+        "rag_vector_service_writer": os.getenv("RAG_VECTOR_SERVICE_WRITER", "false").lower() == "true",
+        "rag_index_read_only": os.getenv("RAG_INDEX_READ_ONLY", "false").lower() == "true",
+        "rag_vector_service_refresh_seconds": float(os.getenv("RAG_VECTOR_SERVICE_REFRESH_SECONDS", "10")),
+        "chroma_host": os.getenv("CHROMA_HOST", "localhost"),
+        "chroma_port": int(os.getenv("CHROMA_PORT", "8000")),
+        "chroma_ssl": os.getenv("CHROMA_SSL", "false").lower() == "true",
+        "chroma_auth_token": os.getenv("CHROMA_AUTH_TOKEN"),
+        "chroma_collection": os.getenv("CHROMA_COLLECTION", "security_knowledge"),
+        "chroma_pool_size": int(os.getenv("CHROMA_POOL_SIZE", "32")),
+        "vector_query_batch_window_ms": float(os.getenv("VECTOR_QUERY_BATCH_WINDOW_MS", "2")),
+        "vector_query_batch_max_size": int(os.getenv("VECTOR_QUERY_BATCH_MAX_SIZE", "32")),
+        "embedding_batching_enabled": os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true",
+        "embedding_batch_window_ms": float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5")),
+        "embedding_batch_max_size": int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64")),
+        "embedding_request_timeout_seconds": float(os.getenv("EMBEDDING_REQUEST_TIMEOUT_SECONDS", "30")),
+        "embedding_max_retries": int(os.getenv("EMBEDDING_MAX_RETRIES", "3")),
+        "embedding_retry_backoff_seconds": float(os.getenv("EMBEDDING_RETRY_BACKOFF_SECONDS", "0.5")),
+        "router_enabled": os.getenv("ROUTER_ENABLED", "true").lower() == "true",
+        "router_cheap_models": os.getenv("ROUTER_CHEAP_MODELS", "gpt-3.5-turbo"),
+        "router_daily_budget_usd": float(os.getenv("ROUTER_DAILY_BUDGET_USD", "0")),
+        "router_tier_budgets_usd": os.getenv("ROUTER_TIER_BUDGETS_USD", ""),
+        "router_queue_threshold": int(os.getenv("ROUTER_QUEUE_THRESHOLD", "32")),
+        "router_large_prompt_tokens": int(os.getenv("ROUTER_LARGE_PROMPT_TOKENS", "8000")),
+        "router_protected_tiers": os.getenv("ROUTER_PROTECTED_TIERS", "experto"),
+        "token_usage_retention_days": int(os.getenv("TOKEN_USAGE_RETENTION_DAYS", "7")),
+        "llm_call_timeout_seconds": float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "60")),
+        "llm_limiter_initial": int(os.getenv("LLM_LIMITER_INITIAL", "8")),
+        "llm_limiter_min": int(os.getenv("LLM_LIMITER_MIN", "1")),
+        "llm_limiter_max": int(os.getenv("LLM_LIMITER_MAX", "64")),
+        "llm_limiter_backoff": float(os.getenv("LLM_LIMITER_BACKOFF", "0.7")),
+        "llm_limiter_queue_timeout_seconds": float(os.getenv("LLM_LIMITER_QUEUE_TIMEOUT_SECONDS", "5")),
+        "circuit_breaker_failure_rate": float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5")),
+        "circuit_breaker_slow_call_seconds": float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "20")),
+        "circuit_breaker_slow_call_rate": float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8")),
+        "circuit_breaker_window": int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20")),
+        "circuit_breaker_min_calls": int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5")),
+        "circuit_breaker_open_seconds": float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30")),
+        "circuit_breaker_half_open_calls": int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "1")),
+        "llm_hedging_tiers": os.getenv("LLM_HEDGING_TIERS", ""),
+        "llm_hedge_quantile": float(os.getenv("LLM_HEDGE_QUANTILE", "0.9")),
+        "llm_hedge_window": int(os.getenv("LLM_HEDGE_WINDOW", "200")),
+        "llm_hedge_min_samples": int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+        "llm_hedge_min_delay_ms": float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "500")),
+        "llm_hedge_default_delay_ms": float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "3000")),
+        "llm_hedge_max_ratio": float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1")),
+        "admission_enabled": os.getenv("ADMISSION_ENABLED", "true").lower() == "true",
+        "admission_max_in_flight": int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32")),
+        "admission_queue_wait_target_seconds": float(os.getenv("ADMISSION_QUEUE_WAIT_TARGET_SECONDS", "2")),
+        "admission_llm_latency_target_seconds": float(os.getenv("ADMISSION_LLM_LATENCY_TARGET_SECONDS", "30")),
+        "admission_thresholds": os.getenv("ADMISSION_THRESHOLDS", "0.6,0.7,0.8,0.9,1.0"),
+        "admission_reduced_rag_chunks": int(os.getenv("ADMISSION_REDUCED_RAG_CHUNKS", "2")),
+        "admission_window_seconds": float(os.getenv("ADMISSION_WINDOW_SECONDS", "30")),
+        "admission_retry_after_seconds": int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5")),
+        "admission_protected_urgencies": os.getenv("ADMISSION_PROTECTED_URGENCIES", "critica"),
+        "admission_llm_saturation_threshold": float(os.getenv("ADMISSION_LLM_SATURATION_THRESHOLD", "0.9")),
+        "admission_max_protected_in_flight": int(os.getenv("ADMISSION_MAX_PROTECTED_IN_FLIGHT", "8")),
+        "admission_max_protected_per_client": int(os.getenv("ADMISSION_MAX_PROTECTED_PER_CLIENT", "2")),
+        "scheduler_urgency_offsets_seconds": os.getenv("SCHEDULER_URGENCY_OFFSETS_SECONDS", "critica=0,alta=5,media=15,baja=30"),
+        "scheduler_tier_offsets_seconds": os.getenv("SCHEDULER_TIER_OFFSETS_SECONDS", "experto=0,estandar=2,rapido=4"),
+        "scheduler_fair_share_seconds": float(os.getenv("SCHEDULER_FAIR_SHARE_SECONDS", "2")),
+        "deadline_default_seconds": float(os.getenv("DEADLINE_DEFAULT_SECONDS", "0")),
+        "deadline_max_seconds": float(os.getenv("DEADLINE_MAX_SECONDS", "300")),
+        "deadline_margin_seconds": float(os.getenv("DEADLINE_MARGIN_SECONDS", "0.2")),
+        "deadline_min_stage_seconds": float(os.getenv("DEADLINE_MIN_STAGE_SECONDS", "0.05")),
+        "deadline_llm_reserve_seconds": float(os.getenv("DEADLINE_LLM_RESERVE_SECONDS", "5")),
+        "deadline_min_rag_seconds": float(os.getenv("DEADLINE_MIN_RAG_SECONDS", "0.5")),
+        "trace_buffer_size": int(os.getenv("TRACE_BUFFER_SIZE", "200")),
+        "prometheus_multiproc_dir": os.getenv("PROMETHEUS_MULTIPROC_DIR"),
+        "openai_base_url": os.getenv("OPENAI_BASE_URL"),
+        "llm_backend": os.getenv("LLM_BACKEND", "openai"),
+        "embeddings_backend": os.getenv("EMBEDDINGS_BACKEND", "openai"),
+        "fake_llm_latency_ms": float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+        "fake_llm_stream_chunk_chars": int(os.getenv("FAKE_LLM_STREAM_CHUNK_CHARS", "20")),
+        "fake_llm_stream_chunk_delay_ms": float(os.getenv("FAKE_LLM_STREAM_CHUNK_DELAY_MS", "0")),
+        "fake_embeddings_latency_ms": float(os.getenv("FAKE_EMBEDDINGS_LATENCY_MS", "0")),
+        "fake_embeddings_size": int(os.getenv("FAKE_EMBEDDINGS_SIZE", "256")),
+        "fake_error_rate": float(os.getenv("FAKE_ERROR_RATE", "0")),
+        "fake_timeout_rate": float(os.getenv("FAKE_TIMEOUT_RATE", "0")),
+        "fake_timeout_seconds": float(os.getenv("FAKE_TIMEOUT_SECONDS", "30")),
+        "fake_seed": int(os.getenv("FAKE_SEED", "42")),
     }
 
 # Load configuration on module import
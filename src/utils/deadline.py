@@ -0,0 +1,251 @@
+"""
+End-to-end request deadlines.
+
+A deadline is bound to the current context with a ContextVar (like the
+trace), so child tasks (asyncio.gather, hedged LLM calls) and worker threads
+(asyncio.to_thread) see the same budget without threading it through every
+signature. Each stage sizes its own timeout and retries from what is left,
+and optional stages are skipped when the budget is short. Outside a deadline
+every helper falls back to the stage's own default.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import time
+
+from src.utils.config import config
+from src.utils import metrics
+
+
+class DeadlineExceededError(TimeoutError):
+    """
+    The request budget ran out before (or during) a stage.
+    """
+
+    def __init__(self, stage: str, deadline: Optional["Deadline"] = None):
+        """
+        Args:
+            stage (str): Stage that could not run within the budget
+            deadline (Deadline): Deadline that expired
+        """
+        self.stage = stage
+        self.deadline = deadline
+        super().__init__(f"Deadline exceeded at stage '{stage}'")
+
+
+class Deadline:
+    """
+    Time budget of a single request.
+    """
+
+    def __init__(self, budget_seconds: float):
+        """
+        Start a new deadline.
+
+        Args:
+            budget_seconds (float): Seconds from now until the deadline
+        """
+        self.budget_seconds = max(0.0, budget_seconds)
+        self.expires_at = time.monotonic() + self.budget_seconds
+        self.skipped_stages: List[str] = []
+
+    def remaining(self) -> float:
+        """
+        Get the seconds left (never negative).
+
+        Returns:
+            float: Remaining budget
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the budget is spent."""
+        return self.remaining() <= 0
+
+    def timeout(self, default: Optional[float] = None, reserve: float = 0.0) -> Optional[float]:
+        """
+        Get the timeout for a stage.
+
+        Args:
+            default (float): The stage's own timeout (None = unbounded)
+            reserve (float): Seconds kept for the stages that follow
+
+        Returns:
+            float: min(default, remaining - reserve), never negative
+        """
+        available = max(0.0, self.remaining() - reserve)
+        return available if default is None else min(default, available)
+
+    def skip(self, stage: str) -> None:
+        """
+        Record an optional stage skipped for lack of budget.
+
+        Args:
+            stage (str): Stage name
+        """
+        self.skipped_stages.append(stage)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the deadline.
+
+        Returns:
+            dict: Budget, remaining milliseconds and skipped stages
+        """
+        return {
+            "budget_ms": round(self.budget_seconds * 1000, 1),
+            "remaining_ms": round(self.remaining() * 1000, 1),
+            "skipped_stages": list(self.skipped_stages)
+        }
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def get_deadline() -> Optional[Deadline]:
+    """
+    Get the deadline bound to the current context.
+
+    Returns:
+        Deadline: Active deadline, or None
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(budget_seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Bind a deadline to the current context.
+
+    A nested scope never extends the enclosing deadline. With no budget the
+    enclosing deadline (if any) stays active.
+
+    Args:
+        budget_seconds (float): Seconds from now (None = no new deadline)
+
+    Yields:
+        Deadline: Active deadline, or None
+    """
+    parent = _current_deadline.get()
+    if budget_seconds is None:
+        yield parent
+        return
+
+    deadline = Deadline(budget_seconds)
+    if parent is not None and parent.expires_at < deadline.expires_at:
+        deadline.expires_at = parent.expires_at
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextmanager
+def bind_deadline(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """
+    Bind an existing deadline (e.g. one captured in another thread).
+
+    Args:
+        deadline (Deadline): Deadline to bind (None = no deadline)
+
+    Yields:
+        Deadline: The bound deadline
+    """
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def stage_timeout(stage: str, default: Optional[float] = None, reserve: float = 0.0) -> Optional[float]:
+    """
+    Size a stage's timeout from the active deadline.
+
+    Args:
+        stage (str): Stage name (for the error)
+        default (float): The stage's own timeout
+        reserve (float): Seconds kept for the stages that follow
+
+    Returns:
+        float: Timeout to use (the default outside a deadline)
+
+    Raises:
+        DeadlineExceededError: Less than the minimum stage budget is left
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    timeout = deadline.timeout(default, reserve)
+    if timeout < config.get("deadline_min_stage_seconds", 0.05):
+        raise DeadlineExceededError(stage, deadline)
+    return timeout
+
+
+def has_budget_for(seconds: float) -> bool:
+    """
+    Check whether an optional stage fits in the active deadline.
+
+    Args:
+        seconds (float): Budget the stage needs
+
+    Returns:
+        bool: True outside a deadline or when enough time is left
+    """
+    deadline = _current_deadline.get()
+    return deadline is None or deadline.remaining() >= seconds
+
+
+def skip_stage(stage: str) -> None:
+    """
+    Record an optional stage skipped because the budget is short.
+
+    Args:
+        stage (str): Stage name
+    """
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.skip(stage)
+    metrics.DEADLINE_EVENTS.labels(stage=stage, outcome="skipped").inc()
+
+
+def parse_client_timeout(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a client timeout in seconds ("12", "2.5").
+
+    Args:
+        value (str): Header or query value
+
+    Returns:
+        float: Seconds, or None if missing or invalid
+    """
+    try:
+        seconds = float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds is not None and seconds > 0 else None
+
+
+def resolve_budget(client_timeout: Optional[float]) -> Optional[float]:
+    """
+    Turn the client's timeout into the server-side budget.
+
+    The client value is capped at `deadline_max_seconds`, falls back to
+    `deadline_default_seconds` (0 = no deadline) and keeps
+    `deadline_margin_seconds` for the response to reach the client.
+
+    Args:
+        client_timeout (float): Seconds the client will wait, or None
+
+    Returns:
+        float: Budget in seconds, or None for no deadline
+    """
+    seconds = client_timeout or config.get("deadline_default_seconds", 0.0)
+    if not seconds:
+        return None
+    max_seconds = config.get("deadline_max_seconds", 300.0)
+    if max_seconds:
+        seconds = min(seconds, max_seconds)
+    return max(0.0, seconds - config.get("deadline_margin_seconds", 0.2))
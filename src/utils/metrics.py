@@ -0,0 +1,300 @@
+"""
+Prometheus metrics for the API, the analysis pipeline and the RAG system.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory before starting the server: every worker then writes
+its samples to memory-mapped files there and /metrics aggregates them.
+Only counters and histograms are used so that every metric aggregates
+across processes without choosing a gauge mode.
+"""
+from typing import Dict, Optional, Tuple
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# USD per 1K tokens (prompt, completion)
+MODEL_PRICING_USD_PER_1K: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4.1-turbo": (0.002, 0.008),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HTTP_REQUESTS = Counter(
+    "riskguardian_http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "riskguardian_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+ANALYSES = Counter(
+    "riskguardian_analyses_total",
+    "Incident analyses by analysis type and result status",
+    ["analysis_type", "status"]
+)
+ANALYSIS_LATENCY = Histogram(
+    "riskguardian_analysis_duration_seconds",
+    "End-to-end analysis latency by analysis type",
+    ["analysis_type"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "riskguardian_stage_duration_seconds",
+    "Analysis pipeline stage latency (from traces)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "riskguardian_llm_tokens_total",
+    "LLM tokens reported by the provider",
+    ["model", "kind"]
+)
+LLM_COST = Counter(
+    "riskguardian_llm_cost_usd_total",
+    "Estimated LLM cost in USD",
+    ["model"]
+)
+LLM_FALLBACKS = Counter(
+    "riskguardian_llm_fallback_activations_total",
+    "Calls answered by the fallback model after the primary failed or was short-circuited",
+    ["primary", "fallback"]
+)
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "riskguardian_llm_circuit_transitions_total",
+    "Circuit breaker state changes per model (state = new state)",
+    ["model", "state"]
+)
+LLM_SHORT_CIRCUITS = Counter(
+    "riskguardian_llm_short_circuits_total",
+    "LLM calls not sent to a model (circuit_open / limiter_queue_timeout)",
+    ["model", "reason"]
+)
+LLM_HEDGES = Counter(
+    "riskguardian_llm_hedges_total",
+    "Hedged LLM requests by primary model and outcome (primary_won / hedge_won / both_failed / skipped_budget)",
+    ["model", "outcome"]
+)
+ROUTING_DECISIONS = Counter(
+    "riskguardian_llm_routing_decisions_total",
+    "Model routing decisions by analysis tier, chosen model and reason",
+    ["tier", "model", "reason"]
+)
+LLM_QUEUE_WAIT = Histogram(
+    "riskguardian_llm_queue_wait_seconds",
+    "Time LLM calls wait for a concurrency slot, by incident urgency",
+    ["urgency"],
+    buckets=LATENCY_BUCKETS
+)
+ADMISSION_DECISIONS = Counter(
+    "riskguardian_admission_decisions_total",
+    "Admission decisions by requested analysis type and degradation step applied (normal ... shed)",
+    ["analysis_type", "action"]
+)
+ADMISSION_PRESSURE = Histogram(
+    "riskguardian_admission_pressure",
+    "Load pressure seen at admission (1.0 = a signal at its target)",
+    buckets=(0.1, 0.25, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.5, 2.0, 5.0)
+)
+DEADLINE_EVENTS = Counter(
+    "riskguardian_deadline_events_total",
+    "Pipeline stages skipped or cut short by the request deadline (outcome = skipped / exceeded)",
+    ["stage", "outcome"]
+)
+JSON_PARSE_FALLBACKS = Counter(
+    "riskguardian_json_parse_fallbacks_total",
+    "LLM responses replaced by the fallback analysis after a parse failure"
+)
+CACHE_REQUESTS = Counter(
+    "riskguardian_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"]
+)
+RETRIEVAL_LATENCY = Histogram(
+    "riskguardian_retrieval_duration_seconds",
+    "RAG retrieval latency (embedding, search and parent expansion)",
+    buckets=LATENCY_BUCKETS
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "riskguardian_embedding_batch_size",
+    "Query embeddings resolved per backend call by the micro-batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+VECTOR_QUERY_BATCH_SIZE = Histogram(
+    "riskguardian_vector_query_batch_size",
+    "Similarity queries sent per HTTP request to the shared vector service",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+EVENT_LOOP_LAG = Histogram(
+    "riskguardian_event_loop_lag_seconds",
+    "Delay between scheduled and actual wake-up of the event loop",
+    buckets=LAG_BUCKETS
+)
+
+
+def is_multiprocess() -> bool:
+    """
+    Check whether multiprocess collection is enabled.
+
+    Returns:
+        bool: True if PROMETHEUS_MULTIPROC_DIR is set
+    """
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the USD cost of an LLM call.
+
+    Args:
+        model (str): Model name (dated variants match their base name)
+        prompt_tokens (int): Prompt tokens
+        completion_tokens (int): Completion tokens
+
+    Returns:
+        float: Estimated cost, 0.0 for unknown models
+    """
+    pricing = MODEL_PRICING_USD_PER_1K.get(model)
+    if pricing is None:
+        pricing = next(
+            (price for name, price in MODEL_PRICING_USD_PER_1K.items() if model.startswith(name)),
+            (0.0, 0.0)
+        )
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1000
+
+
+def record_llm_usage(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """
+    Record token usage and estimated cost of an LLM call.
+
+    Args:
+        model (str): Model name
+        prompt_tokens (int): Prompt tokens
+        completion_tokens (int): Completion tokens
+    """
+    LLM_TOKENS.labels(model=model, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model=model, kind="completion").inc(completion_tokens)
+    LLM_COST.labels(model=model).inc(estimate_cost(model, prompt_tokens, completion_tokens))
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    Record a cache hit or miss.
+
+    Args:
+        cache (str): Cache name
+        hit (bool): Whether the lookup was a hit
+    """
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def observe_analysis(
+    analysis_type: str,
+    status: str,
+    duration_seconds: float,
+    breakdown_ms: Optional[Dict[str, float]] = None
+) -> None:
+    """
+    Record a finished analysis and its per-stage latencies.
+
+    Args:
+        analysis_type (str): Analysis tier
+        status (str): Result status (success/error)
+        duration_seconds (float): End-to-end latency
+        breakdown_ms (dict): Stage name -> milliseconds
+    """
+    ANALYSES.labels(analysis_type=analysis_type, status=status).inc()
+    ANALYSIS_LATENCY.labels(analysis_type=analysis_type).observe(duration_seconds)
+    for stage, duration_ms in (breakdown_ms or {}).items():
+        STAGE_LATENCY.labels(stage=stage).observe(duration_ms / 1000)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    In multiprocess mode the samples of every worker are aggregated.
+
+    Returns:
+        tuple: (payload, content type)
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """
+    Clean up the live multiprocess files of a worker that is exiting.
+
+    Args:
+        pid (int): Worker PID (current process by default)
+    """
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+class EventLoopLagMonitor:
+    """
+    Measures event-loop lag by sleeping a fixed interval and recording how
+    late the loop wakes up.
+    """
+
+    def __init__(self, interval_seconds: float = 0.5):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval_seconds (float): Sampling interval
+        """
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sampling on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Sampling loop."""
+        while True:
+            scheduled = time.perf_counter() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - scheduled))
+
+
+event_loop_lag_monitor = EventLoopLagMonitor()
@@ -0,0 +1,262 @@
+"""
+Fixed-memory streaming statistics: heavy hitters and latency histograms.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# Tokens that are unique per incident and would only pollute the sketch
+_NOISE_TOKEN_PATTERN = re.compile(
+    r"^(\d{1,3}(\.\d{1,3}){3}"     # IPv4
+    r"|[^@\s]+@[^@\s]+"            # emails
+    r"|[0-9a-f]{16,}"              # hashes / hex ids
+    r"|[\d.,:/-]+)$"               # numbers, dates, times
+)
+
+
+def extract_search_terms(query: str, min_length: int = 4) -> List[str]:
+    """
+    Extract countable terms from a search query.
+
+    Args:
+        query (str): Raw query text
+        min_length (int): Minimum term length
+
+    Returns:
+        list: Normalized terms, excluding IPs, emails, hashes and numbers
+    """
+    terms = []
+    for raw_word in query.lower().split():
+        word = raw_word.strip(".,;:!?¿¡()[]{}\"'")
+        if len(word) >= min_length and not _NOISE_TOKEN_PATTERN.match(word):
+            terms.append(word)
+    return terms
+
+
+class DecayedSpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch with exponential time decay.
+
+    Keeps at most `capacity` counters. Decay uses forward decay: each new
+    observation is weighted by exp((t - landmark) / tau), so existing
+    counters never need to be touched on insert; reads divide by the
+    current weight. Counters are renormalized when the weight grows large.
+    """
+
+    _RENORMALIZE_THRESHOLD = 1e12
+
+    def __init__(self, capacity: int = 64, half_life_seconds: float = 3600.0):
+        """
+        Initialize the sketch.
+
+        Args:
+            capacity (int): Maximum number of tracked terms
+            half_life_seconds (float): Time for a count to decay to half
+        """
+        self.capacity = capacity
+        self._tau = half_life_seconds / math.log(2)
+        self._landmark = time.monotonic()
+        self._counts: Dict[str, float] = {}
+        self._errors: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _weight(self, now: float) -> float:
+        """Return the forward-decay weight for an observation at `now`."""
+        return math.exp((now - self._landmark) / self._tau)
+
+    def add(self, term: str, now: Optional[float] = None) -> None:
+        """
+        Record one occurrence of a term.
+
+        Args:
+            term (str): Observed term
+            now (float): Monotonic timestamp (defaults to current time)
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            weight = self._weight(now)
+            if weight > self._RENORMALIZE_THRESHOLD:
+                self._renormalize(now)
+                weight = 1.0
+
+            if term in self._counts:
+                self._counts[term] += weight
+            elif len(self._counts) < self.capacity:
+                self._counts[term] = weight
+                self._errors[term] = 0.0
+            else:
+                evicted = min(self._counts, key=self._counts.__getitem__)
+                min_count = self._counts.pop(evicted)
+                self._errors.pop(evicted, None)
+                self._counts[term] = min_count + weight
+                self._errors[term] = min_count
+
+    def _renormalize(self, now: float) -> None:
+        """Rescale all counters to a new landmark (caller holds the lock)."""
+        scale = self._weight(now)
+        self._counts = {term: count / scale for term, count in self._counts.items()}
+        self._errors = {term: error / scale for term, error in self._errors.items()}
+        self._landmark = now
+
+    def items(self, now: Optional[float] = None) -> List[Tuple[str, float, float]]:
+        """
+        Return all tracked terms with decayed counts.
+
+        Args:
+            now (float): Monotonic timestamp (defaults to current time)
+
+        Returns:
+            list: Tuples of (term, decayed_count, max_overestimation)
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            weight = self._weight(now)
+            return [
+                (term, count / weight, self._errors.get(term, 0.0) / weight)
+                for term, count in self._counts.items()
+            ]
+
+
+class ShardedHeavyHitters:
+    """
+    Heavy hitters split across independently locked shards.
+
+    Terms are routed to a shard by a stable hash, so concurrent searches
+    rarely contend on the same lock. Memory is `shards * capacity` counters.
+    """
+
+    def __init__(self, shards: int = 4, capacity_per_shard: int = 64,
+                 half_life_seconds: float = 3600.0):
+        """
+        Initialize the sharded sketch.
+
+        Args:
+            shards (int): Number of shards
+            capacity_per_shard (int): Counters per shard
+            half_life_seconds (float): Decay half-life
+        """
+        self._shards = [
+            DecayedSpaceSaving(capacity_per_shard, half_life_seconds)
+            for _ in range(shards)
+        ]
+
+    def add(self, term: str) -> None:
+        """
+        Record one occurrence of a term.
+
+        Args:
+            term (str): Observed term
+        """
+        shard = self._shards[zlib.crc32(term.encode("utf-8")) % len(self._shards)]
+        shard.add(term)
+
+    def top(self, k: int = 10) -> Dict[str, float]:
+        """
+        Return the k most frequent terms with decayed counts.
+
+        Args:
+            k (int): Number of terms to return
+
+        Returns:
+            dict: Term to decayed count, most frequent first
+        """
+        now = time.monotonic()
+        candidates = [item for shard in self._shards for item in shard.items(now)]
+        top_items = heapq.nlargest(k, candidates, key=lambda item: item[1])
+        return {term: round(count, 2) for term, count, _ in top_items}
+
+
+class LatencyHistogram:
+    """
+    Windowed log-bucket latency histogram with constant memory.
+
+    Buckets grow geometrically from `min_seconds` to `max_seconds`.
+    Observations land in the current time slot; slots older than the
+    window are recycled, so percentiles reflect the recent window only.
+    """
+
+    def __init__(self, min_seconds: float = 0.001, max_seconds: float = 120.0,
+                 growth_factor: float = 1.2, window_seconds: float = 300.0,
+                 slots: int = 5):
+        """
+        Initialize the histogram.
+
+        Args:
+            min_seconds (float): Upper bound of the first bucket
+            max_seconds (float): Upper bound of the last finite bucket
+            growth_factor (float): Ratio between consecutive bucket bounds
+            window_seconds (float): Length of the sliding window
+            slots (int): Number of sub-windows in the ring
+        """
+        bounds = [min_seconds]
+        while bounds[-1] < max_seconds:
+            bounds.append(bounds[-1] * growth_factor)
+        self._bounds = bounds
+        self._slot_seconds = window_seconds / slots
+        self._slots = [[0] * (len(bounds) + 1) for _ in range(slots)]
+        self._slot_ids = [-1] * slots
+        self._lock = threading.Lock()
+
+    def _bucket_index(self, seconds: float) -> int:
+        """Return the bucket index for a latency value."""
+        if seconds <= self._bounds[0]:
+            return 0
+        index = int(math.log(seconds / self._bounds[0]) / math.log(self._bounds[1] / self._bounds[0])) + 1
+        return min(index, len(self._bounds))
+
+    def observe(self, seconds: float) -> None:
+        """
+        Record one latency observation.
+
+        Args:
+            seconds (float): Observed latency in seconds
+        """
+        slot_id = int(time.monotonic() // self._slot_seconds)
+        position = slot_id % len(self._slots)
+        with self._lock:
+            if self._slot_ids[position] != slot_id:
+                self._slots[position] = [0] * len(self._slots[position])
+                self._slot_ids[position] = slot_id
+            self._slots[position][self._bucket_index(seconds)] += 1
+
+    def percentiles(self, quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99)) -> Dict[str, Optional[float]]:
+        """
+        Estimate latency percentiles over the current window.
+
+        Args:
+            quantiles (tuple): Quantiles in (0, 1]
+
+        Returns:
+            dict: Keys like "p95_ms" with bucket upper bounds in milliseconds
+        """
+        current_slot = int(time.monotonic() // self._slot_seconds)
+        oldest_valid = current_slot - len(self._slots) + 1
+        with self._lock:
+            merged = [0] * (len(self._bounds) + 1)
+            for slot_id, counts in zip(self._slot_ids, self._slots):
+                if slot_id >= oldest_valid:
+                    merged = [a + b for a, b in zip(merged, counts)]
+
+        total = sum(merged)
+        result: Dict[str, Optional[float]] = {"count": total}
+        for quantile in quantiles:
+            key = f"p{int(round(quantile * 100))}_ms"
+            result[key] = self._quantile_from_counts(merged, total, quantile)
+        return result
+
+    def _quantile_from_counts(self, counts: List[int], total: int, quantile: float) -> Optional[float]:
+        """Return the bucket upper bound (ms) containing the quantile."""
+        if total == 0:
+            return None
+        target = quantile * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= target:
+                bound = self._bounds[min(index, len(self._bounds) - 1)]
+                return round(bound * 1000, 2)
+        return round(self._bounds[-1] * 1000, 2)
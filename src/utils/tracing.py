@@ -0,0 +1,250 @@
+"""
+Lightweight in-process tracing for per-stage latency breakdowns.
+
+A trace is bound to the current context with a ContextVar, so spans opened
+in child tasks (asyncio.gather) or worker threads (asyncio.to_thread) are
+recorded on the same trace. Timings use the monotonic perf_counter clock.
+Spans opened outside a trace are no-ops.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+import threading
+import time
+import uuid
+
+from src.utils.config import config
+
+
+class Trace:
+    """
+    A single traced operation and its recorded spans.
+    """
+
+    def __init__(self, name: str, **attributes: Any):
+        """
+        Start a new trace.
+
+        Args:
+            name (str): Operation name (e.g. "analyze_incident")
+            **attributes: Extra attributes attached to the trace
+        """
+        self.trace_id = str(uuid.uuid4())
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+
+    def add_span(self, name: str, start: float, end: float, **attributes: Any) -> None:
+        """
+        Record a finished span.
+
+        Args:
+            name (str): Stage name
+            start (float): perf_counter value when the stage started
+            end (float): perf_counter value when the stage finished
+            **attributes: Extra span attributes
+        """
+        span = {
+            "name": name,
+            "offset_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3)
+        }
+        if attributes:
+            span["attributes"] = attributes
+        self.spans.append(span)
+
+    def elapsed(self) -> float:
+        """
+        Get the trace duration in seconds (so far, if still open).
+
+        Returns:
+            float: Elapsed seconds
+        """
+        return (self.end or time.perf_counter()) - self.start
+
+    def breakdown(self) -> Dict[str, float]:
+        """
+        Get total milliseconds per stage name.
+
+        Spans of concurrent stages overlap, so the values may add up to more
+        than the total trace duration.
+
+        Returns:
+            dict: Stage name -> milliseconds
+        """
+        totals: Dict[str, float] = {}
+        for span in list(self.spans):
+            totals[span["name"]] = round(totals.get(span["name"], 0.0) + span["duration_ms"], 3)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the trace.
+
+        Returns:
+            dict: Trace with spans ordered by start offset
+        """
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": round(self.elapsed() * 1000, 3),
+            "attributes": self.attributes,
+            "breakdown_ms": self.breakdown(),
+            "spans": sorted(self.spans, key=lambda span: span["offset_ms"])
+        }
+
+
+class TraceBuffer:
+    """
+    Fixed-size ring buffer of finished traces.
+    """
+
+    def __init__(self, maxlen: int = 200):
+        """
+        Initialize the buffer.
+
+        Args:
+            maxlen (int): Maximum number of traces kept
+        """
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def append(self, trace: Trace) -> None:
+        """
+        Store a finished trace (serialized).
+
+        Args:
+            trace (Trace): Finished trace
+        """
+        serialized = trace.to_dict()
+        with self._lock:
+            self._traces.append(serialized)
+
+    def recent(self, limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recent traces, newest first.
+
+        Args:
+            limit (int): Maximum number of traces
+            name (str): Only traces with this operation name
+
+        Returns:
+            list: Serialized traces
+        """
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        if name:
+            traces = [trace for trace in traces if trace["name"] == name]
+        return traces[:limit]
+
+    def stage_summary(self, name: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Aggregate per-stage latency over the buffered traces.
+
+        Args:
+            name (str): Only traces with this operation name
+
+        Returns:
+            dict: Stage name -> count, avg_ms and max_ms
+        """
+        summary: Dict[str, Dict[str, float]] = {}
+        for trace in self.recent(limit=len(self._traces), name=name):
+            stages = dict(trace["breakdown_ms"], total=trace["total_ms"])
+            for stage, duration_ms in stages.items():
+                entry = summary.setdefault(stage, {"count": 0, "sum_ms": 0.0, "max_ms": 0.0})
+                entry["count"] += 1
+                entry["sum_ms"] += duration_ms
+                entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+        return {
+            stage: {
+                "count": entry["count"],
+                "avg_ms": round(entry["sum_ms"] / entry["count"], 3),
+                "max_ms": round(entry["max_ms"], 3)
+            }
+            for stage, entry in summary.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+trace_buffer = TraceBuffer(maxlen=config.get("trace_buffer_size", 200))
+
+
+def get_current_trace() -> Optional[Trace]:
+    """
+    Get the trace bound to the current context.
+
+    Returns:
+        Trace: Current trace or None
+    """
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str, buffer: Optional[TraceBuffer] = None, **attributes: Any) -> Iterator[Trace]:
+    """
+    Open a trace for the current context and store it when it finishes.
+
+    Args:
+        name (str): Operation name
+        buffer (TraceBuffer): Destination buffer (module buffer by default)
+        **attributes: Extra trace attributes
+
+    Yields:
+        Trace: The open trace
+    """
+    trace = Trace(name, **attributes)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.end = time.perf_counter()
+        _current_trace.reset(token)
+        (buffer if buffer is not None else trace_buffer).append(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """
+    Time a stage on the current trace. No-op when no trace is active.
+
+    Args:
+        name (str): Stage name
+        **attributes: Extra span attributes
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter(), **attributes)
+
+
+def record_span(name: str, start: float, end: float, **attributes: Any) -> None:
+    """
+    Record a span measured externally (e.g. from a callback).
+
+    Args:
+        name (str): Stage name
+        start (float): perf_counter value when the stage started
+        end (float): perf_counter value when the stage finished
+        **attributes: Extra span attributes
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, start, end, **attributes)
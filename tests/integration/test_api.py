@@ -33,6 +33,27 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("application/json", response.headers["content-type"])
     
+    def test_examples_endpoint_not_modified(self):
+        """Test that a matching ETag returns 304 without body."""
+        response = self.client.get("/api/examples")
+        etag = response.headers["etag"]
+        
+        response = self.client.get("/api/examples", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+    
+    def test_liveness_probe(self):
+        """Test the liveness probe endpoint."""
+        response = self.client.get("/api/health/live")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "alive")
+    
+    def test_readiness_probe(self):
+        """Test the readiness probe reports component status."""
+        response = self.client.get("/api/health/ready")
+        self.assertIn(response.status_code, (200, 503))
+        self.assertIn("components", response.json())
+    
     def test_analyze_endpoint_valid(self):
         """Test the analyze endpoint with valid data."""
         data = {
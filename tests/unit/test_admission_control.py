@@ -0,0 +1,152 @@
+"""
+Unit tests for admission control and load-based degradation.
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from fastapi import HTTPException
+
+from src.controllers.incident_controller import IncidentController
+from src.services.admission_control import AdmissionController, parse_thresholds
+from src.services.llm_resilience import get_model_guard, reset_model_guards
+
+
+class TestAdmissionController(unittest.TestCase):
+    """
+    Test the degradation ladder against each pressure signal.
+    """
+
+    def setUp(self):
+        """Create a controller with round targets."""
+        self.llm_saturation = 0.0
+        self.controller = AdmissionController(
+            max_in_flight=10,
+            queue_wait_target_seconds=1.0,
+            llm_latency_target_seconds=10.0,
+            thresholds=[0.6, 0.7, 0.8, 0.9, 1.0],
+            reduced_rag_chunks=2,
+            retry_after_seconds=3,
+            saturation_probe=lambda: self.llm_saturation
+        )
+
+    def _admit_with_in_flight(self, in_flight, analysis_type="experto"):
+        self.controller._in_flight = in_flight
+        return self.controller.admit(analysis_type)
+
+    def test_ladder_steps(self):
+        """Test each step of the ladder as in-flight analyses grow."""
+        expected = [
+            (5, "normal", "experto", None),
+            (6, "tier_downgrade", "estandar", None),
+            (7, "tier_minimum", "rapido", None),
+            (8, "rag_reduced", "rapido", 2),
+            (9, "rag_skipped", "rapido", 0),
+        ]
+        for in_flight, action, analysis_type, rag_max_chunks in expected:
+            decision = self._admit_with_in_flight(in_flight)
+            self.assertTrue(decision.admitted)
+            self.assertEqual(
+                (decision.action, decision.analysis_type, decision.rag_max_chunks),
+                (action, analysis_type, rag_max_chunks)
+            )
+
+        shed = self._admit_with_in_flight(10)
+        self.assertFalse(shed.admitted)
+        self.assertEqual(shed.to_dict()["retry_after_seconds"], 3)
+        self.assertEqual(self.controller.get_status()["decisions"]["shed"], 1)
+
+    def test_rapido_is_never_upgraded(self):
+        """Test that the cheapest tier stays on it when downgrading."""
+        self.assertEqual(self._admit_with_in_flight(6, "rapido").analysis_type, "rapido")
+        self.assertEqual(self._admit_with_in_flight(6, "estandar").analysis_type, "rapido")
+
+    def test_latency_and_queue_wait_signals(self):
+        """Test that slow LLM calls and queue waits raise pressure only with a saturated limiter."""
+        self.controller.record_llm_latency(35.0)
+        self.controller.record_queue_wait(2.0)
+        self.assertEqual(self.controller.admit("estandar", "media").action, "normal")
+
+        self.llm_saturation = 1.0
+        decision = self.controller.admit("experto")
+        self.assertFalse(decision.admitted)
+        self.assertEqual(decision.retry_after_seconds, 35)
+
+    def test_latency_alone_never_sheds(self):
+        """Test that LLM latency degrades down to no RAG but never rejects."""
+        self.llm_saturation = 1.0
+        self.controller.record_llm_latency(8.5)
+        self.assertEqual(self.controller.admit("experto").action, "rag_reduced")
+
+        self.controller.record_llm_latency(35.0)
+        decision = self.controller.admit("experto")
+        self.assertTrue(decision.admitted)
+        self.assertEqual(decision.action, "rag_skipped")
+
+    def test_configured_controller_probes_llm_limiters(self):
+        """Test that the configured controller reads the saturation of the model guards."""
+        controller = AdmissionController.from_config()
+        reset_model_guards()
+        try:
+            self.assertEqual(controller.saturation_probe(), 0.0)
+            limiter = get_model_guard("probe-test").limiter
+            limiter.in_flight = int(limiter.limit)
+            self.assertEqual(controller.saturation_probe(), 1.0)
+        finally:
+            reset_model_guards()
+
+    def test_signals_expire_without_traffic(self):
+        """Test that old samples stop counting once the window passes."""
+        controller = AdmissionController(
+            queue_wait_target_seconds=1.0, window_seconds=0.05, saturation_probe=lambda: 1.0
+        )
+        controller.record_queue_wait(5.0)
+        self.assertFalse(controller.admit("estandar").admitted)
+        time.sleep(0.1)
+        self.assertEqual(controller.admit("estandar").action, "normal")
+
+    def test_disabled_admits_everything(self):
+        """Test that a disabled controller never degrades."""
+        controller = AdmissionController(enabled=False, max_in_flight=1)
+        controller._in_flight = 5
+        self.assertEqual(controller.admit("experto").action, "normal")
+
+    def test_track_and_threshold_parsing(self):
+        """Test in-flight tracking and threshold configuration."""
+        with self.controller.track():
+            self.assertEqual(self.controller.in_flight, 1)
+        self.assertEqual(self.controller.in_flight, 0)
+        self.assertEqual(parse_thresholds("0.5, 0.9"), [0.5, 0.9])
+        self.assertIsNone(parse_thresholds("bad"))
+
+
+class TestAnalyzeShedding(unittest.TestCase):
+    """
+    Test that /analyze rejects with 503 + Retry-After when saturated.
+    """
+
+    def test_saturated_analyze_returns_503(self):
+        """Test the rejection and its reported degradation."""
+        saturated = AdmissionController(max_in_flight=1, retry_after_seconds=7)
+        saturated._in_flight = 1
+        controller = IncidentController()
+
+        with patch("src.controllers.incident_controller.admission_controller", saturated):
+            with self.assertRaises(HTTPException) as raised:
+                asyncio.run(controller.analyze_incident(
+                    {"titulo": "Phishing", "descripcion": "Correo fraudulento"}, "experto"
+                ))
+
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(raised.exception.headers["Retry-After"], "7")
+        self.assertEqual(raised.exception.detail["degradation"]["action"], "shed")
+
+
+if __name__ == "__main__":
+    unittest.main()
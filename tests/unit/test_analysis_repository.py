@@ -0,0 +1,80 @@
+"""
+Unit tests for the analysis repository.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.analysis_repository import AnalysisRepository
+
+
+class TestAnalysisRepository(unittest.TestCase):
+    """
+    Test persistence, keyset pagination and batched writes.
+    """
+    
+    def setUp(self):
+        """Create a repository on a temporary SQLite file."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.tmp_dir.name, "analyses.sqlite3")
+        self.repository = AnalysisRepository(f"sqlite:///{db_path}", flush_interval_seconds=0.05)
+    
+    def tearDown(self):
+        """Dispose the engine and remove temporary files."""
+        if self.repository._engine is not None:
+            self.repository._engine.dispose()
+        self.tmp_dir.cleanup()
+    
+    def _record(self, index, risk="alta"):
+        """Build a test record."""
+        record = AnalysisRepository.build_record(
+            f"id-{index:03d}",
+            {"titulo": f"Incidente {index}", "categoria_inicial": "phishing"},
+            "estandar",
+            {"status": "success", "modelo_utilizado": "gpt-4.1-turbo", "data": {"controles": []}},
+            risk_level={"nivel": risk, "puntuacion": 75.0}
+        )
+        record["created_at"] = datetime(2024, 1, 1) + timedelta(minutes=index)
+        return record
+    
+    def test_keyset_pagination_and_filters(self):
+        """Test that pages are disjoint, ordered and filtered."""
+        for index in range(7):
+            self.repository.save(self._record(index, risk="alta" if index % 2 else "baja"))
+        
+        first = self.repository.query(limit=2, risk_level="alta")
+        second = self.repository.query(limit=2, risk_level="alta", cursor=first["next_cursor"])
+        
+        self.assertEqual([item["id_analisis"] for item in first["items"]], ["id-005", "id-003"])
+        self.assertEqual([item["id_analisis"] for item in second["items"]], ["id-001"])
+        self.assertIsNone(second["next_cursor"])
+        self.assertNotIn("data", first["items"][0])
+    
+    def test_get_returns_payload(self):
+        """Test lookup by ID returns the stored analysis."""
+        self.repository.save(self._record(1))
+        analysis = self.repository.get("id-001")
+        self.assertEqual(analysis["nivel_riesgo"]["nivel"], "alta")
+        self.assertEqual(analysis["incident"]["titulo"], "Incidente 1")
+        self.assertIsNone(self.repository.get("missing"))
+    
+    def test_batched_async_writes(self):
+        """Test that enqueued records are flushed by the background writer."""
+        async def scenario():
+            for index in range(5):
+                self.repository.enqueue(self._record(index))
+            await self.repository.stop()
+        
+        asyncio.run(scenario())
+        self.assertEqual(self.repository.query(limit=10)["count"], 5)
+        self.assertEqual(self.repository.get_stats()["written"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
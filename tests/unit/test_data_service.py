@@ -0,0 +1,69 @@
+"""
+Unit tests for the cached data service.
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.data_service import DataService
+
+
+class TestDataService(unittest.TestCase):
+    """
+    Test in-memory caching and invalidation of JSON files.
+    """
+    
+    def setUp(self):
+        """Create a temporary data directory with one JSON file."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.service = DataService(self.tmp_dir.name, check_interval_seconds=0)
+        self._write({"incidentes": [1]})
+    
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp_dir.cleanup()
+    
+    def _write(self, data):
+        """Write the test JSON file."""
+        with open(os.path.join(self.tmp_dir.name, "examples.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    
+    def test_cached_until_file_changes(self):
+        """Test that data is cached and reloaded when the file changes."""
+        self.assertEqual(self.service.load_json_file("examples.json"), {"incidentes": [1]})
+        self.service.load_json_file("examples.json")
+        self.assertEqual(self.service.get_cache_stats()["misses"], 1)
+        
+        self._write({"incidentes": [1, 2]})
+        self.assertEqual(self.service.load_json_file("examples.json"), {"incidentes": [1, 2]})
+    
+    def test_serialized_payload_etag_changes_with_content(self):
+        """Test that the ETag is stable per file version."""
+        body, etag = self.service.get_serialized_payload("examples.json", lambda data: data)
+        self.assertEqual(json.loads(body), {"incidentes": [1]})
+        self.assertEqual(self.service.get_serialized_payload("examples.json", lambda data: data)[1], etag)
+        
+        self._write({"incidentes": [3, 4, 5]})
+        self.assertNotEqual(self.service.get_serialized_payload("examples.json", lambda data: data)[1], etag)
+    
+    def test_callers_cannot_mutate_the_cache(self):
+        """Test that changing loaded data leaves the cache and its payload untouched."""
+        data = self.service.load_json_file("examples.json")
+        data["incidentes"].append(99)
+        
+        self.assertEqual(self.service.load_json_file("examples.json"), {"incidentes": [1]})
+        body, _ = self.service.get_serialized_payload("examples.json", lambda data: data)
+        self.assertEqual(json.loads(body), {"incidentes": [1]})
+    
+    def test_missing_file(self):
+        """Test that a missing file returns an empty dict."""
+        self.assertEqual(self.service.load_json_file("missing.json"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
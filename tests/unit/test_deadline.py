@@ -0,0 +1,201 @@
+"""
+Unit tests for end-to-end request deadlines.
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from fastapi import HTTPException
+from langchain_core.runnables import RunnableLambda
+
+from src.controllers.incident_controller import IncidentController
+from src.services.llm_resilience import ModelGuard, with_resilient_fallback
+from src.services.rag.embedding_deadline import DeadlineBoundEmbeddings
+from src.utils.deadline import (
+    DeadlineExceededError,
+    deadline_scope,
+    get_deadline,
+    parse_client_timeout,
+    resolve_budget,
+    stage_timeout
+)
+
+
+class FlakyEmbeddings:
+    """Embeddings backend that fails a number of times before answering."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("backend down")
+        return [1.0, 0.0]
+
+
+class TestDeadlineContext(unittest.TestCase):
+    """
+    Test deadline scopes, stage sizing and budget resolution.
+    """
+
+    def test_stage_timeout_sizing(self):
+        """Test that stage timeouts shrink to the remaining budget."""
+        self.assertEqual(stage_timeout("llm.call", 60.0), 60.0)
+        with deadline_scope(2.0) as deadline:
+            self.assertLessEqual(stage_timeout("llm.call", 60.0), 2.0)
+            self.assertEqual(stage_timeout("llm.call", 0.5), 0.5)
+            self.assertLessEqual(deadline.timeout(reserve=1.5), 0.5)
+            with self.assertRaises(DeadlineExceededError) as raised:
+                stage_timeout("rag", reserve=5.0)
+            self.assertEqual(raised.exception.stage, "rag")
+        self.assertIsNone(get_deadline())
+
+    def test_nested_scope_never_extends(self):
+        """Test that an inner scope keeps the earlier expiry."""
+        with deadline_scope(1.0) as outer:
+            with deadline_scope(30.0) as inner:
+                self.assertEqual(inner.expires_at, outer.expires_at)
+            with deadline_scope(None) as same:
+                self.assertIs(same, outer)
+
+    def test_deadline_reaches_worker_threads(self):
+        """Test that to_thread and gathered tasks see the request deadline."""
+        async def scenario():
+            with deadline_scope(5.0) as deadline:
+                seen = await asyncio.gather(asyncio.to_thread(get_deadline), asyncio.sleep(0, get_deadline()))
+            return deadline, seen
+
+        deadline, seen = asyncio.run(scenario())
+        self.assertEqual(seen, [deadline, deadline])
+
+    def test_budget_resolution(self):
+        """Test client timeout parsing, capping and the response margin."""
+        self.assertEqual(parse_client_timeout("2.5"), 2.5)
+        self.assertIsNone(parse_client_timeout("soon"))
+        self.assertIsNone(parse_client_timeout("-1"))
+
+        overrides = {"deadline_default_seconds": 0.0, "deadline_max_seconds": 20.0, "deadline_margin_seconds": 0.5}
+        with patch.dict("src.utils.deadline.config", overrides):
+            self.assertIsNone(resolve_budget(None))
+            self.assertEqual(resolve_budget(10.0), 9.5)
+            self.assertEqual(resolve_budget(100.0), 19.5)
+
+
+class TestDeadlineBoundEmbeddings(unittest.TestCase):
+    """
+    Test embedding retries sized from the remaining budget.
+    """
+
+    def test_retries_without_deadline(self):
+        """Test that transient errors are retried as the old client did."""
+        backend = FlakyEmbeddings(failures=2)
+        embeddings = DeadlineBoundEmbeddings(backend, max_retries=3, backoff_seconds=0.01)
+        self.assertEqual(embeddings.embed_query("phishing"), [1.0, 0.0])
+        self.assertEqual(backend.calls, 3)
+
+    def test_no_retry_past_the_deadline(self):
+        """Test that a retry whose backoff does not fit is not attempted."""
+        backend = FlakyEmbeddings(failures=5)
+        embeddings = DeadlineBoundEmbeddings(backend, max_retries=3, backoff_seconds=1.0)
+        start = time.monotonic()
+        with deadline_scope(0.8):
+            with self.assertRaises(ConnectionError):
+                embeddings.embed_query("phishing")
+        self.assertEqual(backend.calls, 1)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+class TestLLMDeadline(unittest.TestCase):
+    """
+    Test that LLM calls and fallbacks respect the request deadline.
+    """
+
+    def test_call_cut_by_deadline_frees_the_slot(self):
+        """Test that a deadline cut is not counted against the model."""
+        async def slow(_):
+            await asyncio.sleep(5)
+
+        async def scenario():
+            guard = ModelGuard("deadline-test")
+            with deadline_scope(0.2):
+                with self.assertRaises(DeadlineExceededError) as raised:
+                    await guard.call(RunnableLambda(slow), "prompt")
+            return guard, raised.exception
+
+        start = time.monotonic()
+        guard, error = asyncio.run(scenario())
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(error.stage, "llm.call")
+        self.assertEqual(guard.limiter.in_flight, 0)
+        self.assertEqual(guard.breaker.get_status()["window_calls"], 0)
+
+    def test_fallback_skipped_without_budget(self):
+        """Test that the fallback is not tried when the budget is too short."""
+        fallback_calls = []
+
+        async def failing(_):
+            raise RuntimeError("primary down")
+
+        async def fallback(_):
+            fallback_calls.append(1)
+            return "fallback"
+
+        protected = with_resilient_fallback(
+            "deadline-primary", RunnableLambda(failing), "deadline-fallback", RunnableLambda(fallback)
+        )
+
+        async def scenario():
+            with deadline_scope(1.0) as deadline:
+                with self.assertRaises(DeadlineExceededError):
+                    await protected.ainvoke("prompt")
+                return deadline
+
+        deadline = asyncio.run(scenario())
+        self.assertEqual(fallback_calls, [])
+        self.assertEqual(deadline.skipped_stages, ["llm.fallback"])
+
+
+class TestAnalyzeDeadline(unittest.TestCase):
+    """
+    Test that /analyze answers 504 once the client deadline passes.
+    """
+
+    def test_slow_analysis_returns_504(self):
+        """Test that the analysis is cancelled at the deadline."""
+        class SlowAnalyzer:
+            cancelled = False
+
+            async def analyze_incident(self, request, rag_max_chunks=None):
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    SlowAnalyzer.cancelled = True
+                    raise
+
+        controller = IncidentController()
+        start = time.monotonic()
+        with patch.object(controller, "_get_analyzer", return_value=SlowAnalyzer()), \
+                patch.dict("src.utils.deadline.config", {"deadline_margin_seconds": 0.1}):
+            with self.assertRaises(HTTPException) as raised:
+                asyncio.run(controller.analyze_incident(
+                    {"titulo": "Phishing masivo", "descripcion": "Correo fraudulento a finanzas"},
+                    "rapido",
+                    timeout_seconds=0.4
+                ))
+
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(raised.exception.status_code, 504)
+        self.assertEqual(raised.exception.detail["deadline"]["budget_ms"], 300.0)
+        self.assertTrue(SlowAnalyzer.cancelled)
+
+
+if __name__ == "__main__":
+    unittest.main()
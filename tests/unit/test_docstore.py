@@ -0,0 +1,64 @@
+"""
+Unit tests for the parent-section docstore and small-to-big expansion.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.documents import Document
+
+from src.services.rag.docstore import SecurityDocStore
+from src.services.rag.retriever import SecurityRetriever
+
+
+class TestSecurityDocStore(unittest.TestCase):
+    """
+    Test SQLite docstore and parent expansion in the retriever.
+    """
+
+    def setUp(self):
+        """Create a docstore in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.docstore = SecurityDocStore(os.path.join(self.tmp_dir.name, "docstore.sqlite3"))
+        self.docstore.add_sections([
+            Document(page_content="Sección MAGERIT completa", metadata={"chunk_id": "doc_0"}),
+            Document(page_content="Sección ISO 27001 completa", metadata={"chunk_id": "doc_1"})
+        ])
+
+    def tearDown(self):
+        """Close the docstore and remove temporary files."""
+        self.docstore.close()
+        self.tmp_dir.cleanup()
+
+    def test_get_sections_by_chunk_id(self):
+        """Test batch lookup of parent sections."""
+        sections = self.docstore.get_sections(["doc_1", "doc_0", "missing"])
+        self.assertEqual(set(sections), {"doc_0", "doc_1"})
+        self.assertEqual(sections["doc_1"].page_content, "Sección ISO 27001 completa")
+        self.assertEqual(self.docstore.count(), 2)
+
+    def test_expand_to_parents_deduplicates(self):
+        """Test that children of the same parent collapse into one section."""
+        retriever = SecurityRetriever(vectorstore=None, docstore=self.docstore)
+        children = [
+            Document(page_content="hijo a", metadata={"chunk_id": "doc_1_0", "parent_id": "doc_1"}),
+            Document(page_content="hijo b", metadata={"chunk_id": "doc_0_2", "parent_id": "doc_0"}),
+            Document(page_content="hijo c", metadata={"chunk_id": "doc_1_3", "parent_id": "doc_1"}),
+            Document(page_content="plano", metadata={"chunk_id": "legacy_4"})
+        ]
+
+        expanded = retriever._expand_to_parents(children)
+
+        self.assertEqual(
+            [doc.metadata["chunk_id"] for doc in expanded],
+            ["doc_1", "doc_0", "legacy_4"]
+        )
+        self.assertEqual(expanded[0].metadata["matched_child_id"], "doc_1_0")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Unit tests for query-embedding micro-batching.
+"""
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.fake_backends import HashingEmbeddings
+from src.services.rag.embedding_batcher import MicroBatchingEmbeddings
+
+
+class RecordingEmbeddings(HashingEmbeddings):
+    """Hashing embeddings that record every backend call."""
+
+    def __init__(self, fail: bool = False):
+        super().__init__(size=32, latency_seconds=0.02)
+        self.fail = fail
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self.lock:
+            self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("backend down")
+        return super().embed_documents(texts)
+
+
+class TestMicroBatchingEmbeddings(unittest.TestCase):
+    """
+    Test batching, fan-out and error propagation.
+    """
+
+    def test_concurrent_queries_share_backend_calls(self):
+        """Test that a burst of queries needs far fewer backend calls."""
+        backend = RecordingEmbeddings()
+        batcher = MicroBatchingEmbeddings(backend, window_seconds=0.02, max_batch_size=64)
+        queries = [f"phishing incident {i}" for i in range(32)]
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            vectors = list(pool.map(batcher.embed_query, queries))
+
+        for query, vector in zip(queries, vectors):
+            self.assertEqual(vector, backend.embed_text(query))
+        self.assertLessEqual(len(backend.calls), 4)
+        self.assertEqual(batcher.get_stats()["queries"], 32)
+
+    def test_duplicate_queries_are_embedded_once(self):
+        """Test that identical queries in a batch hit the backend once."""
+        backend = RecordingEmbeddings()
+        batcher = MicroBatchingEmbeddings(backend, window_seconds=0.05, max_batch_size=8)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            vectors = list(pool.map(batcher.embed_query, ["same query"] * 8))
+
+        self.assertEqual(len({tuple(v) for v in vectors}), 1)
+        self.assertEqual(sum(len(call) for call in backend.calls), len(backend.calls))
+
+    def test_errors_reach_every_waiter(self):
+        """Test that a backend error is raised in every batched caller."""
+        batcher = MicroBatchingEmbeddings(RecordingEmbeddings(fail=True), window_seconds=0.02)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(batcher.embed_query, f"q{i}") for i in range(4)]
+        for future in futures:
+            self.assertRaises(RuntimeError, future.result)
+
+    def test_delegates_documents_and_attributes(self):
+        """Test that document embedding and backend attributes pass through."""
+        backend = RecordingEmbeddings()
+        batcher = MicroBatchingEmbeddings(backend)
+        self.assertEqual(batcher.size, 32)
+        self.assertEqual(len(batcher.embed_documents(["a", "b"])), 2)
+        self.assertEqual(backend.calls, [["a", "b"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Unit tests for the retrieval evaluation metrics.
+"""
+import os
+import sys
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from benchmarks.eval_retrieval import (
+    build_labeled_queries,
+    covered_passages,
+    ndcg_at_k,
+    pareto_front,
+    recall_at_k,
+    reciprocal_rank,
+    shingles,
+    split_passages
+)
+
+
+class TestRetrievalMetrics(unittest.TestCase):
+    """
+    Test ranking metrics, passage coverage and the Pareto front.
+    """
+
+    def test_ranking_metrics(self):
+        """Test recall, MRR and nDCG on a ranked list with a duplicate hit."""
+        relevant = {1, 2}
+        ranked = [set(), {1}, {1}, {2}]
+
+        self.assertEqual(recall_at_k(ranked, relevant, 2), 0.5)
+        self.assertEqual(recall_at_k(ranked, relevant, 4), 1.0)
+        self.assertEqual(reciprocal_rank(ranked, 4), 0.5)
+        self.assertEqual(reciprocal_rank([set()], 4), 0.0)
+        self.assertEqual(ndcg_at_k([{1}, {2}], relevant, 2), 1.0)
+        # The duplicate at rank 3 earns nothing
+        self.assertLess(ndcg_at_k(ranked, relevant, 4), ndcg_at_k([{1}, {2}], relevant, 4))
+
+    def test_covered_passages(self):
+        """Test that a section covers passages whose shingles it contains."""
+        passage = "la gestión de contraseñas debe ser robusta"
+        passage_shingles = {0: shingles(passage), 1: shingles("texto sin relación alguna aquí")}
+        section = f"Introducción.\n\n{passage}\n\nOtro párrafo."
+
+        self.assertEqual(covered_passages(section, passage_shingles, {0, 1}), {0})
+
+    def test_pareto_front(self):
+        """Test that dominated configurations are excluded."""
+        rows = [
+            {"ndcg": 0.8, "p95_ms": 50},
+            {"ndcg": 0.6, "p95_ms": 20},
+            {"ndcg": 0.5, "p95_ms": 60},
+        ]
+        self.assertEqual(pareto_front(rows, {"ndcg": "max", "p95_ms": "min"}), [0, 1])
+
+    def test_labeled_set_from_bundled_data(self):
+        """Test that every label in the bundled set has relevant passages."""
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+        passages = split_passages(os.path.join(root, "docs"))
+        labeled = build_labeled_queries(
+            passages,
+            os.path.join(root, "data/incident_examples.json"),
+            os.path.join(root, "benchmarks/retrieval_labels.json")
+        )
+        labels = {item["label"] for item in labeled}
+
+        self.assertIn("phishing", labels)
+        self.assertIn("MAGERIT", labels)
+        self.assertTrue(all(item["relevant"] for item in labeled))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for the deterministic fake LLM and embedding backends.
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from src.services.fake_backends import (
+    FakeBackendError,
+    FakeSecurityChatModel,
+    FaultInjector,
+    HashingEmbeddings
+)
+
+
+class TokenCounter(AsyncCallbackHandler):
+    """Count streamed tokens."""
+
+    def __init__(self):
+        self.tokens = []
+
+    async def on_llm_new_token(self, token, **kwargs):
+        self.tokens.append(token)
+
+
+class TestFakeBackends(unittest.TestCase):
+    """
+    Test determinism, schema, streaming and fault injection of the fakes.
+    """
+
+    def test_embeddings_are_deterministic_and_lexical(self):
+        """Test that equal texts match and related texts are closer."""
+        embeddings = HashingEmbeddings(size=128)
+        query = embeddings.embed_query("ransomware cifra servidores")
+        related, unrelated = embeddings.embed_documents([
+            "el ransomware cifra los servidores de archivos",
+            "política de contraseñas y formación"
+        ])
+
+        def dot(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        self.assertEqual(query, embeddings.embed_query("ransomware cifra servidores"))
+        self.assertGreater(dot(query, related), dot(query, unrelated))
+
+    def test_chat_model_returns_schema_valid_json_and_usage(self):
+        """Test the analysis schema and the reported token usage."""
+        model = FakeSecurityChatModel(model_name="gpt-3.5-turbo")
+        messages = [HumanMessage(content="Phishing a tesorería")]
+
+        result = asyncio.run(model.agenerate([messages]))
+        content = result.generations[0][0].text
+
+        self.assertEqual(content, asyncio.run(model.ainvoke(messages)).content)
+        for key in ("vulnerabilidades", "impactos", "controles"):
+            self.assertIn(f'"{key}"', content)
+        self.assertGreater(result.llm_output["token_usage"]["completion_tokens"], 0)
+
+    def test_streaming_emits_chunks(self):
+        """Test that streaming mode reports tokens through callbacks."""
+        model = FakeSecurityChatModel(streaming=True, chunk_chars=10)
+        counter = TokenCounter()
+
+        message = asyncio.run(model.ainvoke(
+            [HumanMessage(content="Malware")],
+            config={"callbacks": [counter]}
+        ))
+
+        self.assertEqual("".join(counter.tokens), message.content)
+        self.assertGreater(len(counter.tokens), 10)
+
+    def test_fault_injection_is_reproducible(self):
+        """Test that the same seed yields the same fault sequence."""
+        injector_a, injector_b = FaultInjector(seed=7), FaultInjector(seed=7)
+        sequence_a = [injector_a.draw(0.3, 0.1) for _ in range(50)]
+        sequence_b = [injector_b.draw(0.3, 0.1) for _ in range(50)]
+
+        self.assertEqual(sequence_a, sequence_b)
+        self.assertIn("error", sequence_a)
+
+    def test_reseed_restarts_and_diverges_sequence(self):
+        """Test that reseeding restarts the sequence and other seeds differ."""
+        injector = FaultInjector(seed=7)
+        first = [injector.draw(0.3, 0.1) for _ in range(50)]
+        injector.reseed(7)
+        self.assertEqual([injector.draw(0.3, 0.1) for _ in range(50)], first)
+
+        injector.reseed(8)
+        self.assertNotEqual([injector.draw(0.3, 0.1) for _ in range(50)], first)
+
+    def test_error_rate_raises(self):
+        """Test that an error rate of 1 always fails."""
+        model = FakeSecurityChatModel(error_rate=1.0)
+        with self.assertRaises(FakeBackendError):
+            asyncio.run(model.ainvoke([HumanMessage(content="x")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
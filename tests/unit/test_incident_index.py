@@ -0,0 +1,86 @@
+"""
+Unit tests for the similar-incident history index.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import chromadb
+from chromadb.config import Settings
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from src.services.rag.incident_index import IncidentHistoryIndex
+
+
+class TestIncidentHistoryIndex(unittest.TestCase):
+    """
+    Test indexing and lookup of analyzed incidents.
+    """
+
+    def setUp(self):
+        """Create an index backed by a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index = IncidentHistoryIndex(self.tmp_dir.name, DeterministicFakeEmbedding(size=32))
+        self.incident = {
+            "titulo": "Ransomware en servidor de archivos",
+            "descripcion": "Archivos cifrados con extensión .locked",
+            "categoria_inicial": "malware"
+        }
+        self.analysis = {
+            "vulnerabilidades": [{"descripcion": "SMB expuesto", "severidad": "alta"}],
+            "controles": [{"descripcion": "Restaurar backups", "tipo": "correctivo", "prioridad": "alta"}]
+        }
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp_dir.cleanup()
+
+    def test_empty_index_returns_no_results(self):
+        """Test lookup on an empty index."""
+        self.assertEqual(asyncio.run(self.index.find_similar("ransomware")), [])
+
+    def test_index_and_find_exact_match(self):
+        """Test that an indexed analysis is found by its own text."""
+        indexed = asyncio.run(self.index.index_analysis(
+            "analysis-1", self.incident, self.analysis, {"nivel": "alta"}
+        ))
+        self.assertTrue(indexed)
+        self.assertEqual(self.index.count(), 1)
+
+        text = IncidentHistoryIndex.build_incident_text(self.incident, self.analysis)
+        similar = asyncio.run(self.index.find_similar(text, k=3, min_score=0.9))
+
+        self.assertEqual(len(similar), 1)
+        self.assertEqual(similar[0]["id_analisis"], "analysis-1")
+        self.assertEqual(similar[0]["risk_level"], "alta")
+        self.assertIn("PRECEDENTES", self.index.format_similar_for_prompt(similar))
+
+    def test_reindexing_same_analysis_does_not_duplicate(self):
+        """Test that the analysis ID is used as document ID."""
+        for _ in range(2):
+            asyncio.run(self.index.index_analysis("analysis-1", self.incident, self.analysis))
+        self.assertEqual(self.index.count(), 1)
+
+    def test_workers_share_the_vector_service_collection(self):
+        """Test that indexes on one shared client see each other's inserts."""
+        client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+        remote_dir = os.path.join(self.tmp_dir.name, "unused")
+        embeddings = DeterministicFakeEmbedding(size=32)
+        writer = IncidentHistoryIndex(remote_dir, embeddings, client=client)
+        reader = IncidentHistoryIndex(remote_dir, embeddings, client=client)
+
+        asyncio.run(writer.index_analysis("analysis-remote", self.incident, self.analysis))
+        text = IncidentHistoryIndex.build_incident_text(self.incident, self.analysis)
+        similar = asyncio.run(reader.find_similar(text, k=1))
+
+        self.assertEqual(similar[0]["id_analisis"], "analysis-remote")
+        self.assertFalse(os.path.exists(remote_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Unit tests for prebuilt index artifacts.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.documents import Document
+
+from benchmarks.stubs import install_stubs
+from src.build_index import build_artifact
+from src.services.fake_backends import HashingEmbeddings
+from src.services.rag.core import SecurityKnowledgeRAG
+from src.services.rag.index_artifact import (
+    FlatVectorIndex,
+    IndexArtifact,
+    IndexArtifactError,
+    IndexArtifactWriter,
+    write_index_artifact
+)
+from src.services.rag.vector_store import SecurityVectorStore
+
+DOCS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../docs'))
+
+
+class TestIndexArtifactFormat(unittest.TestCase):
+    """
+    Test writing, mmap loading and searching an artifact.
+    """
+
+    def setUp(self):
+        """Write a small artifact with hashing embeddings."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "index.rgidx")
+        self.embeddings = HashingEmbeddings(size=64)
+        texts = ["phishing correo fraudulento", "ransomware cifrado archivos", "magerit análisis de riesgos"]
+        self.chunks = [
+            Document(page_content=text, metadata={"chunk_id": f"c{i}", "parent_id": "p0", "document_type": "test"})
+            for i, text in enumerate(texts)
+        ]
+        self.parents = [Document(page_content=" ".join(texts), metadata={"chunk_id": "p0"})]
+        write_index_artifact(
+            self.path, self.chunks, self.embeddings.embed_documents(texts), self.parents,
+            {"embedding_backend": "hashing:64", "docs_manifest": {"hash": "abc"}}
+        )
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_and_search(self):
+        """Test that vectors are memory-mapped and searches find the exact text."""
+        artifact = IndexArtifact.load(self.path, verify=True)
+        self.assertEqual(artifact.header["count"], 3)
+        self.assertFalse(artifact.vectors.flags.writeable)
+
+        index = FlatVectorIndex(artifact, self.embeddings)
+        self.assertEqual(index.similarity_search("ransomware cifrado archivos", k=1)[0].metadata["chunk_id"], "c1")
+        self.assertEqual(len(index.max_marginal_relevance_search("riesgos", k=2, fetch_k=3)), 2)
+        self.assertRaises(NotImplementedError, index.add_texts, ["nuevo"])
+
+    def test_corrupt_artifacts_are_rejected(self):
+        """Test truncated files and foreign files."""
+        data = Path(self.path).read_bytes()
+        Path(self.path).write_bytes(data[:-16])
+        self.assertRaises(IndexArtifactError, IndexArtifact.load, self.path)
+
+        Path(self.path).write_bytes(b"not an index" + data)
+        self.assertRaises(IndexArtifactError, IndexArtifact.load, self.path)
+
+    def test_streamed_batches_match_single_write(self):
+        """Test that writing in batches yields the same verified content."""
+        streamed_path = os.path.join(self.tmp_dir.name, "streamed.rgidx")
+        vectors = self.embeddings.embed_documents([chunk.page_content for chunk in self.chunks])
+        manifest = {"embedding_backend": "hashing:64", "docs_manifest": {"hash": "abc"}}
+        with IndexArtifactWriter(streamed_path, self.chunks, self.parents, manifest) as writer:
+            writer.add_vectors(vectors[:2])
+            writer.add_vectors(vectors[2:])
+            header = writer.close()
+
+        streamed = IndexArtifact.load(streamed_path, verify=True)
+        original = IndexArtifact.load(self.path, verify=True)
+        self.assertEqual(header["content_sha256"], original.header["content_sha256"])
+        self.assertEqual([doc.metadata for doc in streamed.parents], [doc.metadata for doc in original.parents])
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["index.rgidx", "streamed.rgidx"])
+
+    def test_incomplete_write_is_discarded(self):
+        """Test that a writer left without all its vectors publishes nothing."""
+        partial_path = os.path.join(self.tmp_dir.name, "partial.rgidx")
+        with self.assertRaises(IndexArtifactError):
+            with IndexArtifactWriter(partial_path, self.chunks, self.parents, {}) as writer:
+                writer.add_vectors(self.embeddings.embed_documents(["phishing"]))
+                writer.close()
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["index.rgidx"])
+
+    def test_vector_store_checks_backend_and_docs(self):
+        """Test that incompatible or stale artifacts are not loaded."""
+        store = SecurityVectorStore(self.tmp_dir.name)
+        store.embeddings = HashingEmbeddings(size=32)
+        self.assertIsNone(store.load_index_artifact(self.path))
+
+        store.embeddings = self.embeddings
+        self.assertIsNone(store.load_index_artifact(self.path, docs_hash="changed"))
+        self.assertIsNotNone(store.load_index_artifact(self.path, docs_hash="abc"))
+        self.assertEqual(store.get_vectorstore_stats()["source"], "artifact")
+        self.assertEqual(store.get_vectorstore_stats()["total_documents"], 3)
+
+
+class TestWarmStartup(unittest.TestCase):
+    """
+    Test that the RAG service starts from an artifact without embedding documents.
+    """
+
+    def setUp(self):
+        """Build an artifact of the repo docs with fake embeddings."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.artifact_path = os.path.join(self.tmp_dir.name, "index.rgidx")
+        self.stubs = install_stubs()
+        self.stubs.__enter__()
+        asyncio.run(build_artifact(DOCS_DIR, self.artifact_path))
+
+    def tearDown(self):
+        """Restore config and remove temporary files."""
+        self.stubs.__exit__(None, None, None)
+        self.tmp_dir.cleanup()
+
+    def test_initialize_from_artifact(self):
+        """Test startup from the artifact: no Chroma index, no document embedding."""
+        rag = SecurityKnowledgeRAG(DOCS_DIR, os.path.join(self.tmp_dir.name, "vectorstore"))
+        rag.config["rag_index_artifact"] = self.artifact_path
+        calls = []
+        original = HashingEmbeddings.embed_documents
+        HashingEmbeddings.embed_documents = lambda self, texts: calls.append(texts) or original(self, texts)
+        try:
+            self.assertTrue(asyncio.run(rag.initialize()))
+            results = asyncio.run(rag.search_relevant_context("metodología MAGERIT", 3))
+        finally:
+            HashingEmbeddings.embed_documents = original
+
+        self.assertEqual(rag.active_version, "artifact")
+        self.assertEqual(rag.get_stats()["vectorstore"]["source"], "artifact")
+        self.assertTrue(results)
+        self.assertTrue(all(len(batch) == 1 for batch in calls))
+        self.assertFalse((Path(self.tmp_dir.name) / "vectorstore" / "chroma.sqlite3").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Unit tests for the blue/green versioned RAG index.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from benchmarks.stubs import install_stubs
+from src.services.rag.core import SecurityKnowledgeRAG
+from src.services.rag.index_versions import LEGACY_VERSION, IndexVersionManager
+
+DOCS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../docs'))
+
+
+class TestIndexVersionManager(unittest.TestCase):
+    """
+    Test the ACTIVE pointer, reader counts and garbage collection.
+    """
+
+    def setUp(self):
+        """Create a manager over a temporary root."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.versions = IndexVersionManager(self.tmp_dir.name, keep_versions=2)
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp_dir.cleanup()
+
+    def _make(self, version):
+        self.versions.path_for(version).mkdir(parents=True)
+        return version
+
+    def test_legacy_until_activated(self):
+        """Test that the root index is active until a version is activated."""
+        self.assertEqual(self.versions.active_version(), LEGACY_VERSION)
+        self.assertEqual(self.versions.path_for(LEGACY_VERSION), Path(self.tmp_dir.name))
+
+        version = self._make("v1")
+        self.versions.activate(version)
+        self.assertEqual(self.versions.active_version(), "v1")
+        self.assertRaises(ValueError, self.versions.activate, "missing")
+
+    def test_collect_keeps_recent_active_and_read_versions(self):
+        """Test that only old, inactive and drained versions are removed."""
+        for version in ("v1", "v2", "v3", "v4"):
+            self._make(version)
+        self.versions.activate("v4")
+        self.versions.acquire("v1")
+
+        self.assertEqual(self.versions.collect(), ["v2"])
+        self.assertEqual(self.versions.list_versions(), ["v1", "v3", "v4"])
+
+        self.versions.release("v1")
+        self.assertEqual(self.versions.collect(), ["v1"])
+        self.assertEqual(self.versions.get_status()["readers"], {})
+
+
+class TestBlueGreenRebuild(unittest.TestCase):
+    """
+    Test rebuilding the index while searches keep being served.
+    """
+
+    def setUp(self):
+        """Initialize a RAG over the repo docs with fake embeddings."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.stubs = install_stubs()
+        self.stubs.__enter__()
+        self.rag = SecurityKnowledgeRAG(DOCS_DIR, self.tmp_dir.name)
+        self.assertTrue(asyncio.run(self.rag.initialize()))
+
+    def tearDown(self):
+        """Restore config and remove temporary files."""
+        self.stubs.__exit__(None, None, None)
+        self.tmp_dir.cleanup()
+
+    def test_rebuild_swaps_without_interrupting_searches(self):
+        """Test that searches succeed during the rebuild and the new version becomes active."""
+        first_version = self.rag.active_version
+
+        async def scenario():
+            rebuild = asyncio.create_task(self.rag.rebuild_index())
+            counts = []
+            while not rebuild.done():
+                counts.append(len(await self.rag.search_relevant_context("riesgos MAGERIT", 3)))
+                await asyncio.sleep(0)
+            return await rebuild, counts
+
+        status, counts = asyncio.run(scenario())
+
+        self.assertEqual(status["state"], "completed")
+        self.assertNotEqual(self.rag.active_version, first_version)
+        self.assertEqual(self.rag.index_versions.active_version(), self.rag.active_version)
+        self.assertTrue(counts and all(counts))
+        self.assertTrue(asyncio.run(self.rag.search_relevant_context("riesgos MAGERIT", 3)))
+
+    def test_failed_validation_keeps_active_version(self):
+        """Test that a rebuild failing validation is discarded."""
+        first_version = self.rag.active_version
+
+        async def no_results(*args, **kwargs):
+            return []
+
+        original = self.rag._build_retriever
+
+        def build_empty_retriever(vector_store):
+            retriever = original(vector_store)
+            retriever.search_documents = no_results
+            return retriever
+
+        self.rag._build_retriever = build_empty_retriever
+        status = asyncio.run(self.rag.rebuild_index())
+
+        self.assertEqual(status["state"], "failed")
+        self.assertEqual(self.rag.active_version, first_version)
+        self.assertEqual(self.rag.index_versions.list_versions(), [first_version])
+
+    def test_concurrent_forced_reindex_runs_one_build(self):
+        """Test that reinitialize(force_reindex=True) joins a rebuild already running."""
+        builds = []
+        original = self.rag._build_version
+
+        async def counting_build(version):
+            builds.append(version)
+            return await original(version)
+
+        self.rag._build_version = counting_build
+
+        async def scenario():
+            self.rag.start_rebuild()
+            return await asyncio.gather(
+                self.rag.reinitialize(force_reindex=True),
+                self.rag.reinitialize(force_reindex=True)
+            )
+
+        self.assertEqual(asyncio.run(scenario()), [True, True])
+        self.assertEqual(len(builds), 1)
+
+    def test_read_only_worker_never_builds_or_collects(self):
+        """Test that a pre-fork worker opens the active version and refuses to build."""
+        with patch.dict(os.environ, {"RAG_INDEX_READ_ONLY": "true"}):
+            worker = SecurityKnowledgeRAG(DOCS_DIR, self.tmp_dir.name)
+            self.assertTrue(asyncio.run(worker.initialize()))
+            self.assertEqual(worker.active_version, self.rag.active_version)
+            self.assertRaises(RuntimeError, worker.start_rebuild)
+
+            with tempfile.TemporaryDirectory() as empty_dir:
+                self.assertFalse(asyncio.run(SecurityKnowledgeRAG(DOCS_DIR, empty_dir).initialize()))
+                self.assertEqual(os.listdir(empty_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
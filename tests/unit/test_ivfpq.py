@@ -0,0 +1,110 @@
+"""
+Unit tests for the IVF-PQ approximate index.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.ann_recall import exact_search, make_queries, synthetic_vectors
+from src.services.fake_backends import HashingEmbeddings
+from src.services.rag.index_artifact import IndexArtifact, IndexArtifactError, write_index_artifact
+from src.services.rag.ivfpq import IVFPQIndex, IVFPQVectorIndex, build_ivfpq_for_artifact
+
+
+class TestIVFPQIndex(unittest.TestCase):
+    """
+    Test recall against exact search and the on-disk format.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Build one small index shared by the tests."""
+        cls.vectors = synthetic_vectors(4000, 32, clusters=40, spread=0.5, seed=7)
+        cls.index = IVFPQIndex.build(cls.vectors, nlist=16, m=8, iterations=10, seed=7)
+        cls.queries = make_queries(cls.vectors, 50, noise=0.05, seed=7)
+
+    def _recall(self, nprobe, k=10):
+        hits = 0
+        for query in self.queries:
+            expected = set(exact_search(self.vectors, query, k).tolist())
+            ids, _ = self.index.search(query, k, self.vectors, nprobe=nprobe, rerank=100)
+            hits += len(expected & set(ids.tolist()))
+        return hits / (k * len(self.queries))
+
+    def test_recall_grows_with_nprobe(self):
+        """Test that probing every list is near exact and fewer lists never do better."""
+        recalls = [self._recall(nprobe) for nprobe in (1, 4, 16)]
+        self.assertEqual(recalls, sorted(recalls))
+        self.assertGreater(recalls[-1], 0.95)
+
+    def test_scores_are_exact_similarities(self):
+        """Test that re-ranked scores are the exact inner products, best first."""
+        ids, scores = self.index.search(self.queries[0], 5, self.vectors, nprobe=16)
+        np.testing.assert_allclose(scores, self.vectors[ids] @ self.queries[0], rtol=1e-5)
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_save_load_roundtrip(self):
+        """Test that a saved index gives the same results and rejects foreign files."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.rgidx.ivfpq")
+            self.index.save(path)
+            loaded = IVFPQIndex.load(path)
+
+            self.assertEqual(loaded.get_stats(), self.index.get_stats())
+            expected, _ = self.index.search(self.queries[1], 10, self.vectors, nprobe=4)
+            found, _ = loaded.search(self.queries[1], 10, self.vectors, nprobe=4)
+            np.testing.assert_array_equal(found, expected)
+
+            with open(path, "wb") as f:
+                f.write(b"not an index")
+            self.assertRaises(IndexArtifactError, IVFPQIndex.load, path)
+
+
+class TestIVFPQVectorIndex(unittest.TestCase):
+    """
+    Test the IVF-PQ sidecar of an index artifact.
+    """
+
+    def setUp(self):
+        """Write a small artifact with hashing embeddings."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "index.rgidx")
+        self.embeddings = HashingEmbeddings(size=64)
+        texts = [f"control {i} phishing ransomware magerit riesgo {i % 7}" for i in range(60)]
+        chunks = [Document(page_content=text, metadata={"chunk_id": f"c{i}"}) for i, text in enumerate(texts)]
+        write_index_artifact(
+            self.path, chunks, self.embeddings.embed_documents(texts), [],
+            {"embedding_backend": "hashing:64", "docs_manifest": {"hash": "abc"}}
+        )
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp_dir.cleanup()
+
+    def test_search_through_sidecar(self):
+        """Test that exact duplicates are found through the approximate index."""
+        ivfpq = build_ivfpq_for_artifact(self.path, nlist=4, m=8, iterations=5)
+        index = IVFPQVectorIndex(IndexArtifact.load(self.path), self.embeddings, ivfpq, nprobe=4)
+
+        found = index.similarity_search("control 12 phishing ransomware magerit riesgo 5", k=1)
+        self.assertEqual(found[0].metadata["chunk_id"], "c12")
+        self.assertEqual(index.get_search_info()["type"], "ivfpq")
+
+    def test_rejects_index_of_another_artifact(self):
+        """Test that a sidecar built on different vectors is not used."""
+        ivfpq = build_ivfpq_for_artifact(self.path, nlist=4, m=8, iterations=5)
+        ivfpq.meta["artifact_sha256"] = "0" * 64
+        self.assertRaises(
+            IndexArtifactError, IVFPQVectorIndex, IndexArtifact.load(self.path), self.embeddings, ivfpq
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
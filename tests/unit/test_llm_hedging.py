@@ -0,0 +1,103 @@
+"""
+Unit tests for hedged LLM requests.
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.runnables import RunnableLambda
+
+from src.services.llm_hedging import (
+    HedgingPolicy,
+    get_hedging_policy,
+    reset_hedging_policies,
+    with_hedging
+)
+
+
+class TestHedgingPolicy(unittest.TestCase):
+    """
+    Test the dynamic threshold and the hedge budget.
+    """
+
+    def test_threshold_uses_quantile_after_min_samples(self):
+        """Test the default delay, then the rolling quantile with a floor."""
+        policy = HedgingPolicy("m", quantile=0.9, min_samples=10, min_delay_seconds=0.2,
+                               default_delay_seconds=3.0)
+        self.assertEqual(policy.threshold(), 3.0)
+
+        for i in range(1, 11):
+            policy.observe_ttft(i / 10)
+        self.assertEqual(policy.threshold(), 1.0)
+
+        low = HedgingPolicy("m", min_samples=1, min_delay_seconds=0.2)
+        low.observe_ttft(0.01)
+        self.assertEqual(low.threshold(), 0.2)
+
+    def test_budget_caps_hedge_ratio(self):
+        """Test that at most max_ratio of requests are hedged."""
+        policy = HedgingPolicy("m", max_ratio=0.25)
+        for _ in range(3):
+            policy.record_request(False)
+        self.assertTrue(policy.can_hedge())
+        policy.record_request(True)
+        self.assertFalse(policy.can_hedge())
+
+
+class TestWithHedging(unittest.TestCase):
+    """
+    Test racing the primary against the hedge.
+    """
+
+    def setUp(self):
+        """Fresh policy with a short, permissive threshold."""
+        reset_hedging_policies()
+        self.policy = get_hedging_policy("test-primary")
+        self.policy.default_delay_seconds = 0.05
+        self.policy.max_ratio = 1.0
+        self.cancelled = []
+
+    def tearDown(self):
+        """Do not leak policies into other tests."""
+        reset_hedging_policies()
+
+    def _model(self, name, delay):
+        async def call(prompt):
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(name)
+                raise
+            return name
+        return RunnableLambda(call)
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        """Test that the hedge wins and the slow primary is cancelled."""
+        model = with_hedging("test-primary", self._model("primary", 1.0),
+                             "test-fallback", self._model("hedge", 0.01))
+        self.assertEqual(asyncio.run(model.ainvoke("prompt")), "hedge")
+        self.assertEqual(self.cancelled, ["primary"])
+        self.assertEqual(self.policy.get_status()["hedge_ratio"], 1.0)
+
+    def test_fast_primary_is_not_hedged(self):
+        """Test that a primary answering before the threshold runs alone."""
+        model = with_hedging("test-primary", self._model("primary", 0.0),
+                             "test-fallback", self._model("hedge", 0.0))
+        self.assertEqual(asyncio.run(model.ainvoke("prompt")), "primary")
+        self.assertEqual(self.policy.get_status()["hedge_ratio"], 0.0)
+
+    def test_budget_exhausted_waits_for_primary(self):
+        """Test that without budget the request waits for the primary."""
+        self.policy.max_ratio = 0.0
+        model = with_hedging("test-primary", self._model("primary", 0.1),
+                             "test-fallback", self._model("hedge", 0.0))
+        self.assertEqual(asyncio.run(model.ainvoke("prompt")), "primary")
+        self.assertEqual(self.cancelled, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Unit tests for the LLM concurrency limiter and circuit breaker.
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.runnables import RunnableLambda
+
+from src.services.llm_resilience import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    get_model_guard,
+    reset_model_guards,
+    with_resilient_fallback
+)
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    """
+    Test AIMD adjustment and queueing.
+    """
+
+    def test_aimd_adjustment(self):
+        """Test additive increase on fast successes and multiplicative decrease on errors."""
+        limiter = AdaptiveConcurrencyLimiter("m", initial_limit=4, max_limit=8, backoff=0.5,
+                                             latency_target_seconds=1.0)
+        limiter.in_flight = 1
+        limiter.release(0.1, success=True)
+        self.assertAlmostEqual(limiter.limit, 4.25)
+
+        limiter.in_flight = 1
+        limiter.release(0.1, success=False)
+        self.assertAlmostEqual(limiter.limit, 2.125)
+
+        limiter.in_flight = 1
+        limiter.release(5.0, success=True)  # slow call counts as congestion
+        self.assertAlmostEqual(limiter.limit, 1.0625)
+
+    def test_queue_timeout_and_handoff(self):
+        """Test that waiters time out or receive released slots in order."""
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter("m", initial_limit=1, max_limit=1)
+            self.assertTrue(await limiter.acquire())
+            self.assertFalse(await limiter.acquire(timeout=0.01))
+
+            waiter = asyncio.create_task(limiter.acquire(timeout=1))
+            await asyncio.sleep(0)
+            self.assertEqual(limiter.saturation(), 2.0)
+            limiter.release(0.01, success=True)
+            self.assertTrue(await waiter)
+            self.assertEqual(limiter.in_flight, 1)
+            self.assertEqual(limiter.get_status()["queued"], 0)
+
+        asyncio.run(scenario())
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test state transitions.
+    """
+
+    def test_open_half_open_close(self):
+        """Test that errors open the circuit and a good probe closes it."""
+        breaker = CircuitBreaker("m", failure_rate_threshold=0.5, window_size=4, min_calls=4, open_seconds=0.05)
+        for success in (True, False, False, True):
+            self.assertTrue(breaker.allow_request())
+            breaker.record(0.1, success)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow_request())  # only one probe at a time
+        breaker.record(0.1, True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_slow_calls_open_circuit(self):
+        """Test that a high slow-call rate opens the circuit."""
+        breaker = CircuitBreaker("m", slow_call_seconds=1.0, slow_call_rate_threshold=0.5, min_calls=2)
+        breaker.record(2.0, True)
+        breaker.record(2.0, True)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class TestResilientFallback(unittest.TestCase):
+    """
+    Test routing to the fallback model.
+    """
+
+    def setUp(self):
+        """Start from fresh per-model guards."""
+        reset_model_guards()
+
+    def tearDown(self):
+        """Do not leak guards into other tests."""
+        reset_model_guards()
+
+    def test_open_circuit_skips_primary(self):
+        """Test that an open circuit sends traffic straight to the fallback."""
+        calls = []
+
+        async def primary(prompt):
+            calls.append("primary")
+            raise RuntimeError("brownout")
+
+        async def fallback(prompt):
+            calls.append("fallback")
+            return "ok"
+
+        model = with_resilient_fallback(
+            "test-primary", RunnableLambda(primary), "test-fallback", RunnableLambda(fallback)
+        )
+        guard = get_model_guard("test-primary")
+        guard.breaker.min_calls = 2
+
+        async def scenario():
+            for _ in range(4):
+                self.assertEqual(await model.ainvoke("prompt"), "ok")
+
+        asyncio.run(scenario())
+        self.assertEqual(guard.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(calls.count("primary"), 2)
+        self.assertEqual(calls.count("fallback"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Unit tests for Prometheus metrics helpers.
+"""
+import os
+import sys
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test cost estimation and metric rendering.
+    """
+
+    def test_estimate_cost_matches_dated_model_names(self):
+        """Test that dated model variants use their base pricing."""
+        self.assertAlmostEqual(metrics.estimate_cost("gpt-3.5-turbo", 1000, 1000), 0.002)
+        self.assertAlmostEqual(metrics.estimate_cost("gpt-3.5-turbo-0125", 1000, 1000), 0.002)
+        self.assertEqual(metrics.estimate_cost("unknown-model", 1000, 1000), 0.0)
+
+    def test_observe_analysis_renders_stage_latency(self):
+        """Test that analyses and trace stages appear in the exposition."""
+        metrics.observe_analysis("rapido", "success", 1.5, {"rag.vector_search": 12.0})
+        payload, content_type = metrics.render_metrics()
+        text = payload.decode("utf-8")
+
+        self.assertIn("text/plain", content_type)
+        self.assertIn('riskguardian_analyses_total{analysis_type="rapido",status="success"}', text)
+        self.assertIn('riskguardian_stage_duration_seconds_count{stage="rag.vector_search"}', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
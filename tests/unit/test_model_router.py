@@ -0,0 +1,84 @@
+"""
+Unit tests for token accounting and cost-aware model routing.
+"""
+import os
+import sys
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.model_router import ModelRouter, TokenUsageLedger, parse_tier_budgets
+
+
+class TestModelRouter(unittest.TestCase):
+    """
+    Test the usage ledger and the routing rules.
+    """
+
+    def setUp(self):
+        """Create a router with a single cheaper alternative."""
+        self.ledger = TokenUsageLedger()
+        self.router = ModelRouter(
+            self.ledger,
+            cheap_models=["gpt-3.5-turbo"],
+            queue_threshold=2,
+            large_prompt_tokens=5000,
+            protected_tiers=["experto"]
+        )
+
+    def test_ledger_aggregates_per_day_and_tier(self):
+        """Test that usage is summed per tier and model."""
+        self.ledger.record("estandar", "gpt-4.1-turbo", 1000, 500)
+        self.ledger.record("estandar", "gpt-3.5-turbo", 1000, 500)
+        self.ledger.record("rapido", "gpt-3.5-turbo", 100, 50, day="2000-01-01")
+
+        today = self.ledger.summary(days=1)
+        self.assertEqual(len(today), 1)
+        tier = next(iter(today.values()))["estandar"]
+        self.assertEqual(tier["requests"], 2)
+        self.assertEqual(tier["prompt_tokens"], 2000)
+        self.assertEqual(set(tier["models"]), {"gpt-4.1-turbo", "gpt-3.5-turbo"})
+        self.assertAlmostEqual(self.ledger.spent_usd("estandar"), 0.006 + 0.00125)
+
+    def test_primary_when_unconstrained(self):
+        """Test that the configured model is kept without pressure."""
+        decision = self.router.route("estandar", "gpt-4.1-turbo", 2000, 2000)
+        self.assertEqual(decision.model, "gpt-4.1-turbo")
+        self.assertFalse(decision.rerouted)
+
+    def test_budget_downgrade(self):
+        """Test that an exhausted tier budget moves to the cheaper model."""
+        self.router.tier_budgets_usd = {"estandar": 0.015}
+        self.ledger.record("estandar", "gpt-4.1-turbo", 2000, 500)
+
+        decision = self.router.route("estandar", "gpt-4.1-turbo", 2000, 2000)
+        self.assertEqual(decision.model, "gpt-3.5-turbo")
+        self.assertEqual(decision.reason, "budget")
+
+    def test_large_prompt_and_queue_pressure(self):
+        """Test size and queue rules, which protected tiers ignore."""
+        self.assertEqual(self.router.route("estandar", "gpt-4.1-turbo", 6000, 2000).reason, "large_prompt")
+        self.assertEqual(self.router.route("experto", "gpt-4.1-turbo", 6000, 2000).model, "gpt-4.1-turbo")
+
+        with self.router.track(), self.router.track():
+            self.assertEqual(self.router.route("estandar", "gpt-4.1-turbo", 100, 2000).reason, "queue_pressure")
+        self.assertEqual(self.router.in_flight, 0)
+
+    def test_context_window(self):
+        """Test that models whose context cannot hold the prompt are skipped."""
+        decision = self.router.route("rapido", "gpt-4", 7000, 2000)
+        self.assertEqual(decision.model, "gpt-3.5-turbo")
+        self.assertEqual(decision.reason, "context_window")
+
+        decision = self.router.route("rapido", "gpt-4", 20000, 2000)
+        self.assertEqual(decision.model, "gpt-4")
+        self.assertEqual(decision.reason, "context_exceeded")
+
+    def test_parse_tier_budgets(self):
+        """Test parsing of the per-tier budget setting."""
+        self.assertEqual(parse_tier_budgets("estandar=5, experto=20,bad"), {"estandar": 5.0, "experto": 20.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Unit tests for urgency-aware scheduling of LLM concurrency slots.
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.admission_control import AdmissionController
+from src.services.llm_resilience import AdaptiveConcurrencyLimiter
+from src.services.priority_scheduler import (
+    PriorityWaitQueue,
+    RequestPriority,
+    get_request_priority,
+    normalize_urgency,
+    parse_offsets,
+    request_priority
+)
+
+
+class TestPriorityWaitQueue(unittest.TestCase):
+    """
+    Test ordering by urgency, aging and per-client fair sharing.
+    """
+
+    def setUp(self):
+        """Create a queue with short offsets."""
+        self.queue = PriorityWaitQueue(
+            urgency_offsets={"critica": 0.0, "alta": 0.02, "media": 0.05, "baja": 0.1},
+            tier_offsets={"experto": 0.0, "rapido": 0.01},
+            fair_share_seconds=1.0
+        )
+
+    def _drain(self):
+        order = []
+        while self.queue:
+            order.append(self.queue.pop())
+        return order
+
+    def test_urgency_order_and_fifo_within_level(self):
+        """Test that critical requests go first and equal requests keep arrival order."""
+        self.queue.push("baja", RequestPriority("baja", client_id="a"))
+        self.queue.push("media-1", RequestPriority("media", client_id="b"))
+        self.queue.push("media-2", RequestPriority("media", client_id="c"))
+        self.queue.push("critica", RequestPriority("Crítica", client_id="d"))
+
+        self.assertEqual(self._drain(), ["critica", "media-1", "media-2", "baja"])
+        self.assertIsNone(self.queue.pop())
+
+    def test_aging_prevents_starvation(self):
+        """Test that a low-urgency request overtakes newer urgent ones after waiting."""
+        self.queue.push("baja", RequestPriority("baja", client_id="a"))
+        time.sleep(0.12)
+        self.queue.push("critica", RequestPriority("critica", client_id="b"))
+
+        self.assertEqual(self._drain(), ["baja", "critica"])
+
+    def test_fair_share_between_clients(self):
+        """Test that a burst from one client does not block another client."""
+        for i in range(3):
+            self.queue.push(f"a{i}", RequestPriority("media", client_id="a"))
+        self.queue.push("b0", RequestPriority("media", client_id="b"))
+
+        self.assertEqual(self._drain(), ["a0", "b0", "a1", "a2"])
+
+    def test_remove_and_status(self):
+        """Test that removed waiters are skipped and counters stay consistent."""
+        self.queue.push("x", RequestPriority("alta", client_id="a"))
+        self.queue.push("y", RequestPriority("alta", client_id="a"))
+        self.queue.remove("x")
+        self.queue.remove("missing")
+
+        self.assertEqual(self.queue.get_status(), {"queued": 1, "by_urgency": {"alta": 1}, "clients": 1})
+        self.assertEqual(self._drain(), ["y"])
+        self.assertEqual(self.queue.get_status()["by_urgency"], {})
+
+    def test_parsing_helpers(self):
+        """Test urgency normalization and offset parsing."""
+        self.assertEqual(normalize_urgency("CRÍTICA "), "critica")
+        self.assertEqual(normalize_urgency("desconocida"), "media")
+        self.assertEqual(parse_offsets("critica=0, baja=30, mal"), {"critica": 0.0, "baja": 30.0})
+
+
+class TestPriorityLimiter(unittest.TestCase):
+    """
+    Test that the LLM limiter hands free slots out by priority.
+    """
+
+    def test_critical_request_gets_next_slot(self):
+        """Test that a critical call queued last is served before queued triage calls."""
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter("m", initial_limit=1, max_limit=1)
+            self.assertTrue(await limiter.acquire())
+            served = []
+
+            async def call(name, urgency):
+                with request_priority(urgency, "estandar", client_id=name):
+                    self.assertTrue(await limiter.acquire(timeout=5))
+                    served.append(name)
+                    self.assertEqual(get_request_priority().urgency, urgency)
+                    limiter.release(0.01, success=True)
+
+            tasks = [asyncio.create_task(call(f"baja-{i}", "baja")) for i in range(5)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(call("critica", "critica")))
+            await asyncio.sleep(0)
+            self.assertEqual(limiter.get_status()["queue"]["by_urgency"], {"baja": 5, "critica": 1})
+
+            limiter.release(0.01, success=True)
+            await asyncio.gather(*tasks)
+            return served
+
+        served = asyncio.run(scenario())
+        self.assertEqual(served[0], "critica")
+        self.assertEqual(served[1:], [f"baja-{i}" for i in range(5)])
+
+    def test_critical_requests_are_never_shed(self):
+        """Test that admission degrades but does not reject protected urgencies."""
+        controller = AdmissionController(max_in_flight=1, protected_urgencies=["critica"])
+        controller._in_flight = 3
+
+        self.assertFalse(controller.admit("experto", "baja").admitted)
+        decision = controller.admit("experto", "critica")
+        self.assertTrue(decision.admitted)
+        self.assertEqual(decision.action, "rag_skipped")
+        self.assertTrue(decision.protected)
+
+    def test_protection_is_bounded_per_client_and_globally(self):
+        """Test that self-declared critical requests beyond the caps are shed and queued as media."""
+        controller = AdmissionController(
+            max_in_flight=1, protected_urgencies=["critica"], max_protected_in_flight=2, max_protected_per_client=1
+        )
+        controller._in_flight = 3
+
+        first = controller.admit("experto", "critica", client_id="10.0.0.1")
+        with controller.track(first):
+            repeat = controller.admit("experto", "critica", client_id="10.0.0.1")
+            self.assertFalse(repeat.admitted)
+            self.assertEqual(repeat.urgency, "media")
+
+            second = controller.admit("experto", "critica", client_id="10.0.0.2")
+            with controller.track(second):
+                self.assertEqual(controller.get_status()["protected_in_flight"], 2)
+                self.assertFalse(controller.admit("experto", "critica", client_id="10.0.0.3").admitted)
+
+        self.assertEqual(controller.get_status()["protected_in_flight"], 0)
+        self.assertTrue(controller.admit("experto", "critica", client_id="10.0.0.1").admitted)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Unit tests for quantized (int8 / binary) embedding storage.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.ann_recall import exact_search, make_queries, synthetic_vectors
+from src.services.fake_backends import HashingEmbeddings
+from src.services.rag.index_artifact import IndexArtifactError, write_index_artifact
+from src.services.rag.quantization import QuantizedVectors, build_quantized_for_artifact
+from src.services.rag.vector_store import SecurityVectorStore
+
+
+class TestQuantizedVectors(unittest.TestCase):
+    """
+    Test approximate scores, exact re-ranking and the on-disk format.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Build int8 and binary codes of the same vectors."""
+        cls.vectors = synthetic_vectors(3000, 64, clusters=30, spread=0.5, seed=3)
+        cls.queries = make_queries(cls.vectors, 40, noise=0.05, seed=3)
+        cls.truth = [set(exact_search(cls.vectors, query, 10).tolist()) for query in cls.queries]
+        cls.quantized = {storage: QuantizedVectors.build(cls.vectors, storage) for storage in ("int8", "binary")}
+
+    def _recall(self, quantized, rerank):
+        hits = 0
+        for query, expected in zip(self.queries, self.truth):
+            ids, _ = quantized.search(query, 10, self.vectors, rerank=rerank)
+            hits += len(expected & set(ids.tolist()))
+        return hits / (10 * len(self.queries))
+
+    def test_int8_scores_are_close_to_exact(self):
+        """Test that int8 approximate scores track the float32 inner products."""
+        query = self.queries[0]
+        approx = self.quantized["int8"].scores(query)
+        self.assertLess(np.abs(approx - self.vectors @ query).max(), 0.05)
+
+    def test_rerank_restores_recall(self):
+        """Test that a small exact re-rank set recovers the exact top-k."""
+        self.assertGreater(self._recall(self.quantized["int8"], rerank=10), 0.9)
+        self.assertGreater(self._recall(self.quantized["binary"], rerank=200), 0.95)
+
+        ids, scores = self.quantized["binary"].search(self.queries[1], 5, self.vectors, rerank=100)
+        np.testing.assert_allclose(scores, self.vectors[ids] @ self.queries[1], rtol=1e-5)
+
+    def test_memory_and_roundtrip(self):
+        """Test the compression ratios and that saved codes load unchanged."""
+        self.assertGreater(self.quantized["int8"].get_stats()["compression_ratio"], 3.5)
+        self.assertGreater(self.quantized["binary"].get_stats()["compression_ratio"], 25)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.rgidx.binary")
+            self.quantized["binary"].save(path)
+            loaded = QuantizedVectors.load(path)
+            self.assertEqual(loaded.storage, "binary")
+            np.testing.assert_array_equal(loaded.codes, self.quantized["binary"].codes)
+
+            with open(path, "wb") as f:
+                f.write(b"not quantized")
+            self.assertRaises(IndexArtifactError, QuantizedVectors.load, path)
+
+
+class TestQuantizedStorageOption(unittest.TestCase):
+    """
+    Test the `storage` option of SecurityVectorStore on an artifact.
+    """
+
+    def setUp(self):
+        """Write a small artifact with hashing embeddings."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "index.rgidx")
+        self.embeddings = HashingEmbeddings(size=64)
+        texts = [f"control {i} phishing ransomware magerit riesgo {i % 7}" for i in range(40)]
+        chunks = [Document(page_content=text, metadata={"chunk_id": f"c{i}"}) for i, text in enumerate(texts)]
+        write_index_artifact(
+            self.path, chunks, self.embeddings.embed_documents(texts), [],
+            {"embedding_backend": "hashing:64", "docs_manifest": {"hash": "abc"}}
+        )
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp_dir.cleanup()
+
+    def _load(self, storage):
+        store = SecurityVectorStore(self.tmp_dir.name, storage=storage)
+        store.embeddings = self.embeddings
+        return store.load_index_artifact(self.path)
+
+    def test_storage_option_selects_quantized_index(self):
+        """Test that int8 storage searches the codes and finds exact duplicates."""
+        build_quantized_for_artifact(self.path, "int8")
+        index = self._load("int8")
+
+        self.assertEqual(index.get_search_info()["type"], "int8")
+        found = index.similarity_search("control 21 phishing ransomware magerit riesgo 0", k=1)
+        self.assertEqual(found[0].metadata["chunk_id"], "c21")
+
+    def test_missing_codes_fall_back_to_float32(self):
+        """Test that a storage without its sidecar file uses exact search."""
+        self.assertEqual(self._load("binary").get_search_info()["type"], "flat")
+
+
+if __name__ == "__main__":
+    unittest.main()
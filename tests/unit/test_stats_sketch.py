@@ -0,0 +1,78 @@
+"""
+Unit tests for fixed-memory streaming statistics.
+"""
+import os
+import sys
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.stats_sketch import (
+    DecayedSpaceSaving,
+    ShardedHeavyHitters,
+    LatencyHistogram,
+    extract_search_terms
+)
+
+
+class TestStatsSketch(unittest.TestCase):
+    """
+    Test heavy hitters sketch and latency histogram.
+    """
+
+    def test_extract_search_terms_filters_noise(self):
+        """Test that IPs, emails, hashes and short words are ignored."""
+        terms = extract_search_terms(
+            "Phishing desde 79.3.190.255 cr4ck.100@irnini.com "
+            "d41d8cd98f00b204e9800998ecf8427e con ransomware."
+        )
+        self.assertEqual(terms, ["phishing", "desde", "ransomware"])
+
+    def test_space_saving_memory_is_bounded(self):
+        """Test that the sketch never tracks more than its capacity."""
+        sketch = DecayedSpaceSaving(capacity=8, half_life_seconds=3600)
+        for i in range(1000):
+            sketch.add(f"term{i}", now=0.0)
+        for _ in range(50):
+            sketch.add("ransomware", now=0.0)
+
+        items = sketch.items(now=0.0)
+        self.assertLessEqual(len(items), 8)
+        self.assertEqual(max(items, key=lambda item: item[1])[0], "ransomware")
+
+    def test_space_saving_decay(self):
+        """Test that counts halve after one half-life."""
+        sketch = DecayedSpaceSaving(capacity=4, half_life_seconds=10)
+        base = sketch._landmark
+        for _ in range(8):
+            sketch.add("phishing", now=base)
+
+        count = dict((term, value) for term, value, _ in sketch.items(now=base + 10))["phishing"]
+        self.assertAlmostEqual(count, 4.0, places=3)
+
+    def test_sharded_top_k(self):
+        """Test top-k merge across shards."""
+        hitters = ShardedHeavyHitters(shards=4, capacity_per_shard=16)
+        for term, repetitions in (("malware", 5), ("phishing", 3), ("backup", 1)):
+            for _ in range(repetitions):
+                hitters.add(term)
+
+        self.assertEqual(list(hitters.top(2)), ["malware", "phishing"])
+
+    def test_latency_percentiles(self):
+        """Test percentile estimation from log buckets."""
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.observe(0.010)
+        histogram.observe(1.0)
+        histogram.observe(2.0)
+
+        percentiles = histogram.percentiles()
+        self.assertEqual(percentiles["count"], 100)
+        self.assertLess(percentiles["p50_ms"], 15)
+        self.assertGreaterEqual(percentiles["p99_ms"], 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Unit tests for the in-process span tracer.
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.tracing import TraceBuffer, get_current_trace, record_span, span, start_trace
+
+
+class TestTracing(unittest.TestCase):
+    """
+    Test span recording, context propagation and the trace buffer.
+    """
+
+    def test_span_without_trace_is_noop(self):
+        """Test that spans outside a trace do nothing."""
+        with span("orphan"):
+            pass
+        self.assertIsNone(get_current_trace())
+
+    def test_spans_propagate_to_tasks_and_threads(self):
+        """Test that child tasks and worker threads record on the same trace."""
+        buffer = TraceBuffer(maxlen=5)
+
+        def blocking_stage():
+            with span("thread_stage"):
+                pass
+
+        async def task_stage():
+            with span("task_stage"):
+                await asyncio.to_thread(blocking_stage)
+
+        async def run():
+            with start_trace("operation", buffer=buffer) as trace:
+                with span("validation"):
+                    pass
+                await asyncio.gather(task_stage(), task_stage())
+                record_span("llm.ttft", trace.start, trace.start + 0.25)
+            return trace
+
+        trace = asyncio.run(run())
+        breakdown = trace.breakdown()
+
+        self.assertEqual(
+            set(breakdown),
+            {"validation", "task_stage", "thread_stage", "llm.ttft"}
+        )
+        self.assertAlmostEqual(breakdown["llm.ttft"], 250.0, places=3)
+        self.assertEqual(len(trace.spans), 6)
+        self.assertIsNone(get_current_trace())
+
+    def test_buffer_is_bounded_and_summarized(self):
+        """Test ring buffer eviction and per-stage summary."""
+        buffer = TraceBuffer(maxlen=3)
+        for i in range(5):
+            with start_trace("operation", buffer=buffer, index=i):
+                with span("stage"):
+                    pass
+
+        recent = buffer.recent(limit=10)
+        self.assertEqual(len(recent), 3)
+        self.assertEqual(recent[0]["attributes"]["index"], 4)
+
+        summary = buffer.stage_summary("operation")
+        self.assertEqual(summary["stage"]["count"], 3)
+        self.assertEqual(summary["total"]["count"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
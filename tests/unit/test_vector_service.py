@@ -0,0 +1,160 @@
+"""
+Unit tests for the shared vector-service mode (Chroma HttpClient).
+
+The in-process EphemeralClient exposes the same client API as HttpClient.
+"""
+import os
+import sys
+import threading
+import unittest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import chromadb
+from chromadb.config import Settings
+from langchain_core.documents import Document
+
+from src.services.rag.index_versions import LEGACY_VERSION
+from src.services.rag.vector_service import (
+    BatchedQueryCollection,
+    RemoteDocStore,
+    RemoteIndexVersionManager
+)
+
+
+class RecordingCollection:
+    """Collection stub that records each query request."""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+        self.name = "recording"
+
+    def query(self, query_embeddings=None, n_results=10, include=None, **kwargs):
+        with self.lock:
+            self.requests.append(len(query_embeddings))
+        return {
+            "ids": [[f"id-{embedding[0]}"] for embedding in query_embeddings],
+            "distances": [[embedding[0]] for embedding in query_embeddings],
+            "embeddings": None,
+            "metadatas": None,
+            "documents": [[f"doc-{embedding[0]}"] for embedding in query_embeddings],
+            "uris": None,
+            "data": None
+        }
+
+
+class TestBatchedQueryCollection(unittest.TestCase):
+    """
+    Test that concurrent queries share HTTP requests and get their own rows.
+    """
+
+    def test_concurrent_queries_are_batched_and_split(self):
+        """Test that each caller receives the row of its own embedding."""
+        collection = RecordingCollection()
+        batched = BatchedQueryCollection(collection, window_seconds=0.05, max_batch_size=8)
+
+        def query(i):
+            return batched.query(query_embeddings=[float(i), 0.0], n_results=1)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(query, range(8)))
+
+        for i, result in enumerate(results):
+            self.assertEqual(result["ids"], [[f"id-{float(i)}"]])
+            self.assertEqual(result["documents"], [[f"doc-{float(i)}"]])
+            self.assertIsNone(result["metadatas"])
+        self.assertEqual(sum(collection.requests), 8)
+        self.assertLess(len(collection.requests), 8)
+        self.assertEqual(batched.get_stats()["queries"], 8)
+        self.assertEqual(batched.name, "recording")
+
+    def test_multi_embedding_queries_pass_through(self):
+        """Test that queries that are already batched are sent unchanged."""
+        collection = RecordingCollection()
+        batched = BatchedQueryCollection(collection, window_seconds=0.05)
+
+        result = batched.query(query_embeddings=[[1.0], [2.0]], n_results=1)
+
+        self.assertEqual(collection.requests, [2])
+        self.assertEqual(len(result["ids"]), 2)
+        self.assertEqual(batched.get_stats()["requests"], 0)
+
+
+class TestRemoteIndex(unittest.TestCase):
+    """
+    Test parent sections and the shared active pointer stored on the server.
+    """
+
+    def setUp(self):
+        """Use a unique collection prefix on an in-process client."""
+        self.client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+        self.base_name = f"test-{uuid.uuid4().hex[:8]}"
+
+    def _make(self, versions, version):
+        self.client.create_collection(versions.collection_for(version))
+        return version
+
+    def test_docstore_roundtrip(self):
+        """Test that sections keep their content and full metadata."""
+        docstore = RemoteDocStore(self.client, f"{self.base_name}__parents")
+        self.assertFalse(docstore.exists())
+
+        sections = [
+            Document(page_content=f"Sección {i}", metadata={"chunk_id": f"p{i}", "keywords": ["riesgo", "iso"]})
+            for i in range(3)
+        ]
+        self.assertEqual(docstore.add_sections(sections), 3)
+
+        found = docstore.get_sections(["p2", "p0", "p2", "missing"])
+        self.assertEqual(set(found), {"p0", "p2"})
+        self.assertEqual(found["p2"].page_content, "Sección 2")
+        self.assertEqual(found["p0"].metadata["keywords"], ["riesgo", "iso"])
+        self.assertEqual(docstore.count(), 3)
+
+    def test_pointer_is_shared_between_managers(self):
+        """Test that a version activated by one process is seen by another."""
+        writer = RemoteIndexVersionManager(self.client, self.base_name)
+        reader = RemoteIndexVersionManager(self.client, self.base_name)
+        self.assertEqual(reader.active_version(), LEGACY_VERSION)
+        self.assertRaises(ValueError, writer.activate, "missing")
+
+        writer.activate(self._make(writer, "v1"))
+        self.assertEqual(reader.active_version(), "v1")
+
+    def test_collect_removes_old_version_collections(self):
+        """Test that stale versions lose both their chunk and parent collections."""
+        versions = RemoteIndexVersionManager(self.client, self.base_name, keep_versions=2)
+        for version in ("v1", "v2", "v3"):
+            self._make(versions, version)
+            RemoteDocStore(self.client, versions.parents_collection_for(version)).add_sections(
+                [Document(page_content="x", metadata={"chunk_id": "p"})]
+            )
+        versions.activate("v3")
+
+        self.assertEqual(versions.list_versions(), ["v1", "v2", "v3"])
+        self.assertEqual(versions.collect(), ["v1"])
+        self.assertEqual(versions.list_versions(), ["v2", "v3"])
+
+        names = {collection.name for collection in self.client.list_collections()}
+        self.assertNotIn(versions.parents_collection_for("v1"), names)
+        self.assertIn(versions.parents_collection_for("v2"), names)
+
+    def test_discard_and_status_without_filesystem(self):
+        """Test that the shared base methods work on collection storage."""
+        versions = RemoteIndexVersionManager(self.client, self.base_name)
+        versions.activate(self._make(versions, "v1"))
+        self._make(versions, "v2")
+
+        versions.discard("v1")
+        versions.discard("v2")
+        self.assertEqual(versions.list_versions(), ["v1"])
+        self.assertFalse(hasattr(versions, "path_for"))
+        self.assertEqual(versions.get_status()["active_version"], "v1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Unit tests for incremental vector store statistics.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.rag.vector_store import SecurityVectorStore
+
+
+class TestVectorStoreStats(unittest.TestCase):
+    """
+    Test incremental aggregation of collection statistics.
+    """
+
+    def setUp(self):
+        """Create a vector store manager without a backing collection."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = SecurityVectorStore(self.tmp_dir.name)
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp_dir.cleanup()
+
+    def test_accumulate_and_subtract(self):
+        """Test that adding and removing documents keeps counters exact."""
+        self.store._accumulate_stats([
+            {"document_type": "metodologia_riesgo", "language": "es"},
+            {"document_type": "metodologia_riesgo", "language": "es"},
+            {"document_type": "principios_seguridad", "language": "en"}
+        ], sign=1)
+        self.store._accumulate_stats([
+            {"document_type": "principios_seguridad", "language": "en"}
+        ], sign=-1)
+
+        aggregates = self.store._stats_aggregates
+        self.assertEqual(aggregates["total_documents"], 2)
+        self.assertEqual(aggregates["document_types"], {"metodologia_riesgo": 2})
+        self.assertEqual(aggregates["languages"], {"es": 2})
+
+    def test_stats_without_vectorstore(self):
+        """Test that stats report not_initialized before indexing."""
+        stats = self.store.get_vectorstore_stats()
+        self.assertEqual(stats["status"], "not_initialized")
+
+
+if __name__ == "__main__":
+    unittest.main()